@@ -1,18 +1,46 @@
 """
 camparitraj __ini__ file
 A short description of the project.
+
+Submodules (e.g. ``camparitraj.ctprotein``) and the version attributes are loaded on first
+access, such that ``import camparitraj`` stays fast; the heavy dependencies (mdtraj, scipy)
+are only imported once an analysis module is actually used.
 """
+import importlib
 import os
 
 # Add imports here
 from .camparitraj import *
+from .ctresources import set_resources, get_resources
+
+
+# apply any resource limits defined through CAMPARITRAJ_THREADS, CAMPARITRAJ_WORKERS and
+# CAMPARITRAJ_MEMORY_LIMIT
+from . import ctresources
+ctresources.set_resources_from_environment()
+
+
+# submodules that are imported on first attribute access (e.g. camparitraj.cttrajectory)
+_LAZY_SUBMODULES = ['benchmarks', 'configs', 'ctcluster', 'ctcoarsegrain', 'ctdata', 'ctensemble',
+                    'ctexceptions', 'ctfeatures', 'ctframes', 'ctio', 'ctmutualinformation', 'ctnmr', 'ctpolymer',
+                    'ctpre', 'ctprofiling', 'ctprogress', 'ctprotein', 'ctreader', 'ctreweight',
+                    'ctsynthetic', 'cttools', 'cttrajectory', 'ctuncertainty', 'ctutils']
+
+
+def __getattr__(name):
+
+    # versioneer calls out to git, so the version is only determined when it is first requested
+    if name in ('__version__', '__git_revision__'):
+        from ._version import get_versions
+        versions = get_versions()
+        globals()['__version__'] = versions['version']
+        globals()['__git_revision__'] = versions['full-revisionid']
+        return globals()[name]
+
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
 
-# Handle versioneer
-from ._version import get_versions
-versions = get_versions()
-__version__ = versions['version']
-__git_revision__ = versions['full-revisionid']
-del get_versions, versions
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 # code that allows access to the data directory
@@ -22,4 +50,6 @@ def get_data(path):
 
 
 def get_version():
-    return "%s - %s" % (str(__version__), str(__git_revision__))
+    if '__version__' not in globals():
+        __getattr__('__version__')
+    return "%s - %s" % (str(globals()['__version__']), str(globals()['__git_revision__']))
@@ -0,0 +1,639 @@
+"""
+benchmarks contains a reproducible performance benchmark suite for the core CTProtein analysis
+routines and for trajectory loading. It is run from the command line with
+
+    python -m camparitraj.benchmarks --frames 100 1000 --output results.json
+
+and records, for each benchmark and each system/number-of-frames combination, the wall-clock
+time (best and median over a number of repeats) and the peak memory allocated while the
+benchmark runs. Results are written as JSON together with metadata about the machine and the
+versions used, and can be compared against a previously stored baseline (``--baseline``) to
+flag regressions (e.g. before upgrading camparitraj, numpy or mdtraj in production).
+
+Benchmark trajectories are either built from the shipped test systems by repeating their frames
+(with a small, seeded random perturbation so frames are distinct), or are synthetic
+excluded-volume chains of any length generated with ``ctsynthetic`` (systems named
+``synthetic-<n_residues>``, also selected with ``--residues``). The suite therefore needs no
+network access or external data and is reproducible from run to run.
+
+Import times (``--imports``) are measured in fresh Python processes, each importing a single
+module, and are checked against a per-module budget (IMPORT_BUDGETS) so that heavy dependencies
+are not accidentally pulled in when the package is imported (e.g. by ctanalyzer, which is often
+invoked many times for small analyses).
+
+Peak memory is measured with tracemalloc in a separate (untimed) run, and therefore covers
+memory allocated through Python and numpy but not memory allocated internally by compiled
+extensions.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+import platform
+import tempfile
+import tracemalloc
+
+import numpy as np
+import mdtraj as md
+
+import camparitraj
+from .cttrajectory import CTTrajectory
+from . import ctsynthetic
+from .ctexceptions import CTException
+
+RESULTS_VERSION = 1
+
+# shipped systems benchmark trajectories are built from
+SYSTEMS = {'gs6': ('gs6.pdb', 'gs6.xtc'),
+           'ntl9': ('ntl9.pdb', 'ntl9.xtc')}
+
+# synthetic systems are named SYNTHETIC_PREFIX + number of residues
+SYNTHETIC_PREFIX = 'synthetic-'
+
+DEFAULT_SYSTEMS = ['gs6', 'ntl9', 'synthetic-100']
+DEFAULT_FRAMES = [100, 1000]
+
+# ratio of time (or peak memory) relative to the baseline above which a result is flagged
+DEFAULT_THRESHOLD = 1.25
+
+# perturbation (nm) added to repeated frames
+PERTURBATION = 0.02
+
+
+# each benchmark is a function of the CTProtein being benchmarked
+BENCHMARKS = {'get_distance_map':                lambda CP: CP.get_distance_map(verbose=False),
+              'get_internal_scaling':            lambda CP: CP.get_internal_scaling(verbose=False),
+              'get_scaling_exponent':            lambda CP: CP.get_scaling_exponent(verbose=False),
+              'get_contact_map':                 lambda CP: CP.get_contact_map(),
+              'get_Q':                           lambda CP: CP.get_Q(),
+              'get_clusters':                    lambda CP: CP.get_clusters(),
+              'get_D_vector':                    lambda CP: CP.get_D_vector(verbose=False),
+              'get_all_SASA':                    lambda CP: CP.get_all_SASA(),
+              'get_dihedral_mutual_information': lambda CP: CP.get_dihedral_mutual_information()}
+
+# loading is benchmarked from files written to a temporary directory
+LOAD_BENCHMARK = 'load_trajectory'
+
+ALL_BENCHMARKS = [LOAD_BENCHMARK] + list(BENCHMARKS.keys())
+
+# import-time benchmarks are recorded under this benchmark name, with the module as the system
+IMPORT_BENCHMARK = 'import'
+
+# maximum import time (best of the repeats, in seconds) for each module. Importing the package
+# itself must not import mdtraj, scipy or multiprocessing; importing the analysis modules pulls
+# in mdtraj (~0.3 s) but not scipy.stats, scipy.optimize or scipy.cluster
+IMPORT_BUDGETS = {'camparitraj': 0.15,
+                  'camparitraj.ctprotein': 1.0,
+                  'camparitraj.cttrajectory': 1.0}
+
+# code run in a fresh interpreter to time a single import
+IMPORT_TIMER = 'import time; start = time.perf_counter(); import %s; print(time.perf_counter() - start)'
+
+
+# ........................................................................
+#
+def build_trajectory(system, n_frames, seed=0):
+    """
+    Builds a benchmark trajectory with n_frames frames. For the shipped test systems the frames
+    are repeated, adding a small random perturbation to every coordinate. Synthetic systems
+    (named synthetic-<n_residues>) are capped, all-atom-like excluded-volume chains.
+
+    Parameters
+    ----------
+    system : str
+        Name of the system (one of the keys of SYSTEMS, or synthetic-<n_residues>).
+
+    n_frames : int
+        Number of frames.
+
+    seed : int {0}
+        Seed for the random perturbation.
+
+    Returns
+    -------
+    mdtraj.Trajectory
+
+    """
+
+    n_frames = int(n_frames)
+    if n_frames < 1:
+        raise CTException('n_frames must be a positive integer')
+
+    if system.startswith(SYNTHETIC_PREFIX):
+        try:
+            n_residues = int(system[len(SYNTHETIC_PREFIX):])
+        except ValueError:
+            raise CTException('Synthetic systems must be named %s<n_residues> (got %s)' % (SYNTHETIC_PREFIX, system))
+
+        return ctsynthetic.generate_trajectory(n_residues=n_residues, n_frames=n_frames, model='excluded-volume', caps=True, seed=seed)
+
+    if system not in SYSTEMS:
+        raise CTException('Unknown benchmark system [%s], must be one of %s or %s<n_residues>' % (system, str(list(SYSTEMS.keys())), SYNTHETIC_PREFIX))
+
+    data_dir = camparitraj.get_data('test_data')
+    (pdb, xtc) = SYSTEMS[system]
+    template = md.load('%s/%s' % (data_dir, xtc), top='%s/%s' % (data_dir, pdb))
+
+    index = np.arange(n_frames) % template.n_frames
+
+    rng = np.random.default_rng(seed)
+    xyz = template.xyz[index] + rng.normal(0, PERTURBATION, size=(n_frames, template.n_atoms, 3)).astype(np.float32)
+
+    unitcell_lengths = None if template.unitcell_lengths is None else template.unitcell_lengths[index]
+    unitcell_angles = None if template.unitcell_angles is None else template.unitcell_angles[index]
+
+    return md.Trajectory(xyz, template.topology, time=np.arange(n_frames, dtype=np.float32), unitcell_lengths=unitcell_lengths, unitcell_angles=unitcell_angles)
+
+
+# ........................................................................
+#
+def time_function(function, repeats=3, memory=True):
+    """
+    Times a function (called without arguments) and optionally measures its peak memory.
+
+    Parameters
+    ----------
+    function : callable
+        Function to benchmark.
+
+    repeats : int {3}
+        Number of timed calls.
+
+    memory : bool {True}
+        If True the function is called once more with tracemalloc enabled to measure the peak
+        memory allocated during the call.
+
+    Returns
+    -------
+    dict
+        Dictionary with ``time`` (best time, seconds), ``median_time``, ``times`` (all timings)
+        and ``peak_memory_mb`` (None if memory was not measured).
+
+    """
+
+    times = []
+    for i in range(max(1, int(repeats))):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1] / (1024*1024)
+        finally:
+            tracemalloc.stop()
+
+    return {'time': float(np.min(times)),
+            'median_time': float(np.median(times)),
+            'times': times,
+            'peak_memory_mb': peak}
+
+
+# ........................................................................
+#
+def time_import(module, repeats=3):
+    """
+    Times importing a module in fresh Python processes (so nothing is already imported or cached
+    in sys.modules). Only the import itself is timed, not the interpreter start-up.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module to import (e.g. 'camparitraj.cttrajectory').
+
+    repeats : int {3}
+        Number of processes the import is timed in.
+
+    Returns
+    -------
+    dict
+        Dictionary with ``time`` (best time, seconds), ``median_time``, ``times`` (all timings)
+        and ``peak_memory_mb`` (always None).
+
+    """
+
+    times = []
+    for i in range(max(1, int(repeats))):
+        process = subprocess.run([sys.executable, '-c', IMPORT_TIMER % (module)], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if process.returncode != 0:
+            raise CTException('Unable to import [%s]:\n%s' % (module, process.stderr.strip()))
+        times.append(float(process.stdout.strip().split('\n')[-1]))
+
+    return {'time': float(np.min(times)),
+            'median_time': float(np.median(times)),
+            'times': times,
+            'peak_memory_mb': None}
+
+
+# ........................................................................
+#
+def run_import_suite(modules=None, repeats=3, verbose=True):
+    """
+    Times importing each module (see time_import()) and checks it against its budget.
+
+    Parameters
+    ----------
+    modules : list of str {None}
+        Modules to time (default the keys of IMPORT_BUDGETS).
+
+    repeats : int {3}
+        Number of processes each import is timed in.
+
+    verbose : bool {True}
+        If True each result is printed as it is obtained.
+
+    Returns
+    -------
+    list of dict
+        One dictionary per module, in the same format as the entries of run_suite()['results']
+        (with benchmark IMPORT_BENCHMARK, the module as system and 0 frames) plus ``budget``
+        (None if the module has no budget) and ``over_budget``.
+
+    """
+
+    if modules is None:
+        modules = list(IMPORT_BUDGETS.keys())
+
+    results = []
+    for module in modules:
+        entry = {'benchmark': IMPORT_BENCHMARK,
+                 'system': module,
+                 'n_residues': 0,
+                 'n_atoms': 0,
+                 'n_frames': 0,
+                 'budget': IMPORT_BUDGETS.get(module),
+                 'over_budget': False}
+
+        try:
+            entry.update(time_import(module, repeats=repeats))
+            entry['over_budget'] = entry['budget'] is not None and entry['time'] > entry['budget']
+        except CTException as e:
+            entry['error'] = str(e)
+
+        results.append(entry)
+
+        if verbose:
+            print(format_result(entry))
+            sys.stdout.flush()
+
+    return results
+
+
+# ........................................................................
+#
+def get_metadata():
+    """
+    Returns a dictionary describing the machine and software versions the benchmarks run with.
+
+    """
+
+    return {'camparitraj': camparitraj.get_version(),
+            'numpy': np.__version__,
+            'mdtraj': md.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+# ........................................................................
+#
+def run_suite(systems=None, frames=None, benchmarks=None, repeats=3, memory=True, seed=0, verbose=True):
+    """
+    Runs the benchmark suite over every combination of system and number of frames.
+
+    Benchmarks that raise an exception (e.g. get_scaling_exponent for a chain that is too short)
+    are recorded with the error message rather than stopping the suite.
+
+    Parameters
+    ----------
+    systems : list of str {None}
+        Systems to benchmark (default DEFAULT_SYSTEMS).
+
+    frames : list of int {None}
+        Numbers of frames to benchmark (default DEFAULT_FRAMES).
+
+    benchmarks : list of str {None}
+        Benchmarks to run (default all, see ALL_BENCHMARKS).
+
+    repeats : int {3}
+        Number of timed repeats per benchmark.
+
+    memory : bool {True}
+        Whether to measure peak memory.
+
+    seed : int {0}
+        Seed used to build the benchmark trajectories.
+
+    verbose : bool {True}
+        If True each result is printed as it is obtained.
+
+    Returns
+    -------
+    dict
+        Dictionary with ``version`` (format version), ``metadata`` (see get_metadata()) and
+        ``results``, a list with one dictionary per benchmark run.
+
+    """
+
+    if systems is None:
+        systems = DEFAULT_SYSTEMS
+
+    if frames is None:
+        frames = DEFAULT_FRAMES
+
+    if benchmarks is None:
+        benchmarks = ALL_BENCHMARKS
+
+    for name in benchmarks:
+        if name not in ALL_BENCHMARKS:
+            raise CTException('Unknown benchmark [%s], must be one of %s' % (name, str(ALL_BENCHMARKS)))
+
+    results = []
+    workdir = tempfile.mkdtemp(prefix='ctbenchmark')
+
+    try:
+        for system in systems:
+            for n_frames in frames:
+                traj = build_trajectory(system, n_frames, seed=seed)
+
+                pdb_filename = '%s/%s.pdb' % (workdir, system)
+                xtc_filename = '%s/%s_%i.xtc' % (workdir, system, n_frames)
+                traj[0].save_pdb(pdb_filename)
+                traj.save_xtc(xtc_filename)
+
+                CP = CTTrajectory(TRJ=traj).proteinTrajectoryList[0]
+
+                for name in benchmarks:
+                    if name == LOAD_BENCHMARK:
+                        function = lambda: CTTrajectory(xtc_filename, pdb_filename)
+                    else:
+                        function = lambda: BENCHMARKS[name](CP)
+
+                    entry = {'benchmark': name,
+                             'system': system,
+                             'n_residues': CP.n_residues,
+                             'n_atoms': traj.n_atoms,
+                             'n_frames': int(n_frames)}
+
+                    try:
+                        entry.update(time_function(function, repeats=repeats, memory=memory))
+                    except Exception as e:
+                        entry['error'] = '%s: %s' % (type(e).__name__, str(e))
+
+                    results.append(entry)
+
+                    if verbose:
+                        print(format_result(entry))
+                        sys.stdout.flush()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {'version': RESULTS_VERSION,
+            'metadata': get_metadata(),
+            'results': results}
+
+
+# ........................................................................
+#
+def __result_key(entry):
+    return (entry['benchmark'], entry['system'], entry['n_frames'])
+
+
+# ........................................................................
+#
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares benchmark results against a baseline. A result is flagged as a regression if its
+    time or peak memory is more than threshold times the baseline value, and otherwise as an
+    improvement if either is less than 1/threshold times the baseline value.
+
+    Parameters
+    ----------
+    results : dict
+        Results, as returned by run_suite() or load_results().
+
+    baseline : dict
+        Baseline results, in the same format.
+
+    threshold : float {1.25}
+        Ratio above which a change is flagged.
+
+    Returns
+    -------
+    list of dict
+        One dictionary per benchmark present in both results, with ``benchmark``, ``system``,
+        ``n_frames``, ``time``, ``baseline_time``, ``time_ratio``, ``memory_ratio`` (None if
+        memory was not measured in both) and ``status`` (one of 'regression', 'improvement',
+        'unchanged', 'error').
+
+    """
+
+    if not threshold > 1:
+        raise CTException('threshold must be larger than 1')
+
+    baseline_entries = {__result_key(entry): entry for entry in baseline['results']}
+
+    comparisons = []
+    for entry in results['results']:
+        key = __result_key(entry)
+        if key not in baseline_entries:
+            continue
+
+        reference = baseline_entries[key]
+
+        comparison = {'benchmark': entry['benchmark'],
+                      'system': entry['system'],
+                      'n_frames': entry['n_frames'],
+                      'time': entry.get('time'),
+                      'baseline_time': reference.get('time'),
+                      'time_ratio': None,
+                      'memory_ratio': None}
+
+        if 'error' in entry or 'error' in reference:
+            comparison['status'] = 'error' if 'error' in entry and 'error' not in reference else 'unchanged'
+            comparisons.append(comparison)
+            continue
+
+        ratios = [entry['time'] / max(reference['time'], 1e-9)]
+        comparison['time_ratio'] = ratios[0]
+
+        if entry.get('peak_memory_mb') is not None and reference.get('peak_memory_mb') is not None:
+            comparison['memory_ratio'] = entry['peak_memory_mb'] / max(reference['peak_memory_mb'], 1e-6)
+            ratios.append(comparison['memory_ratio'])
+
+        if max(ratios) > threshold:
+            comparison['status'] = 'regression'
+        elif min(ratios) < 1.0/threshold:
+            comparison['status'] = 'improvement'
+        else:
+            comparison['status'] = 'unchanged'
+
+        comparisons.append(comparison)
+
+    return comparisons
+
+
+# ........................................................................
+#
+def save_results(results, filename):
+    """
+    Writes benchmark results to a JSON file.
+
+    """
+
+    with open(filename, 'w') as fh:
+        json.dump(results, fh, indent=1)
+
+
+# ........................................................................
+#
+def load_results(filename):
+    """
+    Reads benchmark results from a JSON file written by save_results().
+
+    """
+
+    if not os.path.isfile(filename):
+        raise CTException('Benchmark results file [%s] could not be found' % (filename))
+
+    with open(filename) as fh:
+        results = json.load(fh)
+
+    if 'results' not in results:
+        raise CTException('File [%s] does not contain benchmark results' % (filename))
+
+    return results
+
+
+# ........................................................................
+#
+def format_result(entry):
+    """
+    Returns a one-line, human readable summary of a benchmark result.
+
+    """
+
+    label = '%-32s %-14s %8i frames' % (entry['benchmark'], entry['system'], entry['n_frames'])
+
+    if 'error' in entry:
+        return '%s   ERROR (%s)' % (label, entry['error'])
+
+    if entry.get('over_budget'):
+        return '%s %10.4f s   OVER BUDGET (%.2f s)' % (label, entry['time'], entry['budget'])
+
+    if entry.get('peak_memory_mb') is None:
+        return '%s %10.4f s' % (label, entry['time'])
+
+    return '%s %10.4f s %10.1f MB' % (label, entry['time'], entry['peak_memory_mb'])
+
+
+# ........................................................................
+#
+def main(argv=None):
+    """
+    Command line entry point (python -m camparitraj.benchmarks). Returns the exit status, which
+    is 1 if --fail-on-regression was passed and a regression was found, or if --imports was passed
+    and an import exceeded its budget.
+
+    """
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m camparitraj.benchmarks', description='Run the camparitraj performance benchmark suite')
+    parser.add_argument('--systems', nargs='+', default=None, help='Systems to benchmark; %s or %s<n_residues> [D=%s]' % (' '.join(SYSTEMS.keys()), SYNTHETIC_PREFIX, ' '.join(DEFAULT_SYSTEMS)))
+    parser.add_argument('--residues', nargs='+', type=int, default=[], help='Also benchmark synthetic chains with these numbers of residues')
+    parser.add_argument('--frames', nargs='+', type=int, default=DEFAULT_FRAMES, help='Numbers of frames to benchmark [D=%s]' % (' '.join([str(i) for i in DEFAULT_FRAMES])))
+    parser.add_argument('--benchmarks', nargs='+', default=None, choices=ALL_BENCHMARKS, help='Benchmarks to run [D=all]')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of timed repeats [D=3]')
+    parser.add_argument('--no-memory', action='store_true', help='Do not measure peak memory')
+    parser.add_argument('--seed', type=int, default=0, help='Seed used to build the benchmark trajectories [D=0]')
+    parser.add_argument('--output', '-o', help='Write results to this JSON file')
+    parser.add_argument('--baseline', '-b', help='Compare results against this JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Ratio to the baseline flagged as a regression [D=%.2f]' % (DEFAULT_THRESHOLD))
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 if any regression is found')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Only print the comparison summary')
+    parser.add_argument('--imports', action='store_true', help='Also time importing the modules in IMPORT_BUDGETS and fail if an import exceeds its budget')
+    parser.add_argument('--imports-only', action='store_true', help='Only run the import-time benchmarks')
+
+    args = parser.parse_args(argv)
+
+    # read the baseline first so a bad path fails before the (long) run
+    baseline = None
+    if args.baseline:
+        baseline = load_results(args.baseline)
+
+    systems = args.systems
+    if systems is None:
+        systems = [] if len(args.residues) > 0 else DEFAULT_SYSTEMS
+    systems = systems + ['%s%i' % (SYNTHETIC_PREFIX, n) for n in args.residues]
+
+    if args.imports_only:
+        results = {'version': RESULTS_VERSION, 'metadata': get_metadata(), 'results': []}
+    else:
+        results = run_suite(systems=systems, frames=args.frames, benchmarks=args.benchmarks, repeats=args.repeats, memory=not args.no_memory, seed=args.seed, verbose=not args.quiet)
+
+    over_budget = []
+    if args.imports or args.imports_only:
+        import_results = run_import_suite(repeats=args.repeats, verbose=not args.quiet)
+        results['results'].extend(import_results)
+        over_budget = [entry for entry in import_results if entry['over_budget'] or 'error' in entry]
+
+        for entry in over_budget:
+            if 'error' in entry:
+                print('Import of %s failed' % (entry['system']))
+            else:
+                print('Import of %s took %.3f s, exceeding its budget of %.2f s' % (entry['system'], entry['time'], entry['budget']))
+
+    if args.output:
+        save_results(results, args.output)
+
+    if baseline is None:
+        return 1 if len(over_budget) > 0 else 0
+
+    comparisons = compare_results(results, baseline, threshold=args.threshold)
+
+    print('')
+    print('Comparison against baseline [%s] (threshold %.2f)' % (args.baseline, args.threshold))
+    for comparison in comparisons:
+        if comparison['time_ratio'] is None:
+            print('%-32s %-14s %8i frames   %s' % (comparison['benchmark'], comparison['system'], comparison['n_frames'], comparison['status'].upper()))
+        else:
+            memory = '' if comparison['memory_ratio'] is None else ' (memory x%.2f)' % (comparison['memory_ratio'])
+            print('%-32s %-14s %8i frames   time x%.2f%s   %s' % (comparison['benchmark'], comparison['system'], comparison['n_frames'], comparison['time_ratio'], memory, comparison['status'].upper()))
+
+    regressions = [c for c in comparisons if c['status'] in ['regression', 'error']]
+    print('%i regression(s) in %i comparable benchmark(s)' % (len(regressions), len(comparisons)))
+
+    if args.fail_on_regression and len(regressions) > 0:
+        return 1
+
+    if len(over_budget) > 0:
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
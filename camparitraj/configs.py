@@ -14,18 +14,26 @@ configs contain all global configuration.
 ## Simulation analysis package
 ## Copyright 2014 - 2019
 ##
-import multiprocessing as mp
-import platform
+import os
+import sys
 import tempfile
 
 
-MAXCORES = mp.cpu_count()  # Added to resolve a reference with `cttrajectory.CTTrajectory.__init__`
+# cores this process may run on (respects CPU affinity masks, e.g. set by a batch scheduler). Note
+# os is used rather than multiprocessing, which is slow to import
+if hasattr(os, 'sched_getaffinity'):
+    MAXCORES = len(os.sched_getaffinity(0))
+else:
+    MAXCORES = os.cpu_count() or 1
 DEBUGGING = False
 
+# if True, frame-offset index files are written next to XTC trajectories (see ctreader)
+WRITE_INDEX_FILES = True
+
 
 # See: https://stackoverflow.com/questions/847850/cross-platform-way-of-getting-temp-directory-in-python
 TMP_DIR = tempfile.gettempdir()
-if platform.system().lower() == 'darwin':
+if sys.platform == 'darwin':
     TMP_DIR = '/tmp'
 
 
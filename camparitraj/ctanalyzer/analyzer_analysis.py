@@ -14,73 +14,86 @@
 import numpy as np
 import mdtraj as md
 from . import configs
-from camparitraj._internal_data import MAX_SASA_DATA
 from .analyzer_exception import AnalyzerException
-import afrc
+from camparitraj.ctprofiling import section
 AALIST = ['A','C','D','E','F','G','H','I','K','L','M','N','P','Q','R','S','T','V','W','Y']
 
 
-def status_message(ana, name):
-    print("Running %s on %s" % (ana, name))
+def status_message(ana, output):
+    print("Running %s on %s" % (ana, output.outdir))
 
 def arrayfy(val):
     return np.array([val])
     
-def run_RG(CP, outdir):
-    status_message('Radius of gyration', outdir)        
+@section('RG')
+def run_RG(CP, output):
+    status_message('Radius of gyration', output)        
     RG = CP.get_radius_of_gyration()
     MEAN_RG = arrayfy(np.mean(RG))
     STD_RG  = arrayfy(np.std(RG))
-    np.savetxt('%s/RG.csv'%(outdir), RG, delimiter=',')
-    np.savetxt('%s/RG_mean.csv'%(outdir), MEAN_RG, delimiter=', ')
-    np.savetxt('%s/RG_std.csv'%(outdir), STD_RG, delimiter=', ')
+    output.save('RG', RG, delimiter=',')
+    output.save('RG_mean', MEAN_RG, delimiter=', ')
+    output.save('RG_std', STD_RG, delimiter=', ')
 
-def run_RH(CP, outdir):
-    status_message('Hydrodynamic radius', outdir)        
+@section('RH')
+def run_RH(CP, output):
+    status_message('Hydrodynamic radius', output)        
     RH = CP.get_hydrodynamic_radius()
     MEAN_RH = arrayfy(np.mean(RH))
     STD_RH  = arrayfy(np.std(RH))
-    np.savetxt('%s/RH.csv'%(outdir), RH, delimiter=',')
-    np.savetxt('%s/RH_mean.csv'%(outdir), MEAN_RH, delimiter=', ')
-    np.savetxt('%s/RH_std.csv'%(outdir), STD_RH, delimiter=', ')
+    output.save('RH', RH, delimiter=',')
+    output.save('RH_mean', MEAN_RH, delimiter=', ')
+    output.save('RH_std', STD_RH, delimiter=', ')
 
-def run_end_to_end(CP, outdir):
-    status_message('End to end distance', outdir)        
+@section('end_to_end')
+def run_end_to_end(CP, output):
+    status_message('End to end distance', output)        
     E2E = CP.get_end_to_end_distance()
     MEAN_E2E = arrayfy(np.mean(E2E))
     STD_E2E  = arrayfy(np.std(E2E))
-    np.savetxt('%s/end_to_end.csv'%(outdir), E2E, delimiter=',')
-    np.savetxt('%s/end_to_end_mean.csv'%(outdir), MEAN_E2E, delimiter=', ')
-    np.savetxt('%s/end_to_end_std.csv'%(outdir), STD_E2E, delimiter=', ')
+    output.save('end_to_end', E2E, delimiter=',')
+    output.save('end_to_end_mean', MEAN_E2E, delimiter=', ')
+    output.save('end_to_end_std', STD_E2E, delimiter=', ')
 
-def run_asphericity(CP, outdir):
-    status_message('Asphericity', outdir)        
+@section('asphericity')
+def run_asphericity(CP, output):
+    status_message('Asphericity', output)        
     asph = CP.get_asphericity()
     MEAN_asph = arrayfy(np.mean(asph))
     STD_asph  = arrayfy(np.std(asph))
-    np.savetxt('%s/ASPH.csv'%(outdir), asph, delimiter=',')
-    np.savetxt('%s/ASPH_mean.csv'%(outdir), MEAN_asph, delimiter=', ')
-    np.savetxt('%s/ASPH_std.csv'%(outdir), STD_asph, delimiter=', ')
+    output.save('ASPH', asph, delimiter=',')
+    output.save('ASPH_mean', MEAN_asph, delimiter=', ')
+    output.save('ASPH_std', STD_asph, delimiter=', ')
 
-def run_distanceMap(CP, outdir):
-    status_message('Distance map', outdir)        
+@section('distanceMap')
+def run_distanceMap(CP, output):
+    status_message('Distance map', output)        
     [a,b] = CP.get_distance_map()
-    np.savetxt('%s/distance_map.csv'%(outdir), a, delimiter=',')
-    np.savetxt('%s/distance_map_std.csv'%(outdir), b, delimiter=', ')
+    output.save('distance_map', a, delimiter=',')
+    output.save('distance_map_std', b, delimiter=', ')
 
-def run_polymer_scaling_map(CP, outdir):
-    status_message('Polymer scaling map', outdir)        
+@section('polymer_scaling_map')
+def run_polymer_scaling_map(CP, output):
+    status_message('Polymer scaling map', output)        
     print("... absolute change:")
     [PSM, nu, A0, redchi] = CP.get_polymer_scaled_distance_map(mode='signed-absolute-change')
-    np.savetxt('%s/polymer_deviation_map_absolute.csv'%(outdir), PSM, delimiter=',')
+    output.save('polymer_deviation_map_absolute', PSM, delimiter=',')
 
     print("...fractional change:")
     [PSM, nu, A0, redchi] = CP.get_polymer_scaled_distance_map(mode='signed-fractional-change')
-    np.savetxt('%s/polymer_deviation_map_fractional.csv'%(outdir), PSM, delimiter=',')
+    output.save('polymer_deviation_map_fractional', PSM, delimiter=',')
 
-    np.savetxt('%s/polymer_deviation_map_params.csv'%(outdir), np.transpose([nu,A0,redchi]), delimiter=', ')
+    output.save('polymer_deviation_map_params', np.transpose([nu,A0,redchi]), delimiter=', ')
+
+@section('analytical_frc')
+def run_analytical_frc(CP, output,count=False):
+
+    # afrc is an optional dependency, only needed (and imported) when the AFRC analysis is requested
+    try:
+        import afrc
+    except ImportError:
+        raise AnalyzerException('The afrc package is required for AFRC analysis (pip install afrc)')
 
-def run_analytical_frc(CP, outdir,count=False):
     AAS = CP.get_amino_acid_sequence(oneletter=True)
     AAS_final = AAS.translate(str.maketrans('','','<>'))
     AFRC = afrc.AnalyticalFRC(AAS_final)
@@ -93,121 +106,134 @@ def run_analytical_frc(CP, outdir,count=False):
 
     # end_to_end
     [a,b] = AFRC.get_re_distribution()
-    np.savetxt('%s/AFRC_end_to_end_distribution.csv'%(outdir),np.array((a,b)).transpose())
+    output.save('AFRC_end_to_end_distribution', np.array((a,b)).transpose())
 
     re = AFRC.sample_re_distribution(n=count)
-    np.savetxt('%s/AFRC_end_to_end.csv'%(outdir),re)
+    output.save('AFRC_end_to_end', re)
 
     [a,b] = AFRC.get_rg_distribution()    
-    np.savetxt('%s/AFRC_rg_distribution.csv'%(outdir),np.array((a,b)).transpose())
+    output.save('AFRC_rg_distribution', np.array((a,b)).transpose())
 
     rg = AFRC.sample_rg_distribution(n=count)
-    np.savetxt('%s/AFRC_RG.csv'%(outdir),rg)
+    output.save('AFRC_RG', rg)
 
     dm = AFRC.get_distance_map()
-    np.savetxt('%s/AFRC_distance_map.csv'%(outdir),dm)
+    output.save('AFRC_distance_map', dm)
 
 
 
 
-def run_internal_scaling(CP, outdir):
+@section('internal_scaling')
+def run_internal_scaling(CP, output):
     IS = CP.get_internal_scaling()
     mean_is = [np.mean(i) for i in IS[1]]
-    np.savetxt('%s/INTSCAL.csv'%(outdir), mean_is, delimiter=', ')
+    output.save('INTSCAL', mean_is, delimiter=', ')
 
-def run_contact_map(CP, outdir, d_thresh):
+@section('contact_map')
+def run_contact_map(CP, output, d_thresh):
     cmap_full = CP.get_contact_map(distance_thresh=d_thresh)
-    np.savetxt('%s/contact_map_%3.3f.csv'%(outdir, d_thresh),cmap_full[0])
-    np.savetxt('%s/contact_order_%3.3f.csv'%(outdir, d_thresh),cmap_full[1])
+    output.save('contact_map_%3.3f' % (d_thresh), cmap_full[0])
+    output.save('contact_order_%3.3f' % (d_thresh), cmap_full[1])
 
 
-def run_RMS_internal_scaling(CP, outdir):
+@section('RMS_internal_scaling')
+def run_RMS_internal_scaling(CP, output):
     IS = CP.get_internal_scaling_RMS()
-    np.savetxt('%s/RMS_INTSCAL.csv'%(outdir), IS[1], delimiter=', ')
+    output.save('RMS_INTSCAL', IS[1], delimiter=', ')
 
 
-def run_fractal_deviation(CP, outdir, stride):
+@section('fractal_deviation')
+def run_fractal_deviation(CP, output, stride):
     
     (_, n_pairs, mean_cor, std_cor) = CP.get_local_to_global_correlation(stride=stride, n_cycles=1000, max_num_pairs=20)
-    np.savetxt('%s/fractional_deviation.csv'%(outdir), np.transpose([n_pairs, mean_cor, std_cor]), delimiter=', ')
+    output.save('fractional_deviation', np.transpose([n_pairs, mean_cor, std_cor]), delimiter=', ')
 
-def run_Q_analysis(CP, outdir):
+@section('Q_analysis')
+def run_Q_analysis(CP, output):
     Q_TUPLE =  CP.get_Q(stride=1, protein_average=False)
-    with open('%s/Q_res_by_res.txt'%(outdir), 'w') as fh:
-        for i in Q_TUPLE[3]: 
-            fh.write("%s, %3.3f\n" % (i[3:], np.mean(Q_TUPLE[2][i])))
+    text = ''
+    for i in Q_TUPLE[3]: 
+        text = text + "%s, %3.3f\n" % (i[3:], np.mean(Q_TUPLE[2][i]))
+    output.save_text('Q_res_by_res', text)
 
-def run_rij_analysis(CP, outdir, ri, rj):
+@section('rij_analysis')
+def run_rij_analysis(CP, output, ri, rj):
     rij = CP.get_inter_residue_COM_distance(ri, rj)
 
     MEAN_rij = arrayfy(np.mean(rij))
     STD_rij  = arrayfy(np.std(rij))
-    np.savetxt('%s/r_%i_%i.csv'%(outdir, ri, rj), rij, delimiter=',')
-    np.savetxt('%s/r_%i_%i_mean.csv'%(outdir, ri, rj), MEAN_rij, delimiter=', ')
-    np.savetxt('%s/r_%i_%i_std.csv'%(outdir, ri, rj), STD_rij, delimiter=', ')
+    output.save('r_%i_%i' % (ri, rj), rij, delimiter=',')
+    output.save('r_%i_%i_mean' % (ri, rj), MEAN_rij, delimiter=', ')
+    output.save('r_%i_%i_std' % (ri, rj), STD_rij, delimiter=', ')
 
-def run_rg_re_correlation(CP, outdir):
+@section('rg_re_correlation')
+def run_rg_re_correlation(CP, output):
     c = CP.get_end_to_end_vs_rg_correlation()
-    np.savetxt('%s/rg_re_corr.csv'%(outdir), arrayfy(c), delimiter=', ')
+    output.save('rg_re_corr', arrayfy(c), delimiter=', ')
 
 
-def run_scaling_exponent_power(CP, outdir, end_effect=5):
+@section('scaling_exponent_power')
+def run_scaling_exponent_power(CP, output, end_effect=5):
     c = CP.get_scaling_exponent(end_effect=end_effect, mode='COM')
 
     if end_effect == configs.DEFAULT_END_EFFECT:
-        outname_1='scaling_exp_analysis_power.csv'
-        outname_2='scaling_exp_idx_used_power.csv'
-        outname_3='scaling_exp_fit_power.csv'
+        outname_1='scaling_exp_analysis_power'
+        outname_2='scaling_exp_idx_used_power'
+        outname_3='scaling_exp_fit_power'
     else:
-        outname_1='scaling_exp_analysis_ee%i_power.csv' %(end_effect)
-        outname_2='scaling_exp_idx_used_ee%i_power.csv' % (end_effect)
-        outname_3='scaling_exp_fit_ee%i_power.csv' % (end_effect)
+        outname_1='scaling_exp_analysis_ee%i_power' %(end_effect)
+        outname_2='scaling_exp_idx_used_ee%i_power' % (end_effect)
+        outname_3='scaling_exp_fit_ee%i_power' % (end_effect)
 
-    np.savetxt('%s/%s'%(outdir, outname_1), c[0:8], delimiter=', ')
-    np.savetxt('%s/%s'%(outdir, outname_2), c[8].transpose(), delimiter=', ')
-    np.savetxt('%s/%s'%(outdir, outname_3), c[9].transpose(), delimiter=', ')
+    output.save(outname_1, c[0:8], delimiter=', ')
+    output.save(outname_2, c[8].transpose(), delimiter=', ')
+    output.save(outname_3, c[9].transpose(), delimiter=', ')
 
 
-def run_scaling_exponent_power_CA(CP, outdir, end_effect=5):
+@section('scaling_exponent_power_CA')
+def run_scaling_exponent_power_CA(CP, output, end_effect=5):
     c = CP.get_scaling_exponent(end_effect=end_effect, mode='CA')
 
     if end_effect == configs.DEFAULT_END_EFFECT:
-        outname_1='scaling_exp_analysis_power_CA.csv'
-        outname_2='scaling_exp_idx_used_power_CA.csv'
-        outname_3='scaling_exp_fit_power_CA.csv'
+        outname_1='scaling_exp_analysis_power_CA'
+        outname_2='scaling_exp_idx_used_power_CA'
+        outname_3='scaling_exp_fit_power_CA'
     else:
-        outname_1='scaling_exp_analysis_ee%i_power_CA.csv' %(end_effect)
-        outname_2='scaling_exp_idx_used_ee%i_power_CA.csv' % (end_effect)
-        outname_3='scaling_exp_fit_ee%i_power_CA.csv' % (end_effect)
+        outname_1='scaling_exp_analysis_ee%i_power_CA' %(end_effect)
+        outname_2='scaling_exp_idx_used_ee%i_power_CA' % (end_effect)
+        outname_3='scaling_exp_fit_ee%i_power_CA' % (end_effect)
 
-    np.savetxt('%s/%s'%(outdir, outname_1), c[0:8], delimiter=', ')
-    np.savetxt('%s/%s'%(outdir, outname_2), c[8].transpose(), delimiter=', ')
-    np.savetxt('%s/%s'%(outdir, outname_3), c[9].transpose(), delimiter=', ')
+    output.save(outname_1, c[0:8], delimiter=', ')
+    output.save(outname_2, c[8].transpose(), delimiter=', ')
+    output.save(outname_3, c[9].transpose(), delimiter=', ')
 
 
 #>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>    
 #>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>    
-def run_motif_RG(CP, outdir, R1_idx, R2_idx):
-    status_message('Motif RG [%i to %i]' %(R1_idx, R2_idx), outdir)        
+@section('motif_RG')
+def run_motif_RG(CP, output, R1_idx, R2_idx):
+    status_message('Motif RG [%i to %i]' %(R1_idx, R2_idx), output)        
     MOTIF_RG = CP.get_radius_of_gyration(R1=R1_idx, R2=R2_idx)
     MEAN_MOTIF_RG = arrayfy(np.mean(MOTIF_RG))
     STD_MOTIF_RG  = arrayfy(np.std(MOTIF_RG))        
-    np.savetxt('%s/motif_%i_%i_RG.csv'%(outdir, R1_idx, R2_idx), MOTIF_RG, delimiter=', ')
-    np.savetxt('%s/motif_%i_%i_RG_mean.csv'%(outdir, R1_idx, R2_idx), MEAN_MOTIF_RG, delimiter=', ')
-    np.savetxt('%s/motif_%i_%i_RG_std.csv'%(outdir, R1_idx, R2_idx), STD_MOTIF_RG, delimiter=', ')
+    output.save('motif_%i_%i_RG' % (R1_idx, R2_idx), MOTIF_RG, delimiter=', ')
+    output.save('motif_%i_%i_RG_mean' % (R1_idx, R2_idx), MEAN_MOTIF_RG, delimiter=', ')
+    output.save('motif_%i_%i_RG_std' % (R1_idx, R2_idx), STD_MOTIF_RG, delimiter=', ')
 
 
 
 #>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>    
 #>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>    
-def run_SASA(CP, outdir, stride2use, probe_radius=0.14):
-    status_message('SASA', outdir)       
+@section('SASA')
+def run_SASA(CP, output, stride2use, probe_radius=0.14):
+    status_message('SASA', output)       
 
 
 
     # read in max values for sidechains and backbone, and construct a dictionary that allows
     # easy lookup for each residue type
     #max_sasa_vals = np.loadtxt('/work/alex/tools/ANALYZER/data/SASA_SUMMARY.csv',delimiter=',')
+    from camparitraj._internal_data import MAX_SASA_DATA
     max_sasa_vals = MAX_SASA_DATA
     AA_max={}
     for idx in range(0,20):
@@ -278,35 +304,36 @@ def run_SASA(CP, outdir, stride2use, probe_radius=0.14):
     # get amino acid sequence and
 
     if probe_radius == 0.14:
-        np.savetxt('%s/SASA_mean.csv'%(outdir), MEAN_SASA, delimiter=', ')
-        np.savetxt('%s/SASA_std.csv'%(outdir), STD_SASA, delimiter=', ')
+        output.save('SASA_mean', MEAN_SASA, delimiter=', ')
+        output.save('SASA_std', STD_SASA, delimiter=', ')
 
-        np.savetxt('%s/SASA_BB_mean.csv'%(outdir), MEAN_SASA_BB, delimiter=', ')
-        np.savetxt('%s/SASA_BB_std.csv'%(outdir), STD_SASA_BB, delimiter=', ')
+        output.save('SASA_BB_mean', MEAN_SASA_BB, delimiter=', ')
+        output.save('SASA_BB_std', STD_SASA_BB, delimiter=', ')
 
-        np.savetxt('%s/SASA_SC_mean.csv'%(outdir), MEAN_SASA_SC, delimiter=', ')
-        np.savetxt('%s/SASA_SC_std.csv'%(outdir), STD_SASA_SC, delimiter=', ')
+        output.save('SASA_SC_mean', MEAN_SASA_SC, delimiter=', ')
+        output.save('SASA_SC_std', STD_SASA_SC, delimiter=', ')
 
-        np.savetxt('%s/SASA_BB_mean_norm.csv'%(outdir), MEAN_SASA_BB_norm, delimiter=', ')
-        np.savetxt('%s/SASA_BB_std_norm.csv'%(outdir), STD_SASA_BB_norm, delimiter=', ')
+        output.save('SASA_BB_mean_norm', MEAN_SASA_BB_norm, delimiter=', ')
+        output.save('SASA_BB_std_norm', STD_SASA_BB_norm, delimiter=', ')
 
-        np.savetxt('%s/SASA_SC_mean_norm.csv'%(outdir), MEAN_SASA_SC_norm, delimiter=', ')
-        np.savetxt('%s/SASA_SC_std_norm.csv'%(outdir), STD_SASA_SC_norm, delimiter=', ')
+        output.save('SASA_SC_mean_norm', MEAN_SASA_SC_norm, delimiter=', ')
+        output.save('SASA_SC_std_norm', STD_SASA_SC_norm, delimiter=', ')
 
     else:
-        np.savetxt('%s/SASA_mean_radius_%2.2f.csv'%(outdir, probe_radius), MEAN_SASA, delimiter=', ')
-        np.savetxt('%s/SASA_std_radius_%2.2f.csv'%(outdir, probe_radius), STD_SASA, delimiter=', ')
+        output.save('SASA_mean_radius_%2.2f' % (probe_radius), MEAN_SASA, delimiter=', ')
+        output.save('SASA_std_radius_%2.2f' % (probe_radius), STD_SASA, delimiter=', ')
 
-        np.savetxt('%s/SASA_BB_mean_radius_%2.2f.csv'%(outdir, probe_radius), MEAN_SASA_BB, delimiter=', ')
-        np.savetxt('%s/SASA_BB_std_radius_%2.2f.csv'%(outdir, probe_radius), STD_SASA_BB, delimiter=', ')
+        output.save('SASA_BB_mean_radius_%2.2f' % (probe_radius), MEAN_SASA_BB, delimiter=', ')
+        output.save('SASA_BB_std_radius_%2.2f' % (probe_radius), STD_SASA_BB, delimiter=', ')
 
-        np.savetxt('%s/SASA_SC_mean_radius_%2.2f.csv'%(outdir, probe_radius), MEAN_SASA_SC, delimiter=', ')
-        np.savetxt('%s/SASA_SC_std_radius_%2.2f.csv'%(outdir, probe_radius), STD_SASA_SC, delimiter=', ')
+        output.save('SASA_SC_mean_radius_%2.2f' % (probe_radius), MEAN_SASA_SC, delimiter=', ')
+        output.save('SASA_SC_std_radius_%2.2f' % (probe_radius), STD_SASA_SC, delimiter=', ')
 
 
         
 
-def run_DSSP_analysis_OLD(CP, outdir):
+@section('DSSP_analysis_OLD')
+def run_DSSP_analysis_OLD(CP, output):
 
     dssp_data = md.compute_dssp(CP.traj)
     C_vector = []
@@ -321,49 +348,54 @@ def run_DSSP_analysis_OLD(CP, outdir):
         E_vector.append(float(sum(dssp_data.transpose()[i] == 'E'))/n_frames)
         H_vector.append(float(sum(dssp_data.transpose()[i] == 'H'))/n_frames)
         
-    np.savetxt('%s/DSSP_H.csv'%(outdir), np.array(H_vector), delimiter=', ')
-    np.savetxt('%s/DSSP_E.csv'%(outdir), np.array(E_vector), delimiter=', ')
-    np.savetxt('%s/DSSP_C.csv'%(outdir), np.array(C_vector), delimiter=', ')
+    output.save('DSSP_H', np.array(H_vector), delimiter=', ')
+    output.save('DSSP_E', np.array(E_vector), delimiter=', ')
+    output.save('DSSP_C', np.array(C_vector), delimiter=', ')
 
 
-def run_DSSP_analysis(CP, outdir):
+@section('DSSP_analysis')
+def run_DSSP_analysis(CP, output):
 
     dssp_out = CP.get_secondary_structure_DSSP()
         
-    np.savetxt('%s/DSSP_H.csv'%(outdir), dssp_out[1], delimiter=', ')
-    np.savetxt('%s/DSSP_E.csv'%(outdir), dssp_out[2], delimiter=', ')
-    np.savetxt('%s/DSSP_C.csv'%(outdir), dssp_out[3], delimiter=', ')
+    output.save('DSSP_H', dssp_out[1], delimiter=', ')
+    output.save('DSSP_E', dssp_out[2], delimiter=', ')
+    output.save('DSSP_C', dssp_out[3], delimiter=', ')
 
 
-def run_BBSEG_analysis(CP, outdir):
+@section('BBSEG_analysis')
+def run_BBSEG_analysis(CP, output):
     bbseg_out = CP.get_secondary_structure_BBSEG()
 
     for i in range(0, 9):
-        np.savetxt('%s/BBSEG_%i.csv'%(outdir,i), np.array(bbseg_out[i]), delimiter=', ')
+        output.save('BBSEG_%i' % (i), np.array(bbseg_out[i]), delimiter=', ')
 
 
 
 #>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>    
 #>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>    
-def run_linear_heterogeneity(CP, outdir):
+@section('linear_heterogeneity')
+def run_linear_heterogeneity(CP, output):
     LH = CP.get_local_heterogeneity(stride=20)
-    np.savetxt('%s/linear_heterogeneity_mean.csv'%outdir, np.hstack((np.zeros(5), LH[0], np.zeros(5))), delimiter=', ')
-    np.savetxt('%s/linear_heterogeneity_std.csv'%outdir, np.hstack((np.zeros(5), LH[1], np.zeros(5))), delimiter=', ')
+    output.save('linear_heterogeneity_mean', np.hstack((np.zeros(5), LH[0], np.zeros(5))), delimiter=', ')
+    output.save('linear_heterogeneity_std', np.hstack((np.zeros(5), LH[1], np.zeros(5))), delimiter=', ')
 
 
-def run_heterogeneity_analysis(CP, strideval, outdir):
+@section('heterogeneity_analysis')
+def run_heterogeneity_analysis(CP, strideval, output):
     ALL_D = CP.get_D_vector(stride=strideval)
     mean_D  = arrayfy(np.mean(ALL_D))
     std_D   = arrayfy(np.std(ALL_D))
-    np.savetxt('%s/D_vector.csv'%(outdir), ALL_D, delimiter=', ')
-    np.savetxt('%s/D_mean.csv'%(outdir), mean_D, delimiter=', ')
-    np.savetxt('%s/D_std.csv'%(outdir), std_D, delimiter=', ')
+    output.save('D_vector', ALL_D, delimiter=', ')
+    output.save('D_mean', mean_D, delimiter=', ')
+    output.save('D_std', std_D, delimiter=', ')
 
 
-def run_cluster_analysis(CP, strideval, outdir):
+@section('cluster_analysis')
+def run_cluster_analysis(CP, strideval, output):
 
     glob = CP.get_clusters(stride=strideval, n_clusters=10)
-    np.savetxt('%s/cluster_size.csv'%(outdir), np.array(glob[0]), delimiter=', ')
+    output.save('cluster_size', np.array(glob[0]), delimiter=', ')
 
     centroids = glob[3]
 
@@ -378,12 +410,12 @@ def run_cluster_analysis(CP, strideval, outdir):
         centroid_traj = centroid_traj + t[c]
 
 
-    centroid_traj[0].save_pdb('cluster_centroid_traj.pdb')
-    centroid_traj.save_xtc('cluster_centroid_traj.xtc')
+    output.save_trajectory('cluster_centroid_traj', centroid_traj)
         
         
 
-def run_dihedral_extraction(CP, outdir):
+@section('dihedral_extraction')
+def run_dihedral_extraction(CP, output):
 
     MEGA_PHI=[]
     MEGA_PSI=[]
@@ -399,16 +431,17 @@ def run_dihedral_extraction(CP, outdir):
         MEGA_OMEGA.append(OMEGA)
         
     
-    np.savetxt('%s/PSI_matrix.csv'%(outdir), np.array(MEGA_PSI), delimiter=', ')
-    np.savetxt('%s/PHI_matrix.csv'%(outdir), np.array(MEGA_PHI), delimiter=', ')
-    np.savetxt('%s/OMEGA_matrix.csv'%(outdir), np.array(MEGA_OMEGA), delimiter=', ')
+    output.save('PSI_matrix', np.array(MEGA_PSI), delimiter=', ')
+    output.save('PHI_matrix', np.array(MEGA_PHI), delimiter=', ')
+    output.save('OMEGA_matrix', np.array(MEGA_OMEGA), delimiter=', ')
     
 
     
 
-def run_angle_mutual_information(CP, outdir, angle_name):    
+@section('angle_mutual_information')
+def run_angle_mutual_information(CP, output, angle_name):    
     MIMatrix = CP.get_dihedral_mutual_information(angle_name=angle_name)
-    np.savetxt('%s/%s_mutual_information.csv'%(outdir, angle_name), MIMatrix, delimiter=', ')
+    output.save('%s_mutual_information' % (angle_name), MIMatrix, delimiter=', ')
 
     
     
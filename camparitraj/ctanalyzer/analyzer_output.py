@@ -0,0 +1,290 @@
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+"""
+Output handling for ctanalyzer. Every analysis writes its results through an output object rather
+than directly to disk, so the on-disk format is chosen once for the whole run:
+
+* ``CSVOutput`` writes one text file per result (the original ctanalyzer behaviour).
+
+* ``NPZOutput`` streams every result into a single compressed ``.npz`` container as it is produced,
+  together with a JSON manifest that records the run metadata (stride, discard, version, parameters)
+  and the shape/dtype of each result.
+
+Trajectories (e.g. cluster centroids) are not numerical results and are always written as PDB/XTC
+files in the output directory with ``save_trajectory()``. The binary format records these files in
+its manifest.
+
+Results written in the binary format are read back with ``load_results()``, which only decompresses
+an individual result when it is accessed.
+
+"""
+
+import os
+import json
+import time
+import zipfile
+
+import numpy as np
+
+from .analyzer_exception import AnalyzerException
+
+OUTPUT_FORMATS = ['csv', 'npz']
+RESULTS_FILENAME = 'ctanalyzer_results.npz'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def get_output(outdir, fmt='csv', metadata=None):
+    """
+    Construct the output object used for a ctanalyzer run.
+
+    Parameters
+    ----------
+    outdir : str
+        Directory the results are written into.
+
+    fmt : str {'csv', 'npz'}
+        Output format. 'csv' writes one text file per result, 'npz' writes all results into a
+        single compressed container (``<outdir>/ctanalyzer_results.npz``).
+
+    metadata : dict
+        Run metadata saved in the manifest of the binary container (ignored for csv).
+
+    Returns
+    -------
+    CSVOutput or NPZOutput
+
+    """
+    if fmt == 'csv':
+        return CSVOutput(outdir)
+    elif fmt == 'npz':
+        return NPZOutput(outdir, metadata=metadata)
+    else:
+        raise AnalyzerException('Unknown output format [%s], must be one of %s' % (fmt, str(OUTPUT_FORMATS)))
+
+
+def _write_trajectory(outdir, name, traj):
+    """
+    Write a trajectory as <outdir>/<name>.pdb (first frame, as a topology) and <outdir>/<name>.xtc,
+    returning the two filenames.
+
+    """
+    pdb_filename = '%s/%s.pdb' % (outdir, name)
+    xtc_filename = '%s/%s.xtc' % (outdir, name)
+
+    traj[0].save_pdb(pdb_filename)
+    traj.save_xtc(xtc_filename)
+
+    return (pdb_filename, xtc_filename)
+
+
+class CSVOutput:
+    """
+    Writes each result to its own text file in the output directory.
+
+    """
+    def __init__(self, outdir):
+        self.outdir = outdir
+
+    def save(self, name, data, delimiter=' '):
+        """
+        Save a numerical result as <outdir>/<name>.csv
+
+        """
+        np.savetxt('%s/%s.csv' % (self.outdir, name), data, delimiter=delimiter)
+
+    def save_text(self, name, text, extension='.txt'):
+        """
+        Save a pre-formatted text result as <outdir>/<name><extension>
+
+        """
+        with open('%s/%s%s' % (self.outdir, name, extension), 'w') as fh:
+            fh.write(text)
+
+    def save_trajectory(self, name, traj):
+        """
+        Save a trajectory as <outdir>/<name>.pdb (first frame) and <outdir>/<name>.xtc
+
+        """
+        return _write_trajectory(self.outdir, name, traj)
+
+    def close(self):
+        pass
+
+
+class NPZOutput:
+    """
+    Streams every result into a single compressed .npz container. Each result is compressed and
+    written as soon as it is saved so results are never held in memory, and the manifest is written
+    when the output is closed. The container is written to a temporary file and only moved into place
+    by close(), so an interrupted run never leaves a partially written results file behind.
+
+    """
+    def __init__(self, outdir, metadata=None):
+        self.outdir = outdir
+        self.filename = '%s/%s' % (outdir, RESULTS_FILENAME)
+        self.__tmp_filename = '%s.tmp%i' % (self.filename, os.getpid())
+
+        if metadata is None:
+            metadata = {}
+
+        self.metadata = dict(metadata)
+        self.metadata['created'] = time.strftime('%Y-%m-%d %H:%M:%S')
+
+        self.__entries = {}
+        self.__files = {}
+        self.__zf = zipfile.ZipFile(self.__tmp_filename, mode='w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def save(self, name, data, delimiter=' '):
+        """
+        Save a numerical result under the key <name>. The delimiter is accepted for compatibility
+        with CSVOutput and ignored.
+
+        """
+        if self.__zf is None:
+            raise AnalyzerException('Output has already been closed')
+
+        if name in self.__entries or name == MANIFEST_NAME:
+            raise AnalyzerException('A result called [%s] has already been written' % (name))
+
+        data = np.asanyarray(data)
+
+        with self.__zf.open('%s.npy' % (name), mode='w', force_zip64=True) as fh:
+            np.lib.format.write_array(fh, data, allow_pickle=False)
+
+        self.__entries[name] = {'shape': list(data.shape), 'dtype': data.dtype.str}
+
+    def save_text(self, name, text, extension='.txt'):
+        """
+        Save a pre-formatted text result under the key <name>.
+
+        """
+        self.save(name, np.array(text))
+
+    def save_trajectory(self, name, traj):
+        """
+        Save a trajectory as <outdir>/<name>.pdb (first frame) and <outdir>/<name>.xtc alongside the
+        container. The file names (relative to the output directory) are recorded in the manifest.
+
+        """
+        if self.__zf is None:
+            raise AnalyzerException('Output has already been closed')
+
+        if name in self.__files:
+            raise AnalyzerException('A trajectory called [%s] has already been written' % (name))
+
+        self.__files[name] = [os.path.basename(f) for f in _write_trajectory(self.outdir, name, traj)]
+
+    def close(self):
+        """
+        Write the manifest and move the finished container into place.
+
+        """
+        if self.__zf is None:
+            return
+
+        manifest = {'manifest_version': MANIFEST_VERSION,
+                    'metadata': self.metadata,
+                    'results': self.__entries,
+                    'files': self.__files}
+
+        self.__zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1, default=str))
+        self.__zf.close()
+        self.__zf = None
+
+        os.replace(self.__tmp_filename, self.filename)
+
+
+class CTAnalyzerResults:
+    """
+    Read-only, lazy view of a binary ctanalyzer results container. Results are accessed like a
+    dictionary (``results['RG']``) and each one is only decompressed when it is accessed.
+
+    """
+    def __init__(self, filename):
+
+        if not os.path.isfile(filename):
+            raise AnalyzerException('Results file [%s] could not be found' % (filename))
+
+        with zipfile.ZipFile(filename) as zf:
+            if MANIFEST_NAME not in zf.namelist():
+                raise AnalyzerException('Results file [%s] has no manifest - was the run interrupted?' % (filename))
+            manifest = json.loads(zf.read(MANIFEST_NAME).decode())
+
+        self.filename = filename
+        self.manifest = manifest
+        self.metadata = manifest['metadata']
+        self.files = manifest.get('files', {})
+        self.__data = np.load(filename, allow_pickle=False)
+
+    def keys(self):
+        return list(self.manifest['results'].keys())
+
+    def shape(self, name):
+        """
+        Shape of a result, read from the manifest (i.e. without decompressing the data).
+
+        """
+        return tuple(self.__get_entry(name)['shape'])
+
+    def __get_entry(self, name):
+        if name not in self.manifest['results']:
+            raise KeyError(name)
+        return self.manifest['results'][name]
+
+    def __getitem__(self, name):
+        self.__get_entry(name)
+        return self.__data[name]
+
+    def __contains__(self, name):
+        return name in self.manifest['results']
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.manifest['results'])
+
+    def close(self):
+        self.__data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "CTAnalyzerResults [%s] (%i results)" % (self.filename, len(self))
+
+
+def load_results(filename):
+    """
+    Open a binary ctanalyzer results container. If a directory is passed the default results
+    filename within that directory is used.
+
+    Parameters
+    ----------
+    filename : str
+        Results file (or the ctanalyzer output directory).
+
+    Returns
+    -------
+    CTAnalyzerResults
+
+    """
+    if os.path.isdir(filename):
+        filename = os.path.join(filename, RESULTS_FILENAME)
+
+    return CTAnalyzerResults(filename)
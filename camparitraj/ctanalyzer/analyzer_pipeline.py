@@ -0,0 +1,733 @@
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+"""
+Single-pass analysis pipeline for ctanalyzer.
+
+Running the analyses one at a time (the ``run_*`` functions in analyzer_analysis) means the same
+underlying quantities are recomputed over and over - residue centers of mass are recomputed for the
+end-to-end distance, internal scaling, RMS internal scaling and both scaling exponent fits, the
+radius of gyration is recomputed for the hydrodynamic radius, and so on.
+
+In pipeline mode each analysis declares the intermediates it needs (e.g. residue centers of mass,
+CA positions, inter-residue distances), a planner orders the union of these intermediates by their
+dependencies, and the trajectory is walked once in chunks of frames. For each chunk every required
+intermediate is computed exactly once and handed to every analysis, which accumulates the
+sufficient statistics it needs (sums, sums of squares, per-frame values). Once all chunks have been
+seen each analysis writes the same results the corresponding ``run_*`` function would.
+
+Because every analysis only keeps sufficient statistics (counts, sums, sums of squares, per-frame
+values), the state of an incremental analysis can be saved after a run (see write_state()) and
+restored before the next one (see read_state()). A rerun over a trajectory that has grown then only
+needs to process the newly appended frames.
+
+"""
+
+import abc
+import os
+import json
+
+import numpy as np
+import mdtraj as md
+
+from camparitraj import ctio, ctpolymer, ctresources, ctframes
+from . import configs
+from .analyzer_exception import AnalyzerException
+
+# default name of the saved pipeline state within the output directory
+STATE_FILENAME = 'ctanalyzer_state.npz'
+
+
+# ........................................................................
+#
+# Intermediates. Each function computes the intermediate for a single chunk of frames, given the
+# chunk (an mdtraj.Trajectory), the intermediates already computed for the chunk (data) and the
+# per-protein index information built once by __build_index(). Distances/positions are in Angstroms.
+#
+def __compute_COM(chunk, data, index):
+    xyz = chunk.xyz[:, index['COM_atoms']].astype(np.float64) * index['COM_weights'][np.newaxis, :, np.newaxis]
+    return 10*np.add.reduceat(xyz, index['COM_starts'], axis=1)
+
+
+def __compute_CA(chunk, data, index):
+    return 10*chunk.xyz[:, index['CA_atoms']].astype(np.float64)
+
+
+def __pairwise_distances(positions, index):
+    return np.linalg.norm(positions[:, index['pairs_i']] - positions[:, index['pairs_j']], axis=2)
+
+
+def __compute_COM_distances(chunk, data, index):
+    return __pairwise_distances(data['COM'], index)
+
+
+def __compute_CA_distances(chunk, data, index):
+    return __pairwise_distances(data['CA'], index)
+
+
+def __compute_rg(chunk, data, index):
+    return 10*md.compute_rg(chunk)
+
+
+def __compute_gyration_tensor(chunk, data, index):
+    COM = np.einsum('fai,a->fi', chunk.xyz.astype(np.float64), index['masses'])
+    DIF = chunk.xyz - COM[:, np.newaxis, :]
+    return np.einsum('fai,faj->fij', DIF, DIF)/chunk.n_atoms
+
+
+def __compute_contact_distances(chunk, data, index):
+    return md.compute_contacts(chunk.atom_slice(index['mainchain_atoms']), scheme='closest-heavy')
+
+
+def __compute_dssp(chunk, data, index):
+    return md.compute_dssp(chunk.atom_slice(index['dssp_atoms']))
+
+
+# name -> (intermediates this one depends on, function)
+INTERMEDIATES = {'COM'              : ([], __compute_COM),
+                 'CA'               : ([], __compute_CA),
+                 'COM_distances'    : (['COM'], __compute_COM_distances),
+                 'CA_distances'     : (['CA'], __compute_CA_distances),
+                 'rg'               : ([], __compute_rg),
+                 'gyration_tensor'  : ([], __compute_gyration_tensor),
+                 'contact_distances': ([], __compute_contact_distances),
+                 'dssp'             : ([], __compute_dssp)}
+
+
+# ........................................................................
+#
+def __build_index(CP):
+    """
+    Internal function that builds the (chunk-independent) atom and residue-pair indices used to
+    compute the intermediates for a protein.
+
+    """
+
+    resids = np.array(CP.resid_with_CA)
+
+    # atoms of each residue, concatenated, with the start of each residue's block and the
+    # per-atom mass fraction within its residue
+    COM_atoms = []
+    COM_weights = []
+    COM_starts = []
+    for resid in resids:
+        atoms = [atom.index for atom in CP.topology.residue(int(resid)).atoms]
+        masses = np.array([CP.topology.atom(i).element.mass for i in atoms])
+
+        COM_starts.append(len(COM_atoms))
+        COM_atoms.extend(atoms)
+        COM_weights.extend(masses/np.sum(masses))
+
+    all_masses = np.array([atom.element.mass for atom in CP.topology.atoms])
+
+    (pairs_i, pairs_j) = np.triu_indices(len(resids), 1)
+
+    return {'resids'      : resids,
+            'COM_atoms'   : np.array(COM_atoms),
+            'COM_weights' : np.array(COM_weights),
+            'COM_starts'  : np.array(COM_starts),
+            'CA_atoms'    : np.array([CP.get_CA_index(resid, correctOffset=False) for resid in resids]),
+            'masses'      : all_masses/np.sum(all_masses),
+            'pairs_i'     : pairs_i,
+            'pairs_j'     : pairs_j,
+            'separation'  : resids[pairs_j] - resids[pairs_i],
+            'mainchain_atoms' : CP.topology.select('(not resname NME) and (not resname ACE)'),
+            'dssp_atoms'  : CP.topology.select('resid %i to %i' % (resids[0], resids[-1])),
+            'n_frames'    : CP.n_frames,
+            'n_residues'  : CP.n_residues}
+
+
+# ........................................................................
+#
+# Analyses. Each analysis declares the intermediates it requires, accumulates statistics from every
+# chunk in update(), and writes its results to a ctanalyzer output object in finish(). Incremental
+# analyses list the attributes that hold their accumulated statistics in state_fields, which are
+# what is saved and restored between runs.
+#
+class _Analysis:
+    requires = []
+    incremental = True
+    state_fields = []
+
+    def __init__(self, index):
+        self.index = index
+
+    def get_state(self):
+        return {field: np.asarray(getattr(self, field)) for field in self.state_fields}
+
+    def set_state(self, state):
+        for field in self.state_fields:
+            if field not in state:
+                raise AnalyzerException('Saved state for %s is missing [%s]' % (self.__class__.__name__, field))
+            setattr(self, field, state[field])
+
+
+class _PerFrameAnalysis(_Analysis, metaclass=abc.ABCMeta):
+    """
+    Analyses which report a per-frame quantity together with its mean and standard deviation.
+    Subclasses define the output `name` and compute the quantity for a chunk in per_frame().
+
+    """
+    name = None
+    state_fields = ['values']
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.values = []
+
+    @abc.abstractmethod
+    def per_frame(self, data):
+        """
+        Returns the per-frame values for one chunk, given the chunk's intermediates.
+
+        """
+
+    def update(self, data):
+        self.values.append(self.per_frame(data))
+
+    def get_state(self):
+        return {'values': np.concatenate(self.values) if len(self.values) > 0 else np.zeros(0)}
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.values = [state['values']]
+
+    def finish(self, output):
+        values = np.concatenate(self.values)
+        output.save(self.name, values, delimiter=',')
+        output.save('%s_mean' % (self.name), np.array([np.mean(values)]), delimiter=', ')
+        output.save('%s_std' % (self.name), np.array([np.std(values)]), delimiter=', ')
+
+
+class _RG(_PerFrameAnalysis):
+    requires = ['rg']
+    name = 'RG'
+
+    def per_frame(self, data):
+        return data['rg']
+
+
+class _RH(_PerFrameAnalysis):
+    requires = ['rg']
+    name = 'RH'
+
+    def per_frame(self, data):
+        return ctpolymer.get_hydrodynamic_radius(data['rg'], self.index['n_residues'])
+
+
+class _EndToEnd(_PerFrameAnalysis):
+    requires = ['COM']
+    name = 'end_to_end'
+
+    def per_frame(self, data):
+        return np.linalg.norm(data['COM'][:, 0] - data['COM'][:, -1], axis=1)
+
+
+class _Asphericity(_PerFrameAnalysis):
+    requires = ['gyration_tensor']
+    name = 'ASPH'
+
+    def per_frame(self, data):
+        EIG = np.linalg.eigvalsh(data['gyration_tensor'])
+        return 1 - 3*((EIG[:, 0]*EIG[:, 1] + EIG[:, 1]*EIG[:, 2] + EIG[:, 2]*EIG[:, 0])/np.power(np.sum(EIG, axis=1), 2))
+
+
+class _DistanceMap(_Analysis):
+    requires = ['CA_distances']
+    state_fields = ['total', 'total_sq', 'count']
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.count = 0
+
+    def update(self, data):
+        d = data['CA_distances']
+        self.total = self.total + np.sum(d, axis=0)
+        self.total_sq = self.total_sq + np.sum(d*d, axis=0)
+        self.count = self.count + d.shape[0]
+
+    def finish(self, output):
+        n_res = len(self.index['resids'])
+        mean = self.total/self.count
+        std = np.sqrt(np.maximum(self.total_sq/self.count - mean*mean, 0))
+
+        distance_map = np.zeros((n_res, n_res))
+        std_map = np.zeros((n_res, n_res))
+        distance_map[self.index['pairs_i'], self.index['pairs_j']] = mean
+        std_map[self.index['pairs_i'], self.index['pairs_j']] = std
+
+        output.save('distance_map', distance_map, delimiter=',')
+        output.save('distance_map_std', std_map, delimiter=', ')
+
+
+class _SeparationStatistics(_Analysis):
+    """
+    Accumulates sums of distances and squared distances for every sequence separation |i-j|. The
+    separation 0 (a residue with itself) is included and always has a distance of 0.
+
+    """
+    requires = ['COM_distances']
+    distances = 'COM_distances'
+    state_fields = ['total', 'total_sq', 'count']
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.n_sep = int(np.max(index['resids']) - np.min(index['resids'])) + 1
+        self.total = np.zeros(self.n_sep)
+        self.total_sq = np.zeros(self.n_sep)
+        self.count = np.zeros(self.n_sep)
+
+    def update(self, data):
+        d = data[self.distances]
+        sep = self.index['separation']
+        self.total = self.total + np.bincount(sep, weights=np.sum(d, axis=0), minlength=self.n_sep)
+        self.total_sq = self.total_sq + np.bincount(sep, weights=np.sum(d*d, axis=0), minlength=self.n_sep)
+        self.count = self.count + np.bincount(sep, minlength=self.n_sep)*d.shape[0]
+
+    def mean(self):
+        return np.divide(self.total, self.count, out=np.zeros(self.n_sep), where=self.count > 0)
+
+    def mean_sq(self):
+        return np.divide(self.total_sq, self.count, out=np.zeros(self.n_sep), where=self.count > 0)
+
+
+class _InternalScaling(_SeparationStatistics):
+
+    def finish(self, output):
+        output.save('INTSCAL', self.mean(), delimiter=', ')
+
+
+class _InternalScalingRMS(_SeparationStatistics):
+
+    def finish(self, output):
+        output.save('RMS_INTSCAL', np.sqrt(self.mean_sq()), delimiter=', ')
+
+
+class _ScalingExponent(_SeparationStatistics):
+    """
+    Polymer scaling exponent fit (see CTProtein.get_scaling_exponent()). The error estimate is a block
+    bootstrap over frames, so in addition to the pooled statistics the mean squared distance at every
+    separation is kept for every frame. As the bootstrap needs all of these per-frame values the
+    analysis is not saved between runs and so cannot be updated incrementally.
+
+    """
+    suffix = ''
+    incremental = False
+
+    def __init__(self, index, end_effect=configs.DEFAULT_END_EFFECT, inter_residue_min=15, block_size=None, n_bootstrap=1000, num_fitting_points=40):
+        super().__init__(index)
+
+        self.end_effect = end_effect
+        self.inter_residue_min = inter_residue_min
+        self.block_size = block_size
+        self.n_bootstrap = n_bootstrap
+        self.num_fitting_points = num_fitting_points
+
+        # pairs grouped by separation, so per-frame sums for each separation (1, 2, ...) are
+        # a single reduceat over the sorted pairs
+        self.pair_order = np.argsort(index['separation'], kind='stable')
+        pair_counts = np.bincount(index['separation'], minlength=self.n_sep)[1:]
+        self.separation_starts = np.concatenate([[0], np.cumsum(pair_counts)[:-1]])
+        self.pair_counts = pair_counts
+
+        self.per_frame_mean_sq = []
+
+    def update(self, data):
+        super().update(data)
+
+        d = data[self.distances][:, self.pair_order]
+        self.per_frame_mean_sq.append(np.add.reduceat(d*d, self.separation_starts, axis=1)/self.pair_counts)
+
+    def finish(self, output):
+        max_separation = self.n_sep
+
+        num_fitting_points = ctpolymer.get_num_scaling_fitting_points(max_separation, self.inter_residue_min, self.end_effect, self.num_fitting_points)
+
+        mean = self.mean()
+        mean_sq = self.mean_sq()
+
+        seq_sep_vals = list(range(1, max_separation))
+        seq_sep_RMS_distance = list(np.sqrt(mean_sq[1:]))
+        seq_sep_RMS_var_distance = list((mean_sq - mean*mean)[1:])
+
+        (seq_sep_subsampled_distances, n_replicates) = ctpolymer.get_scaling_bootstrap_profiles(np.vstack(self.per_frame_mean_sq), block_size=self.block_size, n_bootstrap=self.n_bootstrap)
+
+        c = ctpolymer.fit_scaling_exponent(seq_sep_vals, seq_sep_RMS_distance, seq_sep_RMS_var_distance, seq_sep_subsampled_distances, n_replicates, self.inter_residue_min, self.end_effect, num_fitting_points, confidence=95)
+
+        if self.end_effect == configs.DEFAULT_END_EFFECT:
+            names = ['scaling_exp_analysis_power', 'scaling_exp_idx_used_power', 'scaling_exp_fit_power']
+        else:
+            names = ['scaling_exp_analysis_ee%i_power' % (self.end_effect), 'scaling_exp_idx_used_ee%i_power' % (self.end_effect), 'scaling_exp_fit_ee%i_power' % (self.end_effect)]
+
+        output.save(names[0] + self.suffix, c[0:8], delimiter=', ')
+        output.save(names[1] + self.suffix, c[8].transpose(), delimiter=', ')
+        output.save(names[2] + self.suffix, c[9].transpose(), delimiter=', ')
+
+
+class _ScalingExponentCA(_ScalingExponent):
+    requires = ['CA_distances']
+    distances = 'CA_distances'
+    suffix = '_CA'
+
+
+class _PolymerScalingMap(_SeparationStatistics):
+    """
+    Deviation of the root mean squared COM distance map from the best-fit homopolymer scaling
+    model (see CTProtein.get_polymer_scaled_distance_map()), in both the signed absolute and the
+    signed fractional change modes. The scaling fit (CTProtein.get_scaling_exponent() defaults) uses
+    the same per-separation statistics as nu_power and is done once for both maps. Only the best
+    fit is needed, so no bootstrap error estimate is made and the statistics are all sums.
+
+    """
+    state_fields = ['total', 'total_sq', 'count', 'pair_total_sq', 'n_frames']
+
+    def __init__(self, index, min_separation=10, end_effect=5, inter_residue_min=15, num_fitting_points=40):
+        super().__init__(index)
+
+        self.min_separation = min_separation
+        self.end_effect = end_effect
+        self.inter_residue_min = inter_residue_min
+        self.num_fitting_points = num_fitting_points
+        self.pair_total_sq = np.zeros(len(index['separation']))
+        self.n_frames = 0
+
+    def update(self, data):
+        super().update(data)
+
+        d = data[self.distances]
+        self.pair_total_sq = self.pair_total_sq + np.sum(d*d, axis=0)
+        self.n_frames = self.n_frames + d.shape[0]
+
+    def finish(self, output):
+        max_separation = self.n_sep
+        n_res = len(self.index['resids'])
+
+        if n_res <= self.min_separation:
+            raise AnalyzerException('The minimum separation is shorter than the chain length')
+
+        num_fitting_points = ctpolymer.get_num_scaling_fitting_points(max_separation, self.inter_residue_min, self.end_effect, self.num_fitting_points)
+
+        mean = self.mean()
+        mean_sq = self.mean_sq()
+
+        seq_sep_vals = list(range(1, max_separation))
+        c = ctpolymer.fit_scaling_exponent(seq_sep_vals, list(np.sqrt(mean_sq[1:])), list((mean_sq - mean*mean)[1:]), [], 0, self.inter_residue_min, self.end_effect, num_fitting_points)
+        (nu, A0, redchi) = (c[0], c[1], c[7])
+
+        # RMS distance map (upper triangle) and the expected distance for each element
+        distance_map = np.zeros((n_res, n_res))
+        distance_map[self.index['pairs_i'], self.index['pairs_j']] = np.sqrt(self.pair_total_sq/self.n_frames)
+
+        separation = np.arange(n_res)[np.newaxis, :] - np.arange(n_res)[:, np.newaxis]
+        expected = A0*np.power(np.abs(separation), nu)
+        mask = separation >= self.min_separation
+
+        output.save('polymer_deviation_map_absolute', np.where(mask, distance_map - expected, 0), delimiter=',')
+        output.save('polymer_deviation_map_fractional', np.where(mask, (distance_map - expected)/np.where(mask, expected, 1), 0), delimiter=',')
+        output.save('polymer_deviation_map_params', np.array([nu, A0, redchi]), delimiter=', ')
+
+
+class _ContactMap(_Analysis):
+    """
+    Fraction of frames in which each pair of residues is in contact (see CTProtein.get_contact_map(),
+    closest-heavy mode), and the derived contact order.
+
+    """
+    requires = ['contact_distances']
+    state_fields = ['contacts', 'pairs', 'count']
+
+    def __init__(self, index, distance_thresh=5.0):
+        super().__init__(index)
+        self.distance_thresh = distance_thresh
+        self.contacts = 0
+        self.pairs = None
+        self.count = 0
+
+    def update(self, data):
+        (distances, pairs) = data['contact_distances']
+        self.pairs = pairs
+        self.contacts = self.contacts + np.sum(distances < self.distance_thresh/10.0, axis=0)
+        self.count = self.count + distances.shape[0]
+
+    def finish(self, output):
+        n_res = int(np.max(self.pairs)) + 1
+
+        contact_map = np.zeros((n_res, n_res))
+        contact_map[self.pairs[:, 0], self.pairs[:, 1]] = self.contacts/float(self.count)
+        contact_map[self.pairs[:, 1], self.pairs[:, 0]] = self.contacts/float(self.count)
+
+        contact_order_normalization_vector = n_res - np.hstack((np.hstack(([3,4],np.repeat(5,n_res-4))),[4,3]))
+        contact_order = np.sum(contact_map, 0)/contact_order_normalization_vector
+
+        output.save('contact_map_%3.3f' % (self.distance_thresh), contact_map)
+        output.save('contact_order_%3.3f' % (self.distance_thresh), contact_order)
+
+
+class _DSSP(_Analysis):
+    """
+    Fraction of frames each residue is helical (H), extended (E) or coil (C) according to DSSP.
+
+    """
+    requires = ['dssp']
+    state_fields = ['counts', 'count']
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.counts = 0
+        self.count = 0
+
+    def update(self, data):
+        dssp = data['dssp']
+        self.counts = self.counts + np.array([np.sum(dssp == state, axis=0) for state in ['H', 'E', 'C']])
+        self.count = self.count + dssp.shape[0]
+
+    def finish(self, output):
+        fractions = self.counts/float(self.count)
+        output.save('DSSP_H', fractions[0], delimiter=', ')
+        output.save('DSSP_E', fractions[1], delimiter=', ')
+        output.save('DSSP_C', fractions[2], delimiter=', ')
+
+
+# analysis name (matches the ctanalyzer flag) -> analysis class
+ANALYSES = {'rg'          : _RG,
+            'rh'          : _RH,
+            'e2e'         : _EndToEnd,
+            'asph'        : _Asphericity,
+            'dm'          : _DistanceMap,
+            'IS'          : _InternalScaling,
+            'rmsis'       : _InternalScalingRMS,
+            'nu_power'    : _ScalingExponent,
+            'nu_power_CA' : _ScalingExponentCA,
+            'psm'         : _PolymerScalingMap,
+            'cmap'        : _ContactMap,
+            'DSSP'        : _DSSP}
+
+
+# ........................................................................
+#
+def plan_intermediates(analyses):
+    """
+    Determine the intermediates needed by a set of analyses, ordered so that every intermediate
+    comes after the intermediates it depends on. Each intermediate appears exactly once.
+
+    Parameters
+    ----------
+    analyses : iterable of str
+        Analysis names (keys in ANALYSES)
+
+    Returns
+    -------
+    list of str
+        Intermediates in the order they should be computed
+
+    """
+    plan = []
+
+    def add(name, visiting):
+        if name in plan:
+            return
+        if name in visiting:
+            raise AnalyzerException('Circular dependency involving intermediate [%s]' % (name))
+        for dependency in INTERMEDIATES[name][0]:
+            add(dependency, visiting + [name])
+        plan.append(name)
+
+    for analysis in analyses:
+        if analysis not in ANALYSES:
+            raise AnalyzerException('Analysis [%s] is not available in pipeline mode (options are %s)' % (analysis, str(list(ANALYSES.keys()))))
+        for name in ANALYSES[analysis].requires:
+            add(name, [])
+
+    return plan
+
+
+# ........................................................................
+#
+def get_chunk_size(n_residues, max_elements=None):
+    """
+    Number of frames per chunk such that the largest per-chunk intermediate (the inter-residue
+    distances, n_residues*(n_residues-1)/2 per frame) holds no more than max_elements values.
+    By default max_elements is PIPELINE_CHUNK_ELEMENTS, or derived from the memory limit set
+    with `camparitraj.set_resources()`.
+
+    """
+    if max_elements is None:
+        max_elements = ctresources.get_chunk_elements(configs.PIPELINE_CHUNK_ELEMENTS)
+
+    n_pairs = max(int(n_residues*(n_residues-1)/2), 1)
+    return max(int(max_elements/n_pairs), 1)
+
+
+# ........................................................................
+#
+def run_pipeline(CP, output, analyses, chunk_size=None, state=None, verbose=True):
+    """
+    Run a set of analyses over a protein in a single pass over the trajectory.
+
+    Parameters
+    ----------
+    CP : CTProtein
+        Protein to analyze. When continuing from a saved state this should contain only the frames
+        that were not analyzed previously.
+
+    output : CSVOutput or NPZOutput
+        ctanalyzer output object the results are written to
+
+    analyses : dict or list
+        Analyses to run. Either a list of analysis names, or a dictionary mapping each analysis
+        name to a dictionary of keyword arguments for that analysis (e.g. {'nu_power': {'end_effect': 5}}).
+
+    chunk_size : int {None}
+        Number of frames processed at once. If None this is set from the size of the protein
+        (see get_chunk_size()).
+
+    state : dict {None}
+        State returned by a previous run (or read_state()). The analyses must be the same as
+        in the previous run, and must all be incremental. The statistics in the state are
+        updated with the frames in CP.
+
+    verbose : bool {True}
+        Print status updates
+
+    Returns
+    -------
+    dict
+        The state after this run, containing the analyses, the total number of frames analyzed
+        ('n_frames') and the accumulated statistics of every incremental analysis. This can be
+        saved with write_state() and passed back in to continue the analysis later.
+
+    """
+
+    if not isinstance(analyses, dict):
+        analyses = {name: {} for name in analyses}
+
+    plan = plan_intermediates(analyses.keys())
+    index = __build_index(CP)
+
+    workers = {name: ANALYSES[name](index, **kwargs) for (name, kwargs) in analyses.items()}
+
+    n_previous = 0
+    if state is not None:
+        if state['analyses'] != analyses:
+            raise AnalyzerException('Analyses %s do not match the analyses in the saved state %s' % (str(analyses), str(state['analyses'])))
+
+        for (name, worker) in workers.items():
+            if not worker.incremental:
+                raise AnalyzerException('Analysis [%s] cannot be updated incrementally' % (name))
+            worker.set_state(state['statistics'][name])
+
+        n_previous = state['n_frames']
+
+    if chunk_size is None:
+        chunk_size = get_chunk_size(len(index['resids']))
+
+    ctio.status_message('Pipeline: running %s using intermediates %s' % (', '.join(analyses.keys()), ', '.join(plan)), verbose)
+
+    n_frames = CP.n_frames
+    for start in range(0, n_frames, chunk_size):
+        ctio.status_message('Pipeline: frames %i to %i of %i' % (start, min(start+chunk_size, n_frames), n_frames), verbose)
+
+        # a view onto the protein's coordinates, i.e. chunks are never copied
+        chunk = ctframes.get_frame_view(CP.traj, start, start+chunk_size)
+
+        data = {}
+        for name in plan:
+            data[name] = INTERMEDIATES[name][1](chunk, data, index)
+
+        for worker in workers.values():
+            worker.update(data)
+
+    for worker in workers.values():
+        worker.finish(output)
+
+    return {'analyses'   : analyses,
+            'n_frames'   : n_previous + n_frames,
+            'statistics' : {name: worker.get_state() for (name, worker) in workers.items() if worker.incremental}}
+
+
+# ........................................................................
+#
+def write_state(filename, state, metadata=None):
+    """
+    Save the state returned by run_pipeline() so the analysis can be continued later. Only
+    incremental analyses are saved. The file is written atomically.
+
+    Parameters
+    ----------
+    filename : str
+        State file (npz)
+
+    state : dict
+        State returned by run_pipeline()
+
+    metadata : dict {None}
+        Additional information saved with the state (e.g. the trajectory file and frame 
+        selection), which can be used to check the state applies to a trajectory before continuing.
+
+    """
+
+    analyses = {name: kwargs for (name, kwargs) in state['analyses'].items() if name in state['statistics']}
+
+    header = {'analyses': analyses,
+              'n_frames': int(state['n_frames']),
+              'metadata': metadata if metadata is not None else {}}
+
+    arrays = {'header': np.array(json.dumps(header, default=str))}
+    for (name, statistics) in state['statistics'].items():
+        for (field, value) in statistics.items():
+            arrays['%s/%s' % (name, field)] = value
+
+    tmp_filename = '%s.tmp%i.npz' % (filename, os.getpid())
+    np.savez_compressed(tmp_filename, **arrays)
+    os.replace(tmp_filename, filename)
+
+
+# ........................................................................
+#
+def read_state(filename):
+    """
+    Read a state saved by write_state().
+
+    Parameters
+    ----------
+    filename : str
+        State file (npz)
+
+    Returns
+    -------
+    tuple
+        A 2-tuple of (state, metadata), where state can be passed to run_pipeline(), or
+        (None, None) if the file does not exist.
+
+    """
+
+    if not os.path.isfile(filename):
+        return (None, None)
+
+    with np.load(filename, allow_pickle=False) as fh:
+        header = json.loads(str(fh['header']))
+
+        statistics = {}
+        for key in fh.files:
+            if key == 'header':
+                continue
+            (name, field) = key.split('/')
+            statistics.setdefault(name, {})[field] = fh[key]
+
+    state = {'analyses'   : header['analyses'],
+             'n_frames'   : header['n_frames'],
+             'statistics' : statistics}
+
+    return (state, header['metadata'])
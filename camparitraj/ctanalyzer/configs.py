@@ -3,3 +3,6 @@
 
 DEFAULT_NUBAL_THRESH=12
 DEFAULT_END_EFFECT=5
+
+# maximum number of inter-residue distances held in memory at once by the single-pass pipeline
+PIPELINE_CHUNK_ELEMENTS=20000000
@@ -0,0 +1,498 @@
+"""
+ctcluster contains scalable structural (RMSD-based) clustering of trajectories.
+
+Two algorithms are provided:
+
+* **k-medoids** (``kmedoids``) - clusters are represented by a medoid conformation. Every
+  iteration needs only the RMSD of every frame against the k medoids (k passes over the
+  trajectory, each of which is a single vectorized RMSD evaluation), while medoids are updated
+  from a random mini-batch of each cluster's members. Memory and time are therefore linear in
+  the number of frames, so entire trajectories can be clustered.
+
+* **Hierarchical** (``hierarchical``) - agglomerative clustering (Ward by default) on the
+  condensed (upper triangle) RMSD vector. This is exact but requires O(F^2) memory and time, so
+  is suitable for up to a few tens of thousands of frames.
+
+Both return a ``CTClustering`` object holding the labels, populations, medoid frames and medoid
+conformations. Because the medoid conformations are stored, new frames (e.g. from a longer
+simulation, read in blocks with ``ctreader``) can be assigned to existing clusters without
+re-clustering via ``CTClustering.assign()``.
+
+All RMSD values are in Angstroms.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import numpy as np
+import mdtraj as md
+
+from .ctexceptions import CTException
+
+
+HIERARCHICAL_METHODS = ['ward', 'average', 'complete', 'single']
+
+
+# ........................................................................
+#
+def _centered(traj, atom_indices=None):
+    """
+    Internal function that returns a copy of the trajectory containing only the atoms used for
+    the RMSD, with every frame centered at the origin. All RMSD calculations are then done with
+    precentered=True, such that no copy/centering is repeated for each reference.
+
+    """
+
+    if atom_indices is None:
+        atom_indices = np.arange(traj.n_atoms)
+
+    sub = traj.atom_slice(atom_indices)
+    sub.center_coordinates()
+
+    return sub
+
+
+# ........................................................................
+#
+def _slice_centered(sub, frames):
+    """
+    Internal function that returns a subset of frames of a centered trajectory. Centering is
+    redone on the slice because mdtraj does not slice the cached RMSD traces with the frames.
+
+    """
+
+    sliced = sub.slice(frames)
+    sliced.center_coordinates()
+
+    return sliced
+
+
+# ........................................................................
+#
+def _rmsd_to_frames(target, reference, frames):
+    """
+    Internal function that returns the RMSD (in Angstroms) of every frame in the (centered)
+    target trajectory against each of the frames of the (centered) reference trajectory.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (target.n_frames, len(frames)).
+
+    """
+
+    distances = np.empty((target.n_frames, len(frames)))
+    for (j, frame) in enumerate(frames):
+        distances[:, j] = 10*md.rmsd(target, reference, int(frame), precentered=True)
+
+    return distances
+
+
+# ........................................................................
+#
+def __check_n_clusters(n_clusters, n_frames):
+
+    n_clusters = int(n_clusters)
+    if n_clusters < 1 or n_clusters > n_frames:
+        raise CTException('n_clusters must be between 1 and the number of frames (%i), but was %i' % (n_frames, n_clusters))
+
+    return n_clusters
+
+
+# ........................................................................
+#
+def __order_by_population(labels, medoids):
+    """
+    Internal function that relabels clusters such that cluster 0 is the most populated, cluster 1
+    the second most populated etc.
+
+    """
+
+    populations = np.bincount(labels, minlength=len(medoids))
+    order = np.argsort(-populations, kind='stable')
+
+    relabel = np.empty(len(order), dtype=int)
+    relabel[order] = np.arange(len(order))
+
+    return (relabel[labels], np.asarray(medoids)[order])
+
+
+# ........................................................................
+#
+class CTClustering:
+    """
+    Result of an RMSD-based clustering. Clusters are ordered by decreasing population.
+
+    Attributes
+    ----------
+    labels : np.ndarray
+        Cluster index of each clustered frame.
+
+    frames : np.ndarray
+        Index (in the original trajectory) of each clustered frame, e.g. every stride-th frame.
+
+    medoids : np.ndarray
+        For each cluster the position (in the clustered frames) of the medoid frame.
+
+    distances : np.ndarray
+        RMSD (Angstroms) of each clustered frame to the medoid of its cluster.
+
+    medoid_traj : mdtraj.Trajectory
+        Centered medoid conformations (only the atoms used for the RMSD).
+
+    atom_indices : np.ndarray
+        Atoms used for the RMSD.
+
+    """
+
+    def __init__(self, labels, medoids, distances, medoid_traj, atom_indices, frames=None):
+
+        self.labels = np.asarray(labels, dtype=int)
+        self.medoids = np.asarray(medoids, dtype=int)
+        self.distances = np.asarray(distances)
+        self.medoid_traj = medoid_traj
+        self.atom_indices = atom_indices
+
+        if frames is None:
+            frames = np.arange(len(self.labels))
+
+        self.frames = np.asarray(frames)
+
+    @property
+    def n_clusters(self):
+        return len(self.medoids)
+
+    @property
+    def populations(self):
+        """
+        Number of frames in each cluster.
+
+        """
+        return np.bincount(self.labels, minlength=self.n_clusters)
+
+    @property
+    def medoid_frames(self):
+        """
+        Index (in the original trajectory) of each cluster's medoid frame.
+
+        """
+        return self.frames[self.medoids]
+
+    def get_cluster_frames(self):
+        """
+        Returns a list with, for each cluster, the indices (in the original trajectory) of the
+        frames in that cluster.
+
+        """
+        return [self.frames[self.labels == i] for i in range(self.n_clusters)]
+
+    def assign(self, traj):
+        """
+        Assigns the frames of a (new) trajectory to the existing clusters, i.e. to the cluster
+        whose medoid is closest in RMSD. The trajectory must have the same topology as the
+        clustered trajectory (the same atom_indices are used), but can be of any length - for
+        very long trajectories frames can be assigned in blocks.
+
+        Parameters
+        ----------
+        traj : mdtraj.Trajectory
+            Trajectory with the frames to be assigned.
+
+        Returns
+        -------
+        tuple
+            (labels, distances) - the cluster index of each frame and its RMSD (Angstroms) to
+            the medoid of that cluster.
+
+        """
+
+        target = _centered(traj, self.atom_indices)
+        if target.n_atoms != self.medoid_traj.n_atoms:
+            raise CTException('Trajectory has %i atoms for the RMSD calculation but the clusters were defined with %i' % (target.n_atoms, self.medoid_traj.n_atoms))
+
+        distances = _rmsd_to_frames(target, self.medoid_traj, range(self.n_clusters))
+        labels = np.argmin(distances, axis=1)
+
+        return (labels, distances[np.arange(len(labels)), labels])
+
+    def __repr__(self):
+        return "CTClustering (%i clusters over %i frames)" % (self.n_clusters, len(self.labels))
+
+
+# ........................................................................
+#
+def kmedoids(traj, n_clusters, atom_indices=None, batch_size=1000, max_iterations=50, tolerance=1e-3, seed=None, frames=None):
+    """
+    Clusters the frames of a trajectory with mini-batch k-medoids using RMSD as the distance.
+
+    Medoids are initialized with the k-medoids++ scheme (each new medoid is chosen with a
+    probability proportional to its squared RMSD from the closest existing medoid). Each
+    iteration then assigns every frame to its closest medoid and, for each cluster, selects as
+    the new medoid the member (among a random batch of at most batch_size members, always
+    including the current medoid) with the smallest sum of squared RMSD to that batch. This
+    stops when the medoids no longer change, or when an update reduces the total squared RMSD
+    of frames to their medoids by less than a fraction tolerance.
+
+    Parameters
+    ----------
+    traj : mdtraj.Trajectory
+        Trajectory to cluster.
+
+    n_clusters : int
+        Number of clusters.
+
+    atom_indices : array_like or None {None}
+        Atoms used for the RMSD. If None all atoms are used.
+
+    batch_size : int {1000}
+        Maximum number of members per cluster used to update the medoids. Each update costs
+        O(batch_size^2) RMSD evaluations per cluster, independent of the number of frames.
+
+    max_iterations : int {50}
+        Maximum number of assignment/update iterations.
+
+    tolerance : float {1e-3}
+        Relative improvement in the total squared RMSD below which iterations stop.
+
+    seed : int or None {None}
+        Seed for the random number generator.
+
+    frames : array_like or None {None}
+        Index in the original trajectory of each frame in traj (e.g. if traj holds every
+        stride-th frame). Only used to report frame indices.
+
+    Returns
+    -------
+    CTClustering
+
+    """
+
+    if atom_indices is not None:
+        atom_indices = np.asarray(atom_indices)
+
+    sub = _centered(traj, atom_indices)
+    n_frames = sub.n_frames
+    n_clusters = __check_n_clusters(n_clusters, n_frames)
+
+    rng = np.random.default_rng(seed)
+
+    # k-medoids++ initialization
+    medoids = [int(rng.integers(n_frames))]
+    closest = _rmsd_to_frames(sub, sub, medoids)[:, 0]
+    while len(medoids) < n_clusters:
+        p = np.square(closest)
+        if np.sum(p) == 0:
+            raise CTException('Unable to find %i distinct medoids (the trajectory has fewer distinct conformations)' % (n_clusters))
+
+        medoids.append(int(rng.choice(n_frames, p=p/np.sum(p))))
+        closest = np.minimum(closest, _rmsd_to_frames(sub, sub, medoids[-1:])[:, 0])
+
+    distances = _rmsd_to_frames(sub, sub, medoids)
+    inertia = np.sum(np.square(np.min(distances, axis=1)))
+
+    for iteration in range(max_iterations):
+        labels = np.argmin(distances, axis=1)
+
+        new_medoids = []
+        for (c, medoid) in enumerate(medoids):
+            members = np.flatnonzero(labels == c)
+            members = members[members != medoid]
+
+            if len(members) >= batch_size:
+                members = rng.choice(members, batch_size - 1, replace=False)
+
+            batch = np.concatenate(([medoid], members))
+            batch_traj = _slice_centered(sub, batch)
+
+            # sum of squared RMSD of each candidate to every other frame in the batch
+            cost = np.sum(np.square(_rmsd_to_frames(batch_traj, batch_traj, range(len(batch)))), axis=0)
+            new_medoids.append(int(batch[np.argmin(cost)]))
+
+        if new_medoids == medoids:
+            break
+
+        # accept the update only if it lowers the total squared RMSD to the medoids, and stop once
+        # the improvement is negligible (mini-batch updates can otherwise keep swapping between
+        # equivalent medoids)
+        new_distances = _rmsd_to_frames(sub, sub, new_medoids)
+        new_inertia = np.sum(np.square(np.min(new_distances, axis=1)))
+
+        if new_inertia < inertia:
+            improvement = (inertia - new_inertia) / inertia
+            (medoids, distances, inertia) = (new_medoids, new_distances, new_inertia)
+        else:
+            improvement = 0
+
+        if improvement < tolerance:
+            break
+
+    labels = np.argmin(distances, axis=1)
+    distances = distances[np.arange(n_frames), labels]
+
+    (labels, medoids) = __order_by_population(labels, medoids)
+
+    return CTClustering(labels, medoids, distances, _slice_centered(sub, medoids), atom_indices, frames=frames)
+
+
+# ........................................................................
+#
+def condensed_rmsd(traj, atom_indices=None):
+    """
+    Computes the condensed all-vs-all RMSD vector (the upper triangle of the RMSD matrix, in the
+    order used by scipy.spatial.distance.squareform).
+
+    Parameters
+    ----------
+    traj : mdtraj.Trajectory
+        Trajectory.
+
+    atom_indices : array_like or None {None}
+        Atoms used for the RMSD. If None all atoms are used.
+
+    Returns
+    -------
+    np.ndarray
+        Condensed RMSD vector (Angstroms) of length F*(F-1)/2.
+
+    """
+
+    sub = _centered(traj, atom_indices)
+    n_frames = sub.n_frames
+
+    condensed = np.empty(n_frames*(n_frames-1)//2)
+    start = 0
+    for i in range(n_frames - 1):
+        row = 10*md.rmsd(sub, sub, i, precentered=True)
+        condensed[start:start + n_frames - 1 - i] = row[i+1:]
+        start = start + n_frames - 1 - i
+
+    return condensed
+
+
+# ........................................................................
+#
+def condensed_submatrix(condensed, n_frames, indices):
+    """
+    Extracts the square distance matrix between a subset of frames from a condensed distance
+    vector, without building the full square matrix.
+
+    Parameters
+    ----------
+    condensed : np.ndarray
+        Condensed distance vector for n_frames frames.
+
+    n_frames : int
+        Number of frames the condensed vector was computed for.
+
+    indices : array_like
+        Frames to extract.
+
+    Returns
+    -------
+    np.ndarray
+        Square (len(indices) x len(indices)) distance matrix.
+
+    """
+
+    indices = np.asarray(indices, dtype=np.int64)
+    I = np.minimum.outer(indices, indices)
+    J = np.maximum.outer(indices, indices)
+
+    different = I != J
+    position = n_frames*I - I*(I+1)//2 + (J - I - 1)
+
+    submatrix = np.zeros(I.shape, dtype=condensed.dtype)
+    submatrix[different] = condensed[position[different]]
+
+    return submatrix
+
+
+# ........................................................................
+#
+def hierarchical(traj, n_clusters, atom_indices=None, method='ward', frames=None, return_condensed=False):
+    """
+    Clusters the frames of a trajectory by agglomerative hierarchical clustering on the condensed
+    RMSD vector. Requires O(F^2) memory and time - for large numbers of frames use kmedoids.
+
+    The medoid of each cluster is the member with the smallest sum of squared RMSD to all other
+    members.
+
+    Parameters
+    ----------
+    traj : mdtraj.Trajectory
+        Trajectory to cluster.
+
+    n_clusters : int
+        Number of clusters (the tree is cut to give at most this many clusters).
+
+    atom_indices : array_like or None {None}
+        Atoms used for the RMSD. If None all atoms are used.
+
+    method : str {'ward'}
+        Linkage method, one of 'ward', 'average', 'complete' or 'single'.
+
+    frames : array_like or None {None}
+        Index in the original trajectory of each frame in traj. Only used to report frame indices.
+
+    return_condensed : bool {False}
+        If True the condensed RMSD vector is also returned.
+
+    Returns
+    -------
+    CTClustering or tuple
+        The clustering, or (clustering, condensed) if return_condensed is True.
+
+    """
+
+    if method not in HIERARCHICAL_METHODS:
+        raise CTException('method must be one of %s' % (str(HIERARCHICAL_METHODS)))
+
+    if atom_indices is not None:
+        atom_indices = np.asarray(atom_indices)
+
+    n_frames = traj.n_frames
+    n_clusters = __check_n_clusters(min(n_clusters, n_frames), n_frames)
+
+    if n_frames == 1:
+        condensed = np.zeros(0)
+        labels = np.zeros(1, dtype=int)
+    else:
+        # scipy.cluster is only imported when hierarchical clustering is actually used
+        import scipy.cluster.hierarchy
+
+        condensed = condensed_rmsd(traj, atom_indices)
+        linkage = scipy.cluster.hierarchy.linkage(condensed, method=method)
+        labels = scipy.cluster.hierarchy.fcluster(linkage, t=n_clusters, criterion='maxclust') - 1
+
+    # clusters present, and medoid (min sum of squared distances) for each
+    (_, labels) = np.unique(labels, return_inverse=True)
+
+    medoids = []
+    distances = np.zeros(n_frames)
+    for c in range(np.max(labels) + 1):
+        members = np.flatnonzero(labels == c)
+        submatrix = condensed_submatrix(condensed, n_frames, members)
+        best = np.argmin(np.sum(np.square(submatrix), axis=0))
+        medoids.append(members[best])
+        distances[members] = submatrix[best]
+
+    (labels, medoids) = __order_by_population(labels, medoids)
+
+    sub = _centered(traj.slice(medoids), atom_indices)
+    clustering = CTClustering(labels, medoids, distances, sub, atom_indices, frames=frames)
+
+    if return_condensed:
+        return (clustering, condensed)
+
+    return clustering
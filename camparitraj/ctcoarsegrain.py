@@ -0,0 +1,953 @@
+"""
+ctcoarsegrain provides a residue-bead (coarse-grained) view of a protein trajectory, in which each
+residue is represented by a single position. Most polymer analyses (distance maps, internal
+scaling, scaling exponents, end-to-end distances, local collapse...) only need one position per
+residue, so running them on a [n_frames x n_residues x 3] bead array rather than on the
+full-atom trajectory cuts both memory use and run time by an order of magnitude or more, and
+makes these analyses feasible for very large ensembles.
+
+Bead trajectories are built with ``CTProtein.coarse_grain()`` and can be saved to (and re-loaded
+from) disk, so the full-atom trajectory only ever needs to be read once:
+
+>>> beads = CP.coarse_grain(mode='COM')
+>>> beads.save('protein_beads.npz')
+>>> beads = ctcoarsegrain.load('protein_beads.npz')
+>>> (seq_sep, rms_distance) = beads.get_internal_scaling_RMS()
+
+Three bead definitions are supported:
+
+* ``'CA'`` - the alpha carbon of each residue
+* ``'COM'`` - the (mass-weighted) center of mass of each residue
+* ``'sidechain-centroid'`` - the (unweighted) centroid of the side chain heavy atoms of each
+  residue (the CA for glycine)
+
+Only residues with a CA atom get a bead, i.e. peptide caps (ACE/NME) are excluded, as they are
+for the equivalent residue-level CTProtein analyses. Residues are referred to by the same
+(zero-indexed) residue index as in CTProtein. Note that the radius of gyration of a bead model is
+computed from the (unweighted) bead positions, and so differs slightly from the all-atom value.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import os
+
+import numpy as np
+
+from .ctexceptions import CTException
+from . import ctpolymer, ctresources, ctutils, ctprofiling
+
+
+# supported bead definitions
+BEAD_MODES = ['CA', 'COM', 'sidechain-centroid']
+
+# atoms that are not part of the side chain
+BACKBONE_ATOM_NAMES = ['N', 'CA', 'C', 'O', 'OXT']
+
+# number of atom coordinates (frames x atoms) processed at once when beads are built
+BEAD_CHUNK_ELEMENTS = 2**22
+
+# version of the bead file format written by CTResidueBeads.save()
+FILE_VERSION = 1
+
+
+# ........................................................................
+#
+def get_bead_atoms(CP, mode='COM'):
+    """
+    Returns, for each residue of a CTProtein that has a CA atom, the atoms that define its bead
+    and the weight of each atom.
+
+    Parameters
+    ----------
+    CP : CTProtein
+        Protein of interest.
+
+    mode : str {'COM'}
+        Bead definition, one of 'CA', 'COM' or 'sidechain-centroid'.
+
+    Returns
+    -------
+    tuple
+        A 2-tuple with a list of atom index arrays (one per bead, indices into CP.traj) and a
+        list of the corresponding weight arrays (each summing to 1).
+
+    """
+
+    ctutils.validate_keyword_option(mode, BEAD_MODES, 'mode')
+
+    bead_atoms = []
+    bead_weights = []
+
+    for resid in CP.resid_with_CA:
+        residue = CP.topology.residue(int(resid))
+
+        if mode == 'CA':
+            atoms = [CP.get_CA_index(resid, correctOffset=False)]
+            masses = [1.0]
+
+        elif mode == 'COM':
+            atoms = [atom.index for atom in residue.atoms]
+            masses = [atom.element.mass for atom in residue.atoms]
+
+        else:
+            atoms = [atom.index for atom in residue.atoms if atom.name not in BACKBONE_ATOM_NAMES and atom.element is not None and atom.element.symbol != 'H']
+
+            # glycine (or a residue without side chain heavy atoms) is represented by its CA
+            if len(atoms) == 0:
+                atoms = [CP.get_CA_index(resid, correctOffset=False)]
+            masses = [1.0]*len(atoms)
+
+        masses = np.array(masses, dtype=np.float64)
+
+        bead_atoms.append(np.array(atoms, dtype=int))
+        bead_weights.append(masses/np.sum(masses))
+
+    return (bead_atoms, bead_weights)
+
+
+# ........................................................................
+#
+def build_beads(CP, mode='COM', stride=1, chunk_size=None):
+    """
+    Builds the residue-bead trajectory for a CTProtein (see `CTProtein.coarse_grain()`).
+
+    The full-atom coordinates are processed in blocks of frames, so apart from the bead array
+    itself no additional copy of the trajectory is made.
+
+    Parameters
+    ----------
+    CP : CTProtein
+        Protein of interest.
+
+    mode : str {'COM'}
+        Bead definition, one of 'CA', 'COM' or 'sidechain-centroid'.
+
+    stride : int {1}
+        Only every stride-th frame is coarse-grained.
+
+    chunk_size : int or None {None}
+        Number of frames processed at once. If None this is chosen such that each block holds
+        roughly BEAD_CHUNK_ELEMENTS atom positions (or as many as the memory limit set with
+        `camparitraj.set_resources()` allows).
+
+    Returns
+    -------
+    CTResidueBeads
+
+    """
+
+    stride = int(stride)
+    if stride < 1 or stride > CP.n_frames:
+        raise CTException('stride (%i) must be between 1 and the number of frames (%i)' % (stride, CP.n_frames))
+
+    (bead_atoms, bead_weights) = get_bead_atoms(CP, mode)
+
+    atoms = np.concatenate(bead_atoms)
+    weights = np.concatenate(bead_weights)
+    starts = np.cumsum([0] + [len(a) for a in bead_atoms[:-1]])
+
+    frames = np.arange(0, CP.n_frames, stride)
+
+    if chunk_size is None:
+        chunk_size = max(1, ctresources.get_chunk_elements(BEAD_CHUNK_ELEMENTS) // len(atoms))
+    chunk_size = int(chunk_size)
+
+    xyz = np.empty((len(frames), len(bead_atoms), 3), dtype=np.float32)
+
+    for i in range(0, len(frames), chunk_size):
+        block = CP.traj.xyz[frames[i]:frames[min(i + chunk_size, len(frames)) - 1] + 1:stride][:, atoms]
+        xyz[i:i + len(block)] = np.add.reduceat(block*weights[np.newaxis, :, np.newaxis], starts, axis=1)
+
+    residue_names = [CP.topology.residue(int(resid)).name for resid in CP.resid_with_CA]
+
+    if CP.weights is None:
+        frame_weights = None
+    else:
+        frame_weights = CP.weights[::stride]
+
+    if CP.traj.time is None:
+        time = None
+    else:
+        time = CP.traj.time[::stride]
+
+    return CTResidueBeads(xyz, CP.idx_with_CA, residue_names, mode, time=time, weights=frame_weights)
+
+
+# ........................................................................
+#
+def load(filename):
+    """
+    Reads a residue-bead trajectory written by `CTResidueBeads.save()`.
+
+    Parameters
+    ----------
+    filename : str
+        Bead file to read.
+
+    Returns
+    -------
+    CTResidueBeads
+
+    Raises
+    ------
+    CTException
+        If the file cannot be found or is not a bead file.
+
+    """
+
+    if not os.path.isfile(filename):
+        raise CTException('Bead file [%s] could not be found' % (filename))
+
+    with np.load(filename, allow_pickle=False) as data:
+        if 'version' not in data or int(data['version']) != FILE_VERSION:
+            raise CTException('File [%s] is not a residue bead file (or was written by an incompatible version)' % (filename))
+
+        time = data['time'] if 'time' in data else None
+        weights = data['weights'] if 'weights' in data else None
+
+        return CTResidueBeads(data['xyz'], data['residue_index'], [str(i) for i in data['residue_names']], str(data['mode']), time=time, weights=weights)
+
+
+# ........................................................................
+#
+@ctprofiling.profile_methods
+class CTResidueBeads:
+    """
+    Coarse-grained (one bead per residue) view of a protein trajectory, with the residue-level
+    polymer analyses of CTProtein. Distances are returned in Angstroms.
+
+    CTResidueBeads objects are normally built with `CTProtein.coarse_grain()` or read from disk
+    with `ctcoarsegrain.load()`.
+
+    Parameters
+    ----------
+    xyz : np.ndarray
+        [n_frames x n_residues x 3] bead positions in nanometers (stored as float32).
+
+    residue_index : array_like of int
+        CTProtein residue index of each bead.
+
+    residue_names : list of str
+        Three-letter residue name of each bead.
+
+    mode : str
+        Bead definition the positions were built with.
+
+    time : np.ndarray or None {None}
+        Simulation time of each frame.
+
+    weights : array_like or None {None}
+        Per-frame weights (see `set_weights()`).
+
+    """
+
+    def __init__(self, xyz, residue_index, residue_names, mode, time=None, weights=None):
+
+        self.xyz = np.asarray(xyz, dtype=np.float32)
+
+        if self.xyz.ndim != 3 or self.xyz.shape[2] != 3:
+            raise CTException('Bead positions must be a [n_frames x n_residues x 3] array')
+
+        self.residue_index = np.array(residue_index, dtype=int)
+        self.residue_names = list(residue_names)
+        self.mode = mode
+        self.time = time
+
+        if len(self.residue_index) != self.xyz.shape[1] or len(self.residue_names) != self.xyz.shape[1]:
+            raise CTException('Number of residues (%i) does not match the number of beads (%i)' % (len(self.residue_index), self.xyz.shape[1]))
+
+        self.__bead_lookup = {int(r): i for (i, r) in enumerate(self.residue_index)}
+        self.__weights = None
+
+        if weights is not None:
+            self.set_weights(weights)
+
+    def __repr__(self):
+        return "CTResidueBeads (%s): %i res and %i frames (%s beads)" % (hex(id(self)), self.n_residues, self.n_frames, self.mode)
+
+    def __len__(self):
+        return self.n_frames
+
+
+    @property
+    def n_frames(self):
+        """
+        Returns the number of frames.
+
+        Returns
+        -------
+        int
+        """
+        return self.xyz.shape[0]
+
+
+    @property
+    def n_residues(self):
+        """
+        Returns the number of residues (beads).
+
+        Returns
+        -------
+        int
+        """
+        return self.xyz.shape[1]
+
+
+    @property
+    def weights(self):
+        """
+        Returns the normalized per-frame weights set with `set_weights()`, or None if no weights
+        have been set.
+
+        Returns
+        -------
+        np.ndarray or None
+        """
+        return self.__weights
+
+
+    # ........................................................................
+    #
+    def set_weights(self, weights):
+        """
+        Sets per-frame weights used by every method that accepts a `weights` keyword (when that
+        keyword is not explicitly passed). Weights are normalized to sum to 1.
+
+        Parameters
+        ----------
+        weights : array_like
+            Array of non-negative floats with one weight per frame.
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.__weights = None
+        self.__weights = self.__check_weights(weights)
+
+
+    # ........................................................................
+    #
+    def clear_weights(self):
+        """
+        Removes any weights previously defined with `set_weights()`.
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.__weights = None
+
+
+    # ........................................................................
+    #
+    def save(self, filename):
+        """
+        Writes the bead trajectory to a (numpy .npz) file, which can be read back with
+        `ctcoarsegrain.load()`.
+
+        Parameters
+        ----------
+        filename : str
+            Output filename.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        CTException
+            If the file cannot be written.
+
+        """
+
+        arrays = {'version': FILE_VERSION,
+                  'xyz': self.xyz,
+                  'residue_index': self.residue_index,
+                  'residue_names': np.array(self.residue_names),
+                  'mode': self.mode}
+
+        if self.time is not None:
+            arrays['time'] = self.time
+
+        if self.__weights is not None:
+            arrays['weights'] = self.__weights
+
+        try:
+            with open(filename, 'wb') as fh:
+                np.savez(fh, **arrays)
+        except IOError as e:
+            raise CTException('Unable to write bead file [%s]: %s' % (filename, str(e)))
+
+
+    # ........................................................................
+    #
+    def __check_weights(self, weights, stride=1):
+        """
+        Internal function that checks and normalizes a weights array (or returns the weights
+        set with `set_weights()`, or False if there are none) using `ctutils.get_frame_weights()`.
+
+        """
+
+        if weights is False or weights is None:
+            weights = self.__weights
+
+            if weights is None:
+                return False
+
+        return ctutils.get_frame_weights(weights, self.n_frames, stride)
+
+
+    # ........................................................................
+    #
+    def __weighted_mean_and_std(self, data, weights, axis=0):
+        """
+        Internal function that returns the (weighted) mean and standard deviation of `data`
+        along `axis`.
+
+        """
+
+        if weights is False:
+            return (np.mean(data, axis), np.std(data, axis))
+
+        mean = np.average(data, axis, weights=weights)
+        variance = np.average(np.power(data - np.expand_dims(mean, axis), 2), axis, weights=weights)
+
+        return (mean, np.sqrt(variance))
+
+
+    # ........................................................................
+    #
+    def __check_stride(self, stride):
+        """
+        Internal function that checks a stride is between 1 and the number of frames.
+
+        """
+
+        if stride > self.n_frames:
+            raise CTException('stride (%i) is larger than the number of frames (%i)' % (stride, self.n_frames))
+
+        if stride < 1:
+            raise CTException('stride (%i) is less than 1' % (stride))
+
+
+    # ........................................................................
+    #
+    def __get_bead(self, R1):
+        """
+        Internal function that returns the bead position of a (CTProtein) residue index.
+
+        """
+
+        try:
+            return self.__bead_lookup[int(R1)]
+        except KeyError:
+            raise CTException('Residue %s does not have a bead (only residues with a CA atom are represented)' % (str(R1)))
+
+
+    # ........................................................................
+    #
+    def __get_range(self, R1, R2):
+        """
+        Internal function that returns the first and last bead of the region between residues
+        R1 and R2 (the whole chain if these are None).
+
+        """
+
+        if R1 is None:
+            first = 0
+        else:
+            first = self.__get_bead(R1)
+
+        if R2 is None:
+            last = self.n_residues - 1
+        else:
+            last = self.__get_bead(R2)
+
+        if first > last:
+            (first, last) = (last, first)
+
+        return (first, last)
+
+
+    # ........................................................................
+    #
+    def __separation_distances(self, first, last, seq_sep, stride):
+        """
+        Internal function that returns the distances (in Angstroms) between every pair of beads
+        in the region first to last that are seq_sep beads apart, as a [n_frames x n_pairs]
+        array.
+
+        """
+
+        positions = self.xyz[::stride, first:last+1]
+
+        if seq_sep == 0:
+            return np.zeros((positions.shape[0], positions.shape[1]))
+
+        return 10*np.linalg.norm(positions[:, seq_sep:] - positions[:, :-seq_sep], axis=2).astype(np.float64)
+
+
+    # ........................................................................
+    #
+    def get_inter_residue_distance(self, R1, R2, stride=1):
+        """
+        Returns the distance between the beads of two residues in every stride-th frame.
+
+        Parameters
+        ----------
+        R1 : int
+            Residue index of the first residue.
+
+        R2 : int
+            Residue index of the second residue.
+
+        stride : int {1}
+            Defines the spacing between frames.
+
+        Returns
+        -------
+        np.ndarray
+            Distance (in Angstroms) for every stride-th frame.
+
+        """
+
+        self.__check_stride(stride)
+
+        A = self.__get_bead(R1)
+        B = self.__get_bead(R2)
+
+        return 10*np.linalg.norm(self.xyz[::stride, B] - self.xyz[::stride, A], axis=1).astype(np.float64)
+
+
+    # ........................................................................
+    #
+    def get_end_to_end_distance(self, stride=1):
+        """
+        Returns the distance between the first and last bead in every stride-th frame.
+
+        Parameters
+        ----------
+        stride : int {1}
+            Defines the spacing between frames.
+
+        Returns
+        -------
+        np.ndarray
+            End-to-end distance (in Angstroms) for every stride-th frame.
+
+        """
+
+        return self.get_inter_residue_distance(self.residue_index[0], self.residue_index[-1], stride=stride)
+
+
+    # ........................................................................
+    #
+    def get_radius_of_gyration(self, R1=None, R2=None, stride=1):
+        """
+        Returns the radius of gyration of the beads in the region between residues R1 and R2
+        (the whole chain if these are not provided). Every bead has the same weight.
+
+        Parameters
+        ----------
+        R1 : int {None}
+            Residue index of the first residue in the region.
+
+        R2 : int {None}
+            Residue index of the last residue in the region.
+
+        stride : int {1}
+            Defines the spacing between frames.
+
+        Returns
+        -------
+        np.ndarray
+            Radius of gyration (in Angstroms) for every stride-th frame.
+
+        """
+
+        self.__check_stride(stride)
+
+        (first, last) = self.__get_range(R1, R2)
+
+        positions = self.xyz[::stride, first:last+1].astype(np.float64)
+        centered = positions - np.mean(positions, axis=1, keepdims=True)
+
+        return 10*np.sqrt(np.mean(np.sum(centered*centered, axis=2), axis=1))
+
+
+    # ........................................................................
+    #
+    def get_distance_map(self, RMS=False, stride=1, weights=False):
+        """
+        Returns the (weighted) mean and standard deviation of every inter-bead distance, as
+        upper-triangular matrices (equivalent to `CTProtein.get_distance_map()`).
+
+        Parameters
+        ----------
+        RMS : bool {False}
+            If True the root mean squared distance, SQRT(<r_ij^2>), is reported instead of the
+            mean distance.
+
+        stride : int {1}
+            Defines the spacing between frames.
+
+        weights : array_like or False {False}
+            Per-frame weights (by default the weights set with `set_weights()`, if any).
+
+        Returns
+        -------
+        tuple
+            A 2-tuple with the [n_residues x n_residues] mean (or RMS) distance map and the
+            corresponding standard deviation map, both in Angstroms.
+
+        """
+
+        self.__check_stride(stride)
+        weights = self.__check_weights(weights, stride)
+
+        n = self.n_residues
+        distance_map = np.zeros((n, n))
+        std_map = np.zeros((n, n))
+
+        positions = self.xyz[::stride]
+
+        # one row at a time, such that only [n_frames x n_residues] distances are held at once
+        for i in range(0, n-1):
+            distances = 10*np.linalg.norm(positions[:, i+1:] - positions[:, i:i+1], axis=2).astype(np.float64)
+
+            if RMS:
+                distances = distances*distances
+
+            (mean_data, std_data) = self.__weighted_mean_and_std(distances, weights)
+
+            if RMS:
+                mean_data = np.sqrt(mean_data)
+
+            distance_map[i, i+1:] = mean_data
+            std_map[i, i+1:] = std_data
+
+        return (distance_map, std_map)
+
+
+    # ........................................................................
+    #
+    def get_internal_scaling(self, R1=None, R2=None, mean_vals=False, stride=1, weights=False):
+        """
+        Returns the internal scaling profile, i.e. the inter-bead distances for every sequence
+        separation (equivalent to `CTProtein.get_internal_scaling()`).
+
+        Parameters
+        ----------
+        R1 : int {None}
+            Residue index of the first residue in the region.
+
+        R2 : int {None}
+            Residue index of the last residue in the region.
+
+        mean_vals : bool {False}
+            If True the (weighted) mean distance for each sequence separation is returned instead
+            of the distances themselves.
+
+        stride : int {1}
+            Defines the spacing between frames.
+
+        weights : array_like or False {False}
+            Per-frame weights (by default the weights set with `set_weights()`, if any). Only
+            used if mean_vals is True.
+
+        Returns
+        -------
+        tuple
+            A 2-tuple with the sequence separations and either a list of distance arrays (ordered
+            pair-by-pair, as in CTProtein) or the mean distance for each separation.
+
+        """
+
+        self.__check_stride(stride)
+        weights = self.__check_weights(weights, stride)
+
+        (first, last) = self.__get_range(R1, R2)
+
+        seq_sep_vals = []
+        seq_sep_distances = []
+        for seq_sep in range(0, last - first + 1):
+            seq_sep_vals.append(seq_sep)
+
+            # transposed so distances are ordered pair-by-pair
+            seq_sep_distances.append(self.__separation_distances(first, last, seq_sep, stride).T.ravel())
+
+        if mean_vals:
+            mean_is = [self.__weighted_mean_and_std(d, self.__tile(weights, d))[0] for d in seq_sep_distances]
+            return (seq_sep_vals, mean_is)
+
+        return (seq_sep_vals, seq_sep_distances)
+
+
+    # ........................................................................
+    #
+    def get_internal_scaling_RMS(self, R1=None, R2=None, stride=1, weights=False):
+        """
+        Returns the root mean squared internal scaling profile, SQRT(<r_ij^2>) vs. |i-j|
+        (equivalent to `CTProtein.get_internal_scaling_RMS()`).
+
+        Parameters
+        ----------
+        R1 : int {None}
+            Residue index of the first residue in the region.
+
+        R2 : int {None}
+            Residue index of the last residue in the region.
+
+        stride : int {1}
+            Defines the spacing between frames.
+
+        weights : array_like or False {False}
+            Per-frame weights (by default the weights set with `set_weights()`, if any).
+
+        Returns
+        -------
+        tuple
+            A 2-tuple with the sequence separations and the RMS distance (in Angstroms) for each.
+
+        """
+
+        (seq_sep_vals, seq_sep_distances) = self.get_internal_scaling(R1=R1, R2=R2, stride=stride)
+
+        weights = self.__check_weights(weights, stride)
+        mean_is = [np.sqrt(self.__weighted_mean_and_std(d*d, self.__tile(weights, d))[0]) for d in seq_sep_distances]
+
+        return (seq_sep_vals, mean_is)
+
+
+    # ........................................................................
+    #
+    def __tile(self, weights, data):
+        """
+        Internal function that repeats per-frame weights once per pair (see get_internal_scaling).
+
+        """
+
+        if weights is False:
+            return False
+
+        return np.tile(weights, int(len(data) / len(weights)))
+
+
+    # ........................................................................
+    #
+    def get_scaling_exponent(self, inter_residue_min=15, end_effect=5, block_size=None, num_fitting_points=40, fraction_of_points=0.5, fraction_override=False, stride=1, weights=False, n_bootstrap=1000, confidence=95, seed=None):
+        """
+        Estimates the apparent scaling exponent (nu) and prefactor (A0) of the polymer relationship
+        sqrt(<Rij^2>) = A0|i-j|^(nu), as done by `CTProtein.get_scaling_exponent()` (see there for
+        a description of the parameters and the returned 10-position tuple).
+
+        Parameters
+        ----------
+        inter_residue_min : int {15}
+            Minimum sequence separation used for fitting.
+
+        end_effect : int {5}
+            Number of residues at each end excluded from the fit.
+
+        block_size : int or None {None}
+            Number of frames per block used for the bootstrap error estimate in nu and A0 (by
+            default selected from the autocorrelation of the data).
+
+        num_fitting_points : int {40}
+            Number of (log-spaced) points used for fitting.
+
+        fraction_of_points : float {0.5}
+            Fraction of points used if fraction_override is True or the chain is short.
+
+        fraction_override : bool {False}
+            If True fraction_of_points is always used.
+
+        stride : int {1}
+            Defines the spacing between frames.
+
+        weights : array_like or False {False}
+            Per-frame weights (by default the weights set with `set_weights()`, if any).
+
+        n_bootstrap : int {1000}
+            Number of bootstrap replicates used to estimate the error in nu and A0.
+
+        confidence : float {95}
+            Width (in percent) of the confidence interval reported for nu and A0.
+
+        seed : int or None {None}
+            Seed used for the bootstrap random number generator.
+
+        Returns
+        -------
+        tuple
+            As returned by `CTProtein.get_scaling_exponent()`.
+
+        """
+
+        self.__check_stride(stride)
+
+        max_separation = self.n_residues
+
+        num_fitting_points = ctpolymer.get_num_scaling_fitting_points(max_separation, inter_residue_min, end_effect, num_fitting_points, fraction_of_points, fraction_override)
+
+        weights = self.__check_weights(weights, stride)
+
+        seq_sep_vals = []
+        seq_sep_RMS_distance = []
+        seq_sep_RMS_var_distance = []
+        per_frame_mean_sq = []
+
+        for seq_sep in range(1, max_separation):
+            seq_sep_vals.append(seq_sep)
+
+            distances = self.__separation_distances(0, self.n_residues - 1, seq_sep, stride)
+            tmp = distances.T.ravel()
+            tmp_weights = self.__tile(weights, tmp)
+
+            (mean_sq, std_sq) = self.__weighted_mean_and_std(tmp*tmp, tmp_weights)
+            std_tmp = self.__weighted_mean_and_std(tmp, tmp_weights)[1]
+
+            seq_sep_RMS_distance.append(np.sqrt(mean_sq))
+            seq_sep_RMS_var_distance.append(np.power(std_tmp, 2))
+
+            # per-frame mean squared distance, resampled over frames for the error estimate
+            per_frame_mean_sq.append(np.mean(distances*distances, axis=1))
+
+        (seq_sep_subsampled_distances, n_replicates) = ctpolymer.get_scaling_bootstrap_profiles(np.transpose(per_frame_mean_sq), block_size=block_size, n_bootstrap=n_bootstrap, weights=weights, seed=seed)
+
+        return ctpolymer.fit_scaling_exponent(seq_sep_vals, seq_sep_RMS_distance, seq_sep_RMS_var_distance, seq_sep_subsampled_distances, n_replicates, inter_residue_min, end_effect, num_fitting_points, confidence=confidence)
+
+
+    # ........................................................................
+    #
+    def get_local_collapse(self, window_size=10, bins=None, stride=1):
+        """
+        Returns the radius of gyration of every window of window_size consecutive beads along
+        the chain (equivalent to `CTProtein.get_local_collapse()`, but using bead positions).
+
+        Parameters
+        ----------
+        window_size : int {10}
+            Number of beads in each window.
+
+        bins : array_like or None {None}
+            Histogram bins (default np.arange(0, 10, 0.01)).
+
+        stride : int {1}
+            Defines the spacing between frames.
+
+        Returns
+        -------
+        tuple
+            A 4-tuple with the mean and standard deviation of the windowed radius of gyration
+            along the chain, the histogram of each window, and the bins.
+
+        """
+
+        self.__check_stride(stride)
+
+        if bins is None:
+            bins = np.arange(0, 10, 0.01)
+        else:
+            bins = np.array(bins, dtype=float)
+            if bins.ndim != 1 or len(bins) < 2:
+                raise CTException('Bins should be a list, vector, or numpy array of evenly spaced values')
+
+        window_size = int(window_size)
+        if window_size < 1 or window_size > self.n_residues:
+            raise CTException('window_size must be between 1 and the number of residues (%i)' % (self.n_residues))
+
+        positions = self.xyz[::stride].astype(np.float64)
+
+        # windowed sums of positions and squared norms give every window's Rg in one pass:
+        # Rg^2 = <|r|^2> - |<r>|^2
+        cumulative_r = np.concatenate((np.zeros((positions.shape[0], 1, 3)), np.cumsum(positions, axis=1)), axis=1)
+        cumulative_r2 = np.concatenate((np.zeros((positions.shape[0], 1)), np.cumsum(np.sum(positions*positions, axis=2), axis=1)), axis=1)
+
+        mean_r = (cumulative_r[:, window_size:] - cumulative_r[:, :-window_size]) / window_size
+        mean_r2 = (cumulative_r2[:, window_size:] - cumulative_r2[:, :-window_size]) / window_size
+
+        rg = 10*np.sqrt(np.maximum(mean_r2 - np.sum(mean_r*mean_r, axis=2), 0))
+
+        meanData = list(np.mean(rg, axis=0))
+        stdData = list(np.std(rg, axis=0))
+        histo = [np.histogram(rg[:, i], bins)[0] for i in range(rg.shape[1])]
+
+        return (meanData, stdData, histo, bins)
+
+
+    # ........................................................................
+    #
+    def get_local_to_global_correlation(self, n_cycles=100, max_num_pairs=10, stride=20, seed=None):
+        """
+        Analyzes how well the mean squared distance of a small number of randomly selected
+        bead pairs correlates with the (squared) radius of gyration (equivalent to
+        `CTProtein.get_local_to_global_correlation()`, but using every pair of beads and the
+        bead radius of gyration).
+
+        Parameters
+        ----------
+        n_cycles : int {100}
+            Number of random pair selections for each number of pairs.
+
+        max_num_pairs : int {10}
+            Pairs selections from 1 to max_num_pairs-1 pairs are analyzed.
+
+        stride : int {20}
+            Defines the spacing between frames.
+
+        seed : int or None {None}
+            Seed for the random pair selection.
+
+        Returns
+        -------
+        tuple
+            A 4-tuple with the raw [number of pairs, correlation] data, the numbers of pairs, and
+            the mean and standard deviation of the correlation for each number of pairs.
+
+        """
+
+        self.__check_stride(stride)
+
+        (pairs_i, pairs_j) = np.triu_indices(self.n_residues, 1)
+        if len(pairs_i) == 0:
+            raise CTException('At least two residues are needed to compute inter-residue distances')
+
+        positions = self.xyz[::stride]
+        all_distances = 10*np.linalg.norm(positions[:, pairs_j] - positions[:, pairs_i], axis=2).astype(np.float64).T
+        rg_squared = np.power(self.get_radius_of_gyration(stride=stride), 2)
+
+        rng = np.random.default_rng(seed)
+        pair_selection_vector = np.arange(1, max_num_pairs, 1)
+        return_data = np.zeros((len(pair_selection_vector)*n_cycles, 2))
+
+        idx = 0
+        for n_selected in pair_selection_vector:
+            for i in range(0, n_cycles):
+                idx_selection = rng.integers(0, len(pairs_i), n_selected)
+                local_mean_square = np.sum(np.power(all_distances[idx_selection], 2), 0)/(2*(n_selected*n_selected))
+
+                return_data[idx] = [n_selected, np.corrcoef(local_mean_square, rg_squared)[0][1]]
+                idx = idx + 1
+
+        correlations = np.reshape(return_data[:, 1], (len(pair_selection_vector), n_cycles))
+
+        return (return_data, pair_selection_vector, np.mean(correlations, 1), np.std(correlations, 1))
@@ -0,0 +1,510 @@
+"""
+ctensemble.py
+
+ctensemble contains the CTEnsemble class, which holds many trajectory files (e.g. replicas from a
+replica exchange simulation or a set of independent simulations) that all share the same topology.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+
+import inspect
+
+import mdtraj as md
+import numpy as np
+
+from .cttrajectory import CTTrajectory
+from .ctprotein import CTProtein
+from .ctexceptions import CTException
+from . import ctio, ctreader, ctprofiling, ctresources
+
+
+# CTProtein methods that return a (mean, standard deviation) tuple, for which reduction='weighted'
+# pools the per-replica statistics. Other tuple-valued results cannot be averaged over replicas.
+MEAN_AND_STD_METHODS = ['get_distance_map']
+
+
+@ctprofiling.profile_methods
+class CTEnsemble:
+    """
+    CTEnsemble holds a set of trajectory files that share a single topology (for example
+    the replicas from a replica exchange simulation, or a set of independent simulations
+    of the same system).
+
+    The topology is parsed exactly once, and the proteins in the system are identified
+    (and their residue/atom index information built) exactly once. Every replica then
+    shares this information, so loading additional trajectories only requires the
+    coordinates to be read. Trajectories are read lazily (on first use) by default, or
+    can be read up-front in parallel worker processes.
+
+    CTProtein analyses are then run over the ensemble via `compute()`, which returns
+    results stacked across replicas, pooled over all frames, or averaged over replicas.
+
+    """
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def __init__(self, trajectory_filenames, pdb_filename, protein_grouping=None, stride=1, lazy=True, cache=True, n_workers=None, debug=False):
+        """
+        CTEnsemble initializer.
+
+        Parameters
+        ----------
+        trajectory_filenames : list of str
+            List of trajectory files (e.g. one per replica). Every trajectory must match the
+            topology defined by `pdb_filename`.
+
+        pdb_filename : str
+            Filename which contains the pdb file associated with every trajectory. This is
+            parsed once and shared by all trajectories.
+
+        protein_grouping : list of lists of ints
+            Lets you manually define protein groups to be considered independently (see
+            `CTTrajectory`).
+
+            Default = None
+
+        stride : int
+            Only every stride-th frame is read from each trajectory.
+
+            Default = 1
+
+        lazy : bool
+            If True trajectories are only read when they are first needed. If False all
+            trajectories are read during initialization (in parallel if `n_workers` > 1).
+
+            Default = True
+
+        cache : bool
+            If True trajectories are kept in memory once read. If False each trajectory
+            is re-read whenever it is needed, which keeps memory use to a single trajectory
+            at a time for very large ensembles.
+
+            Default = True
+
+        n_workers : int
+            Number of worker processes used to read trajectories when `lazy` is False or
+            when `load()` is called. If None the number of workers defined by the global
+            resource policy is used (see `camparitraj.set_resources()`).
+
+            Default = None
+
+        debug : bool
+            Prints warning/help information to help debug weird stuff during initial read-in.
+
+            Default = False
+
+        """
+
+        if isinstance(trajectory_filenames, str):
+            trajectory_filenames = [trajectory_filenames]
+
+        if len(trajectory_filenames) == 0:
+            raise CTException('No trajectory files provided!')
+
+        if pdb_filename is None:
+            raise CTException('No PDB file provided!')
+
+        stride = int(stride)
+        if stride < 1:
+            raise CTException('stride (%i) is less than 1' % (stride))
+
+        self.trajectory_filenames = list(trajectory_filenames)
+        self.pdb_filename = pdb_filename
+        self.stride = stride
+        self.cache = cache
+
+        # parse the topology ONCE and use the PDB structure to identify the proteins and build
+        # the index information (resid_with_CA etc.) shared by every replica
+        template_traj = md.load(pdb_filename)
+        self.topology = template_traj.topology
+
+        template = CTTrajectory(TRJ=template_traj, protein_grouping=protein_grouping, debug=debug)
+
+        self.__templates = template.proteinTrajectoryList
+        self.protein_atom_list = template.protein_atom_list
+        self.num_proteins = template.num_proteins
+
+        # only the protein atoms are decoded from each trajectory (solvent and ions are never
+        # read into memory), so we also need the position of each protein's atoms within the
+        # decoded subset
+        protein_atoms = [i for atoms in self.protein_atom_list for i in atoms]
+        if len(protein_atoms) == 0:
+            self.atom_indices = None
+        else:
+            self.atom_indices = ctreader.select_atoms(self.topology, protein_atoms)
+
+        if self.atom_indices is None:
+            self.__protein_positions = self.protein_atom_list
+        else:
+            self.__protein_positions = [np.searchsorted(self.atom_indices, atoms) for atoms in self.protein_atom_list]
+
+        # replicas are populated on demand
+        self.__replicas = [None]*len(self.trajectory_filenames)
+
+        if not lazy:
+            self.load(n_workers=n_workers)
+
+
+    def  __repr__(self):
+        return "CTEnsemble (%s): %i replicas and %i proteins" % (hex(id(self)), self.n_replicas, self.num_proteins)
+
+    def __len__(self):
+        return self.n_replicas
+
+
+    @property
+    def n_replicas(self):
+        """
+        Returns the number of trajectories (replicas) in the ensemble.
+
+        Returns
+        --------
+        int
+        """
+        return len(self.trajectory_filenames)
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def __build_proteins(self, xyz, time, unitcell_lengths, unitcell_angles, filename):
+        """
+        Internal function that constructs the list of CTProtein objects for one replica from
+        raw coordinate data, sharing the topology and index information of the template
+        proteins.
+
+        Returns
+        -------
+        list of CTProtein
+        """
+
+        if self.atom_indices is None and xyz.shape[1] != self.topology.n_atoms:
+            raise CTException('Trajectory %s has %i atoms but the topology defined by %s has %i atoms' % (filename, xyz.shape[1], self.pdb_filename, self.topology.n_atoms))
+
+        proteins = []
+        for (template, atoms) in zip(self.__templates, self.__protein_positions):
+
+            # build the protein sub-trajectory directly from the sliced coordinates and the
+            # (shared) template topology, rather than via atom_slice which copies the topology
+            PT = md.Trajectory(xyz[:, atoms], template.topology, time=time, unitcell_lengths=unitcell_lengths, unitcell_angles=unitcell_angles)
+            proteins.append(CTProtein(PT, template.residue_offset, template=template))
+
+        return proteins
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def __read_replica(self, replica):
+        """
+        Internal function that reads a single replica in the current process.
+
+        Returns
+        -------
+        list of CTProtein
+        """
+
+        filename = self.trajectory_filenames[replica]
+        traj = ctreader.read_trajectory(filename, self.pdb_filename, stride=self.stride, topology=self.topology, atom_indices=self.atom_indices)
+
+        return self.__build_proteins(traj.xyz, traj.time, traj.unitcell_lengths, traj.unitcell_angles, filename)
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def load(self, n_workers=None):
+        """
+        Reads all trajectories that have not yet been read. If `n_workers` is larger than 1
+        the trajectories are decoded in parallel worker processes, and the coordinates are
+        then assembled into CTProtein objects in this process.
+
+        Note that if `cache` was set to False this has no lasting effect, because
+        trajectories are not kept in memory.
+
+        Parameters
+        ----------
+        n_workers : int or None {None}
+            Number of worker processes (None uses the resource policy). Values larger than
+            the number of cores are reduced to the number of cores.
+
+        Returns
+        -------
+        None
+
+        """
+
+        n_workers = ctresources.get_workers(n_workers)
+
+        if not self.cache:
+            ctio.warning_message('CTEnsemble.load() called with cache=False - trajectories will be re-read when used')
+            return
+
+        to_read = [i for i in range(self.n_replicas) if self.__replicas[i] is None]
+
+        if len(to_read) == 0:
+            return
+
+        n_workers = min(n_workers, len(to_read))
+
+        if n_workers == 1:
+            for i in to_read:
+                self.__replicas[i] = self.__read_replica(i)
+            return
+
+        # each worker decodes whole files (so frames never need to be re-assembled) and
+        # parses the topology once
+        filenames = [self.trajectory_filenames[i] for i in to_read]
+        n_frames = [len(range(0, ctreader.get_n_frames(f), self.stride)) for f in filenames]
+
+        # workers only read the protein atoms, so the files are checked against the topology here
+        for filename in filenames:
+            n_atoms = ctreader.get_n_atoms(filename)
+            if n_atoms is not None and n_atoms != self.topology.n_atoms:
+                raise CTException('Trajectory %s has %i atoms but the topology defined by %s has %i atoms' % (filename, n_atoms, self.pdb_filename, self.topology.n_atoms))
+
+        # imported here because the process pool pulls in multiprocessing, which is slow to import
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=ctreader._init_worker, initargs=(self.pdb_filename, ctresources.get_worker_threads(n_workers))) as executor:
+            results = executor.map(ctreader._read_block, filenames, [0]*len(filenames), n_frames, [self.stride]*len(filenames), [None]*len(filenames), [self.atom_indices]*len(filenames))
+
+            for (i, filename, coordinates) in zip(to_read, filenames, results):
+                self.__replicas[i] = self.__build_proteins(*coordinates, filename)
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def get_replica(self, replica):
+        """
+        Returns the list of CTProtein objects associated with a specific replica, reading
+        the trajectory if needed.
+
+        Parameters
+        ----------
+        replica : int
+            Index of the replica (position in `trajectory_filenames`).
+
+        Returns
+        -------
+        list of CTProtein
+        """
+
+        replica = int(replica)
+        if replica < 0 or replica >= self.n_replicas:
+            raise CTException('Replica index %i is out of range (ensemble has %i replicas)' % (replica, self.n_replicas))
+
+        ctprofiling.record_cache('ensemble_replicas', self.__replicas[replica] is not None)
+        if self.__replicas[replica] is not None:
+            return self.__replicas[replica]
+
+        proteins = self.__read_replica(replica)
+
+        if self.cache:
+            self.__replicas[replica] = proteins
+
+        return proteins
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def get_protein(self, replica, protein_index=0):
+        """
+        Returns the CTProtein object associated with a specific protein in a specific replica.
+
+        Parameters
+        ----------
+        replica : int
+            Index of the replica (position in `trajectory_filenames`).
+
+        protein_index : int {0}
+            Index of the protein (position in the list of proteins for the system).
+
+        Returns
+        -------
+        CTProtein
+        """
+
+        proteins = self.get_replica(replica)
+
+        if protein_index < 0 or protein_index >= len(proteins):
+            raise CTException('Protein index %i is out of range (system has %i proteins)' % (protein_index, len(proteins)))
+
+        return proteins[protein_index]
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def __reduce(self, values, reduction, replica_weights):
+        """
+        Internal function that reduces a list of per-replica results (one entry per replica) to a
+        single result. Tuples are reduced element-wise, and None elements are passed through.
+
+        """
+
+        if isinstance(values[0], tuple):
+            return tuple(self.__reduce([v[i] for v in values], reduction, replica_weights) for i in range(len(values[0])))
+
+        if values[0] is None:
+            return None
+
+        try:
+            if reduction == 'pooled':
+                return np.concatenate([np.atleast_1d(np.asarray(v)) for v in values], axis=0)
+
+            stacked = np.stack([np.asarray(v) for v in values])
+
+        except ValueError:
+            raise CTException("Per-replica results have inconsistent shapes so could not be combined using reduction='%s'" % (reduction))
+
+        if reduction == 'per-replica':
+            return stacked
+
+        return np.average(stacked, axis=0, weights=replica_weights)
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def __pool_mean_and_std(self, values, replica_weights, RMS=False):
+        """
+        Internal function that combines per-replica (mean, std) results into the mean and standard
+        deviation over all replicas, i.e. m = sum_r w_r m_r and s = sqrt(sum_r w_r (s_r^2 + m_r^2) - m^2).
+        If `RMS` is True the per-replica means are root mean squares, whose standard deviations
+        describe the squared values, so the statistics are pooled over the squared values.
+
+        """
+
+        weights = replica_weights/np.sum(replica_weights)
+
+        means = np.stack([np.asarray(v[0], dtype=float) for v in values])
+        stds = np.stack([np.asarray(v[1], dtype=float) for v in values])
+
+        if RMS:
+            means = np.power(means, 2)
+
+        mean = np.tensordot(weights, means, axes=1)
+        second_moment = np.tensordot(weights, np.power(stds, 2) + np.power(means, 2), axes=1)
+        std = np.sqrt(np.clip(second_moment - np.power(mean, 2), 0, None))
+
+        if RMS:
+            mean = np.sqrt(mean)
+
+        return (mean, std)
+
+
+    #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
+    #
+    #
+    def compute(self, method, *args, protein_index=0, reduction='per-replica', replica_weights=None, verbose=False, **kwargs):
+        """
+        Runs a CTProtein analysis over every replica in the ensemble and combines the results.
+        Any positional and keyword arguments (other than those listed below) are passed to
+        the CTProtein method.
+
+        Example::
+
+            E = CTEnsemble(['rep0.xtc', 'rep1.xtc'], 'start.pdb')
+
+            # [n_replicas x n_frames] array of Rg values
+            rg = E.compute('get_radius_of_gyration')
+
+            # Rg for every frame in the ensemble
+            rg = E.compute('get_radius_of_gyration', reduction='pooled')
+
+            # ensemble distance map and standard deviation, pooled from the per-replica maps
+            (dm, std) = E.compute('get_distance_map', reduction='weighted')
+
+        Parameters
+        ----------
+        method : str
+            Name of the CTProtein method to run (e.g. 'get_radius_of_gyration').
+
+        protein_index : int {0}
+            Index of the protein in the system to analyze.
+
+        reduction : str {'per-replica'}
+            Defines how the per-replica results are combined, and must be one of:
+            - 'per-replica' = results are stacked into an array with one entry per replica.
+            - 'pooled' = per-frame results are concatenated along the first (frame) axis,
+              giving results for every frame in the ensemble.
+            - 'weighted' = results are averaged over replicas, using `replica_weights`. By
+              default each replica is weighted by its number of frames, such that for
+              ensemble averages this gives the same value as pooling all frames. For methods
+              that return a (mean, standard deviation) tuple (see `MEAN_AND_STD_METHODS`) the
+              standard deviation is pooled from the per-replica means and variances; other
+              tuple-valued results cannot be combined this way.
+
+        replica_weights : array_like or None {None}
+            Per-replica weights used when reduction = 'weighted'.
+
+        verbose : bool {False}
+            If True a status message is printed as each replica is analyzed. Note this is
+            not passed on to the CTProtein method (pass `verbose` explicitly via keyword
+            arguments if the method supports it).
+
+        Returns
+        -------
+        np.ndarray or tuple of np.ndarray
+            Combined results. If the CTProtein method returns a tuple, each element of the
+            tuple is combined independently (except for pooled standard deviations, see above).
+
+        Raises
+        ------
+        CTException
+            If the method is not a CTProtein analysis, the reduction is invalid, or the
+            per-replica results cannot be combined.
+
+        """
+
+        if reduction not in ['per-replica', 'pooled', 'weighted']:
+            raise CTException('Keyword reduction passed value [%s], but this is not valid.\nMust be one of :per-replica, pooled, weighted' % (reduction))
+
+        if method.startswith('_') or not callable(getattr(CTProtein, method, None)):
+            raise CTException('%s is not a CTProtein analysis method' % (method))
+
+        if replica_weights is not None:
+            replica_weights = np.array(replica_weights, dtype=float)
+            if len(replica_weights) != self.n_replicas:
+                raise CTException('Passed replica weights array is %i in length, while there are %i replicas - these must match' % (len(replica_weights), self.n_replicas))
+
+        values = []
+        frames = []
+        for replica in range(self.n_replicas):
+            ctio.status_message('Running %s on replica %i of %i' % (method, replica+1, self.n_replicas), verbose)
+
+            protein = self.get_protein(replica, protein_index)
+            values.append(getattr(protein, method)(*args, **kwargs))
+            frames.append(protein.n_frames)
+
+        if reduction == 'weighted' and replica_weights is None:
+            replica_weights = np.array(frames, dtype=float)
+
+        if reduction == 'weighted' and isinstance(values[0], tuple):
+            if method not in MEAN_AND_STD_METHODS:
+                raise CTException("%s returns a tuple, which cannot be averaged over replicas - use reduction='per-replica' or 'pooled'" % (method))
+
+            bound = inspect.signature(getattr(CTProtein, method)).bind(None, *args, **kwargs)
+            bound.apply_defaults()
+
+            return self.__pool_mean_and_std(values, replica_weights, RMS=bool(bound.arguments.get('RMS', False)))
+
+        return self.__reduce(values, reduction, replica_weights)
@@ -31,6 +31,17 @@ class CTException(Exception):
     pass
 
 
+# ........................................................................
+#
+class CTCancelledException(CTException):
+    """
+    Exception raised when a long-running operation is stopped via a cancellation token
+    (see ctprogress.CancellationToken)
+
+    """
+    pass
+
+
 # ........................................................................
 #
 class notYetImplementedException(Exception):
@@ -0,0 +1,418 @@
+"""
+ctfeatures contains stand-alone functions and classes for dimensionality reduction and
+clustering of per-frame internal-coordinate features (e.g. inter-residue distances, contact
+vectors or the sin/cos of backbone dihedrals, as built by ``CTProtein.get_features()``).
+
+Unlike RMSD-based clustering (see ``ctcluster``) no superposition is needed, and everything
+here works on blocks of frames such that the full [n_frames x n_features] matrix never has to
+be held in memory:
+
+* ``IncrementalPCA`` - principal component analysis that is updated one block of frames at a
+  time (Ross et al. 2008), so memory scales with the block size and the number of components
+  rather than the number of frames.
+
+* ``kmeans`` - vectorized (Lloyd) k-means with (greedy) k-means++ initialization. Distances are
+  evaluated as |x|^2 - 2x.c + |c|^2 in blocks of frames, so no [n_frames x n_frames] (or
+  [n_frames x n_clusters x n_features]) array is ever built.
+
+References
+----------
+[1] Ross, D. A., Lim, J., Lin, R.-S. and Yang, M.-H. (2008) Incremental learning for robust visual tracking. Int. J. Comput. Vis. 77:125-141
+
+[2] Arthur, D. and Vassilvitskii, S. (2007) k-means++: the advantages of careful seeding. Proc. ACM-SIAM SODA 1027-1035
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import numpy as np
+
+from .ctexceptions import CTException
+from . import ctresources
+
+FEATURE_TYPES = ['CA-distances', 'contacts', 'dihedrals']
+
+# target number of elements in a [n_frames x n_features] block of features
+FEATURE_CHUNK_ELEMENTS = 10000000
+
+
+# ........................................................................
+#
+def get_chunk_size(n_features, chunk_size=None):
+    """
+    Returns the number of frames per block such that a block of features holds roughly
+    FEATURE_CHUNK_ELEMENTS values (or as many as the memory limit set with
+    `camparitraj.set_resources()` allows), or the passed chunk_size if one is given.
+
+    """
+
+    if chunk_size is None:
+        return int(max(1, ctresources.get_chunk_elements(FEATURE_CHUNK_ELEMENTS) // max(1, n_features)))
+
+    chunk_size = int(chunk_size)
+    if chunk_size < 1:
+        raise CTException('chunk_size must be a positive integer (chunk_size = %i)' % (chunk_size))
+
+    return chunk_size
+
+
+# ........................................................................
+#
+def dihedral_features(angles):
+    """
+    Converts an array of dihedral angles (in radians) into features by replacing each angle
+    with its cosine and sine, such that features are continuous across the periodic boundary.
+
+    Parameters
+    ----------
+    angles : np.ndarray
+        [n_frames x n_angles] array of dihedral angles in radians.
+
+    Returns
+    -------
+    np.ndarray
+        [n_frames x 2*n_angles] array, where the first n_angles columns are the cosines and the
+        last n_angles columns the sines.
+
+    """
+
+    angles = np.asarray(angles)
+    return np.hstack((np.cos(angles), np.sin(angles)))
+
+
+# ........................................................................
+#
+class IncrementalPCA:
+    """
+    Principal component analysis computed incrementally from blocks of frames.
+
+    Each call to partial_fit() updates the mean, principal axes and singular values with a new
+    block of data, by taking the SVD of the previous components (scaled by their singular
+    values), the new (centered) block and a mean-correction row. The cost per frame is
+    proportional to (n_components + batch_size) * n_features and memory never depends on the
+    total number of frames.
+
+    Attributes
+    ----------
+    n_components : int
+        Number of components kept.
+
+    components : np.ndarray
+        [n_components x n_features] principal axes (rows), ordered by decreasing variance.
+
+    mean : np.ndarray
+        Per-feature mean over all frames seen.
+
+    explained_variance : np.ndarray
+        Variance along each component.
+
+    explained_variance_ratio : np.ndarray
+        Fraction of the total variance along each component.
+
+    n_samples_seen : int
+        Number of frames used so far.
+
+    """
+
+    def __init__(self, n_components=10, batch_size=200):
+
+        self.n_components = int(n_components)
+        if self.n_components < 1:
+            raise CTException('n_components must be a positive integer')
+
+        self.batch_size = int(max(batch_size, self.n_components))
+
+        self.components = None
+        self.singular_values = None
+        self.mean = None
+        self.n_samples_seen = 0
+        self.__sum_squared_deviations = 0.0
+
+    def partial_fit(self, X):
+        """
+        Updates the decomposition with a block of frames. Blocks larger than batch_size are
+        split into batches of at most batch_size frames.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            [n_frames x n_features] block of features.
+
+        Returns
+        -------
+        IncrementalPCA
+            Returns self, such that calls can be chained.
+
+        """
+
+        X = np.asarray(X)
+        if X.ndim != 2:
+            raise CTException('Features must be passed as an [n_frames x n_features] array')
+
+        if self.mean is not None and X.shape[1] != len(self.mean):
+            raise CTException('Block has %i features but the decomposition was built with %i' % (X.shape[1], len(self.mean)))
+
+        for start in range(0, X.shape[0], self.batch_size):
+            self.__update(X[start:start + self.batch_size].astype(np.float64))
+
+        return self
+
+    def __update(self, X):
+
+        n_new = X.shape[0]
+        if n_new == 0:
+            return
+
+        n_total = self.n_samples_seen + n_new
+        batch_mean = np.mean(X, axis=0)
+        X = X - batch_mean
+
+        # total variance is tracked with the pairwise (Chan et al.) update of the sum of squared
+        # deviations, such that explained variance ratios are relative to all features
+        batch_ssd = np.sum(np.square(X))
+
+        if self.n_samples_seen == 0:
+            stacked = X
+            self.__sum_squared_deviations = batch_ssd
+            mean = batch_mean
+        else:
+            delta = self.mean - batch_mean
+            correction = np.sqrt(self.n_samples_seen * n_new / n_total) * delta
+
+            stacked = np.vstack((self.singular_values[:, np.newaxis] * self.components, X, correction))
+            self.__sum_squared_deviations = self.__sum_squared_deviations + batch_ssd + np.sum(np.square(correction))
+            mean = self.mean + (n_new / n_total) * (batch_mean - self.mean)
+
+        (_, S, Vt) = np.linalg.svd(stacked, full_matrices=False)
+
+        # deterministic sign convention (largest absolute loading of each component is positive)
+        signs = np.sign(Vt[np.arange(Vt.shape[0]), np.argmax(np.abs(Vt), axis=1)])
+        signs[signs == 0] = 1
+        Vt = Vt * signs[:, np.newaxis]
+
+        self.components = Vt[:self.n_components]
+        self.singular_values = S[:self.n_components]
+        self.mean = mean
+        self.n_samples_seen = n_total
+
+    def transform(self, X):
+        """
+        Projects frames onto the principal components.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            [n_frames x n_features] block of features.
+
+        Returns
+        -------
+        np.ndarray
+            [n_frames x n_components] projection.
+
+        """
+
+        if self.components is None:
+            raise CTException('IncrementalPCA has not been fitted - call partial_fit() first')
+
+        X = np.asarray(X)
+        return (X - self.mean.astype(X.dtype, copy=False)).dot(self.components.T.astype(X.dtype, copy=False)).astype(np.float64)
+
+    @property
+    def explained_variance(self):
+        if self.components is None:
+            return None
+
+        return np.square(self.singular_values) / max(1, self.n_samples_seen - 1)
+
+    @property
+    def explained_variance_ratio(self):
+        if self.components is None:
+            return None
+
+        if self.__sum_squared_deviations == 0:
+            return np.zeros(len(self.singular_values))
+
+        return np.square(self.singular_values) / self.__sum_squared_deviations
+
+    def __repr__(self):
+        return "IncrementalPCA (%i components, %i frames seen)" % (self.n_components, self.n_samples_seen)
+
+
+# ........................................................................
+#
+def assign_to_centers(X, centers, chunk_size=100000):
+    """
+    Assigns each frame to the closest center (in Euclidean distance).
+
+    Parameters
+    ----------
+    X : np.ndarray
+        [n_frames x n_features] array.
+
+    centers : np.ndarray
+        [n_clusters x n_features] array of cluster centers.
+
+    chunk_size : int {100000}
+        Number of frames for which distances are evaluated at once.
+
+    Returns
+    -------
+    tuple
+        (labels, distances) - the index of the closest center for each frame and the distance
+        to that center.
+
+    """
+
+    X = np.asarray(X)
+    centers = np.asarray(centers, dtype=np.float64)
+
+    n_frames = X.shape[0]
+    labels = np.empty(n_frames, dtype=int)
+    distances = np.empty(n_frames)
+
+    center_norms = np.sum(np.square(centers), axis=1)
+
+    for start in range(0, n_frames, chunk_size):
+        block = X[start:start + chunk_size].astype(np.float64, copy=False)
+
+        d2 = np.sum(np.square(block), axis=1)[:, np.newaxis] - 2*block.dot(centers.T) + center_norms
+        block_labels = np.argmin(d2, axis=1)
+
+        labels[start:start + chunk_size] = block_labels
+        distances[start:start + chunk_size] = d2[np.arange(len(block_labels)), block_labels]
+
+    return (labels, np.sqrt(np.maximum(distances, 0)))
+
+
+# ........................................................................
+#
+def __cluster_means(X, labels, n_clusters):
+    """
+    Internal function that returns the per-cluster mean of X and the cluster populations.
+
+    """
+
+    counts = np.bincount(labels, minlength=n_clusters)
+
+    sums = np.empty((n_clusters, X.shape[1]))
+    for j in range(X.shape[1]):
+        sums[:, j] = np.bincount(labels, weights=X[:, j], minlength=n_clusters)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts[:, np.newaxis]
+
+    return (means, counts)
+
+
+# ........................................................................
+#
+def kmeans(X, n_clusters, max_iterations=100, tolerance=1e-4, seed=None, chunk_size=100000):
+    """
+    Clusters frames with k-means (Lloyd's algorithm) using greedy k-means++ initialization
+    (2 + log(n_clusters) candidates are sampled for each new center). Every
+    step is vectorized over frames and evaluated in blocks of chunk_size frames, such that
+    millions of frames (in a reduced feature space, e.g. from IncrementalPCA) can be
+    clustered with memory linear in the number of frames.
+
+    Clusters are ordered by decreasing population.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        [n_frames x n_features] array.
+
+    n_clusters : int
+        Number of clusters.
+
+    max_iterations : int {100}
+        Maximum number of iterations.
+
+    tolerance : float {1e-4}
+        Iterations stop when the total squared movement of the centers is less than tolerance
+        times the mean per-feature variance of X.
+
+    seed : int or None {None}
+        Seed for the random number generator.
+
+    chunk_size : int {100000}
+        Number of frames for which distances are evaluated at once.
+
+    Returns
+    -------
+    tuple
+        (labels, centers, distances) - the cluster index of each frame, the [n_clusters x
+        n_features] cluster centers and the distance of each frame to its center.
+
+    """
+
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, np.newaxis]
+
+    n_frames = X.shape[0]
+    n_clusters = int(n_clusters)
+    if n_clusters < 1 or n_clusters > n_frames:
+        raise CTException('n_clusters must be between 1 and the number of frames (%i), but was %i' % (n_frames, n_clusters))
+
+    rng = np.random.default_rng(seed)
+    n_trials = 2 + int(np.log(n_clusters))
+
+    # k-means++ initialization
+    centers = [X[rng.integers(n_frames)]]
+    (_, closest) = assign_to_centers(X, centers, chunk_size)
+    while len(centers) < n_clusters:
+        p = np.square(closest)
+        if np.sum(p) == 0:
+            raise CTException('Unable to find %i distinct centers (there are fewer distinct frames)' % (n_clusters))
+
+        # greedy k-means++: of several sampled candidates keep the one that most reduces the
+        # total squared distance to the closest center
+        best = None
+        for candidate in rng.choice(n_frames, n_trials, p=p/np.sum(p)):
+            (_, new_distances) = assign_to_centers(X, X[candidate:candidate+1], chunk_size)
+            new_closest = np.minimum(closest, new_distances)
+            cost = np.sum(np.square(new_closest))
+            if best is None or cost < best[0]:
+                best = (cost, candidate, new_closest)
+
+        centers.append(X[best[1]])
+        closest = best[2]
+
+    centers = np.array(centers)
+    threshold = tolerance * np.mean(np.var(X, axis=0))
+
+    for iteration in range(max_iterations):
+        (labels, distances) = assign_to_centers(X, centers, chunk_size)
+        (new_centers, counts) = __cluster_means(X, labels, n_clusters)
+
+        # an empty cluster is re-seeded with the frame furthest from its center
+        for c in np.flatnonzero(counts == 0):
+            furthest = int(np.argmax(distances))
+            new_centers[c] = X[furthest]
+            distances[furthest] = 0
+
+        shift = np.sum(np.square(new_centers - centers))
+        centers = new_centers
+
+        if shift <= threshold:
+            break
+
+    (labels, distances) = assign_to_centers(X, centers, chunk_size)
+
+    # order clusters by decreasing population
+    order = np.argsort(-np.bincount(labels, minlength=n_clusters), kind='stable')
+    relabel = np.empty(n_clusters, dtype=int)
+    relabel[order] = np.arange(n_clusters)
+
+    return (relabel[labels], centers[order], distances)
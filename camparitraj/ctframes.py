@@ -0,0 +1,510 @@
+"""
+ctframes provides frame views - frame selections (a frame range and/or stride) over a trajectory
+that share coordinate storage with the trajectory rather than copying it.
+
+A frame view is an ``mdtraj.Trajectory`` whose topology is the parent trajectory's topology (not a
+deep copy, as ``traj[start:stop]`` or ``traj.slice(...)`` would make) and whose coordinates are
+a NumPy view onto the parent's coordinates:
+
+* contiguous selections (``stride=1``) are true views - creating them costs nothing regardless of
+  the trajectory size, and no coordinates are copied.
+
+* strided selections are copied into a new (contiguous) array holding *only* the selected frames,
+  because the compiled mdtraj routines used by every analysis require C-contiguous coordinates.
+  The topology is still shared.
+
+Because contiguous views share coordinates with the parent, operations that modify coordinates in
+place (e.g. ``superpose()``) also modify the parent trajectory; pass ``copy=True`` when a private
+copy is needed.
+
+>>> from camparitraj import ctframes
+>>> view = ctframes.get_frame_view(traj, start=1000, stop=5000)
+>>> np.shares_memory(view.xyz, traj.xyz)
+True
+
+CTProtein objects provide the same functionality via ``CTProtein.get_frame_view()``, which
+returns a new CTProtein that shares both the coordinates and all topology-derived information
+with the original.
+
+Frame selections
+----------------
+
+More general selections are described by a ``FrameSelection``, which combines a frame range and
+stride with explicit frame indices and/or a boolean mask (e.g. derived from an observable). Every
+CTProtein analysis accepts a ``frames`` keyword, which takes a ``FrameSelection`` (or anything
+``as_frame_selection()`` understands - a slice, an array of frame indices or a boolean mask), and
+runs the analysis on only the selected frames, without building a new trajectory:
+
+>>> rg = CP.get_radius_of_gyration()
+>>> compact = ctframes.FrameSelection.from_observable(rg, maximum=15)
+>>> CP.get_distance_map(frames=compact)
+>>> CP.get_secondary_structure_DSSP(frames=ctframes.FrameSelection(start=5000, stride=10))
+
+Selections are applied before anything else, so a method's own `stride` (and any frame numbers
+passed to the method, e.g. the reference frame of ``get_RMSD()``) refer to the selected frames,
+and per-frame results contain one entry per selected frame.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import functools
+import inspect
+
+import numpy as np
+
+from .ctexceptions import CTException
+
+
+# ........................................................................
+#
+def get_frame_slice(n_frames, start=0, stop=None, stride=1):
+    """
+    Validates a frame range and stride, and returns the equivalent (normalized) slice object.
+
+    Parameters
+    ----------
+    n_frames : int
+        Number of frames in the trajectory the selection applies to.
+
+    start : int {0}
+        First frame of the selection. Negative values count from the end of the trajectory.
+
+    stop : int or None {None}
+        Frame at which the selection stops (exclusive). Negative values count from the end of
+        the trajectory; None means the last frame.
+
+    stride : int {1}
+        Selects every `stride`-th frame between `start` and `stop`.
+
+    Returns
+    -------
+    slice
+        Slice with non-negative `start` and `stop` values, selecting at least one frame.
+
+    Raises
+    ------
+    CTException
+        If the stride is less than 1, or the selection contains no frames.
+
+    """
+
+    stride = int(stride)
+    if stride < 1:
+        raise CTException('stride (%i) is less than 1' % (stride))
+
+    (start, stop, _) = slice(start, stop, stride).indices(n_frames)
+
+    if stop <= start:
+        raise CTException('Frame selection (start=%i, stop=%i) contains no frames (trajectory has %i frames)' % (start, stop, n_frames))
+
+    return slice(start, stop, stride)
+
+
+# ........................................................................
+#
+def get_frame_view(traj, start=0, stop=None, stride=1, copy=False):
+    """
+    Returns a trajectory made up of the frames `start` to `stop` (every `stride`-th frame) of
+    `traj`, sharing the topology and (for stride 1) the coordinates of `traj`.
+
+    Parameters
+    ----------
+    traj : mdtraj.Trajectory
+        Trajectory to take the frames from.
+
+    start : int {0}
+        First frame of the view.
+
+    stop : int or None {None}
+        Frame at which the view stops (exclusive). None means the last frame.
+
+    stride : int {1}
+        Selects every `stride`-th frame between `start` and `stop`.
+
+    copy : bool {False}
+        If True, the returned trajectory holds its own copy of the coordinates, time and unit
+        cell information (the topology is still shared), so it can be modified in place without
+        changing `traj`.
+
+    Returns
+    -------
+    mdtraj.Trajectory
+        The frame view. If every frame is selected and `copy` is False, `traj` itself is
+        returned.
+
+    Raises
+    ------
+    CTException
+        If the selection is invalid (see `get_frame_slice()`).
+
+    """
+
+    frames = get_frame_slice(traj.n_frames, start, stop, stride)
+
+    if not copy and frames == slice(0, traj.n_frames, 1):
+        return traj
+
+    view = traj.slice(frames, copy=False)
+
+    # strided selections are already private (contiguous) copies, so only views need copying
+    if copy and np.shares_memory(view.xyz, traj.xyz):
+        view.xyz = view.xyz.copy()
+        view.time = view.time.copy()
+        if view.unitcell_lengths is not None:
+            view.unitcell_lengths = view.unitcell_lengths.copy()
+            view.unitcell_angles = view.unitcell_angles.copy()
+
+    return view
+
+
+# ........................................................................
+#
+class FrameSelection:
+    """
+    Selection of frames from a trajectory. The selected frames are the frames from `start` to
+    `stop` (every `stride`-th frame) that are also in `indices` and for which `mask` is True
+    (where given). Frames are always selected in trajectory order and only once.
+
+    Parameters
+    ----------
+    start : int {0}
+        First frame that can be selected. Negative values count from the end of the trajectory.
+
+    stop : int or None {None}
+        Frame at which the selection stops (exclusive). None means the last frame.
+
+    stride : int {1}
+        Only every `stride`-th frame between `start` and `stop` can be selected.
+
+    indices : array_like of int or None {None}
+        Frame indices to select. Negative values count from the end of the trajectory.
+
+    mask : array_like of bool or None {None}
+        One value per frame in the trajectory; only frames for which the mask is True are
+        selected.
+
+    Raises
+    ------
+    CTException
+        If the stride is less than 1, or the indices or mask are not one-dimensional integer or
+        boolean arrays, respectively.
+
+    """
+
+    def __init__(self, start=0, stop=None, stride=1, indices=None, mask=None):
+
+        self.start = start
+        self.stop = stop
+        self.stride = int(stride)
+
+        if self.stride < 1:
+            raise CTException('stride (%i) is less than 1' % (self.stride))
+
+        if indices is not None:
+            indices = np.asarray(indices)
+            if indices.ndim != 1 or (len(indices) > 0 and not np.issubdtype(indices.dtype, np.integer)):
+                raise CTException('Frame indices must be a one-dimensional array of integers')
+            indices = indices.astype(int)
+
+        if mask is not None:
+            mask = np.asarray(mask)
+            if mask.ndim != 1 or mask.dtype != bool:
+                raise CTException('Frame mask must be a one-dimensional array of booleans')
+
+        self.indices = indices
+        self.mask = mask
+
+    def __repr__(self):
+        description = "start=%s, stop=%s, stride=%i" % (self.start, self.stop, self.stride)
+        if self.indices is not None:
+            description = description + ", %i indices" % (len(self.indices))
+        if self.mask is not None:
+            description = description + ", mask of %i frames" % (np.sum(self.mask))
+
+        return "FrameSelection (%s): %s" % (hex(id(self)), description)
+
+    @classmethod
+    def from_observable(cls, values, minimum=None, maximum=None, start=0, stop=None, stride=1):
+        """
+        Returns a selection of the frames for which a per-frame observable (e.g. the radius of
+        gyration or the number of contacts) lies between `minimum` and `maximum` (inclusive).
+
+        Parameters
+        ----------
+        values : array_like
+            One value per frame.
+
+        minimum : float or None {None}
+            Smallest selected value (None means no lower bound).
+
+        maximum : float or None {None}
+            Largest selected value (None means no upper bound).
+
+        start, stop, stride
+            Optional frame range and stride, as for `FrameSelection`.
+
+        Returns
+        -------
+        FrameSelection
+        """
+
+        values = np.asarray(values)
+        if values.ndim != 1:
+            raise CTException('Observable must have one value per frame (one-dimensional array)')
+
+        mask = np.ones(len(values), dtype=bool)
+        if minimum is not None:
+            mask = mask & (values >= minimum)
+        if maximum is not None:
+            mask = mask & (values <= maximum)
+
+        return cls(start, stop, stride, mask=mask)
+
+    def get_frames(self, n_frames):
+        """
+        Resolves the selection against a trajectory with `n_frames` frames.
+
+        Parameters
+        ----------
+        n_frames : int
+            Number of frames in the trajectory.
+
+        Returns
+        -------
+        slice or np.ndarray
+            A slice if the selected frames are evenly spaced (in which case the selection can be
+            taken as a view, see `get_frame_view()`), otherwise a sorted array of frame indices.
+
+        Raises
+        ------
+        CTException
+            If indices are out of range, the mask does not match the number of frames, or no frame
+            is selected.
+
+        """
+
+        frames = get_frame_slice(n_frames, self.start, self.stop, self.stride)
+
+        if self.indices is None and self.mask is None:
+            return frames
+
+        selected = np.arange(frames.start, frames.stop, frames.step)
+
+        if self.indices is not None:
+            if np.any(self.indices >= n_frames) or np.any(self.indices < -n_frames):
+                raise CTException('Frame indices must be between %i and %i' % (-n_frames, n_frames - 1))
+            selected = np.intersect1d(selected, self.indices % n_frames)
+
+        if self.mask is not None:
+            if len(self.mask) != n_frames:
+                raise CTException('Frame mask has %i values, while there are %i frames - these must match' % (len(self.mask), n_frames))
+            selected = selected[self.mask[selected]]
+
+        if len(selected) == 0:
+            raise CTException('Frame selection contains no frames')
+
+        # evenly spaced frames (e.g. a contiguous window of a mask) can still be taken as a view
+        if len(selected) == 1:
+            return slice(int(selected[0]), int(selected[0]) + 1, 1)
+
+        steps = np.unique(np.diff(selected))
+        if len(steps) == 1:
+            return slice(int(selected[0]), int(selected[-1]) + 1, int(steps[0]))
+
+        return selected
+
+    def count(self, n_frames):
+        """
+        Returns the number of frames selected from a trajectory with `n_frames` frames.
+
+        """
+
+        frames = self.get_frames(n_frames)
+
+        if isinstance(frames, slice):
+            return len(range(frames.start, frames.stop, frames.step))
+
+        return len(frames)
+
+
+# ........................................................................
+#
+def as_frame_selection(frames):
+    """
+    Converts the value passed as a `frames` keyword to a `FrameSelection`.
+
+    Parameters
+    ----------
+    frames : FrameSelection, slice or array_like
+        A FrameSelection is returned as-is, a slice is converted to the equivalent frame range,
+        an array of booleans is used as a mask and an array of integers as frame indices.
+
+    Returns
+    -------
+    FrameSelection
+
+    Raises
+    ------
+    CTException
+        If `frames` cannot be interpreted as a frame selection.
+
+    """
+
+    if isinstance(frames, FrameSelection):
+        return frames
+
+    if isinstance(frames, slice):
+        return FrameSelection(0 if frames.start is None else frames.start,
+                              frames.stop,
+                              1 if frames.step is None else frames.step)
+
+    try:
+        values = np.asarray(frames)
+    except (TypeError, ValueError):
+        raise CTException('Could not interpret %s as a frame selection' % (str(frames)))
+
+    if values.ndim == 1 and values.dtype == bool:
+        return FrameSelection(mask=values)
+
+    if values.ndim == 1 and (len(values) == 0 or np.issubdtype(values.dtype, np.integer)):
+        return FrameSelection(indices=values)
+
+    raise CTException('Could not interpret %s as a frame selection (expected a FrameSelection, a slice, frame indices or a boolean mask)' % (str(frames)))
+
+
+# ........................................................................
+#
+def select_frames(traj, frames):
+    """
+    Returns a trajectory made up of the selected frames of `traj`. Selections of evenly spaced
+    frames are taken as frame views (see `get_frame_view()`); any other selection holds a copy of
+    only the selected frames. The topology is always shared.
+
+    Parameters
+    ----------
+    traj : mdtraj.Trajectory
+        Trajectory to take the frames from.
+
+    frames : FrameSelection, slice or array_like
+        Frame selection (see `as_frame_selection()`). A slice or index array previously returned
+        by `FrameSelection.get_frames()` is also accepted.
+
+    Returns
+    -------
+    mdtraj.Trajectory
+
+    """
+
+    if isinstance(frames, np.ndarray) and frames.dtype != bool:
+        selected = frames
+    else:
+        selected = as_frame_selection(frames).get_frames(traj.n_frames)
+
+    if isinstance(selected, slice):
+        return get_frame_view(traj, selected.start, selected.stop, selected.step)
+
+    return traj.slice(selected, copy=False)
+
+
+# ........................................................................
+#
+def frame_independent(function):
+    """
+    Decorator that marks a method whose result does not depend on the frames (e.g. methods that
+    only use the topology), such that `frame_selection_methods()` does not add a `frames` keyword
+    to it.
+
+    """
+
+    function.__frame_independent__ = True
+
+    return function
+
+
+# ........................................................................
+#
+def __frame_selected(function):
+    """
+    Internal function that wraps a method such that it accepts a `frames` keyword. If a
+    selection is passed the method is run on ``self.select_frames(frames)``, and a full-length
+    `weights` array (passed positionally or as a keyword) is reduced to the selected frames.
+
+    """
+
+    signature = inspect.signature(function)
+    parameters = list(signature.parameters.values())
+    has_weights = 'weights' in signature.parameters
+
+    # the new keyword-only argument has to come before any **kwargs
+    position = len(parameters)
+    if parameters and parameters[-1].kind == inspect.Parameter.VAR_KEYWORD:
+        position = position - 1
+    parameters.insert(position, inspect.Parameter('frames', inspect.Parameter.KEYWORD_ONLY, default=None))
+
+    @functools.wraps(function)
+    def wrapper(self, *args, frames=None, **kwargs):
+        if frames is None:
+            return function(self, *args, **kwargs)
+
+        selected = as_frame_selection(frames).get_frames(self.n_frames)
+
+        # weights can be passed positionally or as a keyword, so bind the call to find them
+        if has_weights:
+            bound = signature.bind(self, *args, **kwargs)
+            weights = bound.arguments.get('weights', False)
+            if weights is not False and weights is not None and np.ndim(weights) == 1 and len(weights) == self.n_frames:
+                bound.arguments['weights'] = np.asarray(weights, dtype=float)[selected]
+            (args, kwargs) = (bound.args[1:], bound.kwargs)
+
+        return function(self.select_frames(selected), *args, **kwargs)
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    wrapper.__frame_selected__ = True
+
+    return wrapper
+
+
+# ........................................................................
+#
+def frame_selection_methods(cls):
+    """
+    Class decorator that adds a keyword-only `frames` argument to all public methods of a class,
+    such that every analysis can be run on a selection of frames (see `FrameSelection`). The
+    class must implement ``select_frames(frames)``, which returns an object of the same class
+    made up of the selected frames. Properties, static/class methods, private methods and methods
+    marked with `frame_independent` are left untouched.
+
+    Parameters
+    ----------
+    cls : class
+        The class to decorate.
+
+    Returns
+    -------
+    class
+        The same class, with its methods replaced by frame-selecting versions.
+
+    """
+
+    for (attribute, value) in list(vars(cls).items()):
+        if attribute.startswith('_'):
+            continue
+
+        if not inspect.isfunction(value) or getattr(value, '__frame_selected__', False) or getattr(value, '__frame_independent__', False):
+            continue
+
+        setattr(cls, attribute, __frame_selected(value))
+
+    return cls
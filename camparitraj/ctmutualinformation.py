@@ -21,7 +21,6 @@ including this function in any one other class.
 
 import mdtraj as md
 import numpy as np
-import scipy
 from .ctexceptions import CTWarning
 
 
@@ -38,7 +37,7 @@ def calc_MI(X,Y,bins, weights=False):
 
     """
    
-    if weights:
+    if weights is not False and weights is not None:
         c_XY = np.histogram2d(X,Y,bins,weights=weights)[0]
         c_X = np.histogram(X,bins,weights=weights)[0]
         c_Y = np.histogram(Y,bins,weights=weights)[0]
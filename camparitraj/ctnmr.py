@@ -1,92 +1,54 @@
 """
+Random coil chemical shift prediction.
+
+All correction tables are built once, when the module is imported, as numpy arrays indexed by an
+integer residue code. Predictions for every residue (and for any number of sequences) are then
+computed with a handful of array lookups rather than residue by residue.
 
 **Author(s):** Alex Keeley (with Alex Holehouse)
 
 """
-from .ctexceptions import CTException
 import re
 
-# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
-
+import numpy as np
 
+from .ctexceptions import CTException
 
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------
-def compute_random_coil_chemical_shifts(protein_sequence, temperature=25, pH=7.4, use_ggxgg=True, use_perdeuteration=False, asFloat=False):
-    """
-
-    Function that predicts the random coil chemical shifts for user-provided amino acid sequence corrected for user-provided 
-    conditions. Specifically, chemical shift and general sequence correction factors are from [1], temperature corrections 
-    and glycine corrections are from [2] and the underlying methods associated with correction-factor calculations are in [3]. 
-    The correction factors for pertdeuteration are from [4].
-
-    Input sequence can be a standard one-letter sequence, but phosphoresidues can also be included (see examples). 
-    Code is based on JavaScript written by Alex Maltsev at the NIH and can be accessed here
-    (https://www1.bio.ku.dk/english/research/bms/research/sbinlab/randomchemicalshifts/).
-
-    Parameters
-    ----------
+# Order of the nuclei in the columns of all shift/correction tables
+NUCLEI = ['CA', 'CB', 'CO', 'N', 'HN', 'HA']
 
-    sequence : str
-      The sequence of representative abbreviations for the sequence of amino acids
+# residue codes with special handling
+__GLY_CODE = 5
+__PRO_CODE = 12
+__NO_RESIDUE = 23
+__PHOSPHO_CODES = (20, 21, 22)
 
-    temperature : float or int    
-          Experiment temperature of the sample of amino acids for use in corrected chemical shift calculations
-          (note units are in degrees celcius). Default value is 25 and should be between 0 and 100.
+# Residues whose random coil shifts depend on pH, and their acid dissociation constants
+__PH_CODES = [2, 3, 6, 20, 21, 22]
+__PH_KA = np.array([7.78 * (10**-5), 3.43 * (10**-5), 1.67 * (10**-7), 9.76 * (10**-7), 5.00 * (10**-7), 1.47 * (10**-6)])
 
-    pH : float or int
-          pH of the sample of amino acids for use in corrected chemical shift calculations. Default value us 7.4
-          and should be between 0 and 14.
 
-    use_ggxgg : bool
-          Whether to use GGXGG-based neighbor correction for glycines. Default is True.
+# Default secondary shift basins on the phi/psi surface, (phi, psi, width, shifts) where shifts are
+# the mean deviations from random coil (ppm) of CA, CB, CO, N, HN and HA
+__SECONDARY_SHIFT_BASINS = [(-63.0, -43.0, 20.0, [3.09, -0.38, 2.20, -1.60, -0.20, -0.39]),  # alpha helix
+                            (-120.0, 130.0, 25.0, [-1.48, 2.18, -1.50, 1.20, 0.30, 0.37])]  # beta strand
 
-    use_perdeuteration : bool
-          Whether perdeuterated correction factors should be used. Default is False. Note this cannot work with
-          phosphoresidues
 
-    asFloat : bool
-          Whether to populate output dictionaries with float or string variables containing chemical shift numbers. 
-          False (strings) by default.
+def __build_tables():
+    """
+    Builds the lookup tables used by the chemical shift predictor. Tables are returned as numpy
+    arrays where rows are residue codes (row 23 is 'no residue') and columns follow ``NUCLEI``.
 
     Returns
     -------
-    output : list of dict
-           List containing a dictionary for each amino acid in the provided sequence detailing abbreviation and chemical 
-           shifts for the main six different atoms. 
-
-
-    Examples
-    --------
-
-    
-    References
-    ----------
-
-    [1] Kjaergaard, M. and Poulsen, F.M. (2011) Sequence correction of random coil chemical shifts: correlation between neighbor correction factors and changes in the Ramachandran distribution J. Biomol. NMR 50(2):157-165
-        
-    
-    [2] Kjaergaard, M., Brander, S. and Poulsen, F.M. (2011) Random coil chemical shifts for intrinsically disordered proteins: Effects of temperature and pH J. Biomol. NMR 49(2):139-49.
-        
-
-    [3] Schwarzinger, S., Kroon, G.J., Foss, T.R., Chung. J., Wright, P.E., Dyson, H.J. (2001) Sequence-dependent correction of random coil NMR chemical shifts. JACS 123(13):2970-8.
-        
-
-    [4] Cavanagh, J., Fairbrother, W.J., Palmer, A.G., Rance, M. and Skelton, N.J. (2007) Protein NMR Spectroscopy - Principles and practice. 2nd edition. Academic Press
-    
-    
+    tuple
+        (key_aa1, key_aa3, av, temp, neighbour, ph_0, deut) where neighbour has shape (2, 4, 24, 6),
+        holding the standard [0] and GGXGG glycine [1] corrections for the residues at i+2, i+1,
+        i-1 and i-2 (in that order), and ph_0 has shape (6, 2, 6) with the protonated [0] and
+        deprotonated [1] shifts of the residues in ``__PH_CODES``.
 
     """
-    # sanity check temperature
-    if temperature > 100 or temperature < 0:
-        raise CTException('Temperature provided (%i) was non-physiological. Remember temperature should be in *celcius*.' %(temperature))
-
-    # pH sanity check
-    if pH < 0 or pH > 14:
-        raise CTException('pH provided (%i) was non-physiological. Remember pH should be in between 0 and 14.' %(pH))
-
-
-
-    # SETUP
     # The array 'key' is used to translate amino acid letter code into
     # numerical index. Value is -1 when there is no such amino acid letter
     key_aa1 = [0, -1, 1, 2, 3, 4, 5, 6, 7, -1, 8, 9, 10, 11, -1, 12, 13, 14, 15, 16, -1, 17, 18, -1, 19, -1]
@@ -121,11 +83,6 @@ def compute_random_coil_chemical_shifts(protein_sequence, temperature=25, pH=7.4
         "PTR": 22,
         "PY": 22}
 
-    # The array 'sequence' keeps the set of amino acid indices for the given
-    # protein. The array size is not fixed and will accommodate a given
-    # sequence.
-    sequence = []
-
     # The XX_av arrays contain uncorrected random coil values for atom type XX at 5C and pH 6.5
     ca_av = [
         52.747,
@@ -369,174 +326,486 @@ def compute_random_coil_chemical_shifts(protein_sequence, temperature=25, pH=7.4
     ptr_ph_0 = [[57.905, 38.760, 175.605, 121.797, 8.403, 4.604],
                 [58.002, 38.685, 175.788, 121.953, 8.320, 4.595]]
 
-    # Arrays for keeping the chemical shifts calculated for the entered pH value
-    asp_ph_corr = [0, 0, 0, 0, 0, 0]
-    glu_ph_corr = [0, 0, 0, 0, 0, 0]
-    his_ph_corr = [0, 0, 0, 0, 0, 0]
-    sep_ph_corr = [0, 0, 0, 0, 0, 0]
-    tpo_ph_corr = [0, 0, 0, 0, 0, 0]
-    ptr_ph_corr = [0, 0, 0, 0, 0, 0]
-
     # Arrays for CS corrections for deuterated proteins
     ca_deut = [-0.68, -0.55, -0.55, -0.69, -0.55, -0.39, -0.55, -0.77, -0.69, -
                0.62, -0.69, -0.55, -0.69, -0.69, -0.69, -0.55, -0.55, -0.84, -0.55, -0.55]
     cb_deut = [-1.00, -0.71, -0.71, -0.97, -0.71, 0.00, -0.71, -1.28, -1.11, -
                1.26, -0.97, -0.71, -1.11, -0.97, -1.11, -0.71, -0.71, -1.20, -0.71, -0.71]
 
-    # RUN
-    cur = 0
-    delta_T = temperature - 5  # difference between the given temperature and 5 degrees C
-    ca_pred = 0
-    cb_pred = 0
-    co_pred = 0
-    n_pred = 0
-    hn_pred = 0
-    ha_pred = 0
+    def stack(tables, n_rows=24):
+        out = np.zeros((n_rows, len(tables)))
+        for (col, table) in enumerate(tables):
+            out[:len(table), col] = table
+        return out
+
+    av = stack([ca_av, cb_av, co_av, n_av, hn_av, ha_av])
+    temp = stack([ca_t, cb_t, co_t, n_t, hn_t, ha_t])
+
+    standard = [[ca_a, cb_a, co_a, n_a, hn_a, ha_a],
+                [ca_b, cb_b, co_b, n_b, hn_b, ha_b],
+                [ca_c, cb_c, co_c, n_c, hn_c, ha_c],
+                [ca_d, cb_d, co_d, n_d, hn_d, ha_d]]
+
+    # glycine (GGXGG) corrections only exist for CA, CO and N
+    glycine = [[gly_ca_a, cb_a, gly_co_a, gly_n_a, hn_a, ha_a],
+               [gly_ca_b, cb_b, gly_co_b, gly_n_b, hn_b, ha_b],
+               [gly_ca_c, cb_c, gly_co_c, gly_n_c, hn_c, ha_c],
+               [gly_ca_d, cb_d, gly_co_d, gly_n_d, hn_d, ha_d]]
+
+    neighbour = np.array([[stack(tables) for tables in standard],
+                          [stack(tables) for tables in glycine]])
+
+    ph_0 = np.array([asp_ph_0, glu_ph_0, his_ph_0, sep_ph_0, tpo_ph_0, ptr_ph_0])
+
+    # deuteration only shifts CA and CB (and is undefined for phosphoresidues)
+    deut = np.zeros((24, 6))
+    deut[:len(ca_deut), 0] = ca_deut
+    deut[:len(cb_deut), 1] = cb_deut
+
+    return (key_aa1, key_aa3, av, temp, neighbour, ph_0, deut)
+
+
+(__KEY_AA1, __KEY_AA3, __AV, __TEMP, __NEIGHBOUR, __PH_0, __DEUT) = __build_tables()
+
+# single-letter lookup indexed by ord(letter) - 65 for fast encoding of plain sequences
+__KEY_AA1_ARRAY = np.array(__KEY_AA1)
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def compute_random_coil_chemical_shifts(protein_sequence, temperature=25, pH=7.4, use_ggxgg=True, use_perdeuteration=False, asFloat=False):
+    """
+
+    Function that predicts the random coil chemical shifts for user-provided amino acid sequence corrected for user-provided 
+    conditions. Specifically, chemical shift and general sequence correction factors are from [1], temperature corrections 
+    and glycine corrections are from [2] and the underlying methods associated with correction-factor calculations are in [3]. 
+    The correction factors for pertdeuteration are from [4].
+
+    Input sequence can be a standard one-letter sequence, but phosphoresidues can also be included (see examples). 
+    Code is based on JavaScript written by Alex Maltsev at the NIH and can be accessed here
+    (https://www1.bio.ku.dk/english/research/bms/research/sbinlab/randomchemicalshifts/).
+
+    Parameters
+    ----------
+
+    sequence : str
+      The sequence of representative abbreviations for the sequence of amino acids
+
+    temperature : float or int    
+          Experiment temperature of the sample of amino acids for use in corrected chemical shift calculations
+          (note units are in degrees celcius). Default value is 25 and should be between 0 and 100.
+
+    pH : float or int
+          pH of the sample of amino acids for use in corrected chemical shift calculations. Default value us 7.4
+          and should be between 0 and 14.
+
+    use_ggxgg : bool
+          Whether to use GGXGG-based neighbor correction for glycines. Default is True.
+
+    use_perdeuteration : bool
+          Whether perdeuterated correction factors should be used. Default is False. Note this cannot work with
+          phosphoresidues
+
+    asFloat : bool
+          Whether to populate output dictionaries with float or string variables containing chemical shift numbers. 
+          False (strings) by default.
+
+    Returns
+    -------
+    output : list of dict
+           List containing a dictionary for each amino acid in the provided sequence detailing abbreviation and chemical 
+           shifts for the main six different atoms. 
+
+
+    Examples
+    --------
+
+    
+    References
+    ----------
+
+    [1] Kjaergaard, M. and Poulsen, F.M. (2011) Sequence correction of random coil chemical shifts: correlation between neighbor correction factors and changes in the Ramachandran distribution J. Biomol. NMR 50(2):157-165
+        
+    
+    [2] Kjaergaard, M., Brander, S. and Poulsen, F.M. (2011) Random coil chemical shifts for intrinsically disordered proteins: Effects of temperature and pH J. Biomol. NMR 49(2):139-49.
+        
+
+    [3] Schwarzinger, S., Kroon, G.J., Foss, T.R., Chung. J., Wright, P.E., Dyson, H.J. (2001) Sequence-dependent correction of random coil NMR chemical shifts. JACS 123(13):2970-8.
+        
+
+    [4] Cavanagh, J., Fairbrother, W.J., Palmer, A.G., Rance, M. and Skelton, N.J. (2007) Protein NMR Spectroscopy - Principles and practice. 2nd edition. Academic Press
+    
+    
+
+    """
+    __check_conditions(temperature, pH)
+
+    (sequence, aminos) = __set_sequence(protein_sequence, __KEY_AA1, __KEY_AA3)
+    sequence = np.array(sequence)
+
+    # positions of the residues within the padded code array
+    positions = np.arange(2, len(sequence) - 2)
+    predicted = __predict_shifts(sequence, positions, temperature, pH, use_ggxgg, use_perdeuteration)
 
     output = []
+    for (j, (code, shifts)) in enumerate(zip(sequence[positions].tolist(), predicted.tolist())):
+        entry = {"Res": aminos[j], "Index": j}
 
-    # Calculate deprotonated fractions of Asp, Glu and His at the given pH
-    asp_deprot_frac = 7.78 * (10**-5) / (7.78 * (10**-5) + (10**(-pH)))
-    glu_deprot_frac = 3.43 * (10**-5) / (3.43 * (10**-5) + (10**(-pH)))
-    his_deprot_frac = 1.67 * (10**-7) / (1.67 * (10**-7) + (10**(-pH)))
-
-    sep_deprot_frac = 9.76 * (10**-7) / (9.76 * (10**-7) + (10**(-pH)))
-    tpo_deprot_frac = 5.00 * (10**-7) / (5.00 * (10**-7) + (10**(-pH)))
-    ptr_deprot_frac = 1.47 * (10**-6) / (1.47 * (10**-6) + (10**(-pH)))
-
-    # Calculate pH corrected chemical shifts
-    for i in range(6):
-        asp_ph_corr[i] = asp_deprot_frac * asp_ph_0[1][i] + (1 - asp_deprot_frac) * asp_ph_0[0][i]
-        glu_ph_corr[i] = glu_deprot_frac * glu_ph_0[1][i] + (1 - glu_deprot_frac) * glu_ph_0[0][i]
-        his_ph_corr[i] = his_deprot_frac * his_ph_0[1][i] + (1 - his_deprot_frac) * his_ph_0[0][i]
-        sep_ph_corr[i] = sep_deprot_frac * sep_ph_0[1][i] + (1 - sep_deprot_frac) * sep_ph_0[0][i]
-        tpo_ph_corr[i] = tpo_deprot_frac * tpo_ph_0[1][i] + (1 - tpo_deprot_frac) * tpo_ph_0[0][i]
-        ptr_ph_corr[i] = ptr_deprot_frac * ptr_ph_0[1][i] + (1 - ptr_deprot_frac) * ptr_ph_0[0][i]
-
-    print(protein_sequence)
-    sequences = __set_sequence(protein_sequence, key_aa1, key_aa3)
-    sequence = sequences[0]
-    aminos = sequences[1]
-
-    for j in range(len(sequence) - 4):
-        output.append({"Res":   aminos[j], "Index": j})
-
-    # deuterated parameters not available for phosphorylated Residues
-    if ((22 in sequence) or (25 in sequence) or (28 in sequence)) and use_perdeuteration:
-        raise CTException('Phosphorylated amino acids not supported in deuterated proteins')
+        for (nucleus, value) in zip(NUCLEI, shifts):
+            entry[nucleus] = __round3(value, asFloat)
+
+        # special output for gly, pro and perdeuterated proteins
+        if code == __GLY_CODE:
+            entry["CB"] = "**.***"
 
-    while cur < (len(sequence) - 4):
-        if sequence[cur + 2] == 2:  # Aspartate
-            ca_pred = asp_ph_corr[0]
-            cb_pred = asp_ph_corr[1]
-            co_pred = asp_ph_corr[2]
-            n_pred = asp_ph_corr[3]
-            hn_pred = asp_ph_corr[4]
-            ha_pred = asp_ph_corr[5]
-
-        elif sequence[cur + 2] == 3:  # Glutamate
-            ca_pred = glu_ph_corr[0]
-            cb_pred = glu_ph_corr[1]
-            co_pred = glu_ph_corr[2]
-            n_pred = glu_ph_corr[3]
-            hn_pred = glu_ph_corr[4]
-            ha_pred = glu_ph_corr[5]
-
-        elif sequence[cur + 2] == 6:  # Histidine
-            ca_pred = his_ph_corr[0]
-            cb_pred = his_ph_corr[1]
-            co_pred = his_ph_corr[2]
-            n_pred = his_ph_corr[3]
-            hn_pred = his_ph_corr[4]
-            ha_pred = his_ph_corr[5]
-
-        elif sequence[cur + 2] == key_aa3["SEP"]:  # phospho-SER
-            ca_pred = sep_ph_corr[0]
-            cb_pred = sep_ph_corr[1]
-            co_pred = sep_ph_corr[2]
-            n_pred = sep_ph_corr[3]
-            hn_pred = sep_ph_corr[4]
-            ha_pred = sep_ph_corr[5]
-
-        elif sequence[cur + 2] == key_aa3["TPO"]:  # phospho-THR
-            ca_pred = tpo_ph_corr[0]
-            cb_pred = tpo_ph_corr[1]
-            co_pred = tpo_ph_corr[2]
-            n_pred = tpo_ph_corr[3]
-            hn_pred = tpo_ph_corr[4]
-            ha_pred = tpo_ph_corr[5]
-
-        elif sequence[cur + 2] == key_aa3["PTR"]:  # phospho-TYR
-            ca_pred = ptr_ph_corr[0]
-            cb_pred = ptr_ph_corr[1]
-            co_pred = ptr_ph_corr[2]
-            n_pred = ptr_ph_corr[3]
-            hn_pred = ptr_ph_corr[4]
-            ha_pred = ptr_ph_corr[5]
-
-        else:  # any other amino acid
-            ca_pred = ca_av[sequence[cur + 2]]
-            cb_pred = cb_av[sequence[cur + 2]]
-            co_pred = co_av[sequence[cur + 2]]
-            n_pred = n_av[sequence[cur + 2]]
-            hn_pred = hn_av[sequence[cur + 2]]
-            ha_pred = ha_av[sequence[cur + 2]]
-
-        # Apply the neighbor and temperature corrections
-        if sequence[cur + 2] == 5 and use_ggxgg:  # special case of glycine
-            ca_pred += gly_ca_a[sequence[cur + 4]] + gly_ca_b[sequence[cur + 3]] + \
-                gly_ca_c[sequence[cur + 1]] + gly_ca_d[sequence[cur]] + (delta_T * ca_t[sequence[cur + 2]] / 1000)
-            co_pred += gly_co_a[sequence[cur + 4]] + gly_co_b[sequence[cur + 3]] + \
-                gly_co_c[sequence[cur + 1]] + gly_co_d[sequence[cur]] + (delta_T * co_t[sequence[cur + 2]] / 1000)
-            n_pred += gly_n_a[sequence[cur + 4]] + gly_n_b[sequence[cur + 3]] + \
-                gly_n_c[sequence[cur + 1]] + gly_n_d[sequence[cur]] + (delta_T * n_t[sequence[cur + 2]] / 1000)
-
-        else:  # all other Residues
-            ca_pred += ca_a[sequence[cur + 4]] + ca_b[sequence[cur + 3]] + ca_c[sequence[cur + 1]] + \
-                ca_d[sequence[cur]] + (delta_T * ca_t[sequence[cur + 2]] / 1000)
-            co_pred += co_a[sequence[cur + 4]] + co_b[sequence[cur + 3]] + co_c[sequence[cur + 1]] + \
-                co_d[sequence[cur]] + (delta_T * co_t[sequence[cur + 2]] / 1000)
-            n_pred += n_a[sequence[cur + 4]] + n_b[sequence[cur + 3]] + n_c[sequence[cur + 1]] + \
-                n_d[sequence[cur]] + (delta_T * n_t[sequence[cur + 2]] / 1000)
-
-        cb_pred += cb_a[sequence[cur + 4]] + cb_b[sequence[cur + 3]] + cb_c[sequence[cur + 1]] + \
-            cb_d[sequence[cur]] + (delta_T * cb_t[sequence[cur + 2]] / 1000)
-        hn_pred += hn_a[sequence[cur + 4]] + hn_b[sequence[cur + 3]] + hn_c[sequence[cur + 1]] + \
-            hn_d[sequence[cur]] + (delta_T * hn_t[sequence[cur + 2]] / 1000)
-        ha_pred += ha_a[sequence[cur + 4]] + ha_b[sequence[cur + 3]] + ha_c[sequence[cur + 1]] + \
-            ha_d[sequence[cur]] + (delta_T * ha_t[sequence[cur + 2]] / 1000)
+        if code == __PRO_CODE:
+            entry["N"] = "***.***"
+            entry["HN"] = "*.***"
 
         if use_perdeuteration:
-            ca_pred += ca_deut[sequence[cur + 2]]
-            cb_pred += cb_deut[sequence[cur + 2]]
-
-        # write to output
-        if sequence[cur + 2] == 5:  # special output for gly
-            output[cur].update({"CA": __round3(ca_pred, asFloat)})
-            output[cur].update({"CB": "**.***"})
-            output[cur].update({"CO": __round3(co_pred, asFloat)})
-        else:
-            output[cur].update({"CA": __round3(ca_pred, asFloat)})
-            output[cur].update({"CB": __round3(cb_pred, asFloat)})
-            output[cur].update({"CO": __round3(co_pred, asFloat)})
+            entry["HA"] = "*.***"
 
-        if sequence[cur + 2] == 12:  # special output for pro
-            output[cur].update({"N": "***.***"})
-            output[cur].update({"HN": "*.***"})
-        else:
-            output[cur].update({"N": __round3(n_pred, asFloat)})
-            output[cur].update({"HN": __round3(hn_pred, asFloat)})
+        output.append(entry)
 
-        if use_perdeuteration:
-            output[cur].update({"HA": "*.***"})
-        else:
-            output[cur].update({"HA": __round3(ha_pred, asFloat)})
+    return output
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def compute_random_coil_chemical_shifts_batch(sequences, temperature=25, pH=7.4, use_ggxgg=True, use_perdeuteration=False):
+    """
+    Predicts random coil chemical shifts for many sequences at once. This uses exactly the same
+    tables and corrections as ``compute_random_coil_chemical_shifts()``, but all sequences are
+    encoded into a single integer array and every residue of every sequence is predicted in one
+    vectorized pass, which makes it suitable for screening large sequence libraries.
+
+    Parameters
+    ----------
+    sequences : str or list of str
+        One or more sequences, using the same format as ``compute_random_coil_chemical_shifts()``
+        (one-letter codes, with phosphoresidues given in brackets, e.g. 'AC(pS)E').
 
-        cur += 1
+    temperature : float or int
+        Temperature in degrees celcius (0 - 100). Default = 25.
+
+    pH : float or int
+        pH (0 - 14). Default = 7.4.
+
+    use_ggxgg : bool
+        Whether to use GGXGG-based neighbor correction for glycines. Default is True.
+
+    use_perdeuteration : bool
+        Whether perdeuterated correction factors should be used. Default is False.
+
+    Returns
+    -------
+    np.ndarray
+        Structured array with one record per residue (for all sequences, in order) and the fields
+        ``sequence`` (index of the sequence in the input), ``index`` (residue index within the
+        sequence), ``residue`` (residue name) and one float field per nucleus (``CA``, ``CB``,
+        ``CO``, ``N``, ``HN``, ``HA``). Shifts are not rounded, and shifts that are undefined
+        (CB of Gly, N and HN of Pro and HA of perdeuterated proteins) are NaN.
+
+    """
+    __check_conditions(temperature, pH)
+
+    if isinstance(sequences, str):
+        sequences = [sequences]
+
+    # encode every sequence (once per unique sequence) and concatenate them, each padded with two
+    # 'no residue' codes on either side so neighbour corrections never cross between sequences
+    encoded = {}
+    codes = []
+    names = []
+    sequence_index = []
+    residue_index = []
+    for (i, seq) in enumerate(sequences):
+        if seq not in encoded:
+            encoded[seq] = __encode_sequence(seq)
+
+        (seq_codes, aminos) = encoded[seq]
+
+        codes.append(seq_codes)
+        names.extend(aminos[:len(seq_codes) - 4])
+        sequence_index.append(np.repeat(i, len(seq_codes) - 4))
+        residue_index.append(np.arange(len(seq_codes) - 4))
+
+    if len(codes) == 0:
+        codes = np.zeros(0, dtype=int)
+    else:
+        codes = np.concatenate(codes)
+
+    positions = np.flatnonzero(codes != __NO_RESIDUE)
+    predicted = __predict_shifts(codes, positions, temperature, pH, use_ggxgg, use_perdeuteration)
+
+    centre = codes[positions]
+    predicted[centre == __GLY_CODE, 1] = np.nan
+    predicted[centre == __PRO_CODE, 3:5] = np.nan
+    if use_perdeuteration:
+        predicted[:, 5] = np.nan
+
+    dtype = [('sequence', np.int64), ('index', np.int64), ('residue', 'U4')] + [(nucleus, np.float64) for nucleus in NUCLEI]
+    output = np.zeros(len(positions), dtype=dtype)
+
+    if len(positions) > 0:
+        output['sequence'] = np.concatenate(sequence_index)
+        output['index'] = np.concatenate(residue_index)
+        output['residue'] = names
+
+    for (col, nucleus) in enumerate(NUCLEI):
+        output[nucleus] = predicted[:, col]
 
     return output
 
 
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def build_secondary_shift_surface(bin_width=5.0, basins=None):
+    """
+    Builds a gridded phi/psi surface of secondary chemical shifts (i.e. the deviation from the
+    random coil shift) for each backbone nucleus. The surface is a sum of periodic Gaussian basins,
+    where each basin is centred on a region of the Ramachandran map and carries the characteristic
+    secondary shift of that region. By default the alpha-helical and beta-strand basins are used,
+    with approximate mean secondary shifts taken from [1] and [2]; conformations outside these
+    basins (e.g. PPII and other coil regions) contribute ~0.
+
+    This is an empirical, residue-independent approximation intended for ensemble-averaged
+    trends rather than residue-specific accuracy. Custom surfaces (e.g. derived from a database)
+    can be passed directly to ``compute_secondary_shifts_from_dihedrals()`` instead.
+
+    Parameters
+    ----------
+    bin_width : float
+        Width of the phi and psi bins in degrees. Must divide 360. Default = 5.0.
+
+    basins : list of tuples
+        Optional list of basins, each defined as (phi, psi, width, shifts) where phi, psi and width
+        are in degrees and shifts is a list of six secondary shifts (ppm) ordered as ``NUCLEI``.
+        If not provided the default helix/strand basins are used.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (n_bins, n_bins, 6) where element [i, j, k] is the secondary shift of nucleus
+        k for phi in bin i and psi in bin j (bins start at -180 degrees).
+
+    References
+    ----------
+    [1] Spera, S. and Bax, A. (1991) Empirical correlation between protein backbone conformation and C.alpha. and C.beta. 13C nuclear magnetic resonance chemical shifts. JACS 113(14):5490-5492
+
+    [2] Wishart, D.S. and Sykes, B.D. (1994) The 13C chemical-shift index: a simple method for the identification of protein secondary structure using 13C chemical-shift data. J. Biomol. NMR 4(2):171-180
+
+    """
+    n_bins = 360.0 / bin_width
+    if bin_width <= 0 or abs(n_bins - round(n_bins)) > 1e-6:
+        raise CTException('bin_width (%s) must be a positive number that divides 360' % (str(bin_width)))
+    n_bins = int(round(n_bins))
+
+    if basins is None:
+        basins = __SECONDARY_SHIFT_BASINS
+
+    centres = -180.0 + bin_width * (np.arange(n_bins) + 0.5)
+
+    surface = np.zeros((n_bins, n_bins, len(NUCLEI)))
+    for (phi, psi, width, shifts) in basins:
+        if len(shifts) != len(NUCLEI):
+            raise CTException('Each basin must define %i shifts (one per nucleus in %s)' % (len(NUCLEI), str(NUCLEI)))
+
+        # periodic distance on the phi/psi torus
+        d_phi = (centres - phi + 180.0) % 360.0 - 180.0
+        d_psi = (centres - psi + 180.0) % 360.0 - 180.0
+        gaussian = np.exp(-(d_phi[:, np.newaxis]**2 + d_psi[np.newaxis, :]**2) / (2 * width**2))
+
+        surface = surface + gaussian[:, :, np.newaxis] * np.array(shifts, dtype=float)
+
+    return surface
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def compute_secondary_shifts_from_dihedrals(phi, psi, surface=None, weights=None, per_frame=False, chunk_size=10000):
+    """
+    Predicts backbone secondary chemical shifts from per-frame backbone dihedral angles by
+    looking up each (phi, psi) pair on a secondary shift surface.
+
+    The ensemble average is computed without ever building the per-frame shifts: each residue's
+    (weighted) phi/psi histogram on the surface grid is accumulated frame-chunk by frame-chunk
+    and contracted against the surface, so memory use is independent of the number of frames.
+
+    Parameters
+    ----------
+    phi : np.ndarray
+        Array of shape (n_frames, n_residues) with phi angles in degrees.
+
+    psi : np.ndarray
+        Array of shape (n_frames, n_residues) with psi angles in degrees.
+
+    surface : np.ndarray
+        Surface of shape (n_bins, n_bins, 6) as returned by ``build_secondary_shift_surface()``.
+        If not provided the default surface is used.
+
+    weights : np.ndarray
+        Optional per-frame weights (n_frames). Weights are normalized internally.
+
+    per_frame : bool
+        If True the per-frame secondary shifts (n_frames, n_residues, 6) are returned instead of
+        the ensemble average. Default = False.
+
+    chunk_size : int
+        Number of frames histogrammed at a time. Default = 10000.
+
+    Returns
+    -------
+    np.ndarray
+        Ensemble averaged secondary shifts of shape (n_residues, 6), or per-frame secondary shifts
+        of shape (n_frames, n_residues, 6) if per_frame is True. Columns follow ``NUCLEI``.
+
+    """
+    phi = np.asarray(phi, dtype=float)
+    psi = np.asarray(psi, dtype=float)
+
+    if phi.ndim != 2 or phi.shape != psi.shape:
+        raise CTException('phi and psi must be equally sized (n_frames, n_residues) arrays')
+
+    if surface is None:
+        surface = build_secondary_shift_surface()
+
+    surface = np.asarray(surface, dtype=float)
+    n_bins = surface.shape[0]
+    if surface.ndim != 3 or surface.shape[1] != n_bins:
+        raise CTException('surface must be an (n_bins, n_bins, n_nuclei) array')
+
+    (n_frames, n_residues) = phi.shape
+
+    if weights is None:
+        weights = np.repeat(1.0 / n_frames, n_frames)
+    else:
+        weights = np.asarray(weights, dtype=float)
+        if len(weights) != n_frames or np.any(weights < 0) or np.sum(weights) == 0:
+            raise CTException('weights must be a non-negative array with one value per frame (%i)' % (n_frames))
+        weights = weights / np.sum(weights)
+
+    if per_frame:
+        return surface[__dihedral_bin(phi, n_bins), __dihedral_bin(psi, n_bins)]
+
+    # weighted occupancy of each (residue, phi-bin, psi-bin)
+    occupancy = np.zeros(n_residues * n_bins * n_bins)
+    residue_offset = np.arange(n_residues) * n_bins * n_bins
+    for start in range(0, n_frames, chunk_size):
+        end = min(start + chunk_size, n_frames)
+        flat = residue_offset + __dihedral_bin(phi[start:end], n_bins) * n_bins + __dihedral_bin(psi[start:end], n_bins)
+        occupancy = occupancy + np.bincount(flat.ravel(), weights=np.repeat(weights[start:end], n_residues), minlength=len(occupancy))
+
+    return occupancy.reshape(n_residues, n_bins * n_bins) @ surface.reshape(n_bins * n_bins, -1)
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def __check_conditions(temperature, pH):
+    """
+    Sanity checks the temperature and pH passed to the chemical shift predictors.
+
+    """
+    # sanity check temperature
+    if temperature > 100 or temperature < 0:
+        raise CTException('Temperature provided (%i) was non-physiological. Remember temperature should be in *celcius*.' %(temperature))
+
+    # pH sanity check
+    if pH < 0 or pH > 14:
+        raise CTException('pH provided (%i) was non-physiological. Remember pH should be in between 0 and 14.' %(pH))
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def __predict_shifts(codes, positions, temperature, pH, use_ggxgg, use_perdeuteration):
+    """
+    Vectorized core of the chemical shift predictors.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Integer residue codes, where every residue has at least two entries (residues or the 23
+        'no residue' padding) on either side.
+
+    positions : np.ndarray
+        Positions in ``codes`` of the residues to predict shifts for.
+
+    temperature : float or int
+        Temperature in degrees celcius.
+
+    pH : float or int
+        pH used for the pH-dependent residues.
+
+    use_ggxgg : bool
+        Whether glycines use the GGXGG neighbour corrections.
+
+    use_perdeuteration : bool
+        Whether to apply the perdeuteration corrections.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (len(positions), 6) with the shifts of each nucleus (columns follow ``NUCLEI``).
+
+    """
+    centre = codes[positions]
+
+    if use_perdeuteration and np.isin(centre, __PHOSPHO_CODES).any():
+        # deuterated parameters not available for phosphorylated Residues
+        raise CTException('Phosphorylated amino acids not supported in deuterated proteins')
+
+    delta_T = temperature - 5  # difference between the given temperature and 5 degrees C
+
+    # base shifts, where Asp, Glu, His and the phosphoresidues are interpolated between their
+    # protonated and deprotonated shifts according to their deprotonated fraction at this pH
+    deprot_frac = (__PH_KA / (__PH_KA + (10**(-pH))))[:, np.newaxis]
+    base = __AV.copy()
+    base[__PH_CODES] = deprot_frac * __PH_0[:, 1] + (1 - deprot_frac) * __PH_0[:, 0]
+
+    # select the glycine-specific neighbour tables where needed
+    gly = ((centre == __GLY_CODE) & bool(use_ggxgg)).astype(int)
+
+    predicted = base[centre] + (__NEIGHBOUR[gly, 0, codes[positions + 2]] + __NEIGHBOUR[gly, 1, codes[positions + 1]] +
+                                __NEIGHBOUR[gly, 2, codes[positions - 1]] + __NEIGHBOUR[gly, 3, codes[positions - 2]] +
+                                (delta_T * __TEMP[centre] / 1000))
+
+    if use_perdeuteration:
+        predicted = predicted + __DEUT[centre]
+
+    return predicted
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def __dihedral_bin(angles, n_bins):
+    """
+    Maps dihedral angles in degrees (-180 to 180) onto the index of their bin on an n_bins wide
+    surface grid.
+
+    """
+    return np.floor((angles + 180.0) * (n_bins / 360.0)).astype(int) % n_bins
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
+def __encode_sequence(sequence):
+    """
+    Encodes a sequence as a numpy array of integer residue codes padded with two 'no residue'
+    codes on either side. Plain upper-case one-letter sequences are encoded directly with a
+    single array lookup, anything else goes through ``__set_sequence()``.
+
+    Returns
+    -------
+    tuple
+        (codes, aminos) where codes is the padded np.ndarray of codes and aminos the list of
+        residue names.
+
+    """
+    stripped = sequence.strip()
+
+    if stripped.isascii() and stripped.isalpha() and stripped.isupper():
+        codes = __KEY_AA1_ARRAY[np.frombuffer(stripped.encode('ascii'), dtype=np.uint8) - 65]
+        if (codes >= 0).all():
+            return (np.concatenate(([__NO_RESIDUE, __NO_RESIDUE], codes, [__NO_RESIDUE, __NO_RESIDUE])), list(stripped))
+
+    (codes, aminos) = __set_sequence(sequence, __KEY_AA1, __KEY_AA3)
+
+    return (np.array(codes), aminos)
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------
 def __set_sequence(sequence, key1, key3):
     """Translates the amino acid input string into a list of integers representing the same set of amino acids.
 
@@ -574,7 +843,7 @@ def __set_sequence(sequence, key1, key3):
     regex = re.findall(r"\(([^)]+)\)|(.)", inp)
     for i in range(len(regex)):
         set = regex[i]
-        if set[0] is '':
+        if set[0] == '':
             aa1 = set[1]
             aminos.append(aa1)
             code = ord(aa1[0]) - 65
@@ -1,5 +1,8 @@
 import numpy as np
 
+from . import ctio, cttools, ctuncertainty
+from .ctexceptions import CTException
+
 
 def get_overlap_concentration(rg):
     """
@@ -40,3 +43,263 @@ def get_overlap_concentration(rg):
     c = (1/(v_l))/Na
 
     return c
+
+
+def get_hydrodynamic_radius(rg, n_residues, alpha1=0.216, alpha2=4.06, alpha3=0.821):
+    """
+    Function that converts the radius of gyration (Rg) into an apparent hydrodynamic radius
+    using the approximation derived by Nygaard et al. [1].
+
+    [1] Nygaard M, Kragelund BB, Papaleo E, Lindorff-Larsen K. An Efficient 
+    Method for Estimating the Hydrodynamic Radius of Disordered Protein 
+    Conformations. Biophys J. 2017;113: 550-557.
+
+    Parameters
+    ----------
+
+    rg : float or np.ndarray
+       Radius of gyration (or per-frame radii of gyration) in Angstroms
+
+    n_residues : int
+       Number of residues in the chain
+
+    alpha1, alpha2, alpha3 : float
+       Parameters in equation (7) from Nygaard et al.
+
+    Return
+    ------
+    
+    float or np.ndarray
+        The hydrodynamic radius in Angstroms
+
+    """
+
+    # precompute
+    N_033 = np.power(n_residues, 0.33)
+    N_060 = np.power(n_residues, 0.60)
+        
+    Rg_over_Rh = ((alpha1*(rg - alpha2*N_033)) / (N_060 - N_033)) + alpha3
+
+    return (1/Rg_over_Rh)*rg
+
+
+def get_num_scaling_fitting_points(max_separation, inter_residue_min, end_effect, num_fitting_points=40, fraction_of_points=0.5, fraction_override=False):
+    """
+    Function that determines the number of (log-spaced) points used to fit the polymer scaling
+    exponent, given the maximum sequence separation available. If the chain is too short to use
+    num_fitting_points a fraction of the available points is used instead. See 
+    CTProtein.get_scaling_exponent() for a description of the parameters.
+
+    Return
+    ------
+    
+    int
+        The number of points to fit
+
+    """
+
+    #  if we're not using fraction override check the number of points requested makes sense given sequence length
+    if not fraction_override and (max_separation - (end_effect+inter_residue_min)) < num_fitting_points:
+        fraction_of_points=1.0
+        ctio.warning_message("For scaling exponent calculation, sequence not long enough to use %i points (only %i valid positions once end effects and low |i-j| are accounted for), switching to using the fraction of points mode (will use %i points instead)" % (num_fitting_points, (max_separation - (end_effect+inter_residue_min)), int(fraction_of_points*(max_separation - (end_effect+inter_residue_min)))))
+            
+        fraction_override = True
+            
+    if fraction_override:
+        if fraction_of_points > 1.0:
+            raise CTException("Using fraction_overide to define the number of points to fit in the linear loglog analysis, but requested over 1.0 fraction (fraction_of_points must lie between >=0 and 1.0")
+        # again note int to round down here
+        num_fitting_points = int(fraction_of_points*(max_separation - (end_effect+inter_residue_min)))
+        if num_fitting_points < 3:
+            raise CTException("Less than three points - cannot fit a straight line")
+        if num_fitting_points < 10:
+            ctio.warning_message("Warning: Scaling fit has only %i points - likely finite size effects!" % (num_fitting_points))
+
+    return num_fitting_points
+
+
+def get_scaling_bootstrap_profiles(per_frame_mean_sq, block_size=None, n_bootstrap=1000, weights=False, seed=None, min_blocks=10):
+    """
+    Function that computes block bootstrap replicates of the root mean squared distance profile
+    used to fit the polymer scaling exponent. Frames are resampled in blocks (see 
+    ctuncertainty.bootstrap_replicates()), so the replicates account for the correlation
+    between frames, and each replicate profile can then be fitted to give a distribution of nu 
+    and A0 values.
+
+    Parameters
+    ----------
+
+    per_frame_mean_sq : np.ndarray
+       [n_frames x n_separations] array where element [f, s] is the mean squared distance over all
+       residue pairs at the s-th sequence separation in frame f
+
+    block_size : int or None {None}
+       Number of frames per block. If None this is selected from the autocorrelation of the data
+
+    n_bootstrap : int {1000}
+       Number of bootstrap replicates
+
+    weights : np.ndarray or False {False}
+       Per-frame weights, or False
+
+    seed : int or None {None}
+       Seed used for the bootstrap random number generator
+
+    min_blocks : int {10}
+       Minimum number of blocks. If there are fewer frames than this every frame is its own block
+
+    Return
+    ------
+    
+    tuple
+        A 2-tuple containing:
+        - [0] := For each sequence separation, an array with the RMS distance in every replicate 
+                 (the seq_sep_subsampled_distances format used by fit_scaling_exponent()).
+        - [1] := The number of replicates (0 if there are fewer than two frames, in which case
+                 no error estimate is possible).
+
+    """
+
+    per_frame_mean_sq = np.asarray(per_frame_mean_sq)
+    n_frames = per_frame_mean_sq.shape[0]
+
+    if n_frames < 2:
+        return ([], 0)
+
+    if weights is False:
+        weights = None
+
+    (replicates, block_size) = ctuncertainty.bootstrap_replicates(per_frame_mean_sq, block_size=block_size, n_bootstrap=n_bootstrap, weights=weights, seed=seed, min_blocks=min(min_blocks, n_frames))
+
+    return (list(np.sqrt(replicates).transpose()), replicates.shape[0])
+
+
+def fit_scaling_exponent(seq_sep_vals, seq_sep_RMS_distance, seq_sep_RMS_var_distance, seq_sep_subsampled_distances, num_subdivisions_for_error, inter_residue_min, end_effect, num_fitting_points, confidence=None):
+    """
+    Function that fits the polymer scaling relationship sqrt(<Rij^2>) = A0|i-j|^(nu) to a
+    precomputed internal scaling profile. This is the fitting stage of 
+    CTProtein.get_scaling_exponent(), split out so the same fit can be applied to internal scaling
+    statistics that were accumulated elsewhere (e.g. by the ctanalyzer pipeline).
+
+    Parameters
+    ----------
+
+    seq_sep_vals : list
+       Sequence separations (1, 2, 3, ...)
+
+    seq_sep_RMS_distance : list
+       Root mean squared distance for each sequence separation
+
+    seq_sep_RMS_var_distance : list
+       Variance of the distance for each sequence separation
+
+    seq_sep_subsampled_distances : list
+       For each sequence separation, a list of num_subdivisions_for_error RMS distances each 
+       computed from a subset (or bootstrap replicate, see get_scaling_bootstrap_profiles()) of
+       the data. Used to estimate the error in the fit.
+
+    num_subdivisions_for_error : int
+       Number of subsets or replicates
+
+    inter_residue_min : int
+       Minimum sequence separation used in the fit
+
+    end_effect : int
+       Number of sequence separations excluded from the end of the profile
+
+    num_fitting_points : int
+       Number of (log-spaced) points used for the fit
+
+    confidence : float or None {None}
+       If None the error bounds on nu and A0 are the minimum and maximum over the subsets, 
+       otherwise they are the bounds of the central confidence% interval (e.g. 95)
+
+    Return
+    ------
+    
+    list
+        The 10-position list described in CTProtein.get_scaling_exponent()
+
+    """
+
+    # now sub-select the bit of the curve we actually want for the separation, distance, and distance variance data
+    # note we are RE DEFINING these three variables here
+    seq_sep_vals = seq_sep_vals[inter_residue_min:-end_effect]
+    seq_sep_RMS_distance = seq_sep_RMS_distance[inter_residue_min:-end_effect]
+    seq_sep_RMS_var_distance = seq_sep_RMS_var_distance[inter_residue_min:-end_effect]
+                
+    ## next find indices for evenly spaced points in logspace. This whole sectino
+    # leads to the identification of the indices in logspaced_idx, which are the
+    # list indices that will given evenly spaced points when plotted in log space 
+    y_data = np.log(seq_sep_vals)
+    y_data_offset = y_data - y_data[0]
+    interval = y_data_offset[-1]/num_fitting_points
+    integer_vals = y_data_offset/interval
+        
+    logspaced_idx = []
+    for i in range(0,num_fitting_points):
+        [local_ix,_] = cttools.find_nearest(integer_vals, i) 
+        if local_ix in logspaced_idx:
+            continue
+        else:
+            logspaced_idx.append(local_ix)
+
+    # finally using those evenly-spaced log indices we extract out new lists
+    # that have values which will be evenly spaced in logspace. Cool.
+    fitting_separation = [seq_sep_vals[i] for i in logspaced_idx]
+    fitting_distances  = [seq_sep_RMS_distance[i] for i in logspaced_idx]
+    fitting_variance   = [seq_sep_RMS_var_distance[i] for i in logspaced_idx]
+
+    # fit to a log/log model and extract params
+    out = np.polyfit(np.log(fitting_separation), np.log(fitting_distances), 1)
+    nu_best = out[0]
+    R0_best = np.exp(out[1])
+
+    ## >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+    ### next calculated reduced chi-squared
+    n_points = len(fitting_distances)
+    chi2=0
+    for i in range(0, n_points):
+        chi2 = chi2 + (np.power(np.log(fitting_distances[i]) - nu_best*np.log(fitting_separation[i])+R0_best,2))/fitting_variance[i]
+
+    # finally calculated reduced chi squared correcting for 2 model parameters
+    reduced_chi_squared_fitting = chi2 / (n_points-2)
+
+
+    full_n_points = len(seq_sep_vals)
+
+    chi2=0
+    for i in range(0, full_n_points):
+        chi2 = chi2 + (np.power(np.log(seq_sep_RMS_distance[i]) - nu_best*np.log(seq_sep_vals[i])+R0_best,2))/seq_sep_RMS_var_distance[i]
+
+    # finally calculated reduced chi squared correcting for 2 model parameters
+    reduced_chi_squared_all = chi2 / (full_n_points-2)
+
+
+            
+    ## >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+    ### Finally run the subselection protocol to subsampled
+
+    if num_subdivisions_for_error > 0:
+
+        # [subset x separation] distances - all subsets are then fit at once (polyfit fits each
+        # column of a 2D y independently)
+        subselected = np.array(seq_sep_subsampled_distances).transpose()[0:num_subdivisions_for_error]
+        local_distances = subselected[:, inter_residue_min:-end_effect][:, logspaced_idx]
+
+        OF = np.polyfit(np.log(fitting_separation), np.log(local_distances).transpose(), 1)
+        nu_sub = OF[0]
+        R0_sub = np.exp(OF[1])
+    else:
+        nu_sub = np.array([np.nan])
+        R0_sub = np.array([np.nan])
+
+    if confidence is None:
+        (nu_lower, nu_upper) = (np.min(nu_sub), np.max(nu_sub))
+        (R0_lower, R0_upper) = (np.min(R0_sub), np.max(R0_sub))
+    else:
+        alpha = (100.0 - confidence) / 2.0
+        (nu_lower, nu_upper) = np.percentile(nu_sub, [alpha, 100.0 - alpha])
+        (R0_lower, R0_upper) = np.percentile(R0_sub, [alpha, 100.0 - alpha])
+
+    return [nu_best, R0_best, nu_lower, nu_upper, R0_lower, R0_upper,  reduced_chi_squared_fitting, reduced_chi_squared_all, np.vstack((np.array(fitting_separation),np.array(fitting_distances))), np.vstack((seq_sep_vals, seq_sep_RMS_distance, cttools.powermodel(seq_sep_vals, nu_best, R0_best)))]
@@ -14,8 +14,8 @@
 
 import mdtraj as md
 import numpy as np
-import scipy
-from .ctexceptions import CTWarning
+from .ctexceptions import CTWarning, CTException
+from . import ctresources
 
 ### CTPRE contains all the functionality associated with calculating
 ### PRE profiles.
@@ -30,6 +30,9 @@ K_IN_NM6   = original_K*1e42  # K constant in nm6 s-2
 #W_H        = 267530000        # Proton Larmor frequency
 #W_H_SQUARED = W_H * W_H 
 
+# maximum number of label-target-frame distances held in memory at once when computing <r^-6>
+PRE_CHUNK_ELEMENTS = 20000000
+
 class CTPRE:
     """
     
@@ -38,10 +41,11 @@ class CTPRE:
     This is, in many ways, a purely functional class, but given it's very specific goal
     it is separated out into its own class in the interest of more robust modularity. 
 
-    There are a number of internal functions, but the only public facing function is the 
-    generate_PRE_profile function below. This gives both the intensity ratio profile and 
-    the transverse relaxation rate (Gamma_2) profiles. For more detail on the calculation
-    of these profiles see the help associated with generate_PRE_profile function
+    There are a number of internal functions, but the public facing functions are the 
+    generate_PRE_profile function below and its multi-label counterpart generate_PRE_profiles. 
+    These give both the intensity ratio profile and the transverse relaxation rate (Gamma_2) 
+    profiles. For more detail on the calculation of these profiles see the help associated 
+    with generate_PRE_profile function
 
     For more information on caculation of PREs using method see the Supplementary information 
     in the following two papers.
@@ -113,8 +117,8 @@ class CTPRE:
             CTWarning("WARNING: The value of tau_c (effective correlation time) is far from the normal expected value of ~5 (t_delay = %4.4e) - recal this is in units of ns" %(self.tau_c))
 
         # if Larmor frequency less than 100 MhZ or above 2 GHz assume something is wrong
-        if W_H < 50000000 or tau_c > 2000000000:
-            CTWarning("WARNING: The value of W_h (proton Larmor frequency) is far from the normal expected value of ~600 000 000 - recal this value should be provided in Herz" %(self.W_H))
+        if W_H < 50000000 or W_H > 2000000000:
+            CTWarning("WARNING: The value of W_H (proton Larmor frequency) is far from the normal expected value of ~600 000 000 (W_H = %4.4e) - recal this value should be provided in Herz" %(self.W_H))
 
         # # convert tau_c to seconds and calculate tau_c squared
         tau_c = float(tau_c)/1000000000     # tau c in seconds
@@ -135,7 +139,7 @@ class CTPRE:
 
 
         """
-        return "["+hex(id(self)) + "]: CTPRE OBJ - (R_2D = %3.2f Hz, t_delay = %3.2f ms, tau_c = %3.2f ns, H1 Larmor = %3.3e Hz)" % (self.R_2D, self.t_delay, self.tau_c, self.W_h)
+        return "["+hex(id(self)) + "]: CTPRE OBJ - (R_2D = %3.2f Hz, t_delay = %3.2f ms, tau_c = %3.2f ns, H1 Larmor = %3.3e Hz)" % (self.R_2D, self.t_delay, self.tau_c, self.W_H)
 
 
     # ........................................................................
@@ -187,32 +191,113 @@ class CTPRE:
             in every residue. Again, it is STRONGLY recommended this isn't changed.
         """
         
-        # get index value of all residues 
-        #residue_list = self.CTPO.get_residue_index_list()        
-
-        tmp = list(self.CTPO._CTProtein__CA_residue_atom.keys())
-        residue_list = sorted(tmp)
-
-        # first calculate mean rij distance for pair-residue distances
-        gamma = []
-
-        # finally for each residue calculate the r^6 distances associated with each frame and for EACH FRAME calculate 
-        # the PREFACTOR / r^6 value and then take the mean. THIS gives a different answer to if you take the mean distance
-        # and calculate the PREFACTOR/<R^6> value because there is a non-linear mapping between relaxation and distance so 
-        # it's important the former method is used (i.e. only average at the end). This calculates the gamma coefficient for
-        # each residue, which measures relaxation 
-        for idx in residue_list:                        
-            r_6_nm = np.power((0.1*self.CTPO.get_interResidue_atomic_distance(label_position, idx, A1=spin_label_atom, A2=target_relaxation_atom, correctOffset=True)),6)
-            gamma.append(np.mean(self.PREFACTOR/r_6_nm))
-        
-        # convert the t_delay from ms to seconds
-        t_delay_in_seconds = self.t_delay/1000 
-        
-        # for each gamma compute the intensity ration 
-        profile = []
-        for g in gamma:
-            profile.append((self.R_2D * np.exp(-g*t_delay_in_seconds)) / (self.R_2D + g))        
+        (profiles, gammas) = self.generate_PRE_profiles([label_position], spin_label_atom=spin_label_atom, target_relaxation_atom=target_relaxation_atom)
+
+        return (list(profiles[0]), list(gammas[0]))
+
+
+    # ........................................................................
+    #                 
+    def generate_PRE_profiles(self, label_positions, spin_label_atom='CB', target_relaxation_atom='N', stride=1, weights=False, return_per_frame=False):
+        """
+        Construct PRE intensity and gamma profiles for many spin label positions in a single pass.
+        Profiles are computed exactly as described in generate_PRE_profile, but the spin-label and
+        target atom coordinates are gathered once and the per-frame r^-6 terms for every label-target
+        pair are computed together in frame chunks, so computing profiles for every possible label
+        site (e.g. when designing experiments) is one call rather than one call per label.
+
+        Parameters
+        ----------
+
+        label_positions : list of int
+            Positions in the sequence at which the spin-label is located (one profile is computed per
+            position). Every residue must contain the spin_label_atom.
 
-        return (profile, gamma)
+        spin_label_atom : str, default='CB'
+            Name of the atom upon which the spin label is located.
+
+        target_relaxation_atom : str, default='N'
+            Name of the atom where relaxation is being performed. Residues (with a CA) that lack this
+            atom (e.g. if the default 'N' is not present) have a gamma and intensity ratio of NaN.
+
+        stride : int, default=1
+            Defines the spacing between frames used in the analysis.
+
+        weights : list or array of floats, default=False
+            Defines the frame-specific weights if re-weighted analysis is required, such that <r^-6> is
+            a weighted average over frames. If not provided any weights set on the underlying CTProtein
+            object (via set_weights()) are used.
+
+        return_per_frame : bool, default=False
+            If True the per-frame gamma values are also returned. These are linear ensemble averages and
+            so are the observables to use when reweighting an ensemble against measured PREs (see 
+            ctreweight). Note this requires an n_frames x n_labels x n_residues array.
+
+        Returns
+        -------
+        Returns a 2 place tuple - tuple position 0 is an (n_labels x n_residues) array of PRE intensity profiles 
+        and tuple position 1 is an (n_labels x n_residues) array of PRE H1 relaxation profiles, where rows follow
+        the order of label_positions and columns are the residues with a CA atom (CTProtein.resid_with_CA). If
+        return_per_frame is True a third element with the (n_frames x n_labels x n_residues) per-frame gammas
+        is included.
+
+        """
+
+        label_atoms = []
+        for label_position in label_positions:
+            resid = self.CTPO.get_offset_residue(label_position)
+            atoms = [atom.index for atom in self.CTPO.topology.residue(resid).atoms if atom.name == spin_label_atom]
+            if len(atoms) == 0:
+                raise CTException('Unable to find spin label atom [%s] in residue %i' % (spin_label_atom, label_position))
+            label_atoms.append(atoms[0])
+
+        # target atom for each residue with a CA atom (-1 if the residue lacks the target atom)
+        target_atoms = []
+        for resid in self.CTPO.resid_with_CA:
+            atoms = [atom.index for atom in self.CTPO.topology.residue(resid).atoms if atom.name == target_relaxation_atom]
+            if len(atoms) == 0:
+                target_atoms.append(-1)
+            else:
+                target_atoms.append(atoms[0])
+
+        target_atoms = np.array(target_atoms, dtype=int)
+        has_target = target_atoms >= 0
+
+        # gather the coordinates (in nm) of all label and target atoms once
+        xyz = self.CTPO.traj.xyz[::int(stride)]
+        label_xyz = xyz[:, label_atoms]
+        target_xyz = xyz[:, target_atoms[has_target]]
+
+        # normalized weights of the strided frames (every frame weighted equally if there are none)
+        weights = self.CTPO.get_frame_weights(weights, stride)
+        if weights is False:
+            weights = np.repeat(1.0/len(xyz), len(xyz))
+
+        # weighted mean of r^-6 over frames for every label-target pair - it's important the average is done
+        # over r^-6 (and not over r) because there is a non-linear mapping between relaxation and distance
+        mean_r_6 = np.zeros((len(label_atoms), len(target_xyz[0])))
+
+        if return_per_frame:
+            per_frame = np.full((len(xyz), len(label_atoms), len(target_atoms)), np.nan)
+
+        chunk_size = max(1, int(ctresources.get_chunk_elements(PRE_CHUNK_ELEMENTS) / max(1, mean_r_6.size)))
+        for start in range(0, len(xyz), chunk_size):
+            end = min(start + chunk_size, len(xyz))
+            r_2 = np.sum(np.square(label_xyz[start:end, :, np.newaxis, :] - target_xyz[start:end, np.newaxis, :, :]), axis=3)
+            r_6 = np.power(r_2, -3)
+            mean_r_6 = mean_r_6 + np.tensordot(weights[start:end], r_6, axes=(0, 0))
+
+            if return_per_frame:
+                per_frame[start:end, :, has_target] = self.PREFACTOR * r_6
+
+        gammas = np.full((len(label_atoms), len(target_atoms)), np.nan)
+        gammas[:, has_target] = self.PREFACTOR * mean_r_6
+
+        # convert the t_delay from ms to seconds and compute the intensity ratio for each gamma
+        t_delay_in_seconds = self.t_delay/1000 
+        profiles = (self.R_2D * np.exp(-gammas*t_delay_in_seconds)) / (self.R_2D + gammas)
 
+        if return_per_frame:
+            return (profiles, gammas, per_frame)
 
+        return (profiles, gammas)
@@ -0,0 +1,640 @@
+"""
+ctprofiling provides lightweight, opt-in instrumentation of the public CAMPARITraj API.
+
+When profiling is enabled every call to a public method of ``CTProtein``, ``CTTrajectory`` and
+``CTEnsemble`` records its wall time, CPU time, the number of frames processed, the memory
+allocated while it ran (peak, via ``tracemalloc``, only if requested) and the hits/misses of the
+internal memoization caches it touched. Results are accumulated
+
+* globally, per method (``get_report()``),
+* per object, such that ``CTProtein.profile_report()`` describes the work done on one protein,
+* per named section (``section()``), which is how ``ctanalyzer --profile`` attributes the cost
+  to individual analyses.
+
+When profiling is disabled (the default) each instrumented call costs a single flag check.
+
+Example
+-------
+
+>>> from camparitraj import ctprofiling
+>>> ctprofiling.enable(memory=True)
+>>> with ctprofiling.section('scaling'):
+...     CP.get_internal_scaling()
+>>> ctprofiling.save_report('profile.json')
+
+Note that records are inclusive, i.e. the time (and cache use) of a method includes that of
+all the (instrumented) methods it called.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import functools
+import inspect
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from .ctexceptions import CTException
+from . import ctframes
+
+
+# name of the attribute used to store per-object records on instrumented objects
+PROFILE_ATTRIBUTE = '_profile_records'
+
+# global profiler state. 'stack' holds one entry per instrumented call currently executing
+# and 'open_sections' the names of the currently open sections (innermost last)
+__STATE = {'enabled': False,
+           'memory': False,
+           'started_tracemalloc': False,
+           'methods': {},
+           'sections': {},
+           'caches': {},
+           'stack': [],
+           'open_sections': []}
+
+
+# ------------------------------------------------------------------------
+#
+def __new_record():
+    """
+    Internal function that returns an empty per-method record.
+
+    """
+    return {'calls': 0,
+            'wall_time': 0.0,
+            'cpu_time': 0.0,
+            'frames': 0,
+            'peak_bytes': 0,
+            'cache_hits': 0,
+            'cache_misses': 0}
+
+
+# ------------------------------------------------------------------------
+#
+def __update_record(records, name, wall, cpu, frames, peak, hits, misses):
+    """
+    Internal function that adds the measurements of one call to the record `name`
+    in the `records` dictionary (creating the record if needed).
+
+    """
+    if name not in records:
+        records[name] = __new_record()
+
+    record = records[name]
+    record['calls'] += 1
+    record['wall_time'] += wall
+    record['cpu_time'] += cpu
+    record['frames'] += frames
+    record['peak_bytes'] = max(record['peak_bytes'], peak)
+    record['cache_hits'] += hits
+    record['cache_misses'] += misses
+
+
+# ------------------------------------------------------------------------
+#
+def enable(memory=False):
+    """
+    Switch profiling on. Records collected by previous profiling sessions are kept (see `reset()`).
+
+    Parameters
+    ----------
+    memory : bool {False}
+        If True, memory allocations are traced with ``tracemalloc`` such that the peak number
+        of bytes allocated by each call is recorded. This slows down allocation-heavy code
+        noticeably, so is off by default.
+
+    Returns
+    -------
+    None
+    """
+
+    __STATE['enabled'] = True
+    __STATE['memory'] = bool(memory)
+
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        __STATE['started_tracemalloc'] = True
+
+
+# ------------------------------------------------------------------------
+#
+def disable():
+    """
+    Switch profiling off. Collected records are kept and can still be retrieved with
+    `get_report()`.
+
+    Returns
+    -------
+    None
+    """
+
+    __STATE['enabled'] = False
+    __STATE['memory'] = False
+
+    if __STATE['started_tracemalloc']:
+        tracemalloc.stop()
+        __STATE['started_tracemalloc'] = False
+
+
+# ------------------------------------------------------------------------
+#
+def is_enabled():
+    """
+    Returns True if profiling is currently switched on.
+
+    """
+    return __STATE['enabled']
+
+
+# ------------------------------------------------------------------------
+#
+def reset():
+    """
+    Discard all globally collected method, section and cache records. Per-object records
+    (as returned by e.g. ``CTProtein.profile_report()``) are stored on the objects themselves
+    and are not affected.
+
+    Returns
+    -------
+    None
+    """
+
+    __STATE['methods'] = {}
+    __STATE['sections'] = {}
+    __STATE['caches'] = {}
+
+
+# ------------------------------------------------------------------------
+#
+@contextmanager
+def profiling(memory=False):
+    """
+    Context manager that enables profiling for the duration of a ``with`` block and
+    restores the previous state afterwards.
+
+    Parameters
+    ----------
+    memory : bool {False}
+        Trace memory allocations (see `enable()`).
+
+    """
+
+    was_enabled = __STATE['enabled']
+    was_memory = __STATE['memory']
+
+    enable(memory=memory or was_memory)
+    try:
+        yield
+    finally:
+        if not was_enabled:
+            disable()
+        else:
+            __STATE['memory'] = was_memory
+
+
+# ------------------------------------------------------------------------
+#
+def record_cache(name, hit):
+    """
+    Record a hit (or miss) of an internal cache. The event is counted both against the
+    named cache and against the instrumented method currently executing. Does nothing if
+    profiling is disabled.
+
+    Parameters
+    ----------
+    name : str
+        Name of the cache.
+
+    hit : bool
+        True if the requested value was found in the cache.
+
+    Returns
+    -------
+    None
+    """
+
+    if not __STATE['enabled']:
+        return
+
+    caches = __STATE['caches']
+    if name not in caches:
+        caches[name] = {'hits': 0, 'misses': 0}
+
+    key = 'hits' if hit else 'misses'
+    caches[name][key] += 1
+
+    if len(__STATE['stack']) > 0:
+        __STATE['stack'][-1][key] += 1
+
+
+# ------------------------------------------------------------------------
+#
+def __start_call(name):
+    """
+    Internal function that pushes a new call entry onto the call stack.
+
+    """
+
+    entry = {'name': name, 'hits': 0, 'misses': 0, 'memory_start': 0, 'peak': 0}
+
+    if __STATE['memory'] and tracemalloc.is_tracing():
+        (current, peak) = tracemalloc.get_traced_memory()
+
+        # the enclosing call keeps track of the highest peak seen so far, because the
+        # tracemalloc peak is reset for every new call
+        if len(__STATE['stack']) > 0:
+            __STATE['stack'][-1]['peak'] = max(__STATE['stack'][-1]['peak'], peak)
+
+        tracemalloc.reset_peak()
+        entry['memory_start'] = current
+        entry['peak'] = current
+
+    entry['wall'] = time.perf_counter()
+    entry['cpu'] = time.process_time()
+    __STATE['stack'].append(entry)
+
+    return entry
+
+
+# ------------------------------------------------------------------------
+#
+def __end_call(entry, instance, frames):
+    """
+    Internal function that pops a call entry from the call stack and records its
+    measurements globally, in the innermost open section and on the instance (if any).
+
+    """
+
+    wall = time.perf_counter() - entry['wall']
+    cpu = time.process_time() - entry['cpu']
+
+    stack = __STATE['stack']
+    if len(stack) > 0 and stack[-1] is entry:
+        stack.pop()
+
+    peak = 0
+    if __STATE['memory'] and tracemalloc.is_tracing():
+        peak_absolute = max(entry['peak'], tracemalloc.get_traced_memory()[1])
+        peak = max(0, peak_absolute - entry['memory_start'])
+
+        if len(stack) > 0:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak_absolute)
+
+    # like times, cache use is inclusive of nested calls
+    if len(stack) > 0:
+        stack[-1]['hits'] += entry['hits']
+        stack[-1]['misses'] += entry['misses']
+
+    measurements = (wall, cpu, frames, peak, entry['hits'], entry['misses'])
+
+    __update_record(__STATE['methods'], entry['name'], *measurements)
+
+    if len(__STATE['open_sections']) > 0:
+        section_record = __STATE['sections'][__STATE['open_sections'][-1]]
+        __update_record(section_record['methods'], entry['name'], *measurements)
+
+    if instance is not None:
+        try:
+            records = instance.__dict__.setdefault(PROFILE_ATTRIBUTE, {})
+        except AttributeError:
+            return
+        __update_record(records, entry['name'], *measurements)
+
+
+# ------------------------------------------------------------------------
+#
+def __count_frames(signature, is_constructor, instance, args, kwargs):
+    """
+    Internal function that estimates the number of frames processed by a method call,
+    from the number of frames of the object, the `frames` selection and the `stride`
+    argument (if the method takes them). Returns 0 if no frame count is available.
+
+    """
+
+    n_frames = getattr(instance, 'n_frames', None)
+    if not isinstance(n_frames, int):
+        return 0
+
+    # the constructor of a trajectory object applies the stride while reading, so the
+    # number of frames already reflects it
+    if is_constructor or ('stride' not in signature.parameters and 'frames' not in signature.parameters):
+        return n_frames
+
+    try:
+        bound = signature.bind(instance, *args, **kwargs)
+        bound.apply_defaults()
+    except TypeError:
+        return n_frames
+
+    if bound.arguments.get('frames') is not None:
+        try:
+            n_frames = ctframes.as_frame_selection(bound.arguments['frames']).count(n_frames)
+        except CTException:
+            return 0
+
+    if 'stride' not in bound.arguments:
+        return n_frames
+
+    try:
+        stride = int(bound.arguments['stride'])
+    except (TypeError, ValueError):
+        stride = 1
+
+    if stride < 1:
+        return n_frames
+
+    return len(range(0, n_frames, stride))
+
+
+# ------------------------------------------------------------------------
+#
+def profiled(function=None, name=None):
+    """
+    Decorator that instruments a function or method. Can be used bare (``@profiled``)
+    or with a custom record name (``@profiled(name='load')``). When profiling is disabled
+    the wrapped function is called directly.
+
+    Parameters
+    ----------
+    function : callable
+        The function to instrument.
+
+    name : str or None {None}
+        Name under which calls are recorded. Defaults to the function's qualified name
+        (e.g. ``CTProtein.get_radius_of_gyration``).
+
+    Returns
+    -------
+    callable
+        The instrumented function.
+    """
+
+    if function is None:
+        return functools.partial(profiled, name=name)
+
+    if name is None:
+        name = function.__qualname__
+
+    signature = inspect.signature(function)
+    is_method = 'self' in signature.parameters
+    is_constructor = function.__name__ == '__init__'
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not __STATE['enabled']:
+            return function(*args, **kwargs)
+
+        entry = __start_call(name)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            instance = None
+            frames = 0
+            if is_method and len(args) > 0:
+                instance = args[0]
+                frames = __count_frames(signature, is_constructor, instance, args[1:], kwargs)
+            __end_call(entry, instance, frames)
+
+    wrapper.__profiled__ = True
+
+    return wrapper
+
+
+# ------------------------------------------------------------------------
+#
+def profile_methods(cls):
+    """
+    Class decorator that instruments all public methods of a class, as well as its
+    constructor. Properties, static/class methods, private methods and methods marked
+    with `not_profiled` are left untouched.
+
+    Parameters
+    ----------
+    cls : class
+        The class to instrument.
+
+    Returns
+    -------
+    class
+        The same class, with its methods replaced by instrumented versions.
+    """
+
+    for (attribute, value) in list(vars(cls).items()):
+        if attribute.startswith('_') and attribute != '__init__':
+            continue
+
+        if not inspect.isfunction(value) or getattr(value, '__profiled__', False) or getattr(value, '__not_profiled__', False):
+            continue
+
+        setattr(cls, attribute, profiled(value, name='%s.%s' % (cls.__name__, attribute)))
+
+    return cls
+
+
+# ------------------------------------------------------------------------
+#
+def not_profiled(function):
+    """
+    Decorator that marks a method such that `profile_methods()` leaves it uninstrumented
+    (e.g. methods that report on the profiler itself).
+
+    """
+
+    function.__not_profiled__ = True
+
+    return function
+
+
+# ------------------------------------------------------------------------
+#
+@contextmanager
+def section(name):
+    """
+    Context manager that groups all instrumented calls made inside a ``with`` block
+    under a named section (e.g. one analysis), in addition to the global per-method
+    records. Sections can be nested; calls are attributed to the innermost section.
+    Does nothing if profiling is disabled.
+
+    Parameters
+    ----------
+    name : str
+        Name of the section. Re-using a name accumulates into the same section.
+
+    """
+
+    if not __STATE['enabled']:
+        yield
+        return
+
+    sections = __STATE['sections']
+    if name not in sections:
+        sections[name] = {'calls': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'peak_bytes': 0, 'methods': {}}
+
+    entry = __start_call(name)
+    __STATE['open_sections'].append(name)
+    try:
+        yield
+    finally:
+        __STATE['open_sections'].pop()
+
+        wall = time.perf_counter() - entry['wall']
+        cpu = time.process_time() - entry['cpu']
+
+        stack = __STATE['stack']
+        if len(stack) > 0 and stack[-1] is entry:
+            stack.pop()
+
+        peak = 0
+        if __STATE['memory'] and tracemalloc.is_tracing():
+            peak_absolute = max(entry['peak'], tracemalloc.get_traced_memory()[1])
+            peak = max(0, peak_absolute - entry['memory_start'])
+            if len(stack) > 0:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak_absolute)
+
+        record = sections[name]
+        record['calls'] += 1
+        record['wall_time'] += wall
+        record['cpu_time'] += cpu
+        record['peak_bytes'] = max(record['peak_bytes'], peak)
+
+
+# ------------------------------------------------------------------------
+#
+def __sorted_records(records):
+    """
+    Internal function that returns a copy of a records dictionary ordered by
+    decreasing wall time.
+
+    """
+
+    ordered = sorted(records.items(), key=lambda item: -item[1]['wall_time'])
+
+    return {name: dict(record) for (name, record) in ordered}
+
+
+# ------------------------------------------------------------------------
+#
+def get_report(instance=None):
+    """
+    Returns the collected profiling records as a (JSON-serializable) dictionary.
+
+    Parameters
+    ----------
+    instance : object or None {None}
+        If provided, only the records collected on this object (e.g. a CTProtein) are
+        returned. Otherwise the global records are returned.
+
+    Returns
+    -------
+    dict
+        Dictionary with the keys:
+
+        * ``enabled`` and ``memory`` - the current profiler settings
+        * ``methods`` - per-method records, each with ``calls``, ``wall_time`` and ``cpu_time``
+          (seconds), ``frames`` (total frames processed), ``peak_bytes`` (largest peak
+          allocation of a single call, 0 if memory tracing was off), ``cache_hits`` and
+          ``cache_misses``. Ordered by decreasing wall time.
+        * ``sections`` - per-section records (global report only), including the per-method
+          breakdown of each section.
+        * ``caches`` - per-cache hit/miss counts (global report only).
+    """
+
+    report = {'enabled': __STATE['enabled'], 'memory': __STATE['memory']}
+
+    if instance is not None:
+        report['methods'] = __sorted_records(getattr(instance, PROFILE_ATTRIBUTE, {}))
+        return report
+
+    report['methods'] = __sorted_records(__STATE['methods'])
+
+    report['sections'] = {}
+    for (name, record) in __STATE['sections'].items():
+        section_report = {key: value for (key, value) in record.items() if key != 'methods'}
+        section_report['methods'] = __sorted_records(record['methods'])
+        report['sections'][name] = section_report
+
+    report['caches'] = {name: dict(record) for (name, record) in __STATE['caches'].items()}
+
+    return report
+
+
+# ------------------------------------------------------------------------
+#
+def save_report(filename, report=None):
+    """
+    Write a profiling report to a JSON file.
+
+    Parameters
+    ----------
+    filename : str
+        Output filename.
+
+    report : dict or None {None}
+        Report to write (as returned by `get_report()`). Defaults to the current
+        global report.
+
+    Returns
+    -------
+    dict
+        The report that was written.
+    """
+
+    if report is None:
+        report = get_report()
+
+    try:
+        with open(filename, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    except IOError as e:
+        raise CTException('Unable to write profiling report to %s: %s' % (filename, str(e)))
+
+    return report
+
+
+# ------------------------------------------------------------------------
+#
+def format_report(report=None):
+    """
+    Returns a human-readable table summarizing a profiling report.
+
+    Parameters
+    ----------
+    report : dict or None {None}
+        Report to format (as returned by `get_report()`). Defaults to the current
+        global report.
+
+    Returns
+    -------
+    str
+    """
+
+    if report is None:
+        report = get_report()
+
+    lines = ['%-50s %7s %10s %10s %10s %10s %12s' % ('method', 'calls', 'wall [s]', 'cpu [s]', 'frames', 'peak [MB]', 'cache h/m')]
+    for (name, record) in report['methods'].items():
+        lines.append('%-50s %7i %10.4f %10.4f %10i %10.2f %12s' % (name,
+                                                                 record['calls'],
+                                                                 record['wall_time'],
+                                                                 record['cpu_time'],
+                                                                 record['frames'],
+                                                                 record['peak_bytes']/1e6,
+                                                                 '%i/%i' % (record['cache_hits'], record['cache_misses'])))
+
+    for (name, record) in report.get('sections', {}).items():
+        lines.append('[section] %-40s %7i %10.4f %10.4f %10s %10.2f' % (name, record['calls'], record['wall_time'], record['cpu_time'], '', record['peak_bytes']/1e6))
+
+    return '\n'.join(lines)
@@ -0,0 +1,349 @@
+"""
+ctprogress provides the progress-reporting and cancellation protocol used by long-running
+CTProtein methods (e.g. ``get_distance_map()``, ``get_internal_scaling()``, ``get_D_vector()``).
+
+Methods that support it accept two keywords:
+
+* ``progress`` - a callable that is passed a progress dictionary (see ``Progress``). Calls are
+  throttled by time (at most one every ``PROGRESS_INTERVAL`` seconds, plus a final call once
+  the operation is complete), so reporting costs essentially nothing inside tight loops. Pass
+  ``True`` to use the default console renderer (``ConsoleProgressBar``). The default (``None``)
+  is silent.
+
+* ``cancel_token`` - a ``CancellationToken``. Calling ``cancel()`` on the token (e.g. from another
+  thread or from within a progress callback) causes the running method to stop at the next
+  step and raise a ``CTCancelledException``.
+
+Example
+-------
+
+>>> from camparitraj import ctprogress
+>>> token = ctprogress.CancellationToken()
+>>> def callback(info):
+...     print('%.0f%% done, %.1f s left' % (100*info['fraction'], info['eta']))
+...     if info['elapsed'] > 600:
+...         token.cancel()
+>>> CP.get_distance_map(progress=callback, cancel_token=token)
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import sys
+import time
+
+from .ctexceptions import CTException, CTCancelledException
+
+
+# minimum time (in seconds) between two consecutive progress callbacks
+PROGRESS_INTERVAL = 0.5
+
+
+# ........................................................................
+#
+class CancellationToken:
+    """
+    Cooperative cancellation flag. A token is passed to a long-running method, which checks it
+    after every step; once `cancel()` has been called the method raises a `CTCancelledException`.
+    A token can be shared between several calls, and remains cancelled until `reset()`.
+
+    """
+
+    def __init__(self):
+        self.__cancelled = False
+
+    def __repr__(self):
+        return "CancellationToken (%s): cancelled=%s" % (hex(id(self)), self.__cancelled)
+
+    @property
+    def cancelled(self):
+        """
+        True if `cancel()` has been called.
+
+        """
+        return self.__cancelled
+
+    def cancel(self):
+        """
+        Request cancellation of every operation using this token.
+
+        """
+        self.__cancelled = True
+
+    def reset(self):
+        """
+        Clear a previous cancellation request such that the token can be reused.
+
+        """
+        self.__cancelled = False
+
+    def check(self, description=None):
+        """
+        Raise a `CTCancelledException` if cancellation has been requested.
+
+        Parameters
+        ----------
+        description : str or None {None}
+            Name of the operation, used in the exception message.
+
+        """
+        if self.__cancelled:
+            if description is None:
+                raise CTCancelledException('Operation was cancelled')
+            raise CTCancelledException('%s was cancelled' % description)
+
+
+# ........................................................................
+#
+class ConsoleProgressBar:
+    """
+    Default progress renderer, which draws a tqdm-style single-line progress bar, e.g.
+
+        get_distance_map:  45%|#########           | 45/100 [00:03<00:04, 1234.5 frames/s]
+
+    The line is redrawn in place (using a carriage return) and terminated once the operation
+    is complete.
+
+    Parameters
+    ----------
+    stream : file-like {sys.stderr}
+        Stream the bar is written to.
+
+    width : int {20}
+        Width of the bar in characters.
+
+    """
+
+    def __init__(self, stream=None, width=20):
+        self.stream = stream
+        self.width = int(width)
+
+    def __call__(self, info):
+
+        stream = self.stream if self.stream is not None else sys.stderr
+
+        filled = int(round(self.width*info['fraction']))
+        bar = '#'*filled + ' '*(self.width - filled)
+
+        line = '%s: %3i%%|%s| %i/%i [%s<%s, %.1f %s/s]' % (info['description'],
+                                                          int(100*info['fraction']),
+                                                          bar,
+                                                          info['completed'],
+                                                          info['total'],
+                                                          format_time(info['elapsed']),
+                                                          format_time(info['eta']),
+                                                          info['rate'],
+                                                          info['unit'])
+
+        stream.write('\r' + line)
+        if info['done']:
+            stream.write('\n')
+        stream.flush()
+
+
+# ........................................................................
+#
+class Progress:
+    """
+    Progress tracker for a single operation made up of `total` (roughly equal) steps. Methods
+    call `update()` after every step; the tracker checks for cancellation and, at most every
+    `interval` seconds, passes a progress dictionary to the callback with the keys:
+
+    * ``description`` - name of the operation
+    * ``completed`` / ``total`` - number of steps completed / in total
+    * ``fraction`` - fraction of steps completed (0 to 1)
+    * ``frames`` - number of frames processed so far (``completed * frames_per_step``)
+    * ``elapsed`` - seconds since the operation started
+    * ``rate`` - throughput in frames per second
+    * ``eta`` - estimated seconds until completion
+    * ``unit`` - unit of the throughput (``'frames'``)
+    * ``done`` - True for the final call
+
+    Can be used as a context manager, in which case `close()` is called on successful exit.
+
+    Parameters
+    ----------
+    description : str
+        Name of the operation.
+
+    total : int
+        Total number of steps.
+
+    frames_per_step : int {1}
+        Number of frames processed in each step, used to report throughput in frames/s.
+
+    callback : callable, True or None {None}
+        Progress callback (see `get_callback()`).
+
+    cancel_token : CancellationToken or None {None}
+        Token checked after every step.
+
+    interval : float {PROGRESS_INTERVAL}
+        Minimum time (in seconds) between two callbacks.
+
+    """
+
+    def __init__(self, description, total, frames_per_step=1, callback=None, cancel_token=None, interval=PROGRESS_INTERVAL):
+
+        self.description = description
+        self.total = max(int(total), 0)
+        self.frames_per_step = frames_per_step
+        self.callback = get_callback(callback)
+        self.cancel_token = cancel_token
+        self.interval = float(interval)
+        self.completed = 0
+
+        self.__start = time.perf_counter()
+        self.__last_report = self.__start
+        self.__closed = False
+
+        if cancel_token is not None:
+            cancel_token.check(description)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def info(self, done=False):
+        """
+        Returns the current progress dictionary (see class docstring).
+
+        """
+
+        elapsed = time.perf_counter() - self.__start
+        frames = self.completed*self.frames_per_step
+
+        if self.total > 0:
+            fraction = min(1.0, self.completed/self.total)
+        else:
+            fraction = 1.0
+
+        if elapsed > 0:
+            rate = frames/elapsed
+        else:
+            rate = 0.0
+
+        if self.completed > 0:
+            eta = max(0.0, elapsed*(self.total - self.completed)/self.completed)
+        else:
+            eta = float('nan')
+
+        return {'description': self.description,
+                'completed': self.completed,
+                'total': self.total,
+                'fraction': fraction,
+                'frames': frames,
+                'elapsed': elapsed,
+                'rate': rate,
+                'eta': eta,
+                'unit': 'frames',
+                'done': done}
+
+    def update(self, steps=1):
+        """
+        Mark `steps` further steps as completed.
+
+        Raises
+        ------
+        CTCancelledException
+            If cancellation was requested via the cancellation token.
+
+        """
+
+        self.completed = self.completed + steps
+
+        if self.cancel_token is not None:
+            self.cancel_token.check(self.description)
+
+        if self.callback is None:
+            return
+
+        now = time.perf_counter()
+        if now - self.__last_report >= self.interval:
+            self.__last_report = now
+            self.callback(self.info())
+
+    def close(self):
+        """
+        Mark the operation as finished and issue the final callback. Calling close more than
+        once has no further effect.
+
+        """
+
+        if self.__closed:
+            return
+        self.__closed = True
+
+        if self.callback is not None:
+            self.callback(self.info(done=True))
+
+
+# ........................................................................
+#
+def get_callback(progress):
+    """
+    Resolves the value passed as a `progress` keyword to a callback.
+
+    Parameters
+    ----------
+    progress : callable, bool or None
+        ``None`` or ``False`` means silent, ``True`` means the default console renderer
+        (``ConsoleProgressBar``), and any callable is used as-is.
+
+    Returns
+    -------
+    callable or None
+
+    Raises
+    ------
+    CTException
+        If `progress` is neither a callable, a bool, nor None.
+    """
+
+    if progress is None or progress is False:
+        return None
+
+    if progress is True:
+        return ConsoleProgressBar()
+
+    if not callable(progress):
+        raise CTException('progress must be a callable, True, False or None (received %s)' % (str(progress)))
+
+    return progress
+
+
+# ........................................................................
+#
+def format_time(seconds):
+    """
+    Formats a duration in seconds as mm:ss (or h:mm:ss), as used by the console renderer.
+    Returns '?' for durations that are not yet known.
+
+    """
+
+    if seconds != seconds or seconds == float('inf'):
+        return '?'
+
+    seconds = int(round(seconds))
+    (minutes, seconds) = divmod(seconds, 60)
+    (hours, minutes) = divmod(minutes, 60)
+
+    if hours > 0:
+        return '%i:%02i:%02i' % (hours, minutes, seconds)
+
+    return '%02i:%02i' % (minutes, seconds)
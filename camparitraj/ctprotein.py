@@ -21,18 +21,13 @@ import mdtraj as md
 import numpy as np
 from numpy import linalg as LA
 from itertools import combinations
-from scipy import stats
-import scipy.optimize as SPO
-from numpy.random import choice
 
 from .configs import DEBUGGING
 from .ctdata import THREE_TO_ONE, DEFAULT_SIDECHAIN_VECTOR_ATOMS, ALL_VALID_RESIDUE_NAMES
 from .ctexceptions import CTException
-from . import ctmutualinformation, ctio, cttools, ctpolymer, ctutils
+from . import ctmutualinformation, ctio, cttools, ctpolymer, ctutils, ctuncertainty, ctnmr, ctcluster, ctfeatures, ctprofiling, ctprogress, ctcoarsegrain, ctframes
 
-from . _internal_data import BBSEG2
 
-import scipy.cluster.hierarchy
 
 
 ## Order of standard args:
@@ -44,6 +39,8 @@ import scipy.cluster.hierarchy
 ##
 
 
+@ctprofiling.profile_methods
+@ctframes.frame_selection_methods
 class CTProtein:
     """
 
@@ -68,6 +65,12 @@ class CTProtein:
     and will always begin from 0 - note this will include the peptide caps (ACE/NME)
     if present.
 
+    Every analysis method also accepts a keyword-only `frames` argument, which restricts
+    the analysis to a selection of frames (a `ctframes.FrameSelection`, a slice, an array
+    of frame indices or a boolean mask, e.g. derived from an observable). The selection is
+    applied before the method runs, so the method's own `stride` (and any frame numbers
+    passed to it) refer to the selected frames. See `ctframes` for details.
+
     """
 
     ## >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
@@ -86,7 +89,7 @@ class CTProtein:
 
     # ........................................................................
     #
-    def __init__(self, traj, residue_offset):
+    def __init__(self, traj, residue_offset, template=None):
         """
         Initialize a CTProtein object instance using trajectory information, and information
         about offsets.
@@ -108,6 +111,13 @@ class CTProtein:
             in functions that call other functions which can perform the offset it will
             only need to be performed once.
 
+        template: `CTProtein` or None {None}
+            An existing CTProtein object built from the same topology (e.g. the same protein
+            in a different replica of an ensemble). If provided, the topology-derived index
+            information (residues with CA atoms, caps, and the residue/atom lookup table) is
+            shared with the template rather than being re-derived, which avoids repeating the
+            (slow) topology parsing for every trajectory.
+
         """
         
         # set the trajectory object for easy access
@@ -136,6 +146,27 @@ class CTProtein:
             
                 
         
+        # if a template protein was provided, share all topology-derived information
+        # with it and skip the (slow) topology parsing
+        if template is not None:
+            if template.n_residues != traj.topology.n_residues or template.topology.n_atoms != traj.topology.n_atoms:
+                raise CTException('Template CTProtein does not match the passed trajectory (%i vs. %i residues, %i vs. %i atoms)' % (template.n_residues, traj.topology.n_residues, template.topology.n_atoms, traj.topology.n_atoms))
+
+            self.__num_residues       = template.n_residues
+            self.__amino_acids_3LTR   = None
+            self.__amino_acids_1LTR   = None
+            self.__residue_index_list = None
+            self.__CA_residue_atom    = template.__CA_residue_atom
+            self.__residue_atom_table = template.__residue_atom_table
+            self.__residue_COM        = {}
+            self.__weights            = None
+
+            self.__resid_with_CA = template.resid_with_CA
+            self.__idx_with_CA   = template.idx_with_CA
+            self.__ncap          = template.ncap
+            self.__ccap          = template.ccap
+            return
+
         # initialze various protein-centric data
         self.__num_residues       = sum( 1 for _ in self.topology.residues)
 
@@ -147,6 +178,7 @@ class CTProtein:
         self.__CA_residue_atom    = {}
         self.__residue_atom_table = {}
         self.__residue_COM        = {}
+        self.__weights            = None
 
         (self.__resid_with_CA, self.__idx_with_CA) = self.__get_resid_with_CA()
 
@@ -286,6 +318,20 @@ class CTProtein:
         return self.__residue_index_list
 
 
+    @property
+    def weights(self):
+        """
+        Returns the normalized per-frame weights set with `set_weights()`, or None if no weights
+        have been set.
+
+        Returns
+        -------
+        np.ndarray or None
+        """
+
+        return self.__weights
+
+
 
     def  __repr__(self):
         return "CTProtein (%s): %i res and %i frames" % (hex(id(self)), self.n_residues, self.n_frames)
@@ -296,40 +342,345 @@ class CTProtein:
         
     # ........................................................................
     #
-    def __check_weights(self, weights, stride=None):
+    @ctframes.frame_independent
+    def set_weights(self, weights):
+        """
+        Sets a per-frame weights array which is then used by every method that accepts a
+        `weights` keyword (when that keyword is not explicitly passed). This means an ensemble
+        re-weighted to match experimental data, or replica exchange data recombined using T-WHAM,
+        need only have its weights defined once. Weights are normalized to sum to 1.
+
+        Weights are always defined for EVERY frame in the trajectory. When a stride is used the
+        strided subset of the weights is renormalized, so strided and weighted analyses can be
+        combined.
+
+        Parameters
+        ----------
+        weights : array_like
+            Array of non-negative floats with one weight per frame.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        CTException
+            If the weights do not match the number of frames, are negative, or sum to zero.
+        """
+
+        self.__weights = None
+        self.__weights = self.__check_weights(weights)
+
+
+    # ........................................................................
+    #
+    @ctframes.frame_independent
+    def clear_weights(self):
+        """
+        Removes any weights previously defined with `set_weights()`, such that all subsequent
+        analyses treat every frame equally.
+
+        Returns
+        -------
+        None
+        """
+
+        self.__weights = None
+
+
+    # ........................................................................
+    #
+    @ctprofiling.not_profiled
+    def get_frame_weights(self, weights=False, stride=1):
+        """
+        Returns the validated and normalized per-frame weights an analysis with these `weights`
+        and `stride` arguments would use, i.e. the passed weights (or, if none are passed, the
+        weights set with `set_weights()`) for every stride-th frame, renormalized to sum to 1.
+        This allows code that analyzes the coordinates of a CTProtein directly to weight frames
+        exactly as the CTProtein methods do.
+
+        Parameters
+        ----------
+        weights : array_like or False {False}
+            One weight per frame, or False to use the weights set with `set_weights()`.
+
+        stride : int {1}
+            Only the weights of every stride-th frame are used.
+
+        Returns
+        -------
+        np.ndarray or False
+            Normalized weights for the selected frames, or False if no weights are being used.
+
+        Raises
+        ------
+        CTException
+            If the weights do not match the number of frames, are negative, or sum to zero.
+        """
+
+        return self.__check_weights(weights, stride)
+
+
+    # ........................................................................
+    #
+    @ctprofiling.not_profiled
+    @ctframes.frame_independent
+    def get_frame_view(self, start=0, stop=None, stride=1):
+        """
+        Returns a new CTProtein made up of the frames `start` to `stop` (every `stride`-th
+        frame) of this protein, without copying the trajectory. The new protein shares the
+        topology and all topology-derived information with this protein, and for a stride of 1
+        its coordinates are a view onto this protein's coordinates (a strided view holds a copy
+        of only the selected frames; see `ctframes.get_frame_view()`). This makes it cheap to
+        run any analysis on (for example) an equilibrated window of a long trajectory.
+
+        If weights have been set (see `set_weights()`) the weights of the selected frames are
+        carried over (and renormalized).
+
+        Parameters
+        ----------
+        start : int {0}
+            First frame of the view. Negative values count from the end of the trajectory.
+
+        stop : int or None {None}
+            Frame at which the view stops (exclusive). None means the last frame.
+
+        stride : int {1}
+            Selects every `stride`-th frame between `start` and `stop`.
+
+        Returns
+        -------
+        CTProtein
+            Protein object over the selected frames. Note that for a stride of 1 modifying
+            coordinates in place (e.g. via ``traj.superpose()``) on the view also modifies this
+            protein.
+
+        Raises
+        ------
+        CTException
+            If the frame selection is invalid or contains no frames.
+        """
+
+        return self.select_frames(ctframes.FrameSelection(start, stop, stride))
+
+
+    # ........................................................................
+    #
+    @ctprofiling.not_profiled
+    @ctframes.frame_independent
+    def select_frames(self, frames):
+        """
+        Returns a new CTProtein made up of a selection of frames of this protein. This is the
+        general form of `get_frame_view()`: the selection can combine a frame range and stride
+        with explicit frame indices or a boolean mask (see `ctframes.FrameSelection`). Evenly
+        spaced selections are taken as frame views, any other selection holds a copy of only the
+        selected frames; the topology and all topology-derived information are always shared.
+
+        If weights have been set (see `set_weights()`) the weights of the selected frames are
+        carried over (and renormalized).
+
+        Note that passing `frames` to an analysis method (e.g.
+        ``CP.get_distance_map(frames=selection)``) runs that analysis on the selected frames
+        without the need to call this method directly.
+
+        Parameters
+        ----------
+        frames : ctframes.FrameSelection, slice or array_like
+            The frames to select, as a FrameSelection, a slice, an array of frame indices or a
+            boolean mask with one value per frame.
+
+        Returns
+        -------
+        CTProtein
+            Protein object over the selected frames.
+
+        Raises
+        ------
+        CTException
+            If the frame selection is invalid or contains no frames.
+        """
+
+        # resolved selections (as passed by frame-selecting methods) are used directly
+        if isinstance(frames, np.ndarray) and frames.dtype != bool:
+            selected = frames
+        else:
+            selected = ctframes.as_frame_selection(frames).get_frames(self.n_frames)
+
+        view = CTProtein(ctframes.select_frames(self.traj, selected), self.residue_offset, template=self)
+
+        if self.__weights is not None:
+            view.set_weights(self.__weights[selected])
+
+        return view
+
+
+    # ........................................................................
+    #
+    @ctprofiling.not_profiled
+    @ctframes.frame_independent
+    def profile_report(self):
+        """
+        Returns the profiling records collected for this protein, i.e. per public method the
+        number of calls, wall and CPU time, frames processed, peak memory allocated and
+        memoization cache hits/misses. Records are only collected while profiling is enabled
+        (see `ctprofiling.enable()`).
+
+        Returns
+        -------
+        dict
+            Report dictionary as described in `ctprofiling.get_report()`, where `methods` only
+            contains calls made on this protein.
+        """
+
+        return ctprofiling.get_report(self)
+
+
+    # ........................................................................
+    #
+    def __check_weights(self, weights, stride=1):
         """
         Function that checks a passed weights-array is usable and matches the number of frames
-        (avoids a lot of heartache when something breaks deep inside the code).
+        (avoids a lot of heartache when something breaks deep inside the code). If no weights
+        are passed (i.e. `weights` is False) the weights set with `set_weights()` are used, if
+        present.
 
         NOTE: This also typecasts weights to a `numpy.array` which allows them to be indexed directly
-        using a list of values.
+        using a list of values, and normalizes the weights such that the (strided) weights sum to 1.
 
         Parameters
         ----------
-        weights : array_like
-            An `numpy.array` object that corresponds to the number of frames within an input trajectory.
-        stride : {None}, optional
-            The stepsize used when iterating across the frames. A value of `None` will set the step
-            size to 0.
+        weights : array_like or False
+            An `numpy.array` object that corresponds to the number of frames within an input trajectory,
+            or False.
+
+        stride : int {1}
+            The stepsize used when iterating across the frames. If larger than one the weights associated
+            with every stride-th frame are selected and renormalized.
 
         Returns
         -------
-        numpy.array
-            An `np.array` object containing trajectory frames selected per `stride` number of frames.
+        numpy.array or False
+            An `np.array` object containing the normalized weights for the frames selected every `stride` 
+            frames, or False if no weights are being used.
+
+        Raises
+        ------
+        CTException
+            If the weights do not match the number of frames, are negative, or sum to zero.
         """
 
-        if weights is not False:
-            if len(weights) != self.n_frames:
-                raise CTException('Passed frame weights array is %i in length, while there are actually %i frames - these must match' % (len(weights), self.n_frames))
+        if weights is False or weights is None:
+            weights = self.__weights
 
-                
-            if stride > 1:
-                ctio.warning_message("WARNING: Using stride with weights is ALMOST certainly not a good idea unless the weights are\ncalculated for every stride-th residue", with_frills=True)
-                return np.array(weights[list(range(0,self.n_frames,stride))])
-            else:
-                return np.array(weights)
+            if weights is None:
+                return False
+
+        return ctutils.get_frame_weights(weights, self.n_frames, stride)
+
+
+    # ........................................................................
+    #
+    def __weighted_mean_and_std(self, data, weights, axis=0):
+        """
+        Internal function that returns the exact (weighted) mean and standard deviation of `data`
+        along `axis`. If `weights` is False the standard unweighted mean and standard deviation
+        are returned, so reducers can use this function regardless of whether weights were passed.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            Array of data where the `axis` dimension runs over frames.
+
+        weights : np.ndarray or False
+            Normalized weights (as returned by `__check_weights`) or False.
+
+        axis : int {0}
+            Axis over which the average is taken.
+
+        Returns
+        -------
+        tuple
+            A 2-tuple containing the mean and standard deviation.
+        """
+
+        if weights is False:
+            return (np.mean(data, axis), np.std(data, axis))
+
+        mean = np.average(data, axis, weights=weights)
+        variance = np.average(np.power(data - np.expand_dims(mean, axis), 2), axis, weights=weights)
+
+        return (mean, np.sqrt(variance))
+
+
+    # ........................................................................
+    #
+    def __tile_weights(self, weights, data):
+        """
+        Internal function that expands per-frame weights to match a 1D array built by 
+        concatenating a per-frame observable for several pairs (i.e. [pair1 frames, pair2 frames, ...]),
+        as done when pooling distances over all pairs at a given sequence separation.
+
+        Parameters
+        ----------
+        weights : np.ndarray or False
+            Normalized per-frame weights (as returned by `__check_weights`) or False.
+
+        data : np.ndarray
+            The concatenated 1D array.
+
+        Returns
+        -------
+        np.ndarray or False
+            Per-element weights (or False if `weights` is False).
+        """
+
+        if weights is False:
+            return False
+
+        return np.tile(weights, int(len(data) / len(weights)))
+
+
+    # ........................................................................
+    #
+    def __frame_uncertainty(self, per_frame, method, block_size, n_bootstrap, confidence, weights, seed):
+        """
+        Internal function that computes the ensemble average of a per-frame observable together
+        with its uncertainty using the `ctuncertainty` module, as used by the *_uncertainty() 
+        methods.
+
+        Parameters
+        ----------
+        per_frame : np.ndarray
+            Array where the first axis runs over frames.
 
-        return False
+        method : str
+            Either 'bootstrap' (block bootstrap) or 'block' (block averaging).
+
+        block_size, n_bootstrap, confidence, seed
+            Passed to `ctuncertainty.block_bootstrap()` or `ctuncertainty.block_average()`.
+
+        weights : np.ndarray or False
+            Normalized weights (as returned by `__check_weights`) or False.
+
+        Returns
+        -------
+        tuple
+            A 5-tuple containing the mean, standard error, lower and upper confidence bounds
+            (both None if method = 'block') and the block size used.
+        """
+
+        ctutils.validate_keyword_option(method, ['bootstrap', 'block'], 'method')
+
+        if weights is False:
+            weights = None
+
+        if method == 'bootstrap':
+            return ctuncertainty.block_bootstrap(per_frame, block_size=block_size, n_bootstrap=n_bootstrap, confidence=confidence, weights=weights, seed=seed)
+
+        (mean, stderr, block_size) = ctuncertainty.block_average(per_frame, block_size=block_size, weights=weights)
+
+        return (mean, stderr, None, None, block_size)
 
 
     # ........................................................................
@@ -398,6 +749,7 @@ class CTProtein:
 
     # ........................................................................
     #
+    @ctframes.frame_independent
     def get_offset_residue(self, R1):
         """
         Returns the true residue index (TRI) for this protein by taking into
@@ -540,10 +892,12 @@ class CTProtein:
 
     # ........................................................................
     #
-    def __get_subtrajectory(self, traj, stride):
+    def __get_subtrajectory(self, traj, stride, copy=False):
         """
         Internal function which returns a subtrajectory. Expects
         `traj` to be an `mdtraj` trajectory object and `stride` to be an `int`.
+        The subtrajectory is a frame view (see `ctframes.get_frame_view()`), i.e.
+        it shares the topology (and, for a stride of 1, the coordinates) of `traj`.
 
         Parameters
         ----------
@@ -555,6 +909,10 @@ class CTProtein:
             The non-zero number of steps to perform while iterating across the input
             trajectory, `traj`.
 
+        copy: bool {False}
+            If True the subtrajectory holds its own coordinates, and so can be modified
+            in place (e.g. superposed) without changing `traj`.
+
         Returns
         -----------
         mdtraj.Trajectory
@@ -565,11 +923,8 @@ class CTProtein:
 
         stride = int(stride)
         self.__check_stride(stride)
-        
-        if stride == 1:
-            return traj
-        else:                                    
-            return traj.slice(list(range(0, self.n_frames, stride)))            
+
+        return ctframes.get_frame_view(traj, stride=stride, copy=copy)
         
 
     # ........................................................................
@@ -665,6 +1020,7 @@ class CTProtein:
         if atomname is None:
             
             # if all_atoms not yet associated with this residue
+            ctprofiling.record_cache('residue_atom_lookup', 'all_atoms' in self.__residue_atom_table[resid])
             if 'all_atoms' not in self.__residue_atom_table[resid]:
                 self.__residue_atom_table[resid]['all_atoms'] = self.topology.select('resid %i'%(resid))
 
@@ -673,6 +1029,7 @@ class CTProtein:
                                 
         # if atom-name not yet associated with this resid lookup
         # the atomname from the underlying topology 
+        ctprofiling.record_cache('residue_atom_lookup', atomname in self.__residue_atom_table[resid])
         if atomname not in self.__residue_atom_table[resid]:
             self.__residue_atom_table[resid][atomname] = self.topology.select('resid %i and name %s'%(resid, atomname))
             
@@ -761,6 +1118,7 @@ class CTProtein:
 
     # ........................................................................
     #
+    @ctframes.frame_independent
     def print_residues(self, verbose=True):
         """
         Function to help determine the mapping of residue ID to PDB residue value. 
@@ -795,6 +1153,7 @@ class CTProtein:
        
     # ........................................................................
     #        
+    @ctframes.frame_independent
     def get_amino_acid_sequence(self, oneletter=False, numbered=True):
         """
         Returns the protein's amino acid sequence.
@@ -852,6 +1211,7 @@ class CTProtein:
 
     # ........................................................................
     #
+    @ctframes.frame_independent
     def get_CA_index(self, residueIndex, correctOffset=True):
         """ 
         Get the CA atom index for the residue defined by residueIndex. Again does this
@@ -888,6 +1248,7 @@ class CTProtein:
         if correctOffset:
             residueIndex = self.get_offset_residue(residueIndex)
 
+        ctprofiling.record_cache('CA_index', residueIndex in self.__CA_residue_atom)
         if residueIndex not in self.__CA_residue_atom:            
             return_val = self.__residue_atom_lookup(residueIndex, 'CA')
         
@@ -901,6 +1262,7 @@ class CTProtein:
 
     # ........................................................................
     #
+    @ctframes.frame_independent
     def get_multiple_CA_index(self, resID_list=None, correctOffset=True):
         """
         Returns the atom indices associated with the C-alpha (CA) atom for the
@@ -1076,7 +1438,8 @@ class CTProtein:
                 if residue <= residueIndex and onlyCterminalResidues:
                     continue
 
-                return_distances.append(self.get_inter_residue_COM_distance(residueIndex, residue))
+                # as in the CA block both indices are already true residue indices
+                return_distances.append(self.get_inter_residue_COM_distance(residueIndex, residue, correctOffset=False, stride=stride))
             
             # finally convert list to numpy array and flip so returns in same format as CA mode
             return np.array(return_distances).transpose()
@@ -1085,7 +1448,7 @@ class CTProtein:
 
     # ........................................................................
     #
-    def get_distance_map(self, mode='CA', RMS=False, stride=1, weights=False, verbose=True):
+    def get_distance_map(self, mode='CA', RMS=False, stride=1, weights=False, verbose=False, progress=None, cancel_token=None):
         """
         Function to calculate the CA defined distance map for a protein of interest. Note 
         this function doesn't take any arguments and instead will just calculate the complete
@@ -1119,10 +1482,19 @@ class CTProtein:
             useful if an ensemble has been re-weighted to better match experimental data, or in
             the case of analysing replica exchange data that is re-combined using T-WHAM.
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
         Returns
         -------
         tuple
@@ -1143,12 +1515,11 @@ class CTProtein:
         distanceMap = np.zeros([len(residuesWithCA),len(residuesWithCA),])
         stdMap = np.zeros([len(residuesWithCA),len(residuesWithCA),])
                 
+        tracker = ctprogress.Progress('get_distance_map', len(residuesWithCA)-1, len(range(0, self.n_frames, stride)), progress or verbose, cancel_token)
+
         SM_index=0
         for resIndex in residuesWithCA[0:-1]:
 
-
-            ctio.status_message("On protein residue %i (overall residue index = %i) of %i [distance calculations]"% (SM_index, resIndex, int(len(residuesWithCA))), verbose)
-
             # get all CA-CA distances between the residue of index resIndex and every other residue. Note this gives the non-redudant upper 
             # triangle. No need to correct for offset because this was done when we retrived the set of residues with CA
             full_data = self.calculate_all_CA_distances(resIndex, mode=mode, stride=stride, correctOffset=False)    
@@ -1157,37 +1528,134 @@ class CTProtein:
             if RMS:
                 full_data = np.power(full_data,2)
             
-            # calculate mean and standard deviation
-            if weights is not False:
-
-                mean_data = np.average(full_data,0,weights=weights)
-
-                # if we want RMS then NOW take square root of <rij^2> 
-                if RMS:
-                    mean_data = np.sqrt(mean_data)
-                std_data  = None
-            else:
-
-                mean_data = np.mean(full_data,0)
+            # calculate (weighted) mean and standard deviation
+            (mean_data, std_data) = self.__weighted_mean_and_std(full_data, weights)
                 
-                # if we want RMS then NOW take square root of <rij^2> 
-                if RMS:
-                    mean_data = np.sqrt(mean_data)
-
-                std_data = np.std(full_data,0)
+            # if we want RMS then NOW take square root of <rij^2> 
+            if RMS:
+                mean_data = np.sqrt(mean_data)
 
             # update the maps appropriately and increment the counter
             distanceMap[SM_index][1+SM_index:len(residuesWithCA)] = mean_data
             stdMap[SM_index][1+SM_index:len(residuesWithCA)] = std_data            
 
             SM_index=SM_index+1
+            tracker.update()
+
+        tracker.close()
 
         return (distanceMap, stdMap)
 
 
     # ........................................................................
     #
-    def get_polymer_scaled_distance_map(self, nu=None, A0=None, min_separation=10, mode='fractional-change', stride=1, weights=False, verbose=True):
+    def get_distance_map_uncertainty(self, mode='CA', method='bootstrap', block_size=None, n_bootstrap=1000, confidence=95, stride=1, weights=False, seed=None, verbose=False, progress=None, cancel_token=None):
+        """
+        Function that computes the ensemble-average distance map (as `get_distance_map`) along
+        with error bars for every element of the map. Per-frame distances are computed once and
+        passed to the `ctuncertainty` module, so no distances are recomputed per bootstrap
+        replicate. Block sizes account for the correlation between frames and (by default) are
+        selected from the autocorrelation of the distances.
+
+        Distance is described in Angstroms.
+
+        Parameters
+        ----------
+
+        mode : str {'CA'}
+            String, must be one of either 'CA' or 'COM'.
+            - 'CA' = alpha carbon.
+            - 'COM' = center of mass (associated withe the residue).
+
+        method : str {'bootstrap'}
+            String, must be one of either 'bootstrap' or 'block'.
+            - 'bootstrap' = block bootstrap; returns standard error and a confidence interval.
+            - 'block' = block averaging; returns the standard error only.
+
+        block_size : int or None {None}
+            Number of frames per block. If None this is selected automatically from the
+            autocorrelation of the distances.
+
+        n_bootstrap : int {1000}
+            Number of bootstrap replicates (only used if method = 'bootstrap').
+
+        confidence : float {95}
+            Width of the confidence interval in percent (only used if method = 'bootstrap').
+
+        stride : int {1}
+            Defines the spacing between frames to compare - i.e. if comparing frame1 to a trajectory we'd compare
+            frame 1 and every stride-th frame.
+
+        weights : list or array of floats
+            Defines the frame-specific weights if re-weighted analysis is required.
+
+        seed : int or None {None}
+            Seed used for the bootstrap random number generator.
+
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown while
+            the per-frame distances are computed.
+
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the distance calculations. True selects the default console
+            renderer. See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
+        Returns
+        -------
+        tuple
+            A 5-tuple containing:
+            - [0] := The distance map (upper triangle).
+            - [1] := The standard error map.
+            - [2] := The lower confidence bound map (None if method = 'block').
+            - [3] := The upper confidence bound map (None if method = 'block').
+            - [4] := The block size used (int).
+        """
+
+        ctutils.validate_keyword_option(mode, ['CA', 'COM'], 'mode')
+        ctutils.validate_keyword_option(method, ['bootstrap', 'block'], 'method')
+
+        weights = self.__check_weights(weights, stride)
+
+        residuesWithCA = self.resid_with_CA
+        n_res = len(residuesWithCA)
+
+        tracker = ctprogress.Progress('get_distance_map_uncertainty', n_res-1, len(range(0, self.n_frames, stride)), progress or verbose, cancel_token)
+
+        # collect the per-frame upper-triangle distances as one [frames x pairs] array
+        per_frame = []
+        for resIndex in residuesWithCA[0:-1]:
+            per_frame.append(self.calculate_all_CA_distances(resIndex, mode=mode, stride=stride, correctOffset=False))
+            tracker.update()
+
+        tracker.close()
+
+        per_frame = np.hstack(per_frame)
+
+        (mean, stderr, lower, upper, block_size) = self.__frame_uncertainty(per_frame, method, block_size, n_bootstrap, confidence, weights, seed)
+
+        # unpack the flattened pairs back into the upper triangle of each map
+        (rows, cols) = np.triu_indices(n_res, k=1)
+
+        return_maps = []
+        for values in [mean, stderr, lower, upper]:
+            if values is None:
+                return_maps.append(None)
+                continue
+            local_map = np.zeros((n_res, n_res))
+            local_map[rows, cols] = values
+            return_maps.append(local_map)
+
+        return (return_maps[0], return_maps[1], return_maps[2], return_maps[3], block_size)
+
+
+    # ........................................................................
+    #
+    def get_polymer_scaled_distance_map(self, nu=None, A0=None, min_separation=10, mode='fractional-change', stride=1, weights=False, verbose=False):
         """
         Function that allows for a global assesment of how well all `i-j` distances conform to standard
         polymer scaling behaviour (i.e. $r_ij = A0*|i-j|^{nu}$).
@@ -1272,8 +1740,8 @@ class CTProtein:
             useful if an ensemble has been re-weighted to better match experimental data, or in
             the case of analysing replica exchange data that is re-combined using T-WHAM.
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True a status message is printed before the scaling exponent is fitted. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
         Returns
@@ -1392,7 +1860,7 @@ class CTProtein:
 
     # ........................................................................
     #
-    def get_local_heterogeneity(self, fragment_size=10, bins=None, stride=20, verbose=True):
+    def get_local_heterogeneity(self, fragment_size=10, bins=None, stride=20, verbose=False, progress=None, cancel_token=None):
         """
         Function to calculate the vector of D values used to calculate the Phi parameter from Lyle et al[1].
         The stride defines the spacing between frames which are analyzed. This is just for practical purposes.
@@ -1420,10 +1888,19 @@ class CTProtein:
             Defines the spacing between frames to compare - i.e. if comparing frame1 to a trajectory we'd compare
             frame 1 and every stride-th frame.
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
         
         Returns
         -------
@@ -1481,10 +1958,13 @@ class CTProtein:
         stdData  = []
         histo    = []
         
+        # each sub-region compares every stride-th frame against all frames
+        fragments = res_idx_list[0:-fragment_size]
+        tracker = ctprogress.Progress('get_local_heterogeneity', len(fragments), len(range(0, n_frames, stride))*n_frames, progress or verbose, cancel_token)
+
         # cycle over each sub-region in the sequence
-        for frag_idx in res_idx_list[0:-fragment_size]:
+        for frag_idx in fragments:
             tmp = []
-            ctio.status_message("On range %i" % frag_idx, verbose)
 
             # for each frame in ensemble, calculate RMSD for that sub-region compared to
             # all other sub-regions (i.e. we're doing a 1-vs-all RMSD calculation for EACH
@@ -1498,6 +1978,9 @@ class CTProtein:
                                 
             meanData.append(np.mean(tmp))
             stdData.append(np.std(tmp))
+            tracker.update()
+
+        tracker.close()
 
         return (meanData, stdData, histo, bins)
         
@@ -1505,7 +1988,7 @@ class CTProtein:
 
     # ........................................................................
     #
-    def get_D_vector(self, stride=20, verbose=True):
+    def get_D_vector(self, stride=20, verbose=False, progress=None, cancel_token=None):
         """
         Function to calculate the vector of D values used to calculate the Phi parameter from Lyle et al[1].
 
@@ -1535,10 +2018,19 @@ class CTProtein:
             Defines the spacing between frames to compare - i.e. if comparing frame1 to a trajectory 
             we'd compare frame 1 and every stride-th frame
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
         Returns
         ---------
         np.ndarray
@@ -1562,17 +2054,21 @@ class CTProtein:
         
         all_distances = np.zeros([len(residuesWithCA),len(residuesWithCA), n_frames])
                 
+        # progress is measured in frame pairs (the D-vector) plus one step per residue (distances)
+        n_steps = len(residuesWithCA) - 1 + n_frames*(n_frames-1)//2
+        tracker = ctprogress.Progress('get_D_vector', n_steps, 1, progress or verbose, cancel_token)
+
         # first compute upper triangle only (lower traingle is identical and doesn't change the answer
         # so we stick with the upper traingle only)
         SM_index=0
         for resIndex in residuesWithCA[0:-1]:        
-            ctio.status_message("Calculating non redundant distance for res. %i " % resIndex, verbose)
 
             vals = self.calculate_all_CA_distances(resIndex, stride=stride, onlyCterminalResidues=True, correctOffset=False)                                 
 
             # have to include a -1 here because we don't have a self:self distance
             all_distances[SM_index][0:(len(residuesWithCA)-1)-SM_index] = vals.transpose()
             SM_index=SM_index+1
+            tracker.update()
         
         # number of residues we're calculating distances between
         n_res = np.shape(all_distances)[0]
@@ -1591,8 +2087,6 @@ class CTProtein:
         # calculate the D-vector of all frames
         D_vector = []
         for A in range(0, n_frames):
-            ctio.status_message("Running PHI calculation on frame %i of %i" % (A, n_frames), verbose)
-
             
             for B in range(A+1, n_frames):
                 
@@ -1627,6 +2121,10 @@ class CTProtein:
 
                 # and compute the D value for comparing these two frames
                 D_vector.append(1 - np.dot(VA,VB)/(np.linalg.norm(VA)*np.linalg.norm(VB)))
+
+            tracker.update(n_frames - A - 1)
+
+        tracker.close()
                 
         return np.array(D_vector)
 
@@ -1760,7 +2258,10 @@ class CTProtein:
         weights : list or array of floats  {False}
             Defines the frame-specific weights if re-weighted analysis is required. This can be 
             useful if an ensemble has been re-weighted to better match experimental data, or in
-            the case of analysing replica exchange data that is re-combined using T-WHAM.
+            the case of analysing replica exchange data that is re-combined using T-WHAM. One
+            weight per frame is expected (the strided subset is renormalized), and if not passed
+            the weights set with `set_weights()` are used. Weights only apply when 
+            protein_average=False, as per-frame values are returned otherwise.
 
 
         Returns
@@ -1792,13 +2293,13 @@ class CTProtein:
         native_state_frame = 0
         n_res = self.n_residues
 
-        # less stringent weights test cos trajectory is one frame too long because we probably loaded the PDB file
-        # as a frame
-        #weights = self.__check_weights(weights, stride)
-        
-        if weights is not False and stride != 1:
-            raise CTException('For get_Q() weights must be set for EACH frame and stride=1')
-        
+        # per-frame Q values cannot be re-weighted, so explicitly passed weights only make sense for
+        # the simulation-average values
+        if protein_average and weights is not False and weights is not None:
+            raise CTException('Reweighting for frame averaged should be done with trajectory weights OUTSIDE of CTraj')
+
+        weights = self.__check_weights(weights, stride)
+
         # if we're using a subregion 
         # NOTE this is WAY more elegant than the previous way of doing this but there *used* to be problems with MDTraj doing
         # things like this...
@@ -1807,8 +2308,8 @@ class CTProtein:
         # extract out the native state frame
         native = self.traj.slice(native_state_frame)
 
-        # get the sub-trajectory to be used         
-        target = self.__get_subtrajectory(self.traj, stride)
+        # get the sub-trajectory to be used (a copy, as it is superposed in place below)
+        target = self.__get_subtrajectory(self.traj, stride, copy=True)
 
         # now align the entire trajectory to the 'native' frame
         target.superpose(target, frame=native_state_frame, atom_indices=selectionatoms)
@@ -1847,32 +2348,19 @@ class CTProtein:
 
         # If we're just computing the protein average then this returns the Q value for the whole protein on a per-frame basis
         if protein_average:         
-            if weights is not False:
-                raise CTException('Reweighting for frame averaged should be done with trajectory weights OUTSIDE of CTraj')
-                
             q = np.mean(1.0 / (1 + np.exp(BETA_CONST * (r - LAMBDA_CONST * r0))), axis=1)
 
             return q
 
         else:
             
-            # if the analysis is to be re-weighted uses the weights here on a per-frame basis
+            # average over every (strided) frame for each native contact, using the (strided and
+            # renormalized) frame weights if the analysis is to be re-weighted
+            q_full = 1.0 / (1 + np.exp(BETA_CONST * (r - LAMBDA_CONST * r0)))
             if weights is not False:
-                q_full = (1.0 / (1 + np.exp(BETA_CONST * (r - LAMBDA_CONST * r0)))).transpose()
-
-                q = []
-                for i in q_full:
-
-                    # note i[1:] means we ignore the first (native) frame
-                    q.append(np.average(i[1:], 0, weights))
-
-                q = np.array(q)
+                q = np.average(q_full, axis=0, weights=weights)
             else:
-
-                # check this makes sense - aboe we do i[1:] should probably correct this to remove
-                # the native state structure? Anyway, here we're averaging over every from for each
-                # residue
-                q = np.mean(1.0 / (1 + np.exp(BETA_CONST * (r - LAMBDA_CONST * r0))), axis=0)
+                q = np.mean(q_full, axis=0)
 
             # get the set of unqiue atoms which are involved in native contacts
             unique_native_contact_atoms = np.unique(np.hstack((np.transpose(native_contacts)[0],np.transpose(native_contacts)[1])))
@@ -2006,10 +2494,6 @@ class CTProtein:
 
         ctutils.validate_keyword_option(mode, ['closest-heavy', 'ca', 'closest', 'sidechain', 'sidechain-heavy'] , 'mode')
 
-        if weights is not False:
-            if int(stride) != 1:
-                raise CTException("Cannot accomodate weighst and non-one stride")
-
         # check weights are correct
         weights = self.__check_weights(weights, stride)
 
@@ -2047,11 +2531,9 @@ class CTProtein:
         # else, if weights...
         else:
 
-            # if we use weights then we multiply each frame's contact map by the weight and sum
-            n_frames = CMAP.shape[0]
-            normalized_contact_map = np.zeros((CMAP.shape[1],CMAP.shape[1]))
-            for fid in range(0,n_frames):
-                normalized_contact_map = normalized_contact_map + (np.ndarray.astype((CMAP[fid]<distance_thresh_in_nm),int)*MASK)*weights[fid]
+            # if we use weights then the weighted sum over frames of each frame's contact map
+            # is just a contraction of the (normalized) weights vector against the frame axis
+            normalized_contact_map = np.tensordot(weights, (CMAP < distance_thresh_in_nm), axes=(0,0))*MASK
                 
         # we can further reduce the dimensionality to ask which residues are most involved in contacts with outher
         # residues in general (i.e. without caring about what those residues are). This gives us a normalized
@@ -2074,8 +2556,92 @@ class CTProtein:
 
         return (normalized_contact_map, normalized_contact_order)
 
-                                  
-                
+
+    # ........................................................................
+    #
+    def get_contact_map_uncertainty(self, distance_thresh=5.0, mode='closest-heavy', method='bootstrap', block_size=None, n_bootstrap=1000, confidence=95, stride=1, weights=False, seed=None):
+        """
+        Function that computes the contact map (as `get_contact_map`) along with error bars for
+        the contact fraction of every pair of residues. Per-frame contacts are computed once and
+        passed to the `ctuncertainty` module, and block sizes account for the correlation between
+        frames.
+
+        Parameters
+        ----------
+
+        distance_thresh : float {5.0}
+            Distance threshold used to define a 'contact' in Angstroms.
+
+        mode : string {'closest-heavy'}
+            Mode used for computing contacts, one of 'closest-heavy', 'ca', 'closest', 'sidechain'
+            or 'sidechain-heavy' (see `get_contact_map`).
+
+        method : str {'bootstrap'}
+            String, must be one of either 'bootstrap' or 'block'.
+            - 'bootstrap' = block bootstrap; returns standard error and a confidence interval.
+            - 'block' = block averaging; returns the standard error only.
+
+        block_size : int or None {None}
+            Number of frames per block. If None this is selected automatically from the
+            autocorrelation of the contacts.
+
+        n_bootstrap : int {1000}
+            Number of bootstrap replicates (only used if method = 'bootstrap').
+
+        confidence : float {95}
+            Width of the confidence interval in percent (only used if method = 'bootstrap').
+
+        stride : int {1}
+            Defines the spacing between frames to compare - i.e. if comparing frame1 to a trajectory 
+            we'd compare frame 1 and every stride-th frame.
+
+        weights : list or array of floats {False}
+            Defines the frame-specific weights if re-weighted analysis is required.
+
+        seed : int or None {None}
+            Seed used for the bootstrap random number generator.
+
+        Returns
+        -------
+        tuple
+            A 5-tuple containing:
+            - [0] := The contact map (same as `get_contact_map()[0]`).
+            - [1] := The standard error map.
+            - [2] := The lower confidence bound map (None if method = 'block').
+            - [3] := The upper confidence bound map (None if method = 'block').
+            - [4] := The block size used (int).
+        """
+
+        ctutils.validate_keyword_option(mode, ['closest-heavy', 'ca', 'closest', 'sidechain', 'sidechain-heavy'] , 'mode')
+        ctutils.validate_keyword_option(method, ['bootstrap', 'block'], 'method')
+
+        weights = self.__check_weights(weights, stride)
+
+        subtraj = self.__get_subtrajectory(self.traj, stride)
+        mainchain_atoms = self.topology.select('(not resname NME) and (not resname ACE)')
+
+        # [N_FRAMES x N_PAIRS] contact/no contact for every pair that mdtraj considers
+        (distances, residue_pairs) = md.compute_contacts(subtraj.atom_slice(mainchain_atoms), scheme=mode)
+        per_frame = 1.0*(distances < float(distance_thresh/10.0))
+
+        (mean, stderr, lower, upper, block_size) = self.__frame_uncertainty(per_frame, method, block_size, n_bootstrap, confidence, weights, seed)
+
+        # unpack the pairs into symmetric maps, as done by md.geometry.squareform
+        n_res = subtraj.atom_slice(mainchain_atoms).n_residues
+
+        return_maps = []
+        for values in [mean, stderr, lower, upper]:
+            if values is None:
+                return_maps.append(None)
+                continue
+            local_map = np.zeros((n_res, n_res))
+            local_map[residue_pairs[:, 0], residue_pairs[:, 1]] = values
+            local_map[residue_pairs[:, 1], residue_pairs[:, 0]] = values
+            return_maps.append(local_map)
+
+        return (return_maps[0], return_maps[1], return_maps[2], return_maps[3], block_size)
+
+
     # ........................................................................
     #
     #
@@ -2088,6 +2654,10 @@ class CTProtein:
         taken here would be easy to re-implement in another function where you
         'simiarity' metric was something else. 
 
+        The all vs. all RMSD is stored as a condensed vector, but memory and time still
+        scale as (n_frames/stride)^2 - to cluster entire long trajectories use
+        get_rmsd_clustering() with method='kmedoids'.
+
         Returns a 4-place tuple with the following sub-elements:
 
         [0] - cluster_members:
@@ -2123,113 +2693,339 @@ class CTProtein:
         region [list/tuple of length 2]  {[]}
         Defines the first and last residue (INCLUSIVE) for a region to be examined
 
-        n_clusters [int] {10}
-        Number of clusters to be returned through Ward's clustering algorithm. 
+        n_clusters [int] {10}
+        Number of clusters to be returned through Ward's clustering algorithm. 
+
+        backbone [bool] {True}
+        Flag to determine if backbone atoms or full chain should be used
+
+        correctOffset [Bool] {True}
+        Defines if we perform local protein offset correction
+        or not. By default we do, but some internal functions
+        may have already performed the correction and so don't
+        need to perform it again.
+
+        stride [int] {20}     
+        Defines the spacing betwen frames to compare with - i.e. take every $stride-th frame.
+        Setting stride=1 would mean every frame is used, which would mean you're doing an
+        all vs. all comparions, which would be ideal BUT may be slow.
+
+
+        """
+
+        # get a subtrajectory which corresponds to the trajectory examined
+        # in the all vs. all comparison (i.e. a trajectory made of every stride-th
+        # frame
+        subtraj = self.__get_subtrajectory(self.traj, stride)
+
+        # atoms used for the RMSD
+        selectionatoms = self.__get_selection_atoms(region=region, backbone=backbone, correctOffset=correctOffset)
+
+        # CLUSTERING
+        # Ward based hierachical clustering on the condensed (upper triangle) all vs. all RMSD
+        # vector of every stride-th frame, separated out into (at most) n_clusters. Clusters
+        # are ordered by decreasing population
+        (clustering, condensed) = ctcluster.hierarchical(subtraj, n_clusters, atom_indices=selectionatoms, method='ward', return_condensed=True)
+
+        # if we're looking at a region further extract out ONLY the atoms
+        # associated with that subregion
+        if region is not None:
+            subtraj = subtraj.atom_slice(self.__get_selection_atoms(region, backbone))
+
+        # we now build n_cluster separate trajectories contaning conformations from the clustering
+        cluster_trajs = []
+        cluster_distance_matricies = []
+        cluster_centroids = []
+        cluster_members = []
+        cluster_frames = []
+
+        for IDXs in clustering.get_cluster_frames():
+            cluster_frames.append(IDXs)
+
+            # record how many frames are associated with the i-th cluster
+            cluster_members.append(len(IDXs))
+
+            # create the trajectory and append to the cluster_trajectory list
+            cluster_trajs.append(subtraj.slice(IDXs))
+
+            # all vs. all RMSD distance matrix for all the frames in i-th cluster (extracted from
+            # the condensed vector) - this effectivly gives you a way to think about how well an
+            # RMSD cluster represents those structures
+            cluster_distances = ctcluster.condensed_submatrix(condensed, subtraj.n_frames, IDXs)
+            cluster_distance_matricies.append(cluster_distances)
+
+            # we determine the frame closest to the centroid of the cluster
+            if len(IDXs) == 1 or cluster_distances.std() == 0:
+                cluster_centroids.append(0)
+            else:
+                cluster_centroids.append(np.exp(-1*cluster_distances / cluster_distances.std()).sum(axis=1).argmax())
+
+        return (cluster_members, cluster_trajs, cluster_distance_matricies, cluster_centroids, cluster_frames)
+
+
+    # ........................................................................
+    #
+    #
+    def get_rmsd_clustering(self, n_clusters=10, method='kmedoids', region=None, backbone=True, correctOffset=True, stride=1, batch_size=1000, max_iterations=50, seed=None):
+        """
+        Function that clusters the conformations in a trajectory using RMSD as the distance
+        and returns a CTClustering object (see ctcluster) with the cluster labels, populations,
+        medoid (representative) frames and frame indices.
+
+        Unlike get_clusters(), the default 'kmedoids' method never builds the all vs. all RMSD
+        matrix - each iteration only needs the RMSD of every frame against the n_clusters
+        medoids - so memory and time are linear in the number of frames and entire trajectories
+        can be clustered. The returned object can also assign new frames (e.g. from another
+        trajectory with the same topology) to the existing clusters via its assign() method.
+
+        Parameters
+        ----------
+        n_clusters : int {10}
+            Number of clusters.
+
+        method : str {'kmedoids'}
+            Clustering method; 'kmedoids' (mini-batch k-medoids) or one of the hierarchical
+            linkage methods 'ward', 'average', 'complete' or 'single' (which require
+            (n_frames/stride)^2 memory).
+
+        region : list/tuple of length 2 {None}
+            Defines the first and last residue (INCLUSIVE) for a region to be examined. By default
+            the entire protein is used.
+
+        backbone : bool {True}
+            Flag to determine if backbone atoms or full chain should be used.
+
+        correctOffset : bool {True}
+            Defines if we perform local protein offset correction or not.
+
+        stride : int {1}
+            Defines the spacing between frames to cluster.
+
+        batch_size : int {1000}
+            Maximum number of members per cluster used to update the medoids (kmedoids only).
+
+        max_iterations : int {50}
+            Maximum number of iterations (kmedoids only).
+
+        seed : int or None {None}
+            Seed for the random number generator (kmedoids only).
+
+        Returns
+        -------
+        CTClustering
+            Clustering, where frame indices (e.g. ``medoid_frames``, ``get_cluster_frames()``)
+            refer to frames of the full trajectory.
+
+        """
+
+        subtraj = self.__get_subtrajectory(self.traj, stride)
+        frames = np.arange(0, self.n_frames, stride)
+
+        selectionatoms = self.__get_selection_atoms(region=region, backbone=backbone, correctOffset=correctOffset)
+
+        if method == 'kmedoids':
+            return ctcluster.kmedoids(subtraj, n_clusters, atom_indices=selectionatoms, batch_size=batch_size, max_iterations=max_iterations, seed=seed, frames=frames)
+
+        elif method in ctcluster.HIERARCHICAL_METHODS:
+            return ctcluster.hierarchical(subtraj, n_clusters, atom_indices=selectionatoms, method=method, frames=frames)
+
+        else:
+            raise CTException("method must be 'kmedoids' or one of %s" % (str(ctcluster.HIERARCHICAL_METHODS)))
+
+
+    # ........................................................................
+    #
+    #
+    def __feature_blocks(self, feature, stride, chunk_size, distance_thresh, mode):
+        """
+        Internal generator that yields the per-frame features of every stride-th frame in
+        blocks of frames (each block being a [n_block_frames x n_features] float32 array). See
+        get_features() for a description of the options.
+
+        """
+
+        ctutils.validate_keyword_option(feature, ctfeatures.FEATURE_TYPES, 'feature')
+        self.__check_stride(stride)
+
+        if feature == 'CA-distances':
+            CA_atoms = np.array(self.get_multiple_CA_index())
+            (i, j) = np.triu_indices(len(CA_atoms), 1)
+            pairs = np.column_stack((CA_atoms[i], CA_atoms[j]))
+            n_features = len(pairs)
+
+            def featurize(block):
+                return 10*md.compute_distances(block, pairs)
+
+        elif feature == 'contacts':
+            ctutils.validate_keyword_option(mode, ['closest-heavy', 'ca', 'closest', 'sidechain', 'sidechain-heavy'], 'mode')
+
+            mainchain_atoms = self.topology.select('(not resname NME) and (not resname ACE)')
+            distance_thresh_in_nm = float(distance_thresh/10.0)
+            n_features = len(md.compute_contacts(ctframes.get_frame_view(self.traj, 0, 1).atom_slice(mainchain_atoms), scheme=mode)[1])
+
+            def featurize(block):
+                return 1.0*(md.compute_contacts(block.atom_slice(mainchain_atoms), scheme=mode)[0] < distance_thresh_in_nm)
+
+        else:
+            first_frame = ctframes.get_frame_view(self.traj, 0, 1)
+            n_features = 2*(len(md.compute_phi(first_frame)[0]) + len(md.compute_psi(first_frame)[0]))
+
+            def featurize(block):
+                return ctfeatures.dihedral_features(np.hstack((md.compute_phi(block)[1], md.compute_psi(block)[1])))
+
+        # chunk_size counts strided frames, so each block spans chunk_size*stride frames
+        chunk_size = ctfeatures.get_chunk_size(n_features, chunk_size)
+        for start in range(0, self.n_frames, chunk_size*stride):
+            block = ctframes.get_frame_view(self.traj, start, min(start + chunk_size*stride, self.n_frames), stride)
+            yield featurize(block).astype(np.float32)
+
+
+    # ........................................................................
+    #
+    #
+    def get_features(self, feature='CA-distances', stride=1, chunk_size=None, distance_thresh=5.0, mode='closest-heavy'):
+        """
+        Returns a per-frame feature matrix built from internal coordinates, which (unlike RMSD)
+        need no superposition and are well suited to clustering and dimensionality reduction of
+        disordered ensembles. Features are computed in blocks of frames.
+
+        Parameters
+        ----------
+        feature : str {'CA-distances'}
+            Type of feature, one of
+
+            * ``'CA-distances'`` - the upper triangle (i < j) of the CA-CA distance map, in
+              Angstroms (ACE/NME caps excluded), in the order given by np.triu_indices.
+
+            * ``'contacts'`` - 1 if a pair of residues is in contact and 0 otherwise, for every
+              pair of residues separated by more than two residues (in the order used by
+              mdtraj.compute_contacts). Contacts are defined using mode and distance_thresh, as
+              in get_contact_map().
+
+            * ``'dihedrals'`` - the cosine and sine of every phi and psi angle (the cosines of
+              the phi angles, then of the psi angles, followed by the sines in the same order).
+
+        stride : int {1}
+            Defines the spacing between frames used.
+
+        chunk_size : int {None}
+            Number of (strided) frames for which features are computed at once. By default
+            blocks hold roughly ctfeatures.FEATURE_CHUNK_ELEMENTS values.
+
+        distance_thresh : float {5.0}
+            Distance threshold (Angstroms) used to define a contact (contacts only).
+
+        mode : str {'closest-heavy'}
+            Scheme used to compute inter-residue distances for contacts (contacts only); one of
+            'closest-heavy', 'ca', 'closest', 'sidechain' or 'sidechain-heavy'.
+
+        Returns
+        -------
+        np.ndarray
+            [n_frames x n_features] float32 feature matrix.
+
+        """
+
+        blocks = list(self.__feature_blocks(feature, stride, chunk_size, distance_thresh, mode))
+
+        return np.concatenate(blocks)
+
+
+    # ........................................................................
+    #
+    #
+    def get_feature_clustering(self, feature='CA-distances', n_components=10, n_clusters=10, stride=1, chunk_size=None, distance_thresh=5.0, mode='closest-heavy', max_iterations=100, seed=None):
+        """
+        Clusters the conformations in a trajectory in a reduced feature space. Features (see
+        get_features()) are computed in blocks of frames and streamed twice - first to build an
+        incremental PCA, and then to project every frame onto the first n_components principal
+        components - after which the projected frames are clustered with k-means.
+
+        Neither the [n_frames x n_features] feature matrix nor any [n_frames x n_frames] matrix
+        is ever built, so memory is dominated by the [n_frames x n_components] projection and
+        very long trajectories (e.g. 10^6 frames) can be clustered.
 
-        backbone [bool] {True}
-        Flag to determine if backbone atoms or full chain should be used
+        Parameters
+        ----------
+        feature : str {'CA-distances'}
+            Type of feature, one of 'CA-distances', 'contacts' or 'dihedrals' (see get_features()).
 
-        correctOffset [Bool] {True}
-        Defines if we perform local protein offset correction
-        or not. By default we do, but some internal functions
-        may have already performed the correction and so don't
-        need to perform it again.
+        n_components : int {10}
+            Number of principal components frames are projected onto.
 
-        stride [int] {20}     
-        Defines the spacing betwen frames to compare with - i.e. take every $stride-th frame.
-        Setting stride=1 would mean every frame is used, which would mean you're doing an
-        all vs. all comparions, which would be ideal BUT may be slow.
+        n_clusters : int {10}
+            Number of clusters.
 
+        stride : int {1}
+            Defines the spacing between frames used.
 
-        """
+        chunk_size : int {None}
+            Number of (strided) frames for which features are computed at once.
 
-        # build an empty distance matrix
-        if self.n_frames % stride == 0:
-            distance_dims = int(self.n_frames/stride)
-        else:
-            distance_dims = int((self.n_frames/stride))+1
+        distance_thresh : float {5.0}
+            Distance threshold (Angstroms) used to define a contact (contacts only).
 
-        distances = np.zeros((distance_dims, distance_dims))
-        
-        idx=0
+        mode : str {'closest-heavy'}
+            Scheme used to compute inter-residue distances for contacts (contacts only).
 
-        # build an all vs. all RMSD matrix based on the parameters provided for every
-        # stride-th frame
-        for i in range(0,self.n_frames,stride):
-            distances[idx] = self.get_RMSD(i, stride=stride, region=region, backbone=backbone, correctOffset=correctOffset)
-            idx=idx+1
+        max_iterations : int {100}
+            Maximum number of k-means iterations.
 
-        # CLUSTERING
-        # having computed the RMSD distance matrix we do Ward based hierachical clustering 
-        # and then separate out into n_clusters
-        
-        # we feed ward a redundant distance matrix
-        # See: http://docs.scipy.org/doc/scipy/reference/generated/scipy.cluster.hierarchy.ward.html#scipy.cluster.hierarchy.ward
-        linkage = scipy.cluster.hierarchy.ward(distances)
+        seed : int or None {None}
+            Seed for the random number generator used by k-means.
 
-        # linkage is the hierachical clustering encoded as a linkage matrix
-        labels = scipy.cluster.hierarchy.fcluster(linkage, t=n_clusters, criterion='maxclust')
+        Returns
+        -------
+        dict
+            Dictionary with the following key-value pairs (clusters are ordered by decreasing
+            population)
 
-        # get a subtrajectory which corresponds to the trajectory examined
-        # in the all vs. all comparison (i.e. a trajectory made of every stride-th
-        # frame
-        subtraj = self.__get_subtrajectory(self.traj, stride)
+            * ``labels`` - cluster index of each (strided) frame.
 
-        # if we're looking at a region further extract out ONLY the atoms
-        # associated with that subregion
-        if region is not None:
-            selectionatoms = self.__get_selection_atoms(region, backbone)
-            subtraj = subtraj.atom_slice(selectionatoms)
-                        
-        # we now build n_cluster separate trajectories contaning conformations from the clustering
-        cluster_trajs = []
-        cluster_distance_matricies = []
-        cluster_centroids = []
-        cluster_members = []
-        cluster_frames = []
+            * ``frames`` - index in the trajectory of each (strided) frame.
 
-        # regardless of how many clusters we *think* we should have, extract the number of labeles
-        # we'll actually have...
-        final_labels = list(set(labels))
-        # for each cluster
-        for i in final_labels:
+            * ``populations`` - number of frames in each cluster.
 
-            # determine the indices associated with frames which are associated 
-            # with the i-th cluster
-            IDXs=np.where(labels == i)
-            IDXs=IDXs[0]
-            cluster_frames.append(IDXs)
+            * ``centers`` - [n_clusters x n_components] cluster centers in the reduced space.
 
-            # record how many frames are associated with the i-th cluster
-            cluster_members.append(len(IDXs))
+            * ``representative_frames`` - for each cluster, the index in the trajectory of the
+              frame closest to the cluster center.
 
-            # create the trajectory and append to the cluster_trajectory list
-            cluster_trajs.append(subtraj.slice(IDXs))
-            
-            # create the appropriate submatrix
-            cluster_distances=np.zeros((len(IDXs), len(IDXs)))
+            * ``projection`` - [n_frames x n_components] projection of every frame.
+
+            * ``explained_variance_ratio`` - fraction of the variance along each component.
 
-            # initial distances is a subset of the all vs all RMSD distance
-            # matrix which now only includes rows associated with the frames
-            # from the i-th cluster
-            initial_dist=distances[IDXs]
+            * ``pca`` - the ctfeatures.IncrementalPCA object, which can be used to project
+              features from other trajectories (with the same topology).
 
-            # for each frame associated with the i-th cluster
-            for k in range(0,len(IDXs)):
+        """
 
-                # add the full all vs. all set of distances between each of the frames from
-                # the i-th cluster and all the other frames from the i-th clster 
-                cluster_distances[k] = initial_dist[k][IDXs]
+        pca = ctfeatures.IncrementalPCA(n_components)
+        for block in self.__feature_blocks(feature, stride, chunk_size, distance_thresh, mode):
+            pca.partial_fit(block)
 
-            # at this point the cluster_distances matrix is an all vs. all RMSD distance
-            # matrix for all the frames in i-th cluster - this effectivly gives you a way
-            # to think about how well an RMSD cluster represents those structures
-            cluster_distance_matricies.append(cluster_distances)
-            
-            # we determine the frame closest to the centroid of the cluster
-            cluster_centroids.append(np.exp(-1*cluster_distances / cluster_distances.std()).sum(axis=1).argmax())
-        
-        return (cluster_members, cluster_trajs, cluster_distance_matricies, cluster_centroids, cluster_frames)
+        projection = np.concatenate([pca.transform(block) for block in self.__feature_blocks(feature, stride, chunk_size, distance_thresh, mode)])
+
+        (labels, centers, distances) = ctfeatures.kmeans(projection, n_clusters, max_iterations=max_iterations, seed=seed)
+
+        frames = np.arange(0, self.n_frames, stride)
+
+        representative_frames = []
+        for c in range(len(centers)):
+            members = np.flatnonzero(labels == c)
+            if len(members) == 0:
+                representative_frames.append(-1)
+            else:
+                representative_frames.append(frames[members[np.argmin(distances[members])]])
+
+        return {'labels': labels,
+                'frames': frames,
+                'populations': np.bincount(labels, minlength=len(centers)),
+                'centers': centers,
+                'representative_frames': np.array(representative_frames),
+                'projection': projection,
+                'explained_variance_ratio': pca.explained_variance_ratio,
+                'pca': pca}
 
 
     # ........................................................................
@@ -2274,24 +3070,26 @@ class CTProtein:
             R2 = int(R2)
 
         
-        # get COM of the two residues for every stride-th frame (only split
-    
+        # get COM of the two residues for every frame (memoized), and then select every
+        # stride-th frame. Note the cache always holds ALL frames so it is valid for any stride
+        self.__check_stride(stride)
+
+        ctprofiling.record_cache('residue_COM', R1 in self.__residue_COM)
+        ctprofiling.record_cache('residue_COM', R2 in self.__residue_COM)
             
         if R1 not in self.__residue_COM:
             atoms1 = self.__residue_atom_lookup(R1)
             TRJ_1 = self.traj.atom_slice(atoms1)        
-            TRJ_1 = self.__get_subtrajectory(TRJ_1, stride) 
             self.__residue_COM[R1] = md.compute_center_of_mass(TRJ_1)
         
 
         if R2 not in self.__residue_COM:
             atoms2 = self.__residue_atom_lookup(R2)
             TRJ_2 = self.traj.atom_slice(atoms2)        
-            TRJ_2 = self.__get_subtrajectory(TRJ_2, stride) 
             self.__residue_COM[R2] = md.compute_center_of_mass(TRJ_2)
             
-        COM_1 = self.__residue_COM[R1]
-        COM_2 = self.__residue_COM[R2]
+        COM_1 = self.__residue_COM[R1][0::int(stride)]
+        COM_2 = self.__residue_COM[R2][0::int(stride)]
 
         
         # calculate distance
@@ -2491,6 +3289,7 @@ class CTProtein:
     # ........................................................................
     #
     #
+    @ctframes.frame_independent
     def get_residue_mass(self, R1, correctOffset=True):
         """
         Returns the mass associated with a specific residue.
@@ -2528,7 +3327,7 @@ class CTProtein:
     # ........................................................................
     #
     #
-    def get_asphericity(self, R1=None, R2=None, correctOffset=True, verbose=True):
+    def get_asphericity(self, R1=None, R2=None, correctOffset=True, verbose=False, progress=None, cancel_token=None):
         """
         Returns the asphericity associated with the region defined by the intervening stretch of residues between
         R1 and R2. This can be a somewhat slow operation, so a status message is printed for the impatient
@@ -2556,9 +3355,18 @@ class CTProtein:
         may have already performed the correction and so don't
         need to perform it again.
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
-            this function can be computationally expensive, so having some report on status can be comforting!
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
+            computing the gyration tensor for every frame can be slow, so having some report on status can be comforting!
+
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
 
         
         """
@@ -2583,7 +3391,7 @@ class CTProtein:
                 R2 = int(R2)
         
         # compute the gyration tensor
-        gyration_tensor_vector = self.get_gyration_tensor(R1, R2, correctOffset=correctOffset, verbose=verbose)
+        gyration_tensor_vector = self.get_gyration_tensor(R1, R2, correctOffset=correctOffset, verbose=verbose, progress=progress, cancel_token=cancel_token)
         asph_vector = []
             
         for gyr in gyration_tensor_vector:
@@ -2602,7 +3410,7 @@ class CTProtein:
     # ........................................................................
     #
     #
-    def get_gyration_tensor(self, R1=None, R2=None, correctOffset=True, verbose=True):
+    def get_gyration_tensor(self, R1=None, R2=None, correctOffset=True, verbose=False, progress=None, cancel_token=None):
         """
         Returns the instantaneous gyration tensor associated with each frame.
 
@@ -2623,10 +3431,19 @@ class CTProtein:
             internal functions may have already performed the correction and so don't need to perform 
             it again
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
         Returns
         -----------
         np.ndarray
@@ -2663,15 +3480,9 @@ class CTProtein:
         all_positions_all_frames = self.traj.atom_slice(self.topology.select('resid %i to %i'%(R1,R2)))
 
         gyration_tensor_vector = []
-        count = 1
+        tracker = ctprogress.Progress('get_gyration_tensor', len(all_positions_all_frames), 1, progress or verbose, cancel_token)
 
         for frame in all_positions_all_frames:
-
-            # quick status update...
-            if count % 500 == 0:
-                ctio.status_message("On frame %i of %i [computing gyration tensor]" % (count, len(all_positions_all_frames)), verbose)
-
-            count = count + 1
             
             # compute the center of mass for the relevant atoms
             COM = md.compute_center_of_mass(frame)
@@ -2695,7 +3506,9 @@ class CTProtein:
             T_new = np.sum(np.einsum('ij...,i...->ij...',DIF,DIF),axis=0)/len(frame.xyz[0])
             
             gyration_tensor_vector.append(T_new)
+            tracker.update()
 
+        tracker.close()
 
         return np.array(gyration_tensor_vector)
 
@@ -2855,13 +3668,7 @@ class CTProtein:
         # first compute the rg
         rg = self.get_radius_of_gyration(R1, R2, correctOffset)
 
-        # precompute
-        N_033 = np.power(self.n_residues, 0.33)
-        N_060 = np.power(self.n_residues, 0.60)
-        
-        Rg_over_Rh = ((alpha1*(rg - alpha2*N_033)) / (N_060 - N_033)) + alpha3
-
-        return (1/Rg_over_Rh)*rg
+        return ctpolymer.get_hydrodynamic_radius(rg, self.n_residues, alpha1, alpha2, alpha3)
 
 
     # ........................................................................
@@ -2931,7 +3738,7 @@ class CTProtein:
     # ........................................................................
     #
     #    
-    def get_internal_scaling(self, R1=None, R2=None, mode='COM', mean_vals=False, correctOffset=True, stride=1, weights=False, verbose=True):
+    def get_internal_scaling(self, R1=None, R2=None, mode='COM', mean_vals=False, correctOffset=True, stride=1, weights=False, verbose=False, progress=None, cancel_token=None):
         """
         Calculates the raw internal scaling info for the protein in the simulation.
         R1 and R2 define a sub-region to operate over if sub-regional analysis is
@@ -3028,27 +3835,36 @@ class CTProtein:
 
 
         weights [list or array of floats] {False}
-        Defines the frame-specific weights if re-weighted analysis is required. This can be 
+        Defines the frame-specific weights if re-weighted analysis is required. This can be
         useful if an ensemble has been re-weighted to better match experimental data, or in
-        the case of analysing replica exchange data that is re-combined using T-WHAM.
-
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        the case of analysing replica exchange data that is re-combined using T-WHAM. If
+        not provided, weights set via `set_weights()` are used (if any). Weights are applied
+        exactly when mean_vals is True. When mean_vals is False the returned distances are the
+        raw (unweighted) per-frame distances, ordered pair-by-pair, such that the weight for
+        each element is given by repeating the per-frame weights once per pair.
+
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
-        
-        """
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
 
-        if weights is not False:
-            if int(stride) != 1:
-                raise CTException("For get_scaling_exponent with weights stride MUST be set to 1. If this is a HUGE deal for you please contact alex and he'll try and update the code to accomodate this, but for now we suggest creating a sub-sampled trajectory and loading that")
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
 
-        # check weights are correct
-        weights = self.__check_weights(weights, stride)
+
+        """
 
         # check stride is ok
         self.__check_stride(stride)
 
+        # check weights are correct
+        weights = self.__check_weights(weights, stride)
+
         # check mode is OK
         ctutils.validate_keyword_option(mode, ['CA', 'COM'], 'mode')
 
@@ -3071,8 +3887,10 @@ class CTProtein:
         seq_sep_distances = []
         seq_sep_vals = []
 
+        # one step per residue pair, each of which processes every stride-th frame
+        tracker = ctprogress.Progress('get_internal_scaling', max_seq_sep*(max_seq_sep+1)//2, len(range(0, self.n_frames, stride)), progress or verbose, cancel_token)
+
         for seq_sep in range(0, max_seq_sep):
-            ctio.status_message("Internal Scaling - on sequence separation %i of %i" %(seq_sep, max_seq_sep-1), verbose)
 
             tmp = []
             seq_sep_vals.append(seq_sep)
@@ -3090,16 +3908,15 @@ class CTProtein:
                 elif mode == 'COM':
                     distance = self.get_inter_residue_COM_distance(A, B, stride=stride, correctOffset=False)
 
-                # if weights were provided subsample from the set of distances using the weights vector
-                if weights is not False:
-                    distance = choice(distance, len(distance), p=weights)
-
                 tmp = np.concatenate((tmp,distance))
                 
             seq_sep_distances.append(tmp)
+            tracker.update(max_seq_sep-seq_sep)
+
+        tracker.close()
 
         if mean_vals:
-            mean_is = [np.mean(i) for i in seq_sep_distances]
+            mean_is = [self.__weighted_mean_and_std(i, self.__tile_weights(weights, i))[0] for i in seq_sep_distances]
             return (seq_sep_vals, mean_is)
         else:
             return (seq_sep_vals, seq_sep_distances)
@@ -3109,7 +3926,7 @@ class CTProtein:
     # ........................................................................
     #
     #    
-    def get_internal_scaling_RMS(self, R1=None, R2=None, mode='COM', stride=1, correctOffset=True, weights=False, verbose=True):
+    def get_internal_scaling_RMS(self, R1=None, R2=None, mode='COM', stride=1, correctOffset=True, weights=False, verbose=False, progress=None, cancel_token=None):
         """
         If :math:`r_{i,j} = \langle \langle \sum \sigma_{1}` equals :math:`\sigma_{2}` then etc, etc.
 
@@ -3198,24 +4015,34 @@ class CTProtein:
         useful if an ensemble has been re-weighted to better match experimental data, or in
         the case of analysing replica exchange data that is re-combined using T-WHAM.
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
+
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
         
         """
         
         # compute the non RMS internal scaling behaviour 
-        (seq_sep_vals, seq_sep_distances) = self.get_internal_scaling(R1=R1, R2=R2, mode=mode, stride=stride, correctOffset=correctOffset, weights=weights, verbose=verbose)
+        (seq_sep_vals, seq_sep_distances) = self.get_internal_scaling(R1=R1, R2=R2, mode=mode, stride=stride, correctOffset=correctOffset, weights=weights, verbose=verbose, progress=progress, cancel_token=cancel_token)
         
-        # calculate RMS for each distance 
-        mean_is = [np.sqrt(np.mean(i*i)) for i in seq_sep_distances]
+        # calculate (weighted) RMS for each distance 
+        weights = self.__check_weights(weights, stride)
+        mean_is = [np.sqrt(self.__weighted_mean_and_std(i*i, self.__tile_weights(weights, i))[0]) for i in seq_sep_distances]
 
         return (seq_sep_vals, mean_is)
 
 
     # ........................................................................
     #
-    def get_scaling_exponent(self, inter_residue_min=15, end_effect=5, correctOffset=True,  subdivision_batch_size=20, mode='COM', num_fitting_points=40, fraction_of_points=0.5, fraction_override=False, stride=1, weights=False, verbose=True):
+    def get_scaling_exponent(self, inter_residue_min=15, end_effect=5, correctOffset=True, block_size=None, mode='COM', num_fitting_points=40, fraction_of_points=0.5, fraction_override=False, stride=1, weights=False, n_bootstrap=1000, confidence=95, seed=None, verbose=False, progress=None, cancel_token=None):
         """
         Estimation for the A0 and nu exponents for the standard polymer relationship
 
@@ -3230,13 +4057,13 @@ class CTProtein:
 
         1 - best A0
 
-        2 - minimum nu identified in bootstrap fitting
+        2 - lower bound of the bootstrap confidence interval for nu
 
-        3 - maximum nu identified in bootstrap fitting
+        3 - upper bound of the bootstrap confidence interval for nu
 
-        4 - minimum A0 identified in bootstrap fitting
+        4 - lower bound of the bootstrap confidence interval for A0
 
-        5 - maximum A0 identified in bootstrap fitting
+        5 - upper bound of the bootstrap confidence interval for A0
 
         6 - reduced chi^2 for the fit region
 
@@ -3260,6 +4087,10 @@ class CTProtein:
               assement of how your chain actually deviates from homopolymer behaviour, see the function
               get_polymer_scaled_distance_map()
 
+        The error in nu and A0 is estimated with a block bootstrap over frames (see `ctuncertainty`): 
+        the per-frame internal scaling profiles are resampled in blocks of correlated frames, and the
+        polymer model is refit to every bootstrap replicate of the profile. 
+
         ........................................
         OPTIONS 
         ........................................
@@ -3279,6 +4110,11 @@ class CTProtein:
         may have already performed the correction and so don't
         need to perform it again.
 
+        block_size [int or None] {None}
+        Number of frames per block used for the bootstrap error estimate. If None this is 
+        selected from the autocorrelation of the per-frame internal scaling profile. With fewer
+        than 10 frames each frame is its own block.
+
         mode [string, either 'COM' or 'CA'] {'COM'}
         Defines the mode in which the internal scaling profile is calculated, can use either
         COM (center of mass) of each residue or the CA carbon of each residue. COM is more
@@ -3310,18 +4146,33 @@ class CTProtein:
         useful if an ensemble has been re-weighted to better match experimental data, or in
         the case of analysing replica exchange data that is re-combined using T-WHAM.
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        n_bootstrap [int] {1000}
+        Number of bootstrap replicates used to estimate the error in nu and A0.
+
+        confidence [float] {95}
+        Width (in percent) of the confidence interval reported for nu and A0.
+
+        seed [int or None] {None}
+        Seed used for the bootstrap random number generator, allowing reproducible error bounds.
+
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the internal scaling calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
 
 
         
         """
         
-        # check weights are OK
-        weights = self.__check_weights(weights, stride)
-
         # check mode is OK
         ctutils.validate_keyword_option(mode, ['CA', 'COM'], 'mode')
 
@@ -3330,50 +4181,25 @@ class CTProtein:
         last= self.resid_with_CA[-1]
         max_separation = (last-first)+1
 
-        #  if we're not using fraction override check the number of points requested makes sense given sequence length
-        if not fraction_override and (max_separation - (end_effect+inter_residue_min)) < num_fitting_points:
-            fraction_of_points=1.0
-            ctio.warning_message("For scaling exponent calculation, sequence not long enough to use %i points (only %i valid positions once end effects and low |i-j| are accounted for), switching to using the fraction of points mode (will use %i points instead)" % (num_fitting_points, (max_separation - (end_effect+inter_residue_min)), int(fraction_of_points*(max_separation - (end_effect+inter_residue_min)))))
-            
-            fraction_override = True
-            
-        if fraction_override:
-            if fraction_of_points > 1.0:
-                raise CTException("Using fraction_overide to define the number of points to fit in the linear loglog analysis, but requested over 1.0 fraction (fraction_of_points must lie between >=0 and 1.0")
-            # again note int to round down here
-            num_fitting_points = int(fraction_of_points*(max_separation - (end_effect+inter_residue_min)))
-            if num_fitting_points < 3:
-                raise CTException("Less than three points - cannot fit a straight line")
-            if num_fitting_points < 10:
-                ctio.warning_message("Warning: Scaling fit has only %i points - likely finite size effects!" % (num_fitting_points))
-
+        num_fitting_points = ctpolymer.get_num_scaling_fitting_points(max_separation, inter_residue_min, end_effect, num_fitting_points, fraction_of_points, fraction_override)
 
         # check weights make sense...
         weights = self.__check_weights(weights, stride)
 
-        # check that the number of points being used makes sense..        
-
-        # This section determines the number of subdivisions performed for error 
-        # bootstrapping. If we have fewer frames than we can divide the data into
-        # then we just use each frame individually (although now error bootstrapping
-        # is probably meaningless!
-        # note integer math used here to round down - also set 
-        if int(self.n_frames/stride) < int(subdivision_batch_size):        
-            num_subdivisions_for_error = int(self.n_frames/stride)
-        else:
-            num_subdivisions_for_error = int(int(self.n_frames/stride) / subdivision_batch_size)
-                
         seq_sep_vals             = []
         seq_sep_RMS_distance     = []
         seq_sep_RMS_var_distance     = []
         seq_sep_RSTDS_distance   = []
-        seq_sep_subsampled_distances  = []
+
+        # per-frame mean squared distance at each sequence separation, used for the error estimate
+        per_frame_mean_sq        = []
         
+        n_selected = len(range(0, self.n_frames, stride))
+        tracker = ctprogress.Progress('get_scaling_exponent', max_separation-1, n_selected, progress or verbose, cancel_token)
+
         # for each possible sequence separation  (|i-j| value)
         for seq_sep in range(1, max_separation):
 
-            ctio.status_message("Internal Scaling - on sequence separation %i of %i" %(seq_sep, max_separation), verbose)
-
             tmp = []
             seq_sep_vals.append(seq_sep)
 
@@ -3391,125 +4217,83 @@ class CTProtein:
                 elif mode == 'COM':
                     distance = self.get_inter_residue_COM_distance(A, B, stride=stride, correctOffset=False)
 
-                # compute the ensemble average of the distances
-                if weights is not False:
-                    distance = choice(distance, len(distance), p=weights)
-
                 tmp.extend(distance)
             
             tmp = np.array(tmp)
+
+            # each pair contributes one distance per frame, so the per-distance weights are
+            # the frame weights repeated for each pair
+            tmp_weights = self.__tile_weights(weights, tmp)
             
-            # add mean and std vals for this sequence sep            
-            seq_sep_RMS_distance.append(np.sqrt(np.mean(tmp*tmp)))
-            seq_sep_RSTDS_distance.append(np.sqrt(np.std(tmp*tmp)))
-            seq_sep_RMS_var_distance.append(np.sqrt(np.power(np.var(tmp),2)))
-
-            if num_subdivisions_for_error > 0:
-
-                # note we cast this to an int to ensure subdivision_size is always
-                # the value added to RMS_local_append is always the same, because
-                # len(tmp) will vary with sequence separation. Basically this means
-                # we take ALL the data and subidivided it into num_subdivisions_for_error
-                # chunks and then use this for error calculations
-                subdivision_size = int(len(tmp)/num_subdivisions_for_error)
-
-                # get shuffled indices
-                idx = np.random.permutation(list(range(0,len(tmp))))
-            
-                # split shuffled indices into $num_subdivisions_for_error sized chunks
-                
-                subdivided_idx = cttools.chunks(idx, subdivision_size)
-                        
-                # finally subselect each of the randomly selected indicies 
-                RMS_local   = []
-            
-                for idx_set in subdivided_idx:
-                    
-                    # subselect a random set of distances and compute RMS
-                    RMS_local.append(np.sqrt(np.mean(tmp[idx_set]*tmp[idx_set])))
-            
-                # add distribution of values for this sequence sep
-                seq_sep_subsampled_distances.append(RMS_local)
-
-        # now sub-select the bit of the curve we actually want for the separation, distance, and distance variance data
-        # note we are RE DEFINING these three variables here
-        seq_sep_vals = seq_sep_vals[inter_residue_min:-end_effect]
-        seq_sep_RMS_distance = seq_sep_RMS_distance[inter_residue_min:-end_effect]
-        seq_sep_RMS_var_distance = seq_sep_RMS_var_distance[inter_residue_min:-end_effect]
-                
-        ## next find indices for evenly spaced points in logspace. This whole sectino
-        # leads to the identification of the indices in logspaced_idx, which are the
-        # list indices that will given evenly spaced points when plotted in log space 
-        y_data = np.log(seq_sep_vals)
-        y_data_offset = y_data - y_data[0]
-        interval = y_data_offset[-1]/num_fitting_points
-        integer_vals = y_data_offset/interval
-        
-        logspaced_idx = []
-        for i in range(0,num_fitting_points):
-            [local_ix,_] = cttools.find_nearest(integer_vals, i) 
-            if local_ix in logspaced_idx:
-                continue
-            else:
-                logspaced_idx.append(local_ix)
+            # add (weighted) mean and std vals for this sequence sep            
+            (mean_sq, std_sq) = self.__weighted_mean_and_std(tmp*tmp, tmp_weights)
+            std_tmp = self.__weighted_mean_and_std(tmp, tmp_weights)[1]
 
-        # finally using those evenly-spaced log indices we extract out new lists
-        # that have values which will be evenly spaced in logspace. Cool.
-        fitting_separation = [seq_sep_vals[i] for i in logspaced_idx]
-        fitting_distances  = [seq_sep_RMS_distance[i] for i in logspaced_idx]
-        fitting_variance   = [seq_sep_RMS_var_distance[i] for i in logspaced_idx]
+            seq_sep_RMS_distance.append(np.sqrt(mean_sq))
+            seq_sep_RSTDS_distance.append(np.sqrt(std_sq))
+            seq_sep_RMS_var_distance.append(np.power(std_tmp,2))
 
-        # fit to a log/log model and extract params
-        out = np.polyfit(np.log(fitting_separation), np.log(fitting_distances), 1)
-        nu_best = out[0]
-        R0_best = np.exp(out[1])
+            # every pair has the same number of frames, so the (weighted) mean over frames of the 
+            # per-frame mean is the same as the pooled mean above
+            per_frame_mean_sq.append(np.mean(np.reshape(tmp*tmp, (-1, n_selected)), axis=0))
 
-        ## >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-        ### next calculated reduced chi-squared
-        n_points = len(fitting_distances)
-        chi2=0
-        for i in range(0, n_points):
-            chi2 = chi2 + (np.power(np.log(fitting_distances[i]) - nu_best*np.log(fitting_separation[i])+R0_best,2))/fitting_variance[i]
+            tracker.update()
 
-        # finally calculated reduced chi squared correcting for 2 model parameters
-        reduced_chi_squared_fitting = chi2 / (n_points-2)
+        tracker.close()
 
+        # block bootstrap over frames of the whole internal scaling profile
+        (seq_sep_subsampled_distances, n_replicates) = ctpolymer.get_scaling_bootstrap_profiles(np.transpose(per_frame_mean_sq), block_size=block_size, n_bootstrap=n_bootstrap, weights=weights, seed=seed)
 
-        full_n_points = len(seq_sep_vals)
+        # finally fit the polymer model to the internal scaling profile and each bootstrap replicate
+        return ctpolymer.fit_scaling_exponent(seq_sep_vals, seq_sep_RMS_distance, seq_sep_RMS_var_distance, seq_sep_subsampled_distances, n_replicates, inter_residue_min, end_effect, num_fitting_points, confidence=confidence)
+
+
+    # ........................................................................
+    #
+    #
+    def coarse_grain(self, mode='COM', stride=1, filename=None, chunk_size=None):
+        """
+        Returns a coarse-grained (residue-bead) view of the protein, in which every residue
+        with a CA atom is represented by a single bead. The bead trajectory is a
+        [n_frames x n_residues x 3] float32 array, and provides the residue-level polymer
+        analyses (distance maps, internal scaling, scaling exponent, end-to-end distance,
+        local collapse and local-to-global correlation) on an array 10-20x smaller than the
+        full-atom trajectory. See `ctcoarsegrain` for details.
+
+        Parameters
+        ----------
+        mode : str {'COM'}
+            Bead definition, one of
+            - 'CA' = alpha carbon.
+            - 'COM' = center of mass of the residue.
+            - 'sidechain-centroid' = centroid of the side chain heavy atoms (CA for glycine).
 
-        chi2=0
-        for i in range(0, full_n_points):
-            chi2 = chi2 + (np.power(np.log(seq_sep_RMS_distance[i]) - nu_best*np.log(seq_sep_vals[i])+R0_best,2))/seq_sep_RMS_var_distance[i]
+        stride : int {1}
+            Only every stride-th frame is coarse-grained.
 
-        # finally calculated reduced chi squared correcting for 2 model parameters
-        reduced_chi_squared_all = chi2 / (full_n_points-2)
+        filename : str or None {None}
+            If provided the bead trajectory is also saved to this file, from which it can be
+            re-loaded with `ctcoarsegrain.load()`.
 
+        chunk_size : int or None {None}
+            Number of frames processed at once (by default chosen from the resource policy,
+            see `camparitraj.set_resources()`).
 
-            
-        ## >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-        ### Finally run the subselection protocol to subsampled
+        Returns
+        -------
+        ctcoarsegrain.CTResidueBeads
+            Bead trajectory. Frame weights set with `set_weights()` are carried over.
 
-        subselected = np.array(seq_sep_subsampled_distances).transpose()
-        
-        nu_sub = []
-        R0_sub = []
-        for i in range(0, num_subdivisions_for_error):
-             
-            local_distances = subselected[i][inter_residue_min:-end_effect]
- 
-            OF = np.polyfit(np.log(fitting_separation), np.log([local_distances[i] for i in logspaced_idx]), 1)
- 
-            nu_sub.append(OF[0])
-            R0_sub.append(np.exp(OF[1]))
- 
-        if num_subdivisions_for_error < 1:
-            nu_sub.append(np.nan)
-            R0_sub.append(np.nan)
+        """
 
+        self.__check_stride(stride)
 
-        return [nu_best, R0_best, min(nu_sub), max(nu_sub), min(R0_sub), max(R0_sub),  reduced_chi_squared_fitting, reduced_chi_squared_all, np.vstack((np.array(fitting_separation),np.array(fitting_distances))), np.vstack((seq_sep_vals, seq_sep_RMS_distance, cttools.powermodel(seq_sep_vals, nu_best, R0_best)))]
+        beads = ctcoarsegrain.build_beads(self, mode=mode, stride=stride, chunk_size=chunk_size)
 
+        if filename is not None:
+            beads.save(filename)
 
+        return beads
 
 
     # ........................................................................
@@ -3968,7 +4752,7 @@ class CTProtein:
         
         # select and compute the relevant angles of the subtrajectroy
         fx = selector[angle_name]
-        angles = fx(self.traj[0::stride])
+        angles = fx(self.__get_subtrajectory(self.traj, stride))
                             
         # construct empty matrices
         SIZE = len(angles[0])
@@ -3992,7 +4776,7 @@ class CTProtein:
     # ........................................................................
     #
     #
-    def get_local_to_global_correlation(self, mode='COM', n_cycles=100, max_num_pairs=10, stride=20, weights=False, verbose=True):
+    def get_local_to_global_correlation(self, mode='COM', n_cycles=100, max_num_pairs=10, stride=20, weights=False, verbose=False, progress=None, cancel_token=None):
         """
         Method to analyze how well ensemble average distances taken from a finite number of inter-residue 
         distances correlate with global dimensions as measured by the radius of gyration. This is a new
@@ -4030,10 +4814,19 @@ class CTProtein:
         weights : bool {False}
             Flag that indicates if frame weights should be used or not.
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
         Returns
         -------
         tuple
@@ -4074,9 +4867,13 @@ class CTProtein:
     
         FIRST_CHECK = True
 
+        pair_selection_vector = np.arange(1,max_num_pairs,1)
+
+        # one step per sequence separation (distance calculations) and per number of selected pairs (correlations)
+        tracker = ctprogress.Progress('get_local_to_global_correlation', (self.n_residues-1) + len(pair_selection_vector), len(range(0, self.n_frames, stride)), progress or verbose, cancel_token)
+
         # start with a sequence separation of 1
         for seq_sep in range(1, self.n_residues):
-            ctio.status_message("On sequence separation %i" % (seq_sep), verbose) 
 
             for pos in range(start, end - seq_sep):
 
@@ -4098,6 +4895,8 @@ class CTProtein:
                 else:
                     all_distances = np.vstack((all_distances, distance))
 
+            tracker.update()
+
                     
         full_rg = self.get_radius_of_gyration()
         stride_rg = full_rg[0::stride]
@@ -4108,8 +4907,6 @@ class CTProtein:
         # total number of distance pairs
         n_pairs = len(all_distances)
 
-        pair_selection_vector = np.arange(1,max_num_pairs,1)
-        
         return_data = np.zeros((len(pair_selection_vector)*n_cycles,2))
 
         weights = False
@@ -4117,7 +4914,6 @@ class CTProtein:
 
         idx=0
         for n_selected in pair_selection_vector:
-            ctio.status_message("On %i pairs selected" % n_selected, verbose)
             for i in range(0,n_cycles):
 
                 # select n_select different values between 0 and n_pairs
@@ -4155,6 +4951,10 @@ class CTProtein:
                 return_data[idx] = [n_selected, c]
                 idx=idx+1
 
+            tracker.update()
+
+        tracker.close()
+
         # leaving this here incase we want to re-introduce the 2D histogram information in later versions...
         # np.histogram2d(np.transpose(return_data)[0],np.transpose(return_data)[1], bins=[np.arange(1,n_pairs), np.arange(0,1,0.01)]))
                             
@@ -4277,6 +5077,86 @@ class CTProtein:
         return np.array((reslist, H_vector, E_vector, C_vector))
 
 
+    # ........................................................................
+    #
+    def get_secondary_structure_DSSP_uncertainty(self, R1=None, R2=None, correctOffset=True, method='bootstrap', block_size=None, n_bootstrap=1000, confidence=95, weights=False, seed=None):
+        """
+        Function that computes the per-residue DSSP secondary structure fractions (as 
+        `get_secondary_structure_DSSP`) along with error bars for every fraction. DSSP is computed
+        once and the per-frame assignments are passed to the `ctuncertainty` module, and block sizes
+        account for the correlation between frames.
+
+        Parameters
+        ----------
+
+        R1 : int {None}
+             Defines the value for first residue in the region of interest. If not provided 
+             then first residue is used.
+
+        R2 : int {None}
+             Defines the value for last residue in the region of interest. If not provided 
+             then last residue is used.
+
+        correctOffset : Bool {True}
+             Defines if we perform local protein offset correction or not.
+
+        method : str {'bootstrap'}
+            String, must be one of either 'bootstrap' or 'block'.
+            - 'bootstrap' = block bootstrap; returns standard error and a confidence interval.
+            - 'block' = block averaging; returns the standard error only.
+
+        block_size : int or None {None}
+            Number of frames per block. If None this is selected automatically from the
+            autocorrelation of the secondary structure assignments.
+
+        n_bootstrap : int {1000}
+            Number of bootstrap replicates (only used if method = 'bootstrap').
+
+        confidence : float {95}
+            Width of the confidence interval in percent (only used if method = 'bootstrap').
+
+        weights : list or array of floats {False}
+            Defines the frame-specific weights if re-weighted analysis is required.
+
+        seed : int or None {None}
+            Seed used for the bootstrap random number generator.
+
+        Returns
+        -------
+        tuple
+            A 5-tuple containing:
+            - [0] := The 4xn DSSP array (same as `get_secondary_structure_DSSP()`).
+            - [1] := 4xn array with the residue index and the standard error of the H, E and C fractions.
+            - [2] := 4xn array with the residue index and the lower confidence bounds (None if method = 'block').
+            - [3] := 4xn array with the residue index and the upper confidence bounds (None if method = 'block').
+            - [4] := The block size used (int).
+        """
+
+        ctutils.validate_keyword_option(method, ['bootstrap', 'block'], 'method')
+
+        weights = self.__check_weights(weights)
+
+        # build R1/R2 values
+        out = self.__get_first_and_last(R1, R2, withCA=True)
+        reslist = list(range(out[0], out[1]+1))
+
+        dssp_data = md.compute_dssp(self.traj.atom_slice(self.topology.select('%s' % out[2])))
+
+        # [N_FRAMES x 3 x N_RES] indicator of each state, in the H, E, C order used by get_secondary_structure_DSSP
+        per_frame = np.stack([1.0*(dssp_data == state) for state in ['H', 'E', 'C']], axis=1)
+
+        results = self.__frame_uncertainty(per_frame, method, block_size, n_bootstrap, confidence, weights, seed)
+
+        return_vectors = []
+        for values in results[0:4]:
+            if values is None:
+                return_vectors.append(None)
+            else:
+                return_vectors.append(np.vstack((reslist, values)))
+
+        return (return_vectors[0], return_vectors[1], return_vectors[2], return_vectors[3], results[4])
+
+
     # ........................................................................
     #
     #
@@ -4397,6 +5277,9 @@ class CTProtein:
              definition.
         """
 
+        # the BBSEG2 table is only loaded the first time it is needed
+        from ._internal_data import BBSEG2
+
         classes = []
 
         for i in range(len(phi_vector)):
@@ -4419,6 +5302,123 @@ class CTProtein:
         return classes
 
             
+    # ........................................................................
+    #
+    def get_secondary_chemical_shifts(self, temperature=25, pH=7.4, use_ggxgg=True, surface=None, stride=1, weights=False, return_per_frame=False):
+        """
+        Returns ensemble-averaged backbone chemical shifts back-calculated directly from the
+        trajectory, along with the secondary chemical shifts (the deviation from the sequence-based
+        random coil shifts).
+
+        For every frame the phi/psi angles of each residue are mapped onto an empirical secondary
+        shift surface (see ``ctnmr.build_secondary_shift_surface()``), and the resulting secondary
+        shifts are ensemble-averaged (optionally with weights) and added to the random coil shifts
+        from ``ctnmr.compute_random_coil_chemical_shifts()``. The per-frame shifts are never
+        explicitly built (unless requested), so this scales to very large ensembles.
+
+        Residues without both a phi and a psi angle (i.e. uncapped termini) and shifts that are not
+        defined (CB of Gly, N and HN of Pro) are returned as NaN. Capping residues are ignored.
+
+        Parameters
+        ----------
+        temperature : float or int {25}
+            Temperature (in degrees celcius) used for the random coil shifts.
+
+        pH : float or int {7.4}
+            pH used for the random coil shifts.
+
+        use_ggxgg : bool {True}
+            Whether to use GGXGG-based neighbor correction for glycines in the random coil shifts.
+
+        surface : np.ndarray {None}
+            Secondary shift surface of shape (n_bins, n_bins, 6). If not provided the default
+            surface from ``ctnmr.build_secondary_shift_surface()`` is used.
+
+        stride : int {1}
+            Defines the spacing between frames used in the analysis.
+
+        weights : list or array of floats {False}
+            Defines the frame-specific weights if re-weighted analysis is required. This can be
+            useful if an ensemble has been re-weighted to better match experimental data, or in
+            the case of analysing replica exchange data that is re-combined using T-WHAM.
+
+        return_per_frame : bool {False}
+            If True the per-frame shifts are also returned (note this requires an array of size
+            n_frames x n_residues x 6).
+
+        Returns
+        -------
+        dict
+            Dictionary with the following key-value pairs (all shift arrays have one column per
+            nucleus in the order CA, CB, CO, N, HN, HA, as given by ``ctnmr.NUCLEI``):
+
+            * ``residues`` - residue indices of the n residues shifts are reported for.
+
+            * ``random_coil`` - (n x 6) sequence-based random coil shifts.
+
+            * ``ensemble`` - (n x 6) ensemble averaged shifts.
+
+            * ``secondary`` - (n x 6) secondary shifts (ensemble - random coil).
+
+            * ``per_frame`` - (n_frames x n x 6) per-frame shifts (only if return_per_frame=True).
+
+        """
+
+        self.__check_stride(stride)
+        weights = self.__check_weights(weights, stride)
+
+        # residues shifts are predicted for (capping groups are skipped)
+        residues = []
+        sequence = []
+        for residue in self.topology.residues:
+            name = residue.name[0:3].upper()
+            if name in ['ACE', 'NME', 'NAC']:
+                continue
+            residues.append(residue.index)
+            if name in THREE_TO_ONE:
+                sequence.append(THREE_TO_ONE[name])
+            else:
+                sequence.append('(%s)' % (name))
+
+        random_coil = ctnmr.compute_random_coil_chemical_shifts_batch("".join(sequence), temperature=temperature, pH=pH, use_ggxgg=use_ggxgg)
+        if len(random_coil) != len(residues):
+            raise CTException('Random coil chemical shifts are not available for all residues in %s' % (str(sequence)))
+
+        random_coil = np.array([random_coil[nucleus] for nucleus in ctnmr.NUCLEI]).transpose()
+
+        # compute phi/psi for every frame and match them to the residues
+        traj = self.__get_subtrajectory(self.traj, stride)
+        (phi_idx, phi) = md.compute_phi(traj)
+        (psi_idx, psi) = md.compute_psi(traj)
+
+        phi_column = {self.topology.atom(atoms[2]).residue.index: i for (i, atoms) in enumerate(phi_idx)}
+        psi_column = {self.topology.atom(atoms[1]).residue.index: i for (i, atoms) in enumerate(psi_idx)}
+
+        defined = [i for (i, resid) in enumerate(residues) if resid in phi_column and resid in psi_column]
+        phi = np.degrees(phi[:, [phi_column[residues[i]] for i in defined]])
+        psi = np.degrees(psi[:, [psi_column[residues[i]] for i in defined]])
+
+        if weights is False:
+            weights = None
+
+        secondary = np.full(random_coil.shape, np.nan)
+        secondary[defined] = ctnmr.compute_secondary_shifts_from_dihedrals(phi, psi, surface=surface, weights=weights)
+
+        ensemble = random_coil + secondary
+
+        return_data = {'residues': np.array(residues),
+                       'random_coil': random_coil,
+                       'ensemble': ensemble,
+                       'secondary': ensemble - random_coil}
+
+        if return_per_frame:
+            per_frame = np.full((traj.n_frames,) + random_coil.shape, np.nan)
+            per_frame[:, defined] = random_coil[defined] + ctnmr.compute_secondary_shifts_from_dihedrals(phi, psi, surface=surface, per_frame=True)
+            return_data['per_frame'] = per_frame
+
+        return return_data
+
+
     # ........................................................................
     #
     def get_overlap_concentration(self):
@@ -4443,12 +5443,22 @@ class CTProtein:
     # ........................................................................
     #
     #
-    def get_angle_decay(self, atom1='C', atom2='N', return_full_matrix=False):
+    def get_angle_decay(self, atom1='C', atom2='N', return_full_matrix=False, chunk_size=None):
                     
         """
-        Returns the a 4 by n numpy array in which column 1 gives residue number, column 2 is local helicity,  
+        Returns the orientational decay of a per-residue bond vector (by default the C->N
+        vector) as a function of sequence separation. For each pair of residues (i, j) the
+        mean value of cos(theta) between the two bond vectors is computed over all frames,
+        and these pairwise values are then averaged over all pairs with the same |i-j|
+        separation. This is the quantity typically used to estimate a persistence length.
+
+        All bond vectors are gathered into a single [n_frames x n_residues x 3] array of unit
+        vectors, such that the full set of pairwise <cos(theta)> values is obtained from
+        a single matrix product per chunk of frames, and the decay is then computed by
+        reducing along the diagonals of the resulting matrix.
 
-        No checking of atom1 and atom2...
+        No checking of atom1 and atom2 beyond ensuring that both atoms are found in every
+        CA-containing residue.
 
         Parameters
         ----------
@@ -4462,78 +5472,81 @@ class CTProtein:
         return_full_matrix: bool {False}
             Whether or not to return the full matrix along with the angle decay calculation.
 
+        chunk_size: int or None {None}
+            If provided, frames are processed in blocks of ``chunk_size`` frames, which bounds
+            the memory required for very long trajectories. By default all frames are processed
+            in a single block.
+
         Returns
         -------
         array_like, or 2-tuple
-            If `array_like`, the matrix returned is comprised of only the angle decay.
-            If a 2-tuple, both the angle decay matrix (index 0) and the full matrix is returned (index 1). 
-        """
+            If `array_like`, the matrix returned is comprised of only the angle decay, where each
+            element is a list of [sequence separation, mean <cos(theta)>, standard deviation].
+            If a 2-tuple, both the angle decay matrix (index 0) and the full [n x n] matrix of 
+            pairwise <cos(theta)> values is returned (index 1), where n is the number of residues 
+            with a CA atom.
 
-        # first compute all the C-N vector for each residue
+        Raises
+        ------
+        CTException
+            If one of the atoms could not be found in one of the residues, or if `chunk_size`
+            is less than 1.
+        """
 
-        CN_vectors = []
-        CN_lengths = [] 
+        if chunk_size is None:
+            chunk_size = self.n_frames
+        else:
+            chunk_size = int(chunk_size)
+            if chunk_size < 1:
+                raise CTException('chunk_size (%i) must be 1 or larger' % (chunk_size))
+
+        # build the atom index for the two atoms in each residue - this lets us
+        # pull out the full set of bond vectors with a single fancy-index operation
+        idx1 = []
+        idx2 = []
         for i in self.resid_with_CA:
+            a1 = self.__residue_atom_lookup(i, atom1)
+            a2 = self.__residue_atom_lookup(i, atom2)
 
-            # this extracts the C->N vector for each frame for each residue
-            value = np.squeeze(self.traj.atom_slice(self.__residue_atom_lookup(i, atom1)).xyz) - np.squeeze(self.traj.atom_slice(self.__residue_atom_lookup(i, atom2)).xyz)
+            if len(a1) == 0 or len(a2) == 0:
+                raise CTException('Could not find atoms %s and %s in residue %i when computing the angle decay' % (atom1, atom2, i))
 
-            # CN_vectors becomes a list where each element is [3 x nframes] array where 3 is the x/y/z vector coordinates
-            CN_vectors.append(value)
+            idx1.append(a1[0])
+            idx2.append(a2[0])
 
-            # CN_lengths extracts the ||v|| length of each vector (should be basically the same)
-            CN_lengths.append(np.linalg.norm(value,axis=1))
+        idx1 = np.array(idx1)
+        idx2 = np.array(idx2)
+        
+        npos = len(idx1)
 
-        # calculate the number of residues for which we have C->N vectors 
-        npos = len(CN_vectors)
+        # running sum of the per-pair cos(theta) values over all frames
+        cos_sum = np.zeros((npos, npos))
+        
+        for start in range(0, self.n_frames, chunk_size):
+            xyz = self.traj.xyz[start:start+chunk_size]
 
-        # initialize an empty dictionary - the keys for this are i-j sequence separation, 
-        # and values are the cos(theta) angle between pairs of vectors
-        all_vals={}
-        for i in range(1, npos):
-            all_vals[i] = []
+            # [frames x npos x 3] array of unit bond vectors
+            vectors = xyz[:, idx1] - xyz[:, idx2]
+            vectors = vectors / np.linalg.norm(vectors, axis=2)[:, :, np.newaxis]
 
-        # precompute 
-        length_multiplier = {}
-        for i1 in range(0, npos-1):
-            length_multiplier[i1] = {}
-            for j1 in range(i1+1, npos):
-                length_multiplier[i1][j1] = CN_lengths[i1]*CN_lengths[j1]
-                        
-        # we then cycle over the non-redudant set of pairwise residues in the protein
-        for i1 in range(0, npos-1):
-            for j1 in range(i1+1, npos):
-
-                # for each frame calculate (u . v) / (||u|| * ||v||)
-                # where u and v are vectors and "." is the dot product between each pair. We're only calculating PAIR-WISE dot product
-                # of each [x,y,z] with [x,y,z] vector, so doing np.sum(Matrix*matrix) is SO SO SO much faster than anything else. We 
-                # also take the average to avoid storing a ton of numbers and generating these giant vectors
-                    
-                all_vals[j1-i1].append(np.mean(np.sum(CN_vectors[i1]*CN_vectors[j1],axis=1)/length_multiplier[i1][j1]))
+            # lay the frames out side by side so that a single [npos x 3F] x [3F x npos] product
+            # gives the sum over frames of every pairwise dot product
+            flat = np.transpose(vectors, (1, 0, 2)).reshape(npos, -1).astype(np.float64)
+            cos_sum = cos_sum + np.matmul(flat, flat.T)
+
+        full_matrix = cos_sum / self.n_frames
 
+        # the mean and standard deviation over all pairs with the same sequence separation
+        # is just a reduction over each of the off-diagonals
         return_matrix = []
         return_matrix.append([0,1.0,0.0])
-        for k in all_vals:
-            return_matrix.append([k, np.mean(all_vals[k]), np.std(all_vals[k])])
+        for k in range(1, npos):
+            diag = np.diagonal(full_matrix, offset=k)
+            return_matrix.append([k, np.mean(diag), np.std(diag)])
              
         # if we want the nres by nres matrix with specific decay <cos(omega)> for each specific pairwise
         # residue-residue set
         if return_full_matrix:
-
-            full_matrix = np.zeros((len(return_matrix),len(return_matrix)))
-
-            # for 0 to the number of residues (i.e. each row in the [nres x nres] matrix
-            for i in range(0, len(return_matrix)):
-
-                # set the column selector (c) to zero
-                c = 0
-                # iterate through 
-                for j in range(0, len(all_vals[i])):
-                    full_matrix[i,c] = all_vals[i][j]
-
-                for j in range(len(all_vals[i]), len(return_matrix)):
-                    full_matrix[i,c] = 0.0
-
             return (return_matrix, full_matrix)
         else:
             return return_matrix
@@ -4543,7 +5556,7 @@ class CTProtein:
     #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
     #
     #
-    def get_local_collapse(self, window_size=10, bins=None, verbose=True):
+    def get_local_collapse(self, window_size=10, bins=None, verbose=False, progress=None, cancel_token=None):
         """        
 
 
@@ -4560,10 +5573,19 @@ class CTProtein:
         bins : np.arange or list
             A range of values (np.arange or list) spanning histogram bins. Default is np.arange(0, 10, 0.1).
 
-        verbose : bool
-            Flag that by default is True determines if the function prints status updates. This is relevant because
+        verbose : bool {False}
+            If True (and no `progress` callback is given) a console progress bar is shown. This is relevant because
             this function can be computationally expensive, so having some report on status can be comforting!
 
+        progress : callable, bool or None {None}
+            Progress callback, which is periodically passed a dictionary describing the progress, ETA
+            and throughput (frames/s) of the calculation. True selects the default console renderer.
+            See `ctprogress` for details.
+
+        cancel_token : ctprogress.CancellationToken or None {None}
+            If provided and cancelled (e.g. from another thread or from the progress callback) the
+            calculation stops and a `CTCancelledException` is raised.
+
 
         Returns
         -------
@@ -4607,9 +5629,9 @@ class CTProtein:
         stdData  = []
         histo    = []                             
         
+        tracker = ctprogress.Progress('get_local_collapse', n_residues - (window_size - 1), n_frames, progress or verbose, cancel_token)
+
         for i in range(window_size - 1, n_residues):
-                    
-            ctutils.status_message("On range %i" % i, verbose)
 
             # get radius of gyration (now by default is in Angstroms
             # - in previous versions we performed a conversion here)
@@ -4622,6 +5644,9 @@ class CTProtein:
             meanData.append(np.mean(tmp))
             stdData.append(np.std(tmp))
 
+            tracker.update()
+
+        tracker.close()
 
         return (meanData, stdData, histo, bins)
 
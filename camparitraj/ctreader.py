@@ -0,0 +1,770 @@
+"""
+ctreader contains the functions used to decode trajectory files from disk. Frame ranges and strides
+are applied at decode time (i.e. by seeking to the first frame of interest and only decoding the
+frames that are requested), decoding can be split across multiple trajectory files and worker
+processes, and decoded frames are written directly into a single preallocated coordinate array.
+
+Seeking within an XTC file requires the byte offset of every frame, which mdtraj obtains by scanning
+the whole file. These offsets are saved to an index file next to the trajectory (<filename>.ctidx.npz)
+the first time they are needed, and are re-used by subsequent reads as long as the trajectory file's
+size and modification time are unchanged. This means the number of frames is available without
+decoding, and arbitrary frames can be read directly (see `read_frames`).
+
+Atoms can also be selected at decode time (see `select_atoms`), e.g. to read only the protein atoms
+of an explicit-solvent simulation. Excluded atoms (solvent, ions, hydrogens...) are then never
+copied into the coordinate array, so memory use scales with the number of selected atoms only.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import os
+import struct
+
+import mdtraj as md
+import numpy as np
+
+from . import configs
+from . import ctresources
+from .ctdata import ALL_VALID_RESIDUE_NAMES
+from .ctexceptions import CTException
+
+
+# formats where mdtraj provides random access (seek) and a strided read
+SEEKABLE_EXTENSIONS = ['.xtc', '.dcd', '.trr']
+
+# suffix and version of the frame-offset index files
+INDEX_SUFFIX = '.ctidx.npz'
+INDEX_VERSION = 1
+
+# named atom selections (see select_atoms)
+ATOM_SELECTIONS = ['all', 'protein', 'heavy', 'backbone+CB']
+
+# atoms kept by the 'backbone+CB' selection
+BACKBONE_CB_ATOM_NAMES = ['N', 'CA', 'C', 'O', 'CB']
+
+# magic number at the start of every XTC frame header
+XTC_MAGIC = 1995
+
+# topology used by worker processes - this is set once per worker process by
+# _init_worker() so the PDB file is parsed once per worker rather than once per read
+_WORKER_TOPOLOGY = None
+
+
+# ........................................................................
+#
+def _init_worker(pdb_filename, threads=None):
+    """
+    Worker process initializer which parses the shared topology once per process.
+
+    Parameters
+    ----------
+    pdb_filename : str
+        PDB file which defines the topology.
+
+    threads : int or None {None}
+        If provided, the number of BLAS threads this worker may use (such that the workers
+        together do not oversubscribe the cores).
+
+    """
+    global _WORKER_TOPOLOGY
+    if threads is not None:
+        ctresources.set_blas_threads(threads)
+    _WORKER_TOPOLOGY = md.load_topology(pdb_filename)
+
+
+# ........................................................................
+#
+def _read_block(trajectory_filename, first, n_frames, stride, topology=None, atom_indices=None):
+    """
+    Reads a contiguous block of (strided) frames from a single trajectory file.
+
+    Parameters
+    ----------
+    trajectory_filename : str
+        Trajectory file to read.
+
+    first : int
+        Index of the first frame (in the file) to read.
+
+    n_frames : int
+        Number of frames to return.
+
+    stride : int
+        Spacing between returned frames.
+
+    topology : mdtraj.Topology or None
+        Topology to use. If None the per-worker topology is used.
+
+    atom_indices : np.ndarray or None
+        If provided only these atoms are read (see `select_atoms`).
+
+    Returns
+    -------
+    tuple
+        A 4-tuple of (xyz, time, unitcell_lengths, unitcell_angles). xyz is in nanometers.
+
+    """
+
+    if topology is None:
+        topology = _WORKER_TOPOLOGY
+
+    extension = os.path.splitext(trajectory_filename)[1].lower()
+
+    if extension == '.xtc':
+        return __read_xtc_block(trajectory_filename, first, n_frames, stride, atom_indices)
+
+    if extension in SEEKABLE_EXTENSIONS:
+        with md.open(trajectory_filename) as fh:
+            fh.seek(first)
+            traj = fh.read_as_traj(topology, n_frames=n_frames, stride=stride, atom_indices=atom_indices)
+    else:
+        # formats without random access are read in full and then sliced
+        traj = md.load(trajectory_filename, top=topology, atom_indices=atom_indices)[first:first + n_frames*stride:stride]
+
+    if traj.n_frames != n_frames:
+        raise CTException('Expected to read %i frames from %s starting at frame %i but read %i' % (n_frames, trajectory_filename, first, traj.n_frames))
+
+    return (traj.xyz, traj.time, traj.unitcell_lengths, traj.unitcell_angles)
+
+
+# ........................................................................
+#
+def get_index_filename(trajectory_filename):
+    """
+    Returns the name of the frame-offset index file associated with a trajectory file.
+
+    Parameters
+    ----------
+    trajectory_filename : str
+        Trajectory file of interest.
+
+    Returns
+    -------
+    str
+        Index filename.
+
+    """
+    return trajectory_filename + INDEX_SUFFIX
+
+
+# ........................................................................
+#
+def get_frame_offsets(trajectory_filename, write_index=None):
+    """
+    Returns the byte offset of every frame in an XTC file. If a valid index file exists next to
+    the trajectory the offsets are read from it, otherwise the trajectory is scanned (without
+    decoding coordinates) and - if possible - an index file is written for next time.
+
+    An index file is only valid if the trajectory's size and modification time match the values
+    recorded when the index was written. Invalid or unreadable index files are rebuilt. If the
+    index cannot be written (e.g. a read-only directory) the offsets are still returned.
+
+    Parameters
+    ----------
+    trajectory_filename : str
+        XTC trajectory file of interest.
+
+    write_index : bool or None {None}
+        Whether to write an index file if one does not exist. If None the global setting
+        `configs.WRITE_INDEX_FILES` is used.
+
+    Returns
+    -------
+    np.ndarray
+        Array of byte offsets (one per frame).
+
+    Raises
+    ------
+    CTException
+        If the file is not an XTC file or could not be found.
+
+    """
+
+    if os.path.splitext(trajectory_filename)[1].lower() != '.xtc':
+        raise CTException('Frame-offset indices are only used for XTC files [%s]' % (trajectory_filename))
+
+    if not os.path.isfile(trajectory_filename):
+        raise CTException('Trajectory file [%s] could not be found' % (trajectory_filename))
+
+    if write_index is None:
+        write_index = configs.WRITE_INDEX_FILES
+
+    file_stat = os.stat(trajectory_filename)
+    index_filename = get_index_filename(trajectory_filename)
+
+    # try and use an existing index
+    if os.path.isfile(index_filename):
+        try:
+            with np.load(index_filename) as data:
+                if int(data['version']) == INDEX_VERSION and int(data['size']) == file_stat.st_size and int(data['mtime_ns']) == file_stat.st_mtime_ns:
+                    return np.array(data['offsets'], dtype=np.int64)
+        except (OSError, ValueError, KeyError, EOFError):
+            pass
+
+    # otherwise scan the file - this only reads frame headers
+    with md.formats.XTCTrajectoryFile(trajectory_filename) as fh:
+        offsets = np.array(fh.offsets, dtype=np.int64)
+
+    if write_index:
+
+        # write to a temporary file and then move it into place so concurrent readers
+        # (e.g. worker processes) never see a partially written index
+        tmp_filename = '%s.%i.tmp' % (index_filename, os.getpid())
+        try:
+            with open(tmp_filename, 'wb') as fh:
+                np.savez(fh, offsets=offsets, size=file_stat.st_size, mtime_ns=file_stat.st_mtime_ns, version=INDEX_VERSION)
+            os.replace(tmp_filename, index_filename)
+        except OSError:
+            if os.path.isfile(tmp_filename):
+                os.remove(tmp_filename)
+
+    return offsets
+
+
+# ........................................................................
+#
+def __read_xtc_block(trajectory_filename, first, n_frames, stride, atom_indices=None):
+    """
+    Internal function that reads a block of (strided) frames from an XTC file, using the frame
+    offsets from the index file so that the file never needs to be scanned. Contiguous blocks
+    are read in a single call, while for strided blocks we seek directly to each selected frame
+    so frames in between are never decoded. If atom_indices is provided only those atoms are
+    copied out of each decoded frame.
+
+    Returns
+    -------
+    tuple
+        A 4-tuple of (xyz, time, unitcell_lengths, unitcell_angles). xyz is in nanometers.
+
+    """
+
+    offsets = get_frame_offsets(trajectory_filename)
+
+    if first + (n_frames-1)*stride >= len(offsets):
+        raise CTException('Expected to read %i frames from %s starting at frame %i but the file only has %i frames' % (n_frames, trajectory_filename, first, len(offsets)))
+
+    with md.formats.XTCTrajectoryFile(trajectory_filename) as fh:
+        fh.offsets = offsets
+
+        if stride == 1:
+            fh.seek(first)
+            (xyz, time, step, box) = fh.read(n_frames=n_frames, atom_indices=atom_indices)
+        else:
+            xyz = None
+            for i in range(n_frames):
+                fh.seek(first + i*stride)
+                (f_xyz, f_time, f_step, f_box) = fh.read(n_frames=1, atom_indices=atom_indices)
+
+                if xyz is None:
+                    xyz = np.empty((n_frames,) + f_xyz.shape[1:], dtype=f_xyz.dtype)
+                    time = np.empty(n_frames, dtype=f_time.dtype)
+
+                    # files written without box vectors have no unit cell (box is None)
+                    if f_box is None:
+                        box = None
+                    else:
+                        box = np.empty((n_frames, 3, 3), dtype=f_box.dtype)
+
+                xyz[i] = f_xyz[0]
+                time[i] = f_time[0]
+                if box is not None and f_box is not None:
+                    box[i] = f_box[0]
+                else:
+                    box = None
+
+    if box is None or np.all(box == 0):
+        return (xyz, time, None, None)
+
+    (a, b, c, alpha, beta, gamma) = md.utils.box_vectors_to_lengths_and_angles(box[:, 0], box[:, 1], box[:, 2])
+
+    return (xyz, time, np.vstack((a, b, c)).T.astype(np.float32), np.vstack((alpha, beta, gamma)).T.astype(np.float32))
+
+
+# ........................................................................
+#
+def get_n_frames(trajectory_filename, topology=None):
+    """
+    Returns the number of frames in a trajectory file. For seekable formats this does
+    not decode any coordinates.
+
+    Parameters
+    ----------
+    trajectory_filename : str
+        Trajectory file of interest.
+
+    topology : mdtraj.Topology, str or None {None}
+        Topology, only needed for formats that do not support random access and do not
+        contain their own topology.
+
+    Returns
+    -------
+    int
+        Number of frames in the file.
+
+    """
+
+    extension = os.path.splitext(trajectory_filename)[1].lower()
+
+    if extension == '.xtc':
+        return len(get_frame_offsets(trajectory_filename))
+
+    if extension in SEEKABLE_EXTENSIONS:
+        with md.open(trajectory_filename) as fh:
+            return len(fh)
+
+    if topology is None:
+        return md.load(trajectory_filename).n_frames
+
+    return md.load(trajectory_filename, top=topology).n_frames
+
+
+# ........................................................................
+#
+def get_n_atoms(trajectory_filename):
+    """
+    Returns the number of atoms in a trajectory file. For XTC files this is read from the
+    header of the first frame, and for DCD/TRR files only the first frame is decoded.
+
+    Parameters
+    ----------
+    trajectory_filename : str
+        Trajectory file of interest.
+
+    Returns
+    -------
+    int or None
+        Number of atoms, or None for formats that would have to be read in full.
+
+    """
+
+    extension = os.path.splitext(trajectory_filename)[1].lower()
+
+    if extension == '.xtc':
+        with open(trajectory_filename, 'rb') as fh:
+            header = fh.read(8)
+
+        if len(header) < 8 or struct.unpack('>i', header[:4])[0] != XTC_MAGIC:
+            raise CTException('File [%s] is not a valid XTC file' % (trajectory_filename))
+
+        return struct.unpack('>i', header[4:])[0]
+
+    if extension in SEEKABLE_EXTENSIONS:
+        with md.open(trajectory_filename) as fh:
+            return fh.read(n_frames=1)[0].shape[1]
+
+    return None
+
+
+# ........................................................................
+#
+def select_atoms(topology, selection):
+    """
+    Returns the indices of the atoms selected by an atom selection, for use as the
+    `atom_indices` of `read_trajectory()` and `read_frames()`.
+
+    Parameters
+    ----------
+    topology : mdtraj.Topology
+        Topology of the full system.
+
+    selection : str, array_like of int or None
+        One of
+
+        * None or ``'all'`` - every atom (no selection)
+        * ``'protein'`` - every atom in a protein chain (the chains CTTrajectory identifies as
+          proteins, i.e. chains whose first residue is a recognized protein residue)
+        * ``'heavy'`` - protein atoms other than hydrogens
+        * ``'backbone+CB'`` - the N, CA, C, O and CB atoms of protein chains
+        * any other string is used as an mdtraj atom selection (e.g. ``'chainid 0 and not type H'``)
+        * a list or array of atom indices
+
+    Returns
+    -------
+    np.ndarray or None
+        Sorted array of unique atom indices, or None if every atom is selected.
+
+    Raises
+    ------
+    CTException
+        If the selection is invalid or selects no atoms.
+
+    """
+
+    if selection is None or (isinstance(selection, str) and selection == 'all'):
+        return None
+
+    if isinstance(selection, str):
+        if selection in ATOM_SELECTIONS:
+            protein_atoms = [atom for chain in topology.chains if chain.n_residues > 0 and chain.residue(0).name in ALL_VALID_RESIDUE_NAMES for atom in chain.atoms]
+
+            if selection == 'protein':
+                indices = [atom.index for atom in protein_atoms]
+            elif selection == 'heavy':
+                indices = [atom.index for atom in protein_atoms if atom.element is None or atom.element.symbol != 'H']
+            else:
+                indices = [atom.index for atom in protein_atoms if atom.name in BACKBONE_CB_ATOM_NAMES]
+        else:
+            try:
+                indices = topology.select(selection)
+            except Exception as e:
+                raise CTException('Invalid atom selection [%s]: %s' % (selection, str(e)))
+    else:
+        indices = selection
+
+    indices = np.unique(np.array(indices, dtype=int))
+
+    if len(indices) == 0:
+        raise CTException('Atom selection [%s] does not select any atoms' % (str(selection)))
+
+    if indices[0] < 0 or indices[-1] >= topology.n_atoms:
+        raise CTException('Atom indices must be between 0 and %i' % (topology.n_atoms - 1))
+
+    # selecting every atom is equivalent to no selection, and avoids the indexing overhead
+    if len(indices) == topology.n_atoms:
+        return None
+
+    return indices
+
+
+# ........................................................................
+#
+def __check_n_atoms(trajectory_filenames, pdb_filename, topology):
+    """
+    Internal function that checks that trajectory files match the topology before a subset
+    of atoms is read from them (once atoms are selected the decoded coordinates can no longer
+    be checked against the topology).
+
+    """
+
+    for filename in trajectory_filenames:
+        n_atoms = get_n_atoms(filename)
+        if n_atoms is not None and n_atoms != topology.n_atoms:
+            raise CTException('Trajectory %s has %i atoms but the topology defined by %s has %i atoms' % (filename, n_atoms, pdb_filename, topology.n_atoms))
+
+
+# ........................................................................
+#
+def plan_frame_reads(n_frames_per_file, start=0, stop=None, stride=1, n_blocks=1):
+    """
+    Determines which frames must be read from each file when a set of files is treated as a
+    single concatenated trajectory and frames start, start+stride, ... (up to but not
+    including stop) are selected. Each file's selection is then split into contiguous
+    blocks so they can be decoded independently (e.g. by different worker processes).
+
+    Parameters
+    ----------
+    n_frames_per_file : list of int
+        Number of frames in each file.
+
+    start : int {0}
+        First frame (in the concatenated trajectory) to select.
+
+    stop : int or None {None}
+        Frame (in the concatenated trajectory) at which selection stops (exclusive). If
+        None all frames up to the end are considered.
+
+    stride : int {1}
+        Spacing between selected frames.
+
+    n_blocks : int {1}
+        Approximate total number of blocks to split the selection into.
+
+    Returns
+    -------
+    list of tuples
+        List of (file_index, first_frame_in_file, n_frames, stride, output_offset) tuples,
+        where output_offset is the position of the block's first frame in the final
+        (selected) trajectory.
+
+    Raises
+    ------
+    CTException
+        If start, stop or stride are invalid.
+
+    """
+
+    start = int(start)
+    stride = int(stride)
+
+    total = int(np.sum(n_frames_per_file))
+
+    if stop is None:
+        stop = total
+    stop = min(int(stop), total)
+
+    if start < 0:
+        raise CTException('start (%i) must be 0 or larger' % (start))
+
+    if stride < 1:
+        raise CTException('stride (%i) is less than 1' % (stride))
+
+    if start >= stop:
+        raise CTException('No frames selected: start (%i) must be smaller than stop (%i) and the number of frames (%i)' % (start, stop, total))
+
+    # number of selected frames overall
+    n_selected = len(range(start, stop, stride))
+    block_size = max(1, int(np.ceil(n_selected / max(1, int(n_blocks)))))
+
+    plan = []
+    file_offset = 0
+    output_offset = 0
+    for (file_index, n_file) in enumerate(n_frames_per_file):
+
+        file_start = file_offset
+        file_stop = min(file_offset + n_file, stop)
+        file_offset = file_offset + n_file
+
+        if file_stop <= start or file_stop <= file_start:
+            continue
+
+        # first selected frame that falls in this file
+        if start >= file_start:
+            first = start
+        else:
+            first = start + int(np.ceil((file_start - start) / stride))*stride
+
+        if first >= file_stop:
+            continue
+
+        n_in_file = len(range(first, file_stop, stride))
+
+        # split into contiguous blocks
+        for block_start in range(0, n_in_file, block_size):
+            n_block = min(block_size, n_in_file - block_start)
+            plan.append((file_index, first - file_start + block_start*stride, n_block, stride, output_offset))
+            output_offset = output_offset + n_block
+
+    return plan
+
+
+# ........................................................................
+#
+def read_trajectory(trajectory_filenames, pdb_filename, start=0, stop=None, stride=1, n_workers=None, topology=None, atom_indices=None):
+    """
+    Reads one or more trajectory files as a single concatenated trajectory, only decoding the
+    selected frames. For XTC/DCD/TRR files the reader seeks directly to the first selected
+    frame and reads only every stride-th frame, so discarded frames are never decoded.
+
+    If `n_workers` is larger than 1 the selection is split into blocks (across and within
+    files) which are decoded in parallel worker processes. In all cases the decoded frames
+    are copied directly into a single preallocated array.
+
+    Parameters
+    ----------
+    trajectory_filenames : str or list of str
+        Trajectory file(s) to read. Multiple files are treated as one trajectory, in order.
+
+    pdb_filename : str
+        PDB file defining the topology.
+
+    start : int {0}
+        First frame (in the concatenated trajectory) to read.
+
+    stop : int or None {None}
+        Frame at which reading stops (exclusive). If None all frames are read.
+
+    stride : int {1}
+        Spacing between frames read.
+
+    n_workers : int or None {None}
+        Number of worker processes used for decoding. If None the number of workers defined
+        by the global resource policy is used (see `camparitraj.set_resources()`).
+
+    topology : mdtraj.Topology or None {None}
+        If provided this (already parsed) topology is used in this process instead of
+        re-parsing `pdb_filename`. Worker processes always parse `pdb_filename` once each.
+
+    atom_indices : array_like of int or None {None}
+        If provided only these atoms are read (see `select_atoms()`), and the returned
+        trajectory's topology is the corresponding subset of the full topology.
+
+    Returns
+    -------
+    mdtraj.Trajectory
+        Trajectory containing the selected frames (and atoms).
+
+    Raises
+    ------
+    CTException
+        If the files cannot be read, do not match the topology, or no frames are selected.
+
+    """
+
+    if isinstance(trajectory_filenames, str):
+        trajectory_filenames = [trajectory_filenames]
+
+    if len(trajectory_filenames) == 0:
+        raise CTException('No trajectory files provided!')
+
+    for filename in trajectory_filenames:
+        if not os.path.isfile(filename):
+            raise CTException('Trajectory file [%s] could not be found' % (filename))
+
+    n_workers = ctresources.get_workers(n_workers)
+
+    if topology is None:
+        topology = md.load_topology(pdb_filename)
+
+    n_frames_per_file = [get_n_frames(f, topology) for f in trajectory_filenames]
+
+    if atom_indices is not None:
+        atom_indices = np.unique(np.array(atom_indices, dtype=int))
+        __check_n_atoms(trajectory_filenames, pdb_filename, topology)
+        n_atoms = len(atom_indices)
+    else:
+        n_atoms = topology.n_atoms
+
+    # with workers we over-split slightly to balance the load between processes
+    if n_workers > 1:
+        n_blocks = 2*n_workers
+    else:
+        n_blocks = 1
+
+    plan = plan_frame_reads(n_frames_per_file, start=start, stop=stop, stride=stride, n_blocks=n_blocks)
+    n_selected = sum([block[2] for block in plan])
+
+    # preallocate the output arrays
+    xyz = np.empty((n_selected, n_atoms, 3), dtype=np.float32)
+    time = np.empty(n_selected, dtype=np.float32)
+    unitcell_lengths = np.empty((n_selected, 3), dtype=np.float32)
+    unitcell_angles = np.empty((n_selected, 3), dtype=np.float32)
+    has_unitcell = True
+
+    filenames = [trajectory_filenames[block[0]] for block in plan]
+
+    if n_workers == 1 or len(plan) == 1:
+        results = (_read_block(filenames[i], block[1], block[2], block[3], topology, atom_indices) for (i, block) in enumerate(plan))
+        executor = None
+    else:
+        # imported here because the process pool pulls in multiprocessing, which is slow to import
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=min(n_workers, len(plan)), initializer=_init_worker, initargs=(pdb_filename, ctresources.get_worker_threads(n_workers)))
+        results = executor.map(_read_block, filenames, [b[1] for b in plan], [b[2] for b in plan], [b[3] for b in plan], [None]*len(plan), [atom_indices]*len(plan))
+
+    try:
+        for (block, filename, (b_xyz, b_time, b_lengths, b_angles)) in zip(plan, filenames, results):
+
+            if b_xyz.shape[1] != n_atoms:
+                raise CTException('Trajectory %s has %i atoms but the topology defined by %s has %i atoms' % (filename, b_xyz.shape[1], pdb_filename, n_atoms))
+
+            o = block[4]
+            n = block[2]
+            xyz[o:o+n] = b_xyz
+            time[o:o+n] = b_time
+
+            if b_lengths is None or b_angles is None:
+                has_unitcell = False
+            else:
+                unitcell_lengths[o:o+n] = b_lengths
+                unitcell_angles[o:o+n] = b_angles
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if not has_unitcell:
+        unitcell_lengths = None
+        unitcell_angles = None
+
+    if atom_indices is not None:
+        topology = topology.subset(atom_indices)
+
+    return md.Trajectory(xyz, topology, time=time, unitcell_lengths=unitcell_lengths, unitcell_angles=unitcell_angles)
+
+
+# ........................................................................
+#
+def read_frames(trajectory_filename, pdb_filename, frames, topology=None, atom_indices=None):
+    """
+    Reads an arbitrary set of frames from a single trajectory file. For XTC files the frame
+    offsets are taken from the index file, so only the requested frames are decoded, making
+    it efficient to pull (for example) cluster centroids or bootstrap samples from disk
+    without loading the whole trajectory.
+
+    Consecutive runs of frames are read in a single pass, and the frames are returned in
+    the order requested (repeated frames are allowed).
+
+    Parameters
+    ----------
+    trajectory_filename : str
+        Trajectory file to read.
+
+    pdb_filename : str
+        PDB file defining the topology.
+
+    frames : array_like of int
+        Indices of the frames to read.
+
+    topology : mdtraj.Topology or None {None}
+        If provided this (already parsed) topology is used instead of parsing `pdb_filename`.
+
+    atom_indices : array_like of int or None {None}
+        If provided only these atoms are read (see `select_atoms()`).
+
+    Returns
+    -------
+    mdtraj.Trajectory
+        Trajectory containing the requested frames, in the requested order.
+
+    Raises
+    ------
+    CTException
+        If any frame index is out of range.
+
+    """
+
+    if topology is None:
+        topology = md.load_topology(pdb_filename)
+
+    frames = np.atleast_1d(np.array(frames, dtype=int))
+    if len(frames) == 0:
+        raise CTException('No frames requested')
+
+    n_frames = get_n_frames(trajectory_filename, topology)
+    if np.min(frames) < 0 or np.max(frames) >= n_frames:
+        raise CTException('Requested frames must be between 0 and %i' % (n_frames - 1))
+
+    if atom_indices is not None:
+        atom_indices = np.unique(np.array(atom_indices, dtype=int))
+        __check_n_atoms([trajectory_filename], pdb_filename, topology)
+
+    unique_frames = np.unique(frames)
+
+    # split the sorted unique frames into runs of consecutive frames
+    run_starts = np.concatenate(([0], np.where(np.diff(unique_frames) != 1)[0] + 1))
+    run_ends = np.concatenate((run_starts[1:], [len(unique_frames)]))
+
+    blocks = [_read_block(trajectory_filename, unique_frames[a], b - a, 1, topology, atom_indices) for (a, b) in zip(run_starts, run_ends)]
+
+    xyz = np.concatenate([b[0] for b in blocks])
+    time = np.concatenate([b[1] for b in blocks])
+
+    if any(b[2] is None for b in blocks):
+        unitcell_lengths = None
+        unitcell_angles = None
+    else:
+        unitcell_lengths = np.concatenate([b[2] for b in blocks])
+        unitcell_angles = np.concatenate([b[3] for b in blocks])
+
+    # map each requested frame to its position in the unique (sorted) set
+    order = np.searchsorted(unique_frames, frames)
+
+    if unitcell_lengths is not None:
+        unitcell_lengths = unitcell_lengths[order]
+        unitcell_angles = unitcell_angles[order]
+
+    if atom_indices is not None:
+        topology = topology.subset(atom_indices)
+
+    return md.Trajectory(xyz[order], topology, time=time[order], unitcell_lengths=unitcell_lengths, unitcell_angles=unitcell_angles)
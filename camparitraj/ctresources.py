@@ -0,0 +1,462 @@
+"""
+ctresources defines the global resource policy used by CAMPARITraj, i.e.
+
+* ``threads`` - the number of threads used by the BLAS/OpenMP thread pools that numpy and scipy
+  call into (linear algebra, FFTs of some builds, etc.),
+* ``workers`` - the default number of worker processes used by parallel engines (e.g. parallel
+  trajectory reading in ``CTTrajectory``, ``CTEnsemble`` and ``ctreader``) when no explicit
+  ``n_workers`` is passed,
+* ``memory_limit`` - a memory budget (in bytes) from which the chunk sizes of the chunked
+  engines (feature extraction, PRE calculations, synthetic trajectories, the ctanalyzer
+  pipeline) are derived.
+
+The policy is set with ``camparitraj.set_resources()`` or through the environment variables
+``CAMPARITRAJ_THREADS``, ``CAMPARITRAJ_WORKERS`` and ``CAMPARITRAJ_MEMORY_LIMIT``, which are read
+when CAMPARITraj is imported. Running many analyses on one node without oversubscription is then
+a matter of e.g.
+
+>>> import camparitraj
+>>> camparitraj.set_resources(threads=2, workers=1, memory_limit='2G')
+
+BLAS thread pools are controlled portably by calling the thread-setting function of whichever
+BLAS/OpenMP runtimes (OpenBLAS, including the scipy-openblas builds shipped in numpy/scipy
+wheels, MKL, BLIS, OpenMP) are loaded in the process. The standard environment variables
+(``OMP_NUM_THREADS`` etc.) are also set, such that worker processes inherit the limit.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import ctypes
+import ctypes.util
+import os
+import sys
+
+from .configs import MAXCORES
+from .ctexceptions import CTException
+
+
+# environment variables read when camparitraj is imported
+THREADS_VARIABLE = 'CAMPARITRAJ_THREADS'
+WORKERS_VARIABLE = 'CAMPARITRAJ_WORKERS'
+MEMORY_LIMIT_VARIABLE = 'CAMPARITRAJ_MEMORY_LIMIT'
+
+# standard thread-count variables, set such that child processes inherit the thread limit
+THREAD_ENVIRONMENT_VARIABLES = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'BLIS_NUM_THREADS']
+
+# (setter, getter) symbols of the thread-control functions of the supported runtimes. All
+# setters take the number of threads as a C int by value
+BLAS_THREAD_FUNCTIONS = [('openblas_set_num_threads', 'openblas_get_num_threads'),
+                         ('openblas_set_num_threads64_', 'openblas_get_num_threads64_'),
+                         ('scipy_openblas_set_num_threads', 'scipy_openblas_get_num_threads'),
+                         ('scipy_openblas_set_num_threads64_', 'scipy_openblas_get_num_threads64_'),
+                         ('MKL_Set_Num_Threads', 'MKL_Get_Max_Threads'),
+                         ('bli_thread_set_num_threads', 'bli_thread_get_num_threads'),
+                         ('omp_set_num_threads', 'omp_get_max_threads')]
+
+# substrings identifying shared libraries that may contain one of the functions above
+BLAS_LIBRARY_NAMES = ['blas', 'mkl_rt', 'blis', 'gomp', 'iomp', 'libomp']
+
+# when a memory limit is set, chunks hold memory_limit/CHUNK_BYTES_PER_ELEMENT values. This
+# allows for 8 byte values and a few temporaries of the chunk size
+CHUNK_BYTES_PER_ELEMENT = 32
+
+__MEMORY_UNITS = {'': 1, 'B': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+
+__POLICY = {'threads': None, 'workers': 1, 'memory_limit': None}
+
+
+# ------------------------------------------------------------------------
+#
+def parse_memory(value):
+    """
+    Converts a memory size to a number of bytes. Sizes can be given as a number of bytes or
+    as a string with a (binary) unit suffix, e.g. '512M', '4G' or '1.5GB'.
+
+    Parameters
+    ----------
+    value : int, float or str
+        Memory size.
+
+    Returns
+    -------
+    int
+        Number of bytes.
+
+    Raises
+    ------
+    CTException
+        If the value cannot be parsed or is not positive.
+    """
+
+    if isinstance(value, str):
+        text = value.strip().upper()
+        if text.endswith('IB'):
+            text = text[:-2]
+        elif text.endswith('B') and len(text) > 1 and text[-2] in __MEMORY_UNITS:
+            text = text[:-1]
+
+        unit = ''
+        if len(text) > 0 and text[-1] in __MEMORY_UNITS:
+            unit = text[-1]
+            text = text[:-1]
+
+        try:
+            n_bytes = int(float(text)*__MEMORY_UNITS[unit])
+        except ValueError:
+            raise CTException('Unable to parse memory size [%s] - expected e.g. 512M or 4G' % (value))
+    else:
+        try:
+            n_bytes = int(value)
+        except (TypeError, ValueError):
+            raise CTException('Unable to parse memory size [%s] - expected e.g. 512M or 4G' % (str(value)))
+
+    if n_bytes < 1:
+        raise CTException('Memory size must be positive (received %s)' % (str(value)))
+
+    return n_bytes
+
+
+# ------------------------------------------------------------------------
+#
+def __positive_int(value, name):
+    """
+    Internal function that validates a positive integer setting.
+
+    """
+
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise CTException('%s must be a positive integer (received %s)' % (name, str(value)))
+
+    if value < 1:
+        raise CTException('%s must be a positive integer (received %i)' % (name, value))
+
+    return value
+
+
+# ------------------------------------------------------------------------
+#
+def __loaded_libraries():
+    """
+    Internal function that returns the paths of the shared libraries loaded in this process
+    which may provide BLAS/OpenMP thread control. On Linux these are read from
+    /proc/self/maps; elsewhere the standard library names are looked up.
+
+    """
+
+    paths = []
+
+    if os.path.isfile('/proc/self/maps'):
+        with open('/proc/self/maps') as fh:
+            for line in fh:
+                fields = line.split()
+                if len(fields) < 6:
+                    continue
+                path = fields[-1]
+                name = os.path.basename(path).lower()
+                if path not in paths and any(key in name for key in BLAS_LIBRARY_NAMES):
+                    paths.append(path)
+        return paths
+
+    for name in ['openblas', 'mkl_rt', 'blis', 'gomp', 'iomp5', 'omp']:
+        path = ctypes.util.find_library(name)
+        if path is not None and path not in paths:
+            paths.append(path)
+
+    return paths
+
+
+# ------------------------------------------------------------------------
+#
+def get_blas_threads():
+    """
+    Returns the thread count of every BLAS/OpenMP runtime loaded in this process.
+
+    Returns
+    -------
+    dict
+        Maps 'library:function' to the number of threads that runtime currently uses.
+    """
+
+    threads = {}
+
+    for path in __loaded_libraries():
+        try:
+            library = ctypes.CDLL(path)
+        except OSError:
+            continue
+
+        for (_, getter) in BLAS_THREAD_FUNCTIONS:
+            try:
+                function = getattr(library, getter)
+            except AttributeError:
+                continue
+            function.restype = ctypes.c_int
+            threads['%s:%s' % (os.path.basename(path), getter)] = function()
+
+    return threads
+
+
+# ------------------------------------------------------------------------
+#
+def set_blas_threads(threads):
+    """
+    Sets the number of threads used by every BLAS/OpenMP runtime loaded in this process
+    (OpenBLAS, MKL, BLIS and OpenMP are supported), and the corresponding environment
+    variables such that processes started later inherit the limit.
+
+    Parameters
+    ----------
+    threads : int
+        Number of threads.
+
+    Returns
+    -------
+    list of str
+        The 'library:function' thread-control functions that were called (empty if no
+        supported runtime is loaded, in which case only the environment is updated).
+    """
+
+    threads = __positive_int(threads, 'threads')
+
+    for variable in THREAD_ENVIRONMENT_VARIABLES:
+        os.environ[variable] = str(threads)
+
+    called = []
+    for path in __loaded_libraries():
+        try:
+            library = ctypes.CDLL(path)
+        except OSError:
+            continue
+
+        for (setter, _) in BLAS_THREAD_FUNCTIONS:
+            try:
+                function = getattr(library, setter)
+            except AttributeError:
+                continue
+            function.argtypes = [ctypes.c_int]
+            function.restype = None
+            function(threads)
+            called.append('%s:%s' % (os.path.basename(path), setter))
+
+    return called
+
+
+# ------------------------------------------------------------------------
+#
+def set_resources(threads=None, workers=None, memory_limit=None):
+    """
+    Sets the global resource policy. Only settings that are passed are changed.
+
+    Parameters
+    ----------
+    threads : int or None {None}
+        Number of threads used by the BLAS/OpenMP thread pools. Applied immediately to all
+        loaded runtimes and exported via the standard environment variables.
+
+    workers : int or None {None}
+        Default number of worker processes used by parallel engines when no explicit
+        `n_workers` is given. Values larger than the number of cores are capped.
+
+    memory_limit : int, str or None {None}
+        Memory budget (bytes, or a string such as '4G') from which the chunk sizes of the
+        chunked engines are derived. See `get_chunk_elements()`.
+
+    Returns
+    -------
+    dict
+        The resulting policy (see `get_resources()`).
+
+    Raises
+    ------
+    CTException
+        If a setting is invalid.
+    """
+
+    if threads is not None:
+        threads = __positive_int(threads, 'threads')
+
+    if workers is not None:
+        workers = __positive_int(workers, 'workers')
+
+    if memory_limit is not None:
+        memory_limit = parse_memory(memory_limit)
+
+    if threads is not None:
+        set_blas_threads(threads)
+        __POLICY['threads'] = threads
+
+    if workers is not None:
+        __POLICY['workers'] = workers
+
+    if memory_limit is not None:
+        __POLICY['memory_limit'] = memory_limit
+
+    return get_resources()
+
+
+# ------------------------------------------------------------------------
+#
+def reset_resources():
+    """
+    Restores the default policy (library-default threads, one worker, no memory limit).
+    Thread pools that were already limited are not changed back.
+
+    Returns
+    -------
+    None
+    """
+
+    __POLICY['threads'] = None
+    __POLICY['workers'] = 1
+    __POLICY['memory_limit'] = None
+
+
+# ------------------------------------------------------------------------
+#
+def get_resources():
+    """
+    Returns the current resource policy.
+
+    Returns
+    -------
+    dict
+        Dictionary with the keys 'threads' (None if not limited), 'workers', 'memory_limit'
+        (bytes, None if not set) and 'cores' (number of cores available).
+    """
+
+    policy = dict(__POLICY)
+    policy['cores'] = MAXCORES
+
+    return policy
+
+
+# ------------------------------------------------------------------------
+#
+def get_workers(n_workers=None):
+    """
+    Resolves the number of worker processes an engine should use.
+
+    Parameters
+    ----------
+    n_workers : int or None {None}
+        Explicitly requested number of workers, or None to use the global policy.
+
+    Returns
+    -------
+    int
+        Number of workers, capped at the number of available cores.
+
+    Raises
+    ------
+    CTException
+        If `n_workers` is smaller than 1.
+    """
+
+    if n_workers is None:
+        n_workers = __POLICY['workers']
+
+    try:
+        n_workers = int(n_workers)
+    except (TypeError, ValueError):
+        raise CTException('n_workers must be an integer (received %s)' % (str(n_workers)))
+
+    if n_workers < 1:
+        raise CTException('n_workers (%i) must be 1 or larger' % (n_workers))
+
+    return min(n_workers, MAXCORES)
+
+
+# ------------------------------------------------------------------------
+#
+def get_worker_threads(n_workers):
+    """
+    Returns the number of BLAS threads each of `n_workers` worker processes should use such
+    that together they do not use more threads than the policy (or the number of cores) allows.
+
+    Parameters
+    ----------
+    n_workers : int
+        Number of worker processes.
+
+    Returns
+    -------
+    int
+    """
+
+    threads = __POLICY['threads']
+    if threads is None:
+        threads = MAXCORES
+
+    return max(1, int(threads) // max(1, int(n_workers)))
+
+
+# ------------------------------------------------------------------------
+#
+def get_chunk_elements(default):
+    """
+    Returns the number of values chunked engines should hold per chunk. Without a memory limit
+    this is the engine's own default; with a memory limit it is derived from the budget (see
+    CHUNK_BYTES_PER_ELEMENT).
+
+    Parameters
+    ----------
+    default : int
+        The engine's default number of values per chunk.
+
+    Returns
+    -------
+    int
+    """
+
+    if __POLICY['memory_limit'] is None:
+        return int(default)
+
+    return max(1, int(__POLICY['memory_limit'] // CHUNK_BYTES_PER_ELEMENT))
+
+
+# ------------------------------------------------------------------------
+#
+def set_resources_from_environment(environment=None):
+    """
+    Applies the resource settings defined by the CAMPARITRAJ_THREADS, CAMPARITRAJ_WORKERS and
+    CAMPARITRAJ_MEMORY_LIMIT environment variables (if set). Called when camparitraj is imported;
+    invalid values are reported as warnings rather than preventing the import.
+
+    Parameters
+    ----------
+    environment : dict or None {None}
+        Mapping to read the variables from (defaults to os.environ).
+
+    Returns
+    -------
+    dict
+        The resulting policy (see `get_resources()`).
+    """
+
+    if environment is None:
+        environment = os.environ
+
+    settings = {}
+    for (keyword, variable) in [('threads', THREADS_VARIABLE), ('workers', WORKERS_VARIABLE), ('memory_limit', MEMORY_LIMIT_VARIABLE)]:
+        if environment.get(variable, '').strip() != '':
+            settings[keyword] = environment[variable].strip()
+
+    try:
+        return set_resources(**settings)
+    except CTException as e:
+        sys.stderr.write('WARNING: ignoring invalid CAMPARITraj resource environment variables: %s\n' % (str(e)))
+        return get_resources()
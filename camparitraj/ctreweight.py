@@ -0,0 +1,327 @@
+"""
+ctreweight contains stand-alone functions for reweighting a simulated ensemble against
+experimental data using the maximum entropy principle (in its Bayesian form, where the
+experimental errors and a confidence parameter theta define how closely the data is fit).
+
+The input is a per-frame matrix of back-calculated observables ([n_frames x n_observables],
+e.g. per-frame PRE gammas from ``CTPRE.generate_PRE_profiles()``, per-frame chemical shifts
+from ``CTProtein.get_secondary_chemical_shifts()`` or the per-frame radius of gyration),
+alongside the matching experimental values and their uncertainties. The optimal weights
+take the form
+
+    w_f  ~  w0_f * exp(-sum_i lambda_i * s_fi / sigma_i)
+
+and the Lagrange multipliers lambda are found by minimizing the (convex) dual function with
+L-BFGS. The function value and gradient only require two matrix-vector products with the
+observable matrix, which is never copied or rescaled, so very large ensembles (e.g. 10^6
+frames x 10^3 observables) can be reweighted without additional memory.
+
+The returned weights can be passed directly to ``CTProtein.set_weights()`` (or to any
+method that takes a ``weights`` keyword). Note that observables must be linear ensemble
+averages (e.g. gammas rather than PRE intensity ratios) and must be computed for every frame
+of the ensemble the weights will be used with.
+
+References
+----------
+[1] Hummer, G. and Koefinger, J. (2015) Bayesian ensemble refinement by replica simulations and reweighting. J. Chem. Phys. 143(24):243150
+
+[2] Cesari, A., Reisser, S. and Bussi, G. (2018) Using the maximum entropy principle to combine simulations and solution experiments. Computation 6(1):15
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import numpy as np
+
+from .ctexceptions import CTException
+
+
+# ........................................................................
+#
+def __check_inputs(calculated, experimental, sigma, prior_weights):
+    """
+    Internal function that validates the observable matrix, experimental data, errors and
+    prior weights. The observable matrix is only converted if it is not already a floating
+    point array, such that large matrices are never copied.
+
+    Returns
+    -------
+    tuple
+        (calculated, experimental, sigma, prior_weights) as numpy arrays, where prior_weights
+        is normalized to sum to 1.
+
+    """
+
+    calculated = np.asarray(calculated)
+    if not np.issubdtype(calculated.dtype, np.floating):
+        calculated = calculated.astype(np.float64)
+
+    if calculated.ndim == 1:
+        calculated = calculated[:, np.newaxis]
+
+    if calculated.ndim != 2:
+        raise CTException('calculated must be an [n_frames x n_observables] array')
+
+    (n_frames, n_observables) = calculated.shape
+
+    experimental = np.atleast_1d(np.asarray(experimental, dtype=np.float64))
+    if experimental.shape != (n_observables,):
+        raise CTException('experimental has %i values but there are %i calculated observables - these must match' % (experimental.size, n_observables))
+
+    if sigma is None:
+        sigma = np.ones(n_observables)
+    else:
+        sigma = np.asarray(sigma, dtype=np.float64) * np.ones(n_observables)
+        if np.any(sigma <= 0):
+            raise CTException('sigma (experimental uncertainties) must all be positive')
+
+    if not np.all(np.isfinite(experimental)) or not np.all(np.isfinite(calculated.sum(axis=0))):
+        raise CTException('calculated and experimental observables must all be finite (remove undefined observables, e.g. NaN shifts, before reweighting)')
+
+    if prior_weights is None or prior_weights is False:
+        prior_weights = np.repeat(1.0 / n_frames, n_frames)
+    else:
+        prior_weights = np.asarray(prior_weights, dtype=np.float64)
+        if prior_weights.ndim != 1 or len(prior_weights) != n_frames:
+            raise CTException('Passed prior weights array is %i in length, while there are actually %i frames - these must match' % (len(prior_weights), n_frames))
+
+        if np.any(prior_weights < 0) or np.sum(prior_weights) <= 0:
+            raise CTException('Prior weights must be non-negative and sum to a positive value')
+
+        prior_weights = prior_weights / np.sum(prior_weights)
+
+    return (calculated, experimental, sigma, prior_weights)
+
+
+# ........................................................................
+#
+def __weights_from_lambdas(calculated, scaled_lambdas, log_prior):
+    """
+    Internal function that returns the normalized weights and log partition function for a set
+    of (sigma-scaled) Lagrange multipliers.
+
+    """
+
+    log_w = log_prior - calculated.dot(scaled_lambdas.astype(calculated.dtype, copy=False))
+    log_w = log_w.astype(np.float64, copy=False)
+
+    shift = np.max(log_w)
+    w = np.exp(log_w - shift)
+    Z = np.sum(w)
+
+    return (w / Z, np.log(Z) + shift)
+
+
+# ........................................................................
+#
+def __weighted_average(calculated, weights):
+    """
+    Internal function that returns the weighted average of each observable. The weights are cast
+    to the dtype of the observable matrix, such that a float32 matrix is never upcast (copied).
+
+    """
+
+    return weights.astype(calculated.dtype, copy=False).dot(calculated).astype(np.float64)
+
+
+# ........................................................................
+#
+def chi_squared(calculated, experimental, sigma=None, weights=None):
+    """
+    Returns the reduced chi-squared between the (weighted) ensemble averaged observables and the
+    experimental data, i.e. mean(((<s_i> - y_i) / sigma_i)^2).
+
+    Parameters
+    ----------
+    calculated : array_like
+        [n_frames x n_observables] array of per-frame calculated observables.
+
+    experimental : array_like
+        Experimental values (n_observables).
+
+    sigma : array_like or float or None {None}
+        Experimental uncertainties. If None all uncertainties are 1.
+
+    weights : array_like or None {None}
+        Per-frame weights. If None frames are weighted equally.
+
+    Returns
+    -------
+    float
+        Reduced chi-squared.
+
+    """
+
+    (calculated, experimental, sigma, weights) = __check_inputs(calculated, experimental, sigma, weights)
+
+    average = __weighted_average(calculated, weights)
+
+    return float(np.mean(np.square((average - experimental) / sigma)))
+
+
+# ........................................................................
+#
+def effective_sample_fraction(weights, prior_weights=None):
+    """
+    Returns the effective fraction of frames retained by a set of weights, defined as exp(-S)
+    where S is the relative entropy (Kullback-Leibler divergence) of the weights with respect to
+    the prior weights. A value of 1 means the weights are unchanged from the prior and values
+    close to 0 mean the ensemble has been reduced to a handful of frames.
+
+    Parameters
+    ----------
+    weights : array_like
+        Per-frame weights.
+
+    prior_weights : array_like or None {None}
+        Per-frame prior (reference) weights. If None frames are weighted equally.
+
+    Returns
+    -------
+    float
+        Effective fraction of frames (between 0 and 1).
+
+    """
+
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / np.sum(weights)
+
+    if prior_weights is None:
+        prior_weights = np.repeat(1.0 / len(weights), len(weights))
+    else:
+        prior_weights = np.asarray(prior_weights, dtype=np.float64)
+        prior_weights = prior_weights / np.sum(prior_weights)
+
+    nonzero = weights > 0
+    relative_entropy = np.sum(weights[nonzero] * np.log(weights[nonzero] / prior_weights[nonzero]))
+
+    return float(np.exp(-relative_entropy))
+
+
+# ........................................................................
+#
+def maxent_reweight(calculated, experimental, sigma=None, theta=1.0, prior_weights=None, max_iterations=1000, tolerance=1e-8):
+    """
+    Fits per-frame weights such that the ensemble averaged observables agree with the experimental
+    data, while keeping the weights as close as possible (in the relative entropy sense) to the
+    prior weights.
+
+    The balance between fitting the data and staying close to the prior is set by theta: the fit
+    is obtained at the minimum of theta * S_rel + chi^2 / 2, such that large values of theta
+    retain more of the prior ensemble and theta -> 0 gives a (strict) maximum entropy fit that
+    reproduces the experimental data exactly. A suitable theta is typically chosen by scanning
+    theta and inspecting the returned chi-squared and effective sample fraction.
+
+    The dual function is minimized with L-BFGS, where every function and gradient evaluation
+    requires one product of the observable matrix with the multipliers and one with the weights.
+    The observable matrix is used as passed (float32 matrices are used in float32, halving memory
+    for very large ensembles).
+
+    Parameters
+    ----------
+    calculated : array_like
+        [n_frames x n_observables] array of per-frame calculated observables (a 1D array is
+        treated as a single observable).
+
+    experimental : array_like
+        Experimental values (n_observables).
+
+    sigma : array_like or float or None {None}
+        Experimental uncertainties (including forward model error) for each observable. If None
+        all uncertainties are 1.
+
+    theta : float {1.0}
+        Confidence parameter. Must be positive.
+
+    prior_weights : array_like or None {None}
+        Per-frame prior weights (e.g. from a previous reweighting or from T-WHAM). If None frames
+        are weighted equally.
+
+    max_iterations : int {1000}
+        Maximum number of L-BFGS iterations.
+
+    tolerance : float {1e-8}
+        Convergence tolerance on the gradient of the dual function.
+
+    Returns
+    -------
+    dict
+        Dictionary with the following key-value pairs
+
+        * ``weights`` - normalized per-frame weights (n_frames).
+
+        * ``lambdas`` - the Lagrange multiplier for each observable (in units of the observable).
+
+        * ``average`` - reweighted ensemble average of each observable.
+
+        * ``chi2_prior`` / ``chi2`` - reduced chi-squared before and after reweighting.
+
+        * ``phi`` - the effective fraction of frames retained (see `effective_sample_fraction`).
+
+        * ``converged`` - whether the optimizer converged.
+
+        * ``n_iterations`` - number of iterations used.
+
+    Raises
+    ------
+    CTException
+        If inputs are inconsistent or not finite, or theta is not positive.
+
+    Example
+    -------
+    >>> per_frame_rg = CP.get_radius_of_gyration()
+    >>> result = ctreweight.maxent_reweight(per_frame_rg, [25.0], sigma=[0.5], theta=1.0)
+    >>> CP.set_weights(result['weights'])
+
+    """
+
+    if not theta > 0:
+        raise CTException('theta must be positive (theta = %s)' % (str(theta)))
+
+    (calculated, experimental, sigma, prior_weights) = __check_inputs(calculated, experimental, sigma, prior_weights)
+
+    with np.errstate(divide='ignore'):
+        log_prior = np.log(prior_weights)
+
+    scaled_experimental = experimental / sigma
+
+    # dual function in terms of sigma-scaled multipliers l (lambda = l / sigma) such that all
+    # observables are on the same scale regardless of their units
+    def dual(l):
+        (w, log_Z) = __weights_from_lambdas(calculated, l / sigma, log_prior)
+
+        average = __weighted_average(calculated, w) / sigma
+
+        value = log_Z + np.dot(l, scaled_experimental) + 0.5 * theta * np.dot(l, l)
+        gradient = scaled_experimental - average + theta * l
+
+        return (value, gradient)
+
+    # imported here so that importing ctreweight does not pull in scipy.optimize
+    import scipy.optimize as SPO
+
+    result = SPO.minimize(dual, np.zeros(len(experimental)), jac=True, method='L-BFGS-B', options={'maxiter': int(max_iterations), 'gtol': tolerance})
+
+    (weights, _) = __weights_from_lambdas(calculated, result.x / sigma, log_prior)
+
+    average = __weighted_average(calculated, weights)
+
+    return {'weights': weights,
+            'lambdas': result.x / sigma,
+            'average': average,
+            'chi2_prior': float(np.mean(np.square((__weighted_average(calculated, prior_weights) - experimental) / sigma))),
+            'chi2': float(np.mean(np.square((average - experimental) / sigma))),
+            'phi': effective_sample_fraction(weights, prior_weights),
+            'converged': bool(result.success),
+            'n_iterations': int(result.nit)}
@@ -0,0 +1,600 @@
+"""
+ctsynthetic contains functions for generating synthetic polymer trajectories of arbitrary size,
+for benchmarking and testing. Chains are generated as CA traces (bond length 3.8 Angstroms) and
+can be decorated with an all-atom-like backbone (N, H, CA, HA, CB, C, O with ideal tetrahedral
+geometry around each CA, plus optional ACE/NME caps) or kept as a CA-only (one bead per residue)
+model. Residue names follow the sequence, so the resulting trajectories can be analyzed with
+CTTrajectory/CTProtein like a simulation.
+
+Two chain models are available:
+
+* ``'gaussian'`` - an ideal random walk (freely jointed chain, with bond directions drawn
+  uniformly on the sphere), for which internal distances scale as |i-j|^0.5.
+
+* ``'excluded-volume'`` - bond vectors are drawn from fractional Gaussian noise with Hurst
+  exponent nu (0.588 by default), such that internal distances scale as |i-j|^nu as for a
+  self-avoiding walk in a good solvent. Note this reproduces the scaling of a self-avoiding
+  chain (which is what matters for polymer analyses) but does not strictly prevent overlaps.
+
+Generation is vectorized over frames and residues (fractional Gaussian noise is generated by
+circulant embedding with real FFTs), and very long trajectories can be written to XTC in blocks
+of frames with ``write_trajectory()`` without ever holding the whole trajectory in memory.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import numpy as np
+import mdtraj as md
+
+from .ctdata import ONE_TO_THREE
+from .ctexceptions import CTException
+from . import ctresources
+
+MODELS = ['gaussian', 'excluded-volume']
+RESOLUTIONS = ['all-atom', 'CA']
+
+# CA-CA virtual bond length (Angstroms)
+BOND_LENGTH = 3.8
+
+# Flory scaling exponent of a self-avoiding chain
+EXCLUDED_VOLUME_NU = 0.588
+
+# target number of elements in the FFT work arrays used to generate fractional Gaussian noise
+FGN_BLOCK_ELEMENTS = 20000000
+
+# residues cycled through when only a number of residues is given
+DEFAULT_SEQUENCE_ALPHABET = 'ACDEFGHIKLMNPQRSTVWY'
+
+# position of each backbone atom relative to its CA in the local residue frame (u, v, w), where
+# u runs along the chain, v is the outward bisector and w = u x v (Angstroms). N, C, CB and HA
+# point along the four tetrahedral directions
+__TETRAHEDRAL = {'N': np.array([-0.8165, -0.5774, 0.0]),
+                 'C': np.array([0.8165, -0.5774, 0.0]),
+                 'CB': np.array([0.0, 0.5774, 0.8165]),
+                 'HA': np.array([0.0, 0.5774, -0.8165])}
+
+__OFFSETS = {'N': 1.46*__TETRAHEDRAL['N'],
+             'C': 1.52*__TETRAHEDRAL['C'],
+             'CB': 1.53*__TETRAHEDRAL['CB'],
+             'HA': 1.09*__TETRAHEDRAL['HA'],
+             'HA2': 1.09*__TETRAHEDRAL['HA'],
+             'HA3': 1.09*__TETRAHEDRAL['CB']}
+
+__OFFSETS['O'] = __OFFSETS['C'] + 1.23*np.array([0.0, -0.6, -0.8])
+__OFFSETS['H'] = __OFFSETS['N'] + 1.01*np.array([-0.3, -0.8, 0.52])/np.linalg.norm([-0.3, -0.8, 0.52])
+
+# caps are placed in the frame of the residue they are bonded to
+__CAP_OFFSETS = {'ACE': [('CH3', 'C', __OFFSETS['N'] + np.array([-2.3, 0.6, -0.4])),
+                         ('C', 'C', __OFFSETS['N'] + np.array([-1.0, -0.6, 0.3])),
+                         ('O', 'O', __OFFSETS['N'] + np.array([-1.2, -1.7, 0.8]))],
+                 'NME': [('N', 'N', __OFFSETS['C'] + np.array([1.0, -0.6, 0.5])),
+                         ('H', 'H', __OFFSETS['C'] + np.array([0.9, -1.3, 1.2])),
+                         ('C', 'C', __OFFSETS['C'] + np.array([2.3, -0.3, 0.6]))]}
+
+
+# ........................................................................
+#
+def __get_sequence(sequence, n_residues):
+    """
+    Internal function that returns the one-letter sequence, built by cycling through the 20
+    amino acids if only a number of residues is given.
+
+    """
+
+    if sequence is None:
+        if n_residues is None:
+            raise CTException('Either a sequence or a number of residues must be provided')
+
+        n_residues = int(n_residues)
+        if n_residues < 2:
+            raise CTException('Synthetic chains must have at least two residues')
+
+        return "".join([DEFAULT_SEQUENCE_ALPHABET[i % 20] for i in range(n_residues)])
+
+    sequence = str(sequence).upper()
+    if len(sequence) < 2:
+        raise CTException('Synthetic chains must have at least two residues')
+
+    for residue in sequence:
+        if residue not in DEFAULT_SEQUENCE_ALPHABET:
+            raise CTException('Invalid residue [%s] in sequence - only the 20 standard amino acids are supported' % (residue))
+
+    return sequence
+
+
+# ........................................................................
+#
+def __residue_atoms(residue, resolution):
+    """
+    Internal function that returns the names of the atoms in a residue.
+
+    """
+
+    if resolution == 'CA':
+        return ['CA']
+
+    if residue == 'G':
+        return ['N', 'H', 'CA', 'HA2', 'HA3', 'C', 'O']
+
+    if residue == 'P':
+        return ['N', 'CA', 'HA', 'CB', 'C', 'O']
+
+    return ['N', 'H', 'CA', 'HA', 'CB', 'C', 'O']
+
+
+# ........................................................................
+#
+def build_topology(sequence=None, n_residues=None, n_chains=1, caps=False, resolution='all-atom'):
+    """
+    Builds the topology of a synthetic (multi-chain) system, where every chain has the same
+    sequence and is placed in its own mdtraj chain.
+
+    Parameters
+    ----------
+    sequence : str {None}
+        One-letter amino acid sequence of each chain.
+
+    n_residues : int {None}
+        Number of residues per chain if no sequence is given (residues cycle through the 20
+        amino acids).
+
+    n_chains : int {1}
+        Number of chains.
+
+    caps : bool {False}
+        If True ACE and NME caps are added to each chain (all-atom resolution only).
+
+    resolution : str {'all-atom'}
+        'all-atom' (backbone atoms plus CB) or 'CA' (one CA bead per residue).
+
+    Returns
+    -------
+    tuple
+        (topology, offsets) - the mdtraj.Topology and, for each atom, the index of the residue
+        (within its chain) whose frame it is placed in and its offset in that frame.
+
+    """
+
+    if resolution not in RESOLUTIONS:
+        raise CTException('resolution must be one of %s' % (str(RESOLUTIONS)))
+
+    if caps and resolution != 'all-atom':
+        raise CTException('Caps can only be added at all-atom resolution')
+
+    n_chains = int(n_chains)
+    if n_chains < 1:
+        raise CTException('n_chains must be a positive integer')
+
+    sequence = __get_sequence(sequence, n_residues)
+
+    topology = md.Topology()
+    frame_residue = []
+    offsets = []
+
+    for c in range(n_chains):
+        chain = topology.add_chain()
+        previous_C = None
+
+        if caps:
+            cap = topology.add_residue('ACE', chain)
+            atoms = {}
+            for (name, element, offset) in __CAP_OFFSETS['ACE']:
+                atoms[name] = topology.add_atom(name, md.element.get_by_symbol(element), cap)
+                frame_residue.append(0)
+                offsets.append(offset)
+
+            topology.add_bond(atoms['CH3'], atoms['C'])
+            topology.add_bond(atoms['C'], atoms['O'])
+            previous_C = atoms['C']
+
+        for (i, aa) in enumerate(sequence):
+            residue = topology.add_residue(ONE_TO_THREE[aa], chain)
+
+            atoms = {}
+            for name in __residue_atoms(aa, resolution):
+                atoms[name] = topology.add_atom(name, md.element.get_by_symbol(name[0]), residue)
+                frame_residue.append(i)
+                offsets.append(__OFFSETS[name] if name != 'CA' else np.zeros(3))
+
+            if resolution == 'CA':
+                if previous_C is not None:
+                    topology.add_bond(previous_C, atoms['CA'])
+                previous_C = atoms['CA']
+                continue
+
+            for name in ['N', 'C', 'HA', 'HA2', 'HA3', 'CB']:
+                if name in atoms:
+                    topology.add_bond(atoms['CA'], atoms[name])
+
+            topology.add_bond(atoms['C'], atoms['O'])
+            if 'H' in atoms:
+                topology.add_bond(atoms['N'], atoms['H'])
+
+            if previous_C is not None:
+                topology.add_bond(previous_C, atoms['N'])
+            previous_C = atoms['C']
+
+        if caps:
+            cap = topology.add_residue('NME', chain)
+            atoms = {}
+            for (name, element, offset) in __CAP_OFFSETS['NME']:
+                atoms[name] = topology.add_atom(name, md.element.get_by_symbol(element), cap)
+                frame_residue.append(len(sequence) - 1)
+                offsets.append(offset)
+
+            topology.add_bond(previous_C, atoms['N'])
+            topology.add_bond(atoms['N'], atoms['H'])
+            topology.add_bond(atoms['N'], atoms['C'])
+
+    return (topology, (np.array(frame_residue), np.array(offsets)))
+
+
+# ........................................................................
+#
+def __fractional_gaussian_noise(n_rows, n_steps, hurst, rng):
+    """
+    Internal function that returns n_rows independent realizations of fractional Gaussian noise
+    of length n_steps (unit variance) by circulant embedding (Davies-Harte), using real FFTs.
+    The embedding is padded to a power of two so the FFTs are fast for any chain length.
+
+    """
+
+    n_embed = int(2**np.ceil(np.log2(max(n_steps, 2))))
+
+    k = np.arange(n_embed + 1, dtype=np.float64)
+    autocovariance = 0.5*(np.power(k + 1, 2*hurst) - 2*np.power(k, 2*hurst) + np.power(np.abs(k - 1), 2*hurst))
+
+    # first row of the circulant matrix, and its (real, non-negative) eigenvalues
+    row = np.concatenate((autocovariance, autocovariance[-2:0:-1]))
+    m = len(row)
+    eigenvalues = np.maximum(np.fft.rfft(row).real, 0)
+
+    # complex Gaussian coefficients with the symmetry of a real signal, scaled such that the
+    # inverse transform has the circulant covariance
+    scale = np.sqrt(eigenvalues / m)
+    scale[1:-1] = scale[1:-1] / np.sqrt(2)
+    scale = (scale*m).astype(np.float32)
+
+    coefficients = np.empty((n_rows, len(scale)), dtype=np.complex64)
+    coefficients.real = rng.standard_normal((n_rows, len(scale)), dtype=np.float32)
+    coefficients.imag = rng.standard_normal((n_rows, len(scale)), dtype=np.float32)
+    coefficients.imag[:, 0] = 0
+    coefficients.imag[:, -1] = 0
+    coefficients *= scale
+
+    return np.fft.irfft(coefficients, n=m, axis=1)[:, :n_steps]
+
+
+# ........................................................................
+#
+def generate_chain_coordinates(n_frames, n_residues, model='gaussian', nu=EXCLUDED_VOLUME_NU, bond_length=BOND_LENGTH, seed=None):
+    """
+    Generates independent conformations of a CA trace with fixed bond lengths, centered at the
+    origin.
+
+    Parameters
+    ----------
+    n_frames : int
+        Number of conformations.
+
+    n_residues : int
+        Number of residues.
+
+    model : str {'gaussian'}
+        Chain model, one of 'gaussian' or 'excluded-volume'.
+
+    nu : float {0.588}
+        Scaling exponent of the 'excluded-volume' model (between 0.5 and 1).
+
+    bond_length : float {3.8}
+        CA-CA bond length (Angstroms).
+
+    seed : int, np.random.Generator or None {None}
+        Seed (or random number generator).
+
+    Returns
+    -------
+    np.ndarray
+        [n_frames x n_residues x 3] coordinates (Angstroms, float32).
+
+    """
+
+    if model not in MODELS:
+        raise CTException('model must be one of %s' % (str(MODELS)))
+
+    n_frames = int(n_frames)
+    n_residues = int(n_residues)
+    if n_frames < 1 or n_residues < 2:
+        raise CTException('n_frames must be positive and n_residues at least 2')
+
+    rng = np.random.default_rng(seed)
+    n_steps = n_residues - 1
+
+    if model == 'gaussian':
+        # independent bond directions drawn uniformly on the unit sphere
+        z = rng.random((n_frames, n_steps), dtype=np.float32)*2 - 1
+        phi = rng.random((n_frames, n_steps), dtype=np.float32)*np.float32(2*np.pi)
+        r = np.sqrt(1 - z*z)*np.float32(bond_length)
+
+        steps = np.stack((r*np.cos(phi), r*np.sin(phi), z*np.float32(bond_length)), axis=2)
+    else:
+        if not 0.5 <= nu < 1:
+            raise CTException('nu must be between 0.5 and 1 (nu = %s)' % (str(nu)))
+
+        # each cartesian component of the bond vectors is a fractional Gaussian noise series,
+        # generated in blocks of frames to bound the size of the FFT work arrays
+        steps = np.empty((n_frames, n_steps, 3), dtype=np.float32)
+        block_size = max(1, ctresources.get_chunk_elements(FGN_BLOCK_ELEMENTS) // (6*n_steps))
+        for start in range(0, n_frames, block_size):
+            n = min(block_size, n_frames - start)
+            noise = __fractional_gaussian_noise(3*n, n_steps, nu, rng)
+            steps[start:start + n] = noise.reshape(n, 3, n_steps).transpose(0, 2, 1)
+
+        # fix the bond lengths
+        norms = np.sqrt(np.einsum('ijk,ijk->ij', steps, steps))
+        norms[norms == 0] = 1
+        steps *= (np.float32(bond_length) / norms)[:, :, np.newaxis]
+
+    xyz = np.empty((n_frames, n_residues, 3), dtype=np.float32)
+    xyz[:, 0] = 0
+    np.cumsum(steps, axis=1, out=xyz[:, 1:])
+
+    # center on the origin; the mean position is a weighted sum of the bond vectors, which avoids
+    # a (slow) reduction over the residue axis of the coordinates
+    weights = (np.arange(n_steps, 0, -1) / n_residues).astype(np.float32)
+    xyz -= np.einsum('j,ijk->ik', weights, steps)[:, np.newaxis, :]
+
+    return xyz
+
+
+# ........................................................................
+#
+def __normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms < 1e-6] = 1
+    return vectors / norms
+
+
+# ........................................................................
+#
+def __residue_frames(ca):
+    """
+    Internal function that returns the local frame (u, v, w) of every residue of a CA trace
+    ([n_frames x n_residues x 3]), where u runs along the chain, v is the outward bisector of the
+    CA-CA-CA angle and w = u x v.
+
+    """
+
+    forward = np.empty_like(ca)
+    forward[:, :-1] = ca[:, 1:] - ca[:, :-1]
+    forward[:, -1] = forward[:, -2]
+
+    backward = np.empty_like(ca)
+    backward[:, 1:] = ca[:, 1:] - ca[:, :-1]
+    backward[:, 0] = backward[:, 1]
+
+    u = __normalize(forward + backward)
+
+    # outward bisector; at the termini (and for straight segments) any perpendicular is used
+    v = backward - forward
+    v = v - np.sum(v*u, axis=2, keepdims=True)*u
+
+    degenerate = np.linalg.norm(v, axis=2) < 1e-3
+    if np.any(degenerate):
+        reference = np.where(np.abs(u[..., 0:1]) < 0.9, np.array([1, 0, 0], dtype=u.dtype), np.array([0, 1, 0], dtype=u.dtype))
+        fallback = np.cross(u, reference)
+        v[degenerate] = fallback[degenerate]
+
+    v = __normalize(v)
+    w = np.cross(u, v)
+
+    return (u, v, w)
+
+
+# ........................................................................
+#
+def __place_atoms(ca, frame_residue, offsets):
+    """
+    Internal function that builds all atom positions from the CA trace of one chain.
+
+    """
+
+    (u, v, w) = __residue_frames(ca)
+    offsets = offsets.astype(ca.dtype)
+
+    return (ca[:, frame_residue]
+            + offsets[:, 0, np.newaxis]*u[:, frame_residue]
+            + offsets[:, 1, np.newaxis]*v[:, frame_residue]
+            + offsets[:, 2, np.newaxis]*w[:, frame_residue])
+
+
+# ........................................................................
+#
+def __build_system(sequence, n_residues, n_chains, model, nu, resolution, caps, box, seed):
+    """
+    Internal function that builds the topology, chain placement and random number generator of
+    a synthetic system.
+
+    Returns
+    -------
+    dict
+
+    """
+
+    sequence = __get_sequence(sequence, n_residues)
+    (topology, (frame_residue, offsets)) = build_topology(sequence, n_chains=n_chains, caps=caps, resolution=resolution)
+
+    n_chains = int(n_chains)
+    rng = np.random.default_rng(seed)
+
+    if box is None:
+        # chains on a line, separated by several times their expected end-to-end distance
+        exponent = 0.5 if model == 'gaussian' else nu
+        spacing = 4*BOND_LENGTH*np.power(len(sequence), exponent)
+        centers = np.column_stack((spacing*np.arange(n_chains), np.zeros(n_chains), np.zeros(n_chains)))
+    else:
+        box = float(box)
+        if not box > 0:
+            raise CTException('box must be a positive box length (Angstroms)')
+        centers = rng.uniform(0, box, size=(n_chains, 3))
+
+    atoms_per_chain = topology.n_atoms // n_chains
+
+    return {'sequence': sequence,
+            'topology': topology,
+            'frame_residue': frame_residue[:atoms_per_chain],
+            'offsets': offsets[:atoms_per_chain],
+            'atoms_per_chain': atoms_per_chain,
+            'centers': centers,
+            'box': box,
+            'model': model,
+            'nu': nu,
+            'rng': rng}
+
+
+# ........................................................................
+#
+def __generate_block(system, n_frames):
+    """
+    Internal function that returns an [n_frames x n_atoms x 3] block of coordinates (nm) and the
+    matching unit cell lengths and angles (None if there is no box).
+
+    """
+
+    atoms_per_chain = system['atoms_per_chain']
+
+    xyz = np.empty((n_frames, system['topology'].n_atoms, 3), dtype=np.float32)
+    for (c, center) in enumerate(system['centers']):
+        ca = generate_chain_coordinates(n_frames, len(system['sequence']), model=system['model'], nu=system['nu'], seed=system['rng'])
+        ca += center.astype(np.float32)
+
+        xyz[:, c*atoms_per_chain:(c+1)*atoms_per_chain] = __place_atoms(ca, system['frame_residue'], system['offsets'])
+
+    xyz *= np.float32(0.1)
+
+    if system['box'] is None:
+        return (xyz, None, None)
+
+    lengths = np.full((n_frames, 3), 0.1*system['box'], dtype=np.float32)
+    angles = np.full((n_frames, 3), 90.0, dtype=np.float32)
+
+    return (xyz, lengths, angles)
+
+
+# ........................................................................
+#
+def generate_trajectory(sequence=None, n_residues=None, n_frames=100, n_chains=1, model='gaussian', nu=EXCLUDED_VOLUME_NU, resolution='all-atom', caps=False, box=None, timestep=1.0, seed=None):
+    """
+    Generates an in-memory synthetic trajectory. Every frame is an independent conformation.
+
+    Parameters
+    ----------
+    sequence : str {None}
+        One-letter amino acid sequence of each chain.
+
+    n_residues : int {None}
+        Number of residues per chain if no sequence is given (residues cycle through the 20
+        amino acids).
+
+    n_frames : int {100}
+        Number of frames.
+
+    n_chains : int {1}
+        Number of chains, each with the same sequence.
+
+    model : str {'gaussian'}
+        Chain model, one of 'gaussian' or 'excluded-volume'.
+
+    nu : float {0.588}
+        Scaling exponent of the 'excluded-volume' model.
+
+    resolution : str {'all-atom'}
+        'all-atom' (backbone atoms plus CB) or 'CA' (one CA bead per residue).
+
+    caps : bool {False}
+        If True ACE and NME caps are added to each chain (all-atom resolution only).
+
+    box : float {None}
+        If provided chains are placed at random positions in a cubic periodic box of this side
+        length (Angstroms) and the unit cell is set. Coordinates are not wrapped.
+
+    timestep : float {1.0}
+        Time between frames (ps).
+
+    seed : int or None {None}
+        Seed for the random number generator.
+
+    Returns
+    -------
+    mdtraj.Trajectory
+
+    """
+
+    n_frames = int(n_frames)
+    if n_frames < 1:
+        raise CTException('n_frames must be a positive integer')
+
+    system = __build_system(sequence, n_residues, n_chains, model, nu, resolution, caps, box, seed)
+    (xyz, lengths, angles) = __generate_block(system, n_frames)
+
+    return md.Trajectory(xyz, system['topology'], time=timestep*np.arange(n_frames), unitcell_lengths=lengths, unitcell_angles=angles)
+
+
+# ........................................................................
+#
+def write_trajectory(pdb_filename, xtc_filename, sequence=None, n_residues=None, n_frames=100, n_chains=1, model='gaussian', nu=EXCLUDED_VOLUME_NU, resolution='all-atom', caps=False, box=None, timestep=1.0, seed=None, chunk_size=1000):
+    """
+    Generates a synthetic trajectory and writes it as a PDB (topology, first frame) and an XTC
+    file. Frames are generated and written in blocks of chunk_size frames, so memory does not
+    depend on the number of frames. See generate_trajectory() for a description of the options.
+
+    Parameters
+    ----------
+    pdb_filename : str
+        PDB file to write.
+
+    xtc_filename : str
+        XTC file to write.
+
+    chunk_size : int {1000}
+        Number of frames generated and written at once.
+
+    Returns
+    -------
+    None
+
+    """
+
+    n_frames = int(n_frames)
+    chunk_size = int(chunk_size)
+    if n_frames < 1 or chunk_size < 1:
+        raise CTException('n_frames and chunk_size must be positive integers')
+
+    system = __build_system(sequence, n_residues, n_chains, model, nu, resolution, caps, box, seed)
+
+    with md.formats.XTCTrajectoryFile(xtc_filename, 'w') as fh:
+        for start in range(0, n_frames, chunk_size):
+            n = min(chunk_size, n_frames - start)
+            (xyz, lengths, angles) = __generate_block(system, n)
+
+            if start == 0:
+                md.Trajectory(xyz[0:1], system['topology'], unitcell_lengths=None if lengths is None else lengths[0:1], unitcell_angles=None if angles is None else angles[0:1]).save_pdb(pdb_filename)
+
+            box_vectors = None
+            if lengths is not None:
+                box_vectors = np.zeros((n, 3, 3), dtype=np.float32)
+                box_vectors[:, [0, 1, 2], [0, 1, 2]] = lengths
+
+            fh.write(xyz, time=timestep*np.arange(start, start + n, dtype=np.float32), box=box_vectors)
@@ -28,8 +28,11 @@ from .ctprotein import CTProtein
 from .ctexceptions import CTException
 from . import ctutils
 from . import ctio
+from . import ctreader
+from . import ctprofiling
 
 
+@ctprofiling.profile_methods
 class CTTrajectory:
     """
     CTrajectory class that holds a single simulation trajectory object. 
@@ -40,7 +43,7 @@ class CTTrajectory:
     #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
     #
     #
-    def __init__(self, trajectory_filename=None, pdb_filename=None, TRJ=None, protein_grouping=None, pdblead=False, debug=False):
+    def __init__(self, trajectory_filename=None, pdb_filename=None, TRJ=None, protein_grouping=None, pdblead=False, debug=False, start=0, stop=None, stride=1, n_workers=None, atom_selection=None, copy=False):
         """
         CAMPARITraj trajectory object initializer. 
 
@@ -59,9 +62,10 @@ class CTTrajectory:
                
         Parameters
         ----------        
-        trajectory_filename : str
+        trajectory_filename : str or list of str
             Filename which contains the trajectory file of interest. Normally \
-            this is `__traj.xtc` or `__traj.dcd`.
+            this is `__traj.xtc` or `__traj.dcd`. If a list of filenames is passed \
+            these are read (in order) as a single trajectory.
 
         pdb_filename : str
             Filename which contains the pdb file associated with the trajectory \
@@ -72,7 +76,9 @@ class CTTrajectory:
             object from that trajectory. This could be done by writing that new trajectory \
             to file, but this is extremely slow due to the I/O impact of reading/writing \
             from disk. If an mdtraj trajectory objected is passed, this is used as the \
-            new trajectory from which the CTTrajectory object is constructed. 
+            new trajectory from which the CTTrajectory object is constructed. Unless \
+            `copy` is True the passed trajectory is used directly (not copied), so the \
+            CTTrajectory shares its coordinates with `TRJ`.
 
             Default = None
 
@@ -92,32 +98,93 @@ class CTTrajectory:
         debug : book
             Prints warning/help information to help debug weird stuff during initial trajectory read-in. 
             Default = False.
+
+        start : int
+            First frame to read from the trajectory file(s). Frames before this are never \
+            decoded. Note that if `pdblead` is True the PDB frame is still added as the first \
+            frame.
+
+            Default = 0
+
+        stop : int or None
+            Frame at which reading stops (exclusive). If None all frames are read.
+
+            Default = None
+
+        stride : int
+            Only every stride-th frame (starting from `start`) is read from the trajectory \
+            file(s). Frames that are skipped are never decoded.
+
+            Default = 1
+
+        n_workers : int
+            Number of worker processes used to decode the trajectory file(s). Decoding is \
+            split across files and into frame blocks within files. If None the number of \
+            workers defined by the global resource policy is used (see `camparitraj.set_resources()`).
+
+            Default = None
+
+        atom_selection : str, list of int or None
+            Atoms to keep, one of 'all', 'protein' (every atom in a protein chain), 'heavy' \
+            (protein atoms other than hydrogens), 'backbone+CB', an mdtraj selection string, \
+            or a list of atom indices (see `ctreader.select_atoms()`). When reading from file \
+            the selection is applied as frames are decoded, so excluded atoms (e.g. solvent \
+            and ions in explicit-solvent simulations) are never held in memory. Note that \
+            analyses which need the excluded atoms (e.g. hydrogens for SASA) will be affected. \
+            The indices of the kept atoms in the full system are stored in `atom_indices` \
+            (None if every atom was kept). Note that all other atom indices (e.g. \
+            `protein_atom_list`) refer to the selected atoms.
+
+            Default = None
+
+        copy : bool
+            Only used when a trajectory is passed via `TRJ`. If True the CTTrajectory \
+            holds its own copy of the trajectory, otherwise (the default) it shares the \
+            coordinates with `TRJ`, such that constructing a CTTrajectory costs no \
+            memory. Note that with sharing, in-place modifications of `TRJ` (e.g. \
+            `TRJ.superpose()`) are seen by the CTTrajectory and vice versa. An atom \
+            selection always creates a new trajectory.
+
+            Default = False
         """
         
         # first we decide if we're reading from file or from an existing trajectory
         if (trajectory_filename is None) and (pdb_filename is None):
             if TRJ is None:
                 raise CTException('No input provided! Please provide ether a pdb and trajectory file OR a pre-formed traj object')
-                
-            # note the [:] means this is a COPY!
-            self.traj = TRJ[:]
+
+            self.atom_indices = ctreader.select_atoms(TRJ.topology, atom_selection)
+
+            # the passed trajectory is shared unless a copy was requested (atom_slice always copies)
+            if self.atom_indices is None:
+                if copy:
+                    self.traj = TRJ[:]
+                else:
+                    self.traj = TRJ
+            else:
+                self.traj = TRJ.atom_slice(self.atom_indices)
         else:
             if (trajectory_filename is None):
                 raise CTException('No trajectory file provided!')
             if (pdb_filename is None):
                 raise CTException('No PDB file provided!')
 
+            # the topology is parsed once, and used both to resolve the atom selection and to
+            # decode the trajectory
+            topology = md.load_topology(pdb_filename)
+            self.atom_indices = ctreader.select_atoms(topology, atom_selection)
+
             # read in the raw trajectory
-            self.traj = self.__readTrajectory(trajectory_filename, pdb_filename, pdblead)
+            self.traj = self.__readTrajectory(trajectory_filename, pdb_filename, pdblead, start=start, stop=stop, stride=stride, n_workers=n_workers, topology=topology, atom_indices=self.atom_indices)
 
 
         # Next, having read in the trajectory we parse out into proteins
         # extract a list of protein trajectories where each protein is assumed
         # to be in its own chain
         if protein_grouping == None:
-            (self.proteinTrajectoryList, self.resid_offset_list, self.atom_offset_list) = self.__get_proteins(self.traj, debug)        
+            (self.proteinTrajectoryList, self.resid_offset_list, self.atom_offset_list, self.protein_atom_list) = self.__get_proteins(self.traj, debug)        
         else:
-            (self.proteinTrajectoryList, self.resid_offset_list, self.atom_offset_list)  = self.__get_proteins_by_residue(self.traj, protein_grouping, debug)
+            (self.proteinTrajectoryList, self.resid_offset_list, self.atom_offset_list, self.protein_atom_list)  = self.__get_proteins_by_residue(self.traj, protein_grouping, debug)
 
         
         self.num_proteins = len(self.proteinTrajectoryList)
@@ -135,7 +202,7 @@ class CTTrajectory:
     #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
     #
     #
-    def __readTrajectory(self, trajectory_filename, pdb_filename, pdblead):
+    def __readTrajectory(self, trajectory_filename, pdb_filename, pdblead, start=0, stop=None, stride=1, n_workers=None, topology=None, atom_indices=None):
         """
         Internal function which parses and reads in a CAMPARI trajectory
 
@@ -151,10 +218,11 @@ class CTTrajectory:
 
         Parameters
         -----------
-        trajectory_filename : str
+        trajectory_filename : str or list of str
             Filename which contains the trajectory file of interest. File type
-            is automatically detected and dealt with mdtraj' 'load' command
-            (i.e. md.load(filename, top=pdb_filename))
+            is automatically detected and frames are decoded by `ctreader.read_trajectory`
+            (which seeks directly to the selected frames for XTC/DCD/TRR files). A list
+            of files is read as one trajectory.
 
         pdb_filename : str
             Filename which contains the pdb file associated with the trajectory
@@ -168,6 +236,24 @@ class CTTrajectory:
             an analysis where that first structure should be a reference frame
             but it's not actually included in the trajectory file.
 
+        start : int {0}
+            First frame to read.
+
+        stop : int or None {None}
+            Frame at which reading stops (exclusive).
+
+        stride : int {1}
+            Only every stride-th frame is read.
+
+        n_workers : int or None {None}
+            Number of worker processes used for decoding (None uses the resource policy).
+
+        topology : mdtraj.Topology or None {None}
+            Already parsed topology defined by `pdb_filename` (parsed again if None).
+
+        atom_indices : np.ndarray or None {None}
+            If provided only these atoms are read (from both the trajectory and the PDB file).
+
         Returns
         --------
         mdtraj.traj 
@@ -175,9 +261,8 @@ class CTTrajectory:
 
         """
 
-        # straight up read the trajectory first using mdtraj's awesome
-        # trajectory reading facility
-        traj =  md.load(trajectory_filename, top=pdb_filename)
+        # read the trajectory first, only decoding the frames we actually want
+        traj = ctreader.read_trajectory(trajectory_filename, pdb_filename, start=start, stop=stop, stride=stride, n_workers=n_workers, topology=topology, atom_indices=atom_indices)
                     
         # check unit cell lengths
         try:
@@ -194,7 +279,7 @@ class CTTrajectory:
         # and then add it to the front (the PDB file is its own topology
         # file so no need to specificy the top= file here!
         if pdblead:
-            pdbtraj = md.load(pdb_filename)
+            pdbtraj = md.load(pdb_filename, atom_indices=atom_indices)
             traj = pdbtraj+traj
 
 
@@ -236,15 +321,21 @@ class CTTrajectory:
         Returns
         ---------
         tuple :
-            Returns a tuple with three lists:
+            Returns a tuple with four lists:
         
             proteinTrajectoryList - contains a list of 0 or more CTProtein objcts        
             resid_offset_list     - contains a list of 0 or more integers which are 
                                     resid offset values
             atom_offset_list      - contains a list of 0 or more integers which are
                                     atom offset values
+            protein_atom_list     - contains a list of 0 or more lists of integers which
+                                    are the atom indices of each protein in the passed
+                                    `trajectory`. If an atom selection was applied when
+                                    the CTTrajectory was created these index the selected
+                                    atoms, not the full system (`atom_indices` maps them
+                                    back to the full system)
  
-            Note all three lists must be the same length (by definition)
+            Note all four lists must be the same length (by definition)
         
         """
 
@@ -315,7 +406,11 @@ class CTTrajectory:
             # consistent and contains an associated and fully
             # correct .topology object (NOTE this fixes a 
             # previous bug in CAMPARITraj 0.1.4)
-            PT = trajectory.atom_slice(local_chain_atoms)
+            # (if the protein is the entire system the trajectory is shared rather than copied)
+            if len(local_chain_atoms) == trajectory.n_atoms:
+                PT = trajectory
+            else:
+                PT = trajectory.atom_slice(local_chain_atoms)
 
             # gets the resid offset in a way that is ensures internal
             # consistency for the CTProtein object
@@ -328,7 +423,7 @@ class CTTrajectory:
         if len(proteinTrajectoryList) == 0:
             ctio.warning_message('No protein chains found in the trajectory')
 
-        return (proteinTrajectoryList, resid_offset_list, atom_offset_list)
+        return (proteinTrajectoryList, resid_offset_list, atom_offset_list, chainAtoms)
 
 
 
@@ -363,6 +458,11 @@ class CTTrajectory:
             CAMPARITraj internal residue indexing, meaning that indexing begins at 0 from
             the first residue in the PDB file.
 
+        Returns
+        ---------
+        tuple :
+            Returns a tuple with four lists, as described for `__get_proteins()`.
+
         """
         
         atom_offset_list  = []
@@ -410,7 +510,11 @@ class CTTrajectory:
             # consistent and contains an associated and fully
             # correct .topology object (NOTE this fixes a 
             # previous bug in CAMPARITraj 0.1.4)
-            PT = trajectory.atom_slice(local_group_atoms)            
+            # (if the protein is the entire system the trajectory is shared rather than copied)
+            if len(local_group_atoms) == trajectory.n_atoms:
+                PT = trajectory
+            else:
+                PT = trajectory.atom_slice(local_group_atoms)
             
             # gets the resid offset in a way that is ensures internal
             # consistency for the CTProtein object
@@ -422,7 +526,7 @@ class CTTrajectory:
             ctio.warning_message('No protein chains found in the trajectory')
 
 
-        return (proteinTrajectoryList, resid_offset_list, atom_offset_list)
+        return (proteinTrajectoryList, resid_offset_list, atom_offset_list, group_atoms)
 
 
     #oxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxoxoxoxoxoxoxoxoxoxooxoxo
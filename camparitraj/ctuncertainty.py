@@ -0,0 +1,593 @@
+"""
+ctuncertainty contains stand-alone functions for estimating the statistical uncertainty
+associated with ensemble averages computed from (correlated) simulation frames. All
+functions operate on arrays where the first axis runs over frames and any remaining axes
+define the observable (e.g. a scalar per frame, a vector per frame, or a full [n x n] map
+per frame), such that error bars for every element of a distance or contact map are
+obtained in a single pass without recomputing the underlying observable.
+
+Two estimators are provided:
+
+* **Block averaging** - frames are grouped into contiguous blocks which are (approximately)
+  statistically independent, and the standard error is estimated from the spread of the
+  block means.
+
+* **Block bootstrap** - the block means are resampled with replacement. Resampling is done
+  over block indices (a single [n_bootstrap x n_blocks] count matrix) such that every
+  bootstrap replicate of every observable is obtained from one matrix product.
+
+The block size can be selected automatically from the integrated autocorrelation time of
+the data.
+
+"""
+
+##
+##                                       _ _              _
+##   ___ __ _ _ __ ___  _ __   __ _ _ __(_) |_ _ __ __ _ (_)
+##  / __/ _` | '_ ` _ \| '_ \ / _` | '__| | __| '__/ _` || |
+## | (_| (_| | | | | | | |_) | (_| | |  | | |_| | | (_| || |
+##  \___\__,_|_| |_| |_| .__/ \__,_|_|  |_|\__|_|  \__,_|/ |
+##                     |_|                             |__/
+##
+## Alex Holehouse (Pappu Lab and Holehouse Lab)
+## Simulation analysis package
+## Copyright 2014 - 2021
+##
+
+import numpy as np
+
+from .ctexceptions import CTException
+
+
+# maximum number of floats held in memory at once for the bootstrap replicate array. Above this
+# the observables are processed in column-chunks
+MAX_BOOTSTRAP_ELEMENTS = 20000000
+
+
+# ........................................................................
+#
+def __as_frame_array(data, weights=None, min_frames=2):
+    """
+    Internal function that converts the passed data into an [n_frames x n_observables]
+    float array (i.e. flattens any trailing observable axes) and validates the weights.
+
+    Parameters
+    ----------
+    data : array_like
+        Array where the first axis is frames.
+
+    weights : array_like or None
+        Per-frame weights or None.
+
+    min_frames : int
+        Minimum number of frames required.
+
+    Returns
+    -------
+    tuple
+        A 3-tuple containing:
+        - [0] := [n_frames x n_observables] float array.
+        - [1] := The shape of a single observable (used to restore the output shape).
+        - [2] := Normalized weights as a numpy array, or None.
+
+    Raises
+    ------
+    CTException
+        If there are too few frames or the weights are not valid.
+    """
+
+    data = np.asarray(data, dtype=np.float64)
+
+    if data.ndim == 0:
+        raise CTException('Data must be an array where the first axis runs over frames')
+
+    n_frames = data.shape[0]
+
+    if n_frames < min_frames:
+        raise CTException('At least %i frames are needed to estimate an uncertainty (got %i)' % (min_frames, n_frames))
+
+    obs_shape = data.shape[1:]
+    data = data.reshape(n_frames, -1)
+
+    if weights is not None and weights is not False:
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim != 1 or len(weights) != n_frames:
+            raise CTException('Passed weights array is %i in length, while there are actually %i frames - these must match' % (len(weights), n_frames))
+
+        if np.any(weights < 0) or np.sum(weights) <= 0:
+            raise CTException('Weights must be non-negative and sum to a positive value')
+
+        weights = weights / np.sum(weights)
+    else:
+        weights = None
+
+    return (data, obs_shape, weights)
+
+
+# ........................................................................
+#
+def __get_blocks(data, block_size, weights=None):
+    """
+    Internal function that computes the per-block (weighted) means. Any remainder frames that
+    do not fill a complete block are discarded from the START of the data, on the basis that
+    early frames are the least likely to be equilibrated.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        [n_frames x n_observables] array.
+
+    block_size : int
+        Number of frames per block.
+
+    weights : np.ndarray or None
+        Normalized per-frame weights or None.
+
+    Returns
+    -------
+    tuple
+        A 2-tuple containing:
+        - [0] := [n_blocks x n_observables] array of block means.
+        - [1] := [n_blocks] array of the total weight in each block (all equal if unweighted).
+    """
+
+    n_frames = data.shape[0]
+    n_blocks = n_frames // block_size
+    first = n_frames - n_blocks*block_size
+
+    blocked = data[first:].reshape(n_blocks, block_size, -1)
+
+    if weights is None:
+        return (blocked.mean(axis=1), np.full(n_blocks, 1.0/n_blocks))
+
+    block_weights = weights[first:].reshape(n_blocks, block_size)
+    block_totals = block_weights.sum(axis=1)
+
+    if np.sum(block_totals) <= 0:
+        raise CTException('All frames that fall into complete blocks have a weight of zero')
+
+    # blocks with zero total weight contribute nothing (their mean is set to zero rather than nan)
+    safe_totals = np.where(block_totals > 0, block_totals, 1.0)
+    block_means = np.einsum('bf,bfo->bo', block_weights, blocked) / safe_totals[:, np.newaxis]
+
+    return (block_means, block_totals / np.sum(block_totals))
+
+
+# ........................................................................
+#
+def __check_block_size(block_size, n_frames, min_blocks):
+    """
+    Internal function that checks a passed block size makes sense for the number
+    of frames available.
+
+    Raises
+    ------
+    CTException
+        If the block size is less than 1 or yields fewer than `min_blocks` blocks.
+    """
+
+    block_size = int(block_size)
+
+    if block_size < 1:
+        raise CTException('block_size (%i) must be 1 or larger' % (block_size))
+
+    if n_frames // block_size < min_blocks:
+        raise CTException('block_size (%i) gives fewer than %i blocks for %i frames' % (block_size, min_blocks, n_frames))
+
+    return block_size
+
+
+# ........................................................................
+#
+def __get_replicate_weights(block_weights, n_bootstrap, seed):
+    """
+    Internal function that draws the bootstrap replicates as a single [n_bootstrap x n_blocks]
+    matrix, where row b holds the (normalized) weight of each block in replicate b. Each replicate
+    average is then one row of this matrix multiplied by the block means.
+
+    Parameters
+    ----------
+    block_weights : np.ndarray
+        [n_blocks] array of the total weight in each block.
+
+    n_bootstrap : int
+        Number of bootstrap replicates.
+
+    seed : int or None
+        Seed for the random number generator.
+
+    Returns
+    -------
+    np.ndarray
+        [n_replicates x n_blocks] array of replicate weights. Replicates that only drew
+        zero-weight blocks are discarded, so n_replicates may be less than n_bootstrap.
+
+    Raises
+    ------
+    CTException
+        If fewer than two replicates have a non-zero weight.
+    """
+
+    n_blocks = len(block_weights)
+
+    # build the [n_bootstrap x n_blocks] count matrix in one go - row b records how many times
+    # each block was drawn in replicate b
+    rng = np.random.default_rng(seed)
+    draws = rng.integers(0, n_blocks, size=(n_bootstrap, n_blocks))
+    offsets = np.arange(n_bootstrap)[:, np.newaxis] * n_blocks
+    counts = np.bincount((draws + offsets).ravel(), minlength=n_bootstrap*n_blocks).reshape(n_bootstrap, n_blocks)
+
+    # each replicate is then a weighted combination of block means
+    replicate_weights = counts * block_weights[np.newaxis, :]
+
+    # with heavily reweighted data a replicate may only draw zero-weight blocks, in which case
+    # its average is undefined and it is discarded
+    replicate_totals = replicate_weights.sum(axis=1)
+    replicate_weights = replicate_weights[replicate_totals > 0] / replicate_totals[replicate_totals > 0][:, np.newaxis]
+
+    if replicate_weights.shape[0] < 2:
+        raise CTException('Too few bootstrap replicates with non-zero weight - check the weights or use a larger block size')
+
+    return replicate_weights
+
+
+# ........................................................................
+#
+def autocorrelation(data):
+    """
+    Computes the normalized autocorrelation function for each observable in `data` along the
+    frame axis. This is computed using an FFT over all observables simultaneously, so it is
+    efficient even for a full [n x n] map per frame.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of shape (n_frames, ...) where the first axis corresponds to frames.
+
+    Returns
+    -------
+    np.ndarray
+        Array with the same shape as `data` where element [t, ...] is the autocorrelation at lag t.
+        Observables with zero variance have an autocorrelation of 1 at lag 0 and 0 elsewhere.
+    """
+
+    (data, obs_shape, _) = __as_frame_array(data)
+    n_frames = data.shape[0]
+
+    fluctuations = data - data.mean(axis=0)
+
+    # zero-pad to avoid the circular wrap-around of the FFT
+    n_fft = 1 << int(np.ceil(np.log2(2*n_frames)))
+    transform = np.fft.rfft(fluctuations, n=n_fft, axis=0)
+    acf = np.fft.irfft(transform * np.conjugate(transform), n=n_fft, axis=0)[:n_frames]
+
+    # unbiased normalization (number of pairs at each lag)
+    acf = acf / np.arange(n_frames, 0, -1)[:, np.newaxis]
+
+    variance = acf[0].copy()
+    constant = variance <= 0
+    variance[constant] = 1.0
+    acf = acf / variance
+
+    acf[:, constant] = 0.0
+    acf[0, constant] = 1.0
+
+    return acf.reshape((n_frames,) + obs_shape)
+
+
+# ........................................................................
+#
+def integrated_autocorrelation_time(data, window_factor=5):
+    """
+    Estimates the integrated autocorrelation time (in frames) for each observable using the
+    self-consistent window method of Sokal, i.e. tau = 1 + 2*sum_{t=1}^{M} rho(t) where M
+    is the smallest lag for which M >= window_factor * tau(M).
+
+    An uncorrelated series has tau = 1; the number of effectively independent samples is
+    approximately n_frames/tau.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of shape (n_frames, ...) where the first axis corresponds to frames.
+
+    window_factor : float {5}
+        Factor used to define the self-consistent summation window.
+
+    Returns
+    -------
+    np.ndarray or float
+        Integrated autocorrelation time for each observable (same shape as a single frame of
+        `data`). A float is returned if `data` is one-dimensional.
+    """
+
+    acf = autocorrelation(data)
+    n_frames = acf.shape[0]
+    obs_shape = acf.shape[1:]
+    acf = acf.reshape(n_frames, -1)
+
+    # running estimate of tau for each possible window M = 0 ... n_frames-1
+    tau = 1 + 2*np.cumsum(acf[1:], axis=0)
+    tau = np.vstack([np.ones((1, acf.shape[1])), tau])
+
+    # first window satisfying the self-consistency condition (fall back to the last window)
+    window = np.arange(n_frames)[:, np.newaxis] >= window_factor * tau
+    has_window = window.any(axis=0)
+    M = np.where(has_window, np.argmax(window, axis=0), n_frames - 1)
+
+    tau = tau[M, np.arange(acf.shape[1])]
+
+    # tau cannot be less than 1 in a meaningful sense for block selection, but anticorrelated
+    # data can give lower values so we keep it positive
+    tau = np.maximum(tau, 1.0/n_frames)
+
+    if len(obs_shape) == 0:
+        return float(tau[0])
+
+    return tau.reshape(obs_shape)
+
+
+# ........................................................................
+#
+def select_block_size(data, min_blocks=10, window_factor=5):
+    """
+    Selects a block size (in frames) from the autocorrelation of the data. The block size is
+    set to 2*tau_max, where tau_max is the largest integrated autocorrelation time over all
+    observables, such that adjacent blocks are approximately independent. The block size is
+    capped such that there are at least `min_blocks` blocks.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of shape (n_frames, ...) where the first axis corresponds to frames.
+
+    min_blocks : int {10}
+        The minimum number of blocks that must be available.
+
+    window_factor : float {5}
+        Passed to `integrated_autocorrelation_time`.
+
+    Returns
+    -------
+    int
+        Number of frames per block.
+
+    Raises
+    ------
+    CTException
+        If there are fewer frames than `min_blocks`.
+    """
+
+    data = np.asarray(data)
+
+    if data.shape[0] < min_blocks:
+        raise CTException('Need at least %i frames to form %i blocks (got %i)' % (min_blocks, min_blocks, data.shape[0]))
+
+    tau = np.max(integrated_autocorrelation_time(data, window_factor=window_factor))
+    block_size = int(np.ceil(2*tau))
+
+    return int(min(max(block_size, 1), data.shape[0] // min_blocks))
+
+
+# ........................................................................
+#
+def block_average(data, block_size=None, weights=None, min_blocks=10):
+    """
+    Computes the ensemble average and its block-averaged standard error for each observable.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of shape (n_frames, ...) where the first axis corresponds to frames. For example
+        a 1D array of Rg values or an [n_frames x n x n] array of per-frame distance maps.
+
+    block_size : int or None {None}
+        Number of frames per block. If None the block size is selected automatically using
+        `select_block_size`.
+
+    weights : array_like or None {None}
+        Optional per-frame weights. If provided the mean, block means and standard error are
+        all computed using the (normalized) weights.
+
+    min_blocks : int {10}
+        Minimum number of blocks allowed.
+
+    Returns
+    -------
+    tuple
+        A 3-tuple containing:
+        - [0] := The ensemble average of each observable (computed over all frames).
+        - [1] := The block-averaged standard error of each observable.
+        - [2] := The block size used (int).
+
+    Raises
+    ------
+    CTException
+        If the block size is invalid, or weights do not match the number of frames.
+    """
+
+    (flat, obs_shape, weights) = __as_frame_array(data, weights, min_frames=min_blocks)
+    n_frames = flat.shape[0]
+
+    if block_size is None:
+        block_size = select_block_size(flat, min_blocks=min_blocks)
+
+    block_size = __check_block_size(block_size, n_frames, min_blocks)
+
+    (block_means, block_weights) = __get_blocks(flat, block_size, weights)
+    n_blocks = block_means.shape[0]
+
+    if weights is None:
+        mean = flat.mean(axis=0)
+    else:
+        mean = np.average(flat, axis=0, weights=weights)
+
+    # weighted variance of the block means around their own weighted mean, converted into
+    # the variance of the mean using the effective number of blocks
+    block_center = np.average(block_means, axis=0, weights=block_weights)
+    block_var = np.average((block_means - block_center)**2, axis=0, weights=block_weights)
+
+    n_eff = 1.0 / np.sum(block_weights**2)
+    stderr = np.sqrt(block_var * n_blocks / (n_blocks - 1) / n_eff)
+
+    return (mean.reshape(obs_shape), stderr.reshape(obs_shape), block_size)
+
+
+# ........................................................................
+#
+def block_bootstrap(data, block_size=None, n_bootstrap=1000, confidence=95, weights=None, seed=None, min_blocks=10):
+    """
+    Computes bootstrap confidence intervals for the ensemble average of each observable by
+    resampling frame blocks with replacement.
+
+    The block means are computed once, and all bootstrap replicates are generated from a single
+    [n_bootstrap x n_blocks] matrix of resampling counts, such that the replicate averages for
+    every observable come from one matrix product (observables are processed in column-chunks
+    if needed to bound memory). This means error bars for a full [n x n] map cost little more
+    than the map itself.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of shape (n_frames, ...) where the first axis corresponds to frames.
+
+    block_size : int or None {None}
+        Number of frames per block. If None the block size is selected automatically using
+        `select_block_size`. Using `block_size=1` gives a standard (frame) bootstrap.
+
+    n_bootstrap : int {1000}
+        Number of bootstrap replicates.
+
+    confidence : float {95}
+        Width of the confidence interval in percent.
+
+    weights : array_like or None {None}
+        Optional per-frame weights. If provided each replicate is a weighted average, where
+        each resampled block contributes its total weight.
+
+    seed : int or None {None}
+        Seed for the random number generator, allowing reproducible intervals.
+
+    min_blocks : int {10}
+        Minimum number of blocks allowed.
+
+    Returns
+    -------
+    tuple
+        A 5-tuple containing:
+        - [0] := The ensemble average of each observable.
+        - [1] := The bootstrap standard error of each observable.
+        - [2] := The lower bound of the confidence interval for each observable.
+        - [3] := The upper bound of the confidence interval for each observable.
+        - [4] := The block size used (int).
+
+    Raises
+    ------
+    CTException
+        If the block size, confidence or number of bootstrap replicates is invalid.
+    """
+
+    if confidence <= 0 or confidence >= 100:
+        raise CTException('confidence must be between 0 and 100 (got %s)' % (str(confidence)))
+
+    n_bootstrap = int(n_bootstrap)
+    if n_bootstrap < 2:
+        raise CTException('n_bootstrap (%i) must be 2 or larger' % (n_bootstrap))
+
+    (flat, obs_shape, weights) = __as_frame_array(data, weights, min_frames=min_blocks)
+    n_frames = flat.shape[0]
+
+    if block_size is None:
+        block_size = select_block_size(flat, min_blocks=min_blocks)
+
+    block_size = __check_block_size(block_size, n_frames, min_blocks)
+
+    (block_means, block_weights) = __get_blocks(flat, block_size, weights)
+
+    if weights is None:
+        mean = flat.mean(axis=0)
+    else:
+        mean = np.average(flat, axis=0, weights=weights)
+
+    replicate_weights = __get_replicate_weights(block_weights, n_bootstrap, seed)
+
+    alpha = (100.0 - confidence) / 2.0
+    n_obs = flat.shape[1]
+
+    stderr = np.zeros(n_obs)
+    lower = np.zeros(n_obs)
+    upper = np.zeros(n_obs)
+
+    chunk = max(1, MAX_BOOTSTRAP_ELEMENTS // replicate_weights.shape[0])
+    for start in range(0, n_obs, chunk):
+        end = start + chunk
+        replicates = np.matmul(replicate_weights, block_means[:, start:end])
+
+        stderr[start:end] = np.std(replicates, axis=0, ddof=1)
+        (lower[start:end], upper[start:end]) = np.percentile(replicates, [alpha, 100.0 - alpha], axis=0)
+
+    return (mean.reshape(obs_shape), stderr.reshape(obs_shape), lower.reshape(obs_shape), upper.reshape(obs_shape), block_size)
+
+
+
+# ........................................................................
+#
+def bootstrap_replicates(data, block_size=None, n_bootstrap=1000, weights=None, seed=None, min_blocks=10):
+    """
+    Returns the bootstrap replicates of the ensemble average of each observable, resampling
+    frame blocks with replacement as in `block_bootstrap`. This is useful when the quantity of
+    interest is a non-linear function of the ensemble averages (e.g. a scaling exponent fitted to
+    an internal scaling profile), in which case the function can be evaluated for every replicate.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of shape (n_frames, ...) where the first axis corresponds to frames.
+
+    block_size : int or None {None}
+        Number of frames per block. If None the block size is selected automatically using
+        `select_block_size`.
+
+    n_bootstrap : int {1000}
+        Number of bootstrap replicates.
+
+    weights : array_like or None {None}
+        Optional per-frame weights.
+
+    seed : int or None {None}
+        Seed for the random number generator.
+
+    min_blocks : int {10}
+        Minimum number of blocks allowed.
+
+    Returns
+    -------
+    tuple
+        A 2-tuple containing:
+        - [0] := Array of shape (n_replicates, ...) with the average of each observable in every
+                 replicate. Replicates that only drew zero-weight blocks are discarded, so
+                 n_replicates may be less than n_bootstrap.
+        - [1] := The block size used (int).
+
+    Raises
+    ------
+    CTException
+        If the block size or number of bootstrap replicates is invalid.
+    """
+
+    n_bootstrap = int(n_bootstrap)
+    if n_bootstrap < 2:
+        raise CTException('n_bootstrap (%i) must be 2 or larger' % (n_bootstrap))
+
+    (flat, obs_shape, weights) = __as_frame_array(data, weights, min_frames=min_blocks)
+
+    if block_size is None:
+        block_size = select_block_size(flat, min_blocks=min_blocks)
+
+    block_size = __check_block_size(block_size, flat.shape[0], min_blocks)
+
+    (block_means, block_weights) = __get_blocks(flat, block_size, weights)
+
+    replicates = np.matmul(__get_replicate_weights(block_weights, n_bootstrap, seed), block_means)
+
+    return (replicates.reshape((replicates.shape[0],) + obs_shape), block_size)
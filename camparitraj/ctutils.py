@@ -12,26 +12,20 @@
 ##
 
 import numpy
-import ctypes
 from . ctexceptions import CTException
+from . import ctresources
 
 
 ##
 ## This is included the force numpy to use defined number of cores. For
 ## some of the linear algebra routines numpy will default to using as many
 ## cores as it can get its greedy little hands on - this function allows that 
-## thirst to be quenched...
+## thirst to be quenched... Kept for backwards compatibility; this now works
+## for any BLAS (not just MKL), see ctresources.set_resources()
 ##
 
 def mkl_set_num_threads(cores):
-    mkl_rt = ctypes.CDLL('libmkl_rt.so')
-    mkl_get_max_threads = mkl_rt.mkl_get_max_threads
-    mkl_rt.mkl_set_num_threads(ctypes.byref(ctypes.c_int(cores)))
-
-
-# usage
-#mkl_set_num_threads(1)
-#print mkl_get_max_threads() 
+    ctresources.set_resources(threads=cores)
 
 def validate_keyword_option(keyword, allowed_vals, keyword_name, error_message=None):
     """
@@ -67,3 +61,51 @@ def validate_keyword_option(keyword, allowed_vals, keyword_name, error_message=N
         if error_message is None:
             raise CTException('Keyword %s passed value [%s], but this is not valid.\nMust be one of :%s'  % (keyword_name, keyword, ", ".join(allowed_vals)))
 
+
+
+def get_frame_weights(weights, n_frames, stride=1):
+    """
+    Helper function that checks a per-frame weights array is usable and returns the weights of
+    every stride-th frame, normalized to sum to 1. This is the single weights check shared by
+    every object that supports frame weights (CTProtein, CTResidueBeads, CTPRE...).
+
+    Parameters
+    -----------
+    weights : array_like
+        One non-negative weight per frame.
+
+    n_frames : int
+        Number of frames the weights must match.
+
+    stride : int {1}
+        If larger than one the weights associated with every stride-th frame are selected
+        and renormalized.
+
+    Returns
+    --------
+    numpy.ndarray
+        Normalized weights for the frames selected every `stride` frames.
+
+    Raises
+    --------
+    ctexceptions.CTException
+        If the weights do not match the number of frames, are negative, or sum to zero.
+
+    """
+
+    weights = numpy.array(weights, dtype=float)
+
+    if weights.ndim != 1 or len(weights) != n_frames:
+        raise CTException('Passed frame weights array is %i in length, while there are actually %i frames - these must match' % (len(weights), n_frames))
+
+    if numpy.any(weights < 0):
+        raise CTException('Passed frame weights array contains negative weights')
+
+    if stride is not None and stride > 1:
+        weights = weights[0:n_frames:int(stride)]
+
+    total = numpy.sum(weights)
+    if total <= 0:
+        raise CTException('Passed frame weights (after applying a stride of %s) sum to zero' % (str(stride)))
+
+    return weights / total
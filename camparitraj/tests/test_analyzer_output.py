@@ -0,0 +1,85 @@
+"""
+Unit and regression tests for the ctanalyzer output formats.
+"""
+
+import os
+
+import numpy as np
+import mdtraj as md
+import pytest
+
+import camparitraj
+from camparitraj.ctanalyzer import analyzer_output
+from camparitraj.ctanalyzer.analyzer_exception import AnalyzerException
+
+
+def test_csv_output(tmp_path):
+
+    output = analyzer_output.get_output(str(tmp_path), 'csv')
+    output.save('RG', np.arange(5.0), delimiter=',')
+    output.save_text('Q_res_by_res', 'A, 1.000\n')
+    output.close()
+
+    assert np.allclose(np.loadtxt(str(tmp_path / 'RG.csv')), np.arange(5.0))
+    assert open(str(tmp_path / 'Q_res_by_res.txt')).read() == 'A, 1.000\n'
+
+
+def test_npz_output(tmp_path):
+
+    dm = np.random.random((50, 50)).astype(np.float32)
+    rg = np.random.random(1000)
+
+    output = analyzer_output.get_output(str(tmp_path), 'npz', metadata={'stride': 2, 'discard': 10, 'parameters': {'dm': True}})
+    output.save('distance_map', dm)
+    output.save('RG', rg, delimiter=',')
+    output.save_text('Q_res_by_res', 'A, 1.000\n')
+
+    with pytest.raises(AnalyzerException):
+        output.save('RG', rg)
+
+    # nothing is visible until the output is closed
+    assert not os.path.exists(str(tmp_path / analyzer_output.RESULTS_FILENAME))
+    output.close()
+
+    with analyzer_output.load_results(str(tmp_path)) as results:
+        assert len(results) == 3
+        assert set(results.keys()) == set(['distance_map', 'RG', 'Q_res_by_res'])
+        assert results.metadata['stride'] == 2
+        assert results.metadata['parameters'] == {'dm': True}
+        assert results.shape('distance_map') == (50, 50)
+
+        assert results['distance_map'].dtype == np.float32
+        assert np.array_equal(results['distance_map'], dm)
+        assert np.array_equal(results['RG'], rg)
+        assert str(results['Q_res_by_res']) == 'A, 1.000\n'
+
+        with pytest.raises(KeyError):
+            results['manifest']
+
+    with pytest.raises(AnalyzerException):
+        analyzer_output.get_output(str(tmp_path), 'hdf5')
+
+    with pytest.raises(AnalyzerException):
+        analyzer_output.load_results(str(tmp_path / 'missing.npz'))
+
+
+def test_save_trajectory(tmp_path):
+
+    test_data_dir = camparitraj.get_data('test_data')
+    traj = md.load('%s/ntl9.xtc' % (test_data_dir), top='%s/ntl9.pdb' % (test_data_dir))[0:3]
+
+    for fmt in ['csv', 'npz']:
+        outdir = tmp_path / fmt
+        outdir.mkdir()
+
+        output = analyzer_output.get_output(str(outdir), fmt)
+        output.save_trajectory('cluster_centroid_traj', traj)
+        output.close()
+
+        # trajectories are written to the output directory in both formats
+        saved = md.load(str(outdir / 'cluster_centroid_traj.xtc'), top=str(outdir / 'cluster_centroid_traj.pdb'))
+        assert saved.n_frames == 3 and np.allclose(saved.xyz, traj.xyz, atol=1e-3)
+
+    with analyzer_output.load_results(str(tmp_path / 'npz')) as results:
+        assert results.files == {'cluster_centroid_traj': ['cluster_centroid_traj.pdb', 'cluster_centroid_traj.xtc']}
+        assert len(results) == 0
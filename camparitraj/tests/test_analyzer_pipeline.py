@@ -0,0 +1,110 @@
+"""
+Unit and regression tests for the single-pass ctanalyzer pipeline.
+"""
+
+import numpy as np
+import pytest
+
+import camparitraj
+from camparitraj.cttrajectory import CTTrajectory
+from camparitraj.ctanalyzer import analyzer_pipeline, analyzer_output
+from camparitraj.ctanalyzer.analyzer_exception import AnalyzerException
+
+test_data_dir = camparitraj.get_data('test_data')
+NTL9_PDB = "%s/ntl9.pdb" % (test_data_dir)
+NTL9_XTC = "%s/ntl9.xtc" % (test_data_dir)
+
+
+def test_plan_intermediates():
+
+    plan = analyzer_pipeline.plan_intermediates(['e2e', 'IS', 'rmsis', 'nu_power', 'dm'])
+
+    # each intermediate is computed once, after the intermediates it depends on
+    assert sorted(plan) == sorted(['COM', 'COM_distances', 'CA', 'CA_distances'])
+    assert plan.index('COM') < plan.index('COM_distances')
+    assert plan.index('CA') < plan.index('CA_distances')
+
+    assert analyzer_pipeline.plan_intermediates(['rg', 'rh']) == ['rg']
+
+    with pytest.raises(AnalyzerException):
+        analyzer_pipeline.plan_intermediates(['not_an_analysis'])
+
+
+def test_run_pipeline(NTL9_CP, tmp_path):
+
+    output = analyzer_output.get_output(str(tmp_path), 'npz')
+    analyses = ['rg', 'rh', 'e2e', 'asph', 'dm', 'IS', 'rmsis', 'nu_power', 'psm']
+    analyzer_pipeline.run_pipeline(NTL9_CP, output, analyses, chunk_size=3, verbose=False)
+    output.close()
+
+    with analyzer_output.load_results(str(tmp_path)) as results:
+        assert np.allclose(results['RG'], NTL9_CP.get_radius_of_gyration())
+        assert np.allclose(results['RH'], NTL9_CP.get_hydrodynamic_radius())
+        assert np.allclose(results['end_to_end'], NTL9_CP.get_end_to_end_distance(), atol=1e-3)
+        assert np.allclose(results['ASPH'], NTL9_CP.get_asphericity(verbose=False), atol=1e-4)
+
+        (dm, dm_std) = NTL9_CP.get_distance_map(verbose=False)
+        assert np.allclose(results['distance_map'], dm, atol=1e-3)
+        assert np.allclose(results['distance_map_std'], dm_std, atol=1e-3)
+
+        IS = NTL9_CP.get_internal_scaling(verbose=False)
+        assert np.allclose(results['INTSCAL'], [np.mean(i) for i in IS[1]], atol=1e-3)
+        assert np.allclose(results['RMS_INTSCAL'], NTL9_CP.get_internal_scaling_RMS(verbose=False)[1], atol=1e-3)
+
+        # best fit values are deterministic (the error estimates are based on random subsets)
+        nu = NTL9_CP.get_scaling_exponent(verbose=False)
+        assert np.allclose(results['scaling_exp_analysis_power'][[0, 1, 6, 7]], np.array(nu[0:8])[[0, 1, 6, 7]], rtol=1e-4)
+        assert np.allclose(results['scaling_exp_fit_power'], nu[9].transpose(), rtol=1e-4)
+
+        # both polymer scaling maps share a single fit
+        (PSM, psm_nu, psm_A0, psm_redchi) = NTL9_CP.get_polymer_scaled_distance_map(mode='signed-absolute-change')
+        assert np.allclose(results['polymer_deviation_map_absolute'], PSM, atol=1e-3)
+        assert np.allclose(results['polymer_deviation_map_fractional'], NTL9_CP.get_polymer_scaled_distance_map(mode='signed-fractional-change')[0], atol=1e-4)
+        assert np.allclose(results['polymer_deviation_map_params'], [psm_nu, psm_A0, psm_redchi], rtol=1e-4)
+
+
+def test_incremental_pipeline(NTL9_CP, tmp_path):
+
+    analyses = {'rg': {}, 'dm': {}, 'IS': {}, 'psm': {}, 'cmap': {'distance_thresh': 5.0}, 'DSSP': {}}
+
+    # the whole trajectory in one go
+    full_dir = tmp_path / 'full'
+    full_dir.mkdir()
+    output = analyzer_output.get_output(str(full_dir), 'npz')
+    analyzer_pipeline.run_pipeline(NTL9_CP, output, analyses, verbose=False)
+    output.close()
+
+    # the first 6 frames, then the remaining frames continuing from the saved state
+    inc_dir = tmp_path / 'incremental'
+    inc_dir.mkdir()
+    state_filename = str(inc_dir / analyzer_pipeline.STATE_FILENAME)
+
+    first = CTTrajectory(NTL9_XTC, NTL9_PDB, stop=6).proteinTrajectoryList[0]
+    state = analyzer_pipeline.run_pipeline(first, analyzer_output.get_output(str(inc_dir), 'csv'), analyses, verbose=False)
+    analyzer_pipeline.write_state(state_filename, state, {'stride': 1})
+
+    (state, metadata) = analyzer_pipeline.read_state(state_filename)
+    assert state['n_frames'] == 6
+    assert metadata == {'stride': 1}
+
+    rest = CTTrajectory(NTL9_XTC, NTL9_PDB, start=6).proteinTrajectoryList[0]
+    output = analyzer_output.get_output(str(inc_dir), 'npz')
+    state = analyzer_pipeline.run_pipeline(rest, output, analyses, state=state, verbose=False)
+    output.close()
+    assert state['n_frames'] == NTL9_CP.n_frames
+
+    with analyzer_output.load_results(str(full_dir)) as full, analyzer_output.load_results(str(inc_dir)) as incremental:
+        assert sorted(full.keys()) == sorted(incremental.keys())
+        for name in full.keys():
+            assert np.allclose(full[name], incremental[name])
+
+        (cmap, corder) = NTL9_CP.get_contact_map()
+        assert np.allclose(full['contact_map_5.000'], cmap)
+        assert np.allclose(full['contact_order_5.000'], corder)
+        assert np.allclose(full['DSSP_H'], NTL9_CP.get_secondary_structure_DSSP()[1])
+
+    # the analyses must match the saved state, and must be incremental
+    with pytest.raises(AnalyzerException):
+        analyzer_pipeline.run_pipeline(rest, analyzer_output.get_output(str(inc_dir), 'csv'), ['rg'], state=state, verbose=False)
+
+    assert analyzer_pipeline.read_state(str(tmp_path / 'missing.npz')) == (None, None)
@@ -0,0 +1,85 @@
+"""
+Unit and regression tests for the benchmarks module.
+"""
+
+import copy
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from camparitraj import benchmarks
+from camparitraj.ctexceptions import CTException
+
+
+def test_build_trajectory():
+
+    traj = benchmarks.build_trajectory('gs6', 25, seed=3)
+    assert traj.n_frames == 25
+
+    # reproducible, and repeated frames are perturbed
+    assert np.array_equal(traj.xyz, benchmarks.build_trajectory('gs6', 25, seed=3).xyz)
+    assert not np.allclose(traj.xyz[0], traj.xyz[10])
+
+    with pytest.raises(CTException):
+        benchmarks.build_trajectory('lysozyme', 10)
+
+
+def test_run_and_compare(tmp_path):
+
+    results = benchmarks.run_suite(systems=['gs6'], frames=[5], benchmarks=['load_trajectory', 'get_distance_map'], repeats=1, verbose=False)
+
+    assert [r['benchmark'] for r in results['results']] == ['load_trajectory', 'get_distance_map']
+    for r in results['results']:
+        assert r['time'] > 0 and r['peak_memory_mb'] >= 0 and r['n_frames'] == 5
+
+    filename = str(tmp_path / 'results.json')
+    benchmarks.save_results(results, filename)
+    baseline = benchmarks.load_results(filename)
+
+    slower = copy.deepcopy(results)
+    slower['results'][0]['time'] = 2*baseline['results'][0]['time']
+    slower['results'][1]['time'] = 0.5*baseline['results'][1]['time']
+
+    status = [c['status'] for c in benchmarks.compare_results(slower, baseline, threshold=1.5)]
+    assert status == ['regression', 'improvement']
+
+    assert benchmarks.main(['--systems', 'gs6', '--frames', '5', '--benchmarks', 'get_distance_map', '--repeats', '1', '--no-memory', '-q', '-b', filename]) == 0
+
+    with pytest.raises(CTException):
+        benchmarks.run_suite(benchmarks=['get_everything'])
+
+
+def test_synthetic_system():
+
+    traj = benchmarks.build_trajectory('synthetic-30', 4)
+    assert traj.n_frames == 4 and traj.n_residues == 32
+
+    with pytest.raises(CTException):
+        benchmarks.build_trajectory('synthetic-many', 4)
+
+    # benchmark errors are recorded rather than raised, so check the synthetic systems actually load
+    results = benchmarks.run_suite(systems=['synthetic-30'], frames=[5], benchmarks=['load_trajectory', 'get_distance_map'], repeats=1, memory=False, verbose=False)
+    assert len(results['results']) == 2
+    for r in results['results']:
+        assert 'error' not in r and r['n_frames'] == 5
+
+
+def test_import_benchmark():
+
+    results = benchmarks.run_import_suite(modules=['camparitraj', 'camparitraj.not_a_module'], repeats=1, verbose=False)
+
+    assert results[0]['time'] > 0 and results[0]['budget'] == benchmarks.IMPORT_BUDGETS['camparitraj']
+    assert 'error' in results[1] and results[1]['budget'] is None
+
+
+def test_lazy_imports():
+
+    # heavy dependencies are only imported once they are needed
+    code = ('import sys, camparitraj; loaded = set(sys.modules); import camparitraj.cttrajectory; '
+            'print(sorted(m for m in ["mdtraj", "scipy", "multiprocessing"] if m in loaded)); '
+            'print(sorted(m for m in ["scipy.stats", "scipy.optimize", "scipy.cluster", "afrc", "multiprocessing"] if m in sys.modules))')
+
+    output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True).split('\n')
+    assert output[0] == '[]' and output[1] == '[]'
@@ -0,0 +1,93 @@
+"""
+Unit and regression tests for the ctcluster module.
+"""
+
+import numpy as np
+import mdtraj as md
+import pytest
+
+from camparitraj import ctcluster
+from camparitraj.ctexceptions import CTException
+
+
+def test_condensed_rmsd(NTL9_CP):
+
+    traj = NTL9_CP.traj
+    bb = traj.topology.select('backbone')
+    full = np.array([10*md.rmsd(traj, traj, i, atom_indices=bb) for i in range(traj.n_frames)])
+
+    condensed = ctcluster.condensed_rmsd(traj, atom_indices=bb)
+    assert len(condensed) == traj.n_frames*(traj.n_frames-1)//2
+
+    indices = [7, 1, 3, 1]
+    assert np.allclose(ctcluster.condensed_submatrix(condensed, traj.n_frames, indices), full[np.ix_(indices, indices)], atol=1e-2)
+
+
+@pytest.mark.parametrize('method', ['kmedoids', 'ward', 'average'])
+def test_clustering_and_assign(NTL9_CP, method):
+
+    traj = NTL9_CP.traj
+    bb = traj.topology.select('backbone')
+
+    if method == 'kmedoids':
+        clustering = ctcluster.kmedoids(traj, 3, atom_indices=bb, seed=1)
+    else:
+        clustering = ctcluster.hierarchical(traj, 3, atom_indices=bb, method=method)
+
+    assert clustering.n_clusters == 3
+    assert np.sum(clustering.populations) == traj.n_frames
+    assert np.all(np.diff(clustering.populations) <= 0)
+
+    # medoids belong to their own cluster, at zero distance
+    assert np.array_equal(clustering.labels[clustering.medoids], np.arange(3))
+    assert np.allclose(clustering.distances[clustering.medoids], 0, atol=1e-2)
+
+    # re-assigning the clustered frames reproduces the clustering (for k-medoids by
+    # construction, for hierarchical only the medoid distances are guaranteed)
+    (labels, distances) = clustering.assign(traj)
+    if method == 'kmedoids':
+        assert np.array_equal(labels, clustering.labels)
+        assert np.allclose(distances, clustering.distances, atol=1e-2)
+
+    medoid_rmsd = [10*md.rmsd(traj, traj, int(m), atom_indices=bb) for m in clustering.medoid_frames]
+    assert np.allclose(distances, np.min(medoid_rmsd, axis=0), atol=1e-2)
+
+    frames = clustering.get_cluster_frames()
+    assert sorted(np.concatenate(frames)) == list(range(traj.n_frames))
+
+
+def test_clustering_errors(NTL9_CP):
+
+    with pytest.raises(CTException):
+        ctcluster.kmedoids(NTL9_CP.traj, 0)
+
+    with pytest.raises(CTException):
+        ctcluster.hierarchical(NTL9_CP.traj, 3, method='centroid')
+
+
+def test_get_rmsd_clustering(NTL9_CP):
+
+    clustering = NTL9_CP.get_rmsd_clustering(n_clusters=2, stride=2, seed=0)
+    assert len(clustering.labels) == 5
+    assert np.all(clustering.medoid_frames % 2 == 0)
+
+    clustering = NTL9_CP.get_rmsd_clustering(n_clusters=2, method='ward', region=[5, 20])
+    assert np.sum(clustering.populations) == NTL9_CP.n_frames
+
+    with pytest.raises(CTException):
+        NTL9_CP.get_rmsd_clustering(method='kmeans')
+
+
+def test_get_clusters(NTL9_CP):
+
+    (members, trajs, distance_matrices, centroids, frames) = NTL9_CP.get_clusters(stride=1, n_clusters=3)
+
+    assert sum(members) == NTL9_CP.n_frames
+    for (n, t, d, c, f) in zip(members, trajs, distance_matrices, centroids, frames):
+        assert t.n_frames == n == len(f) == d.shape[0] == d.shape[1]
+        assert 0 <= c < n
+        assert np.allclose(d, d.T)
+
+    # a single strided frame leaves a single cluster
+    (members, _, _, centroids, _) = NTL9_CP.get_clusters(stride=10)
+    assert members == [1] and centroids == [0]
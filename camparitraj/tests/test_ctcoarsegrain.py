@@ -0,0 +1,78 @@
+"""
+Unit and regression tests for the ctcoarsegrain module.
+"""
+
+import numpy as np
+import pytest
+
+from camparitraj import ctcoarsegrain
+from camparitraj.ctexceptions import CTException
+
+
+def test_beads_match_full_atom(NTL9_CP, GS6_CP):
+
+    for CP in [NTL9_CP, GS6_CP]:
+        for mode in ['CA', 'COM']:
+            beads = CP.coarse_grain(mode=mode, chunk_size=3)
+            assert beads.xyz.shape == (CP.n_frames, len(CP.resid_with_CA), 3) and beads.xyz.dtype == np.float32
+
+            # residue-level analyses agree with the full-atom calculation
+            assert np.allclose(beads.get_distance_map()[0], CP.get_distance_map(mode=mode)[0], atol=1e-3)
+            assert np.allclose(beads.get_internal_scaling_RMS()[1], CP.get_internal_scaling_RMS(mode=mode)[1], atol=1e-3)
+            assert np.allclose(beads.get_end_to_end_distance(), CP.get_end_to_end_distance(mode=mode), atol=1e-3)
+
+            (A, B) = (CP.idx_with_CA[1], CP.idx_with_CA[-2])
+            assert np.allclose(beads.get_inter_residue_distance(A, B, stride=2), CP.get_inter_residue_COM_distance(A, B, stride=2) if mode == 'COM' else CP.get_inter_residue_atomic_distance(A, B, stride=2), atol=1e-3)
+
+    # caps have no bead
+    if GS6_CP.ncap:
+        with pytest.raises(CTException):
+            GS6_CP.coarse_grain().get_inter_residue_distance(0, 2)
+
+
+def test_bead_analyses(NTL9_CP):
+
+    beads = NTL9_CP.coarse_grain(mode='sidechain-centroid', stride=2)
+    assert beads.n_frames == len(range(0, NTL9_CP.n_frames, 2)) and beads.n_residues == NTL9_CP.n_residues
+
+    # glycine beads sit on the CA
+    glycine = beads.residue_names.index('GLY')
+    CA = NTL9_CP.get_CA_index(beads.residue_index[glycine], correctOffset=False)
+    assert np.allclose(beads.xyz[:, glycine], NTL9_CP.traj.xyz[::2, CA])
+
+    rg = beads.get_radius_of_gyration()
+    assert np.all(rg > 0) and len(rg) == beads.n_frames
+
+    # windowed Rg from cumulative sums matches direct calculation
+    (mean_rg, std_rg, histo, bins) = beads.get_local_collapse(window_size=5)
+    assert len(mean_rg) == beads.n_residues - 4
+    assert np.isclose(mean_rg[3], np.mean(beads.get_radius_of_gyration(beads.residue_index[3], beads.residue_index[7])))
+
+    out = beads.get_scaling_exponent(inter_residue_min=5, end_effect=2, num_fitting_points=10)
+    assert 0 < out[0] < 1.5
+
+    out = beads.get_local_to_global_correlation(n_cycles=5, stride=1, seed=1)
+    assert out[0].shape == (45, 2) and np.all(np.abs(out[2]) <= 1)
+
+    with pytest.raises(CTException):
+        NTL9_CP.coarse_grain(mode='backbone')
+
+
+def test_bead_persistence(GS6_CP, tmp_path):
+
+    filename = str(tmp_path / 'beads.npz')
+
+    GS6_CP.set_weights(np.arange(1, GS6_CP.n_frames + 1))
+    try:
+        beads = GS6_CP.coarse_grain(mode='CA', filename=filename)
+    finally:
+        GS6_CP.clear_weights()
+
+    loaded = ctcoarsegrain.load(filename)
+    assert np.array_equal(loaded.xyz, beads.xyz) and loaded.mode == 'CA'
+    assert loaded.residue_names == beads.residue_names and np.array_equal(loaded.residue_index, beads.residue_index)
+    assert np.allclose(loaded.weights, beads.weights)
+    assert np.allclose(loaded.get_distance_map()[0], beads.get_distance_map()[0])
+
+    with pytest.raises(CTException):
+        ctcoarsegrain.load(str(tmp_path / 'missing.npz'))
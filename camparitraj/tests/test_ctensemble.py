@@ -0,0 +1,80 @@
+"""
+Unit and regression tests for the CTEnsemble class.
+"""
+
+import numpy as np
+import pytest
+
+import camparitraj
+from camparitraj.ctensemble import CTEnsemble
+from camparitraj.ctexceptions import CTException
+
+test_data_dir = camparitraj.get_data('test_data')
+NTL9_PDB = "%s/ntl9.pdb" % (test_data_dir)
+NTL9_XTC = "%s/ntl9.xtc" % (test_data_dir)
+NTL9_DCD = "%s/ntl9.dcd" % (test_data_dir)
+
+
+def test_ensemble_shares_topology(NTL9_CP):
+
+    E = CTEnsemble([NTL9_XTC, NTL9_XTC, NTL9_XTC], NTL9_PDB)
+    assert len(E) == 3
+    assert E.num_proteins == 1
+
+    P0 = E.get_protein(0)
+    P2 = E.get_protein(2)
+
+    # index information is built once and shared between replicas
+    assert P0.resid_with_CA is P2.resid_with_CA
+    assert P0.resid_with_CA == NTL9_CP.resid_with_CA
+    assert P0.n_frames == NTL9_CP.n_frames
+
+    assert np.allclose(P0.get_radius_of_gyration(), NTL9_CP.get_radius_of_gyration())
+
+    with pytest.raises(CTException):
+        E.get_protein(3)
+
+
+def test_ensemble_reductions(NTL9_CP):
+
+    E = CTEnsemble([NTL9_XTC, NTL9_DCD], NTL9_PDB)
+    rg = NTL9_CP.get_radius_of_gyration()
+
+    per_replica = E.compute('get_radius_of_gyration')
+    assert per_replica.shape == (2, 10)
+    assert np.allclose(per_replica[0], rg, atol=1e-3)
+
+    pooled = E.compute('get_radius_of_gyration', reduction='pooled')
+    assert pooled.shape == (20,)
+
+    (dm, std) = E.compute('get_distance_map', reduction='weighted', verbose=False)
+    assert np.allclose(dm, NTL9_CP.get_distance_map(verbose=False)[0], atol=1e-2)
+
+    # the pooled standard deviation matches the standard deviation over every frame
+    distances = np.vstack([E.get_protein(i).calculate_all_CA_distances(NTL9_CP.resid_with_CA[0], correctOffset=False) for i in range(2)])
+    assert np.allclose(std[0][1:], np.std(distances, axis=0), atol=1e-3)
+
+    (rms, rms_std) = E.compute('get_distance_map', RMS=True, reduction='weighted')
+    assert np.allclose(rms[0][1:], np.sqrt(np.mean(distances**2, axis=0)), atol=1e-3)
+    assert np.allclose(rms_std[0][1:], np.std(distances**2, axis=0), atol=1e-1)
+
+    with pytest.raises(CTException):
+        E.compute('get_local_heterogeneity', stride=1, reduction='weighted')
+
+    weighted = E.compute('get_radius_of_gyration', reduction='weighted', replica_weights=[1, 0])
+    assert np.allclose(weighted, per_replica[0])
+
+    with pytest.raises(CTException):
+        E.compute('get_radius_of_gyration', reduction='not-a-reduction')
+
+    with pytest.raises(CTException):
+        E.compute('_CTProtein__check_weights')
+
+
+def test_ensemble_parallel_load():
+
+    serial = CTEnsemble([NTL9_XTC, NTL9_XTC], NTL9_PDB, stride=2, lazy=False)
+    parallel = CTEnsemble([NTL9_XTC, NTL9_XTC], NTL9_PDB, stride=2, lazy=False, n_workers=2)
+
+    assert serial.get_protein(1).n_frames == 5
+    assert np.allclose(serial.get_protein(1).traj.xyz, parallel.get_protein(1).traj.xyz)
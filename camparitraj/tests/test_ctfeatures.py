@@ -0,0 +1,84 @@
+"""
+Unit and regression tests for the ctfeatures module.
+"""
+
+import numpy as np
+import pytest
+
+from camparitraj import ctfeatures
+from camparitraj.ctexceptions import CTException
+
+
+def test_incremental_pca():
+
+    # low rank data plus noise - incremental and exact PCA agree
+    rng = np.random.default_rng(0)
+    X = 5*rng.normal(size=(3000, 3)).dot(rng.normal(size=(3, 40))) + 0.1*rng.normal(size=(3000, 40))
+
+    pca = ctfeatures.IncrementalPCA(3, batch_size=100)
+    for start in range(0, len(X), 700):
+        pca.partial_fit(X[start:start + 700])
+
+    (_, S, Vt) = np.linalg.svd(X - X.mean(axis=0), full_matrices=False)
+
+    assert pca.n_samples_seen == len(X)
+    assert np.allclose(pca.mean, X.mean(axis=0))
+    assert np.allclose(np.abs(np.sum(pca.components*Vt[:3], axis=1)), 1, atol=1e-4)
+    assert np.allclose(pca.explained_variance_ratio, np.square(S[:3])/np.sum(np.square(S)), atol=1e-4)
+    assert pca.transform(X[:5]).shape == (5, 3)
+
+    with pytest.raises(CTException):
+        pca.partial_fit(X[:, :10])
+
+
+def test_kmeans():
+
+    rng = np.random.default_rng(1)
+    X = np.vstack([rng.normal(center, 0.5, size=(n, 2)) for (center, n) in [(0, 300), (10, 100), (20, 200)]])
+
+    (labels, centers, distances) = ctfeatures.kmeans(X, 3, seed=0, chunk_size=50)
+
+    # clusters are ordered by population
+    assert np.array_equal(np.bincount(labels), [300, 200, 100])
+    assert np.allclose(centers[:, 0], [0, 20, 10], atol=0.2)
+
+    assert np.allclose(distances, np.sqrt(np.sum(np.square(X - centers[labels]), axis=1)))
+    assert np.array_equal(ctfeatures.assign_to_centers(X, centers)[0], labels)
+
+    with pytest.raises(CTException):
+        ctfeatures.kmeans(X, 0)
+
+
+def test_get_features(NTL9_CP):
+
+    n_CA = len(NTL9_CP.resid_with_CA)
+
+    X = NTL9_CP.get_features('CA-distances')
+    assert X.shape == (NTL9_CP.n_frames, n_CA*(n_CA-1)//2)
+    assert np.isclose(X[4, 0], NTL9_CP.get_inter_residue_atomic_distance(NTL9_CP.resid_with_CA[0], NTL9_CP.resid_with_CA[1], correctOffset=False)[4], atol=1e-3)
+
+    # blocks and strides give the same features
+    for feature in ctfeatures.FEATURE_TYPES:
+        assert np.allclose(NTL9_CP.get_features(feature)[::3], NTL9_CP.get_features(feature, stride=3, chunk_size=2))
+
+    X = NTL9_CP.get_features('dihedrals')
+    assert np.allclose(np.square(X[:, :X.shape[1]//2]) + np.square(X[:, X.shape[1]//2:]), 1)
+
+    X = NTL9_CP.get_features('contacts', distance_thresh=6.0)
+    assert set(np.unique(X)) <= {0.0, 1.0}
+
+    with pytest.raises(CTException):
+        NTL9_CP.get_features('RMSD')
+
+
+def test_get_feature_clustering(NTL9_CP):
+
+    result = NTL9_CP.get_feature_clustering(n_components=3, n_clusters=3, stride=2, chunk_size=2, seed=0)
+
+    assert result['projection'].shape == (5, 3)
+    assert np.sum(result['populations']) == 5
+    assert np.array_equal(result['frames'], [0, 2, 4, 6, 8])
+    assert np.all(np.diff(result['explained_variance_ratio']) <= 0)
+
+    for (c, frame) in enumerate(result['representative_frames']):
+        assert result['labels'][list(result['frames']).index(frame)] == c
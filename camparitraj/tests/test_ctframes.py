@@ -0,0 +1,130 @@
+"""
+Unit and regression tests for the ctframes module.
+"""
+
+import numpy as np
+import mdtraj as md
+import pytest
+
+import camparitraj
+from camparitraj import ctframes
+from camparitraj.cttrajectory import CTTrajectory
+from camparitraj.ctexceptions import CTException
+
+test_data_dir = camparitraj.get_data('test_data')
+NTL9_PDB = "%s/ntl9.pdb" % (test_data_dir)
+NTL9_XTC = "%s/ntl9.xtc" % (test_data_dir)
+
+
+def test_frame_view():
+
+    traj = md.load(NTL9_XTC, top=NTL9_PDB)
+
+    assert ctframes.get_frame_slice(traj.n_frames, -4) == slice(traj.n_frames - 4, traj.n_frames, 1)
+    assert ctframes.get_frame_view(traj) is traj
+
+    # contiguous views share coordinates and topology
+    view = ctframes.get_frame_view(traj, 2, 8)
+    assert view.n_frames == 6 and view.topology is traj.topology
+    assert np.shares_memory(view.xyz, traj.xyz)
+    assert np.allclose(view.time, traj.time[2:8])
+
+    # strided views only hold the selected frames
+    view = ctframes.get_frame_view(traj, 1, None, 3)
+    assert view.xyz.flags['C_CONTIGUOUS'] and not np.shares_memory(view.xyz, traj.xyz)
+    assert np.array_equal(view.xyz, traj.xyz[1::3])
+
+    copied = ctframes.get_frame_view(traj, 2, 8, copy=True)
+    assert not np.shares_memory(copied.xyz, traj.xyz)
+
+    for (start, stop, stride) in [(10, 10, 1), (0, None, 0), (traj.n_frames, None, 1)]:
+        with pytest.raises(CTException):
+            ctframes.get_frame_view(traj, start, stop, stride)
+
+
+def test_zero_copy_construction():
+
+    traj = md.load(NTL9_XTC, top=NTL9_PDB)
+
+    # a single-protein system is shared all the way down to the CTProtein
+    CP = CTTrajectory(TRJ=traj).proteinTrajectoryList[0]
+    assert CP.traj is traj
+
+    CP = CTTrajectory(TRJ=traj, copy=True).proteinTrajectoryList[0]
+    assert not np.shares_memory(CP.traj.xyz, traj.xyz)
+
+    # in-place superposition used by get_Q no longer modifies the protein's coordinates
+    original = CP.traj.xyz.copy()
+    CP.get_Q()
+    assert np.array_equal(CP.traj.xyz, original)
+
+
+def test_protein_frame_view(NTL9_CP):
+
+    rg = NTL9_CP.get_radius_of_gyration()
+
+    view = NTL9_CP.get_frame_view(2, 8)
+    assert view.n_frames == 6 and np.shares_memory(view.traj.xyz, NTL9_CP.traj.xyz)
+    assert view.resid_with_CA == NTL9_CP.resid_with_CA
+    assert np.allclose(view.get_radius_of_gyration(), rg[2:8])
+
+    view = NTL9_CP.get_frame_view(stride=3)
+    assert np.allclose(view.get_radius_of_gyration(), rg[::3])
+
+    # weights of the selected frames are carried over
+    weights = np.arange(1, NTL9_CP.n_frames + 1, dtype=float)
+    NTL9_CP.set_weights(weights)
+    try:
+        view = NTL9_CP.get_frame_view(0, 4)
+        assert np.allclose(view.weights, weights[:4]/weights[:4].sum())
+    finally:
+        NTL9_CP.clear_weights()
+
+
+def test_frame_selection():
+
+    selection = ctframes.FrameSelection(start=2, stride=2, indices=[0, 2, 3, 4, 8, -1], mask=[True]*8 + [False]*2)
+    assert ctframes.FrameSelection(start=2, stride=2, indices=[2, 4, 6]).get_frames(10) == slice(2, 7, 2)
+    assert selection.get_frames(10) == slice(2, 5, 2)
+    assert selection.count(10) == 2
+
+    # irregular selections resolve to frame indices
+    assert np.array_equal(ctframes.as_frame_selection([7, 1, 2]).get_frames(10), [1, 2, 7])
+
+    mask = np.array([True, False, True, True, False, False, False, True, False, False])
+    assert np.array_equal(ctframes.as_frame_selection(mask).get_frames(10), [0, 2, 3, 7])
+    assert ctframes.as_frame_selection(slice(None, None, 3)).get_frames(10) == slice(0, 10, 3)
+
+    observable = np.arange(10.0)
+    assert ctframes.FrameSelection.from_observable(observable, 3, 5).get_frames(10) == slice(3, 6, 1)
+
+    for frames in [[10], mask[:5], ctframes.FrameSelection(indices=[1], mask=mask), 'all']:
+        with pytest.raises(CTException):
+            ctframes.as_frame_selection(frames).get_frames(10)
+
+
+def test_method_frames(NTL9_CP):
+
+    rg = NTL9_CP.get_radius_of_gyration()
+    compact = ctframes.FrameSelection.from_observable(rg, maximum=np.median(rg))
+
+    assert np.allclose(NTL9_CP.get_radius_of_gyration(frames=compact), rg[rg <= np.median(rg)])
+    assert np.allclose(NTL9_CP.get_end_to_end_distance(frames=slice(2, 8)), NTL9_CP.get_end_to_end_distance()[2:8])
+    assert np.allclose(NTL9_CP.get_asphericity(frames=[1, 3, 9]), NTL9_CP.get_asphericity()[[1, 3, 9]])
+
+    # a method's own stride is applied within the selection
+    assert np.allclose(NTL9_CP.get_distance_map(frames=ctframes.FrameSelection(stride=2))[0], NTL9_CP.get_distance_map(stride=2)[0])
+    assert np.allclose(NTL9_CP.get_distance_map(frames=slice(0, 8), stride=2)[0], NTL9_CP.get_distance_map(frames=[0, 2, 4, 6])[0])
+
+    # explicit full-length weights are reduced to the selected frames
+    weights = np.ones(NTL9_CP.n_frames)
+    weights[0] = 0
+    assert np.allclose(NTL9_CP.get_distance_map(frames=[0, 1], weights=weights)[0], NTL9_CP.get_distance_map(frames=[1])[0])
+
+    # ... also when passed positionally
+    (mean_map, std_map) = NTL9_CP.get_distance_map('CA', False, 1, weights, frames=ctframes.FrameSelection(stride=2))
+    assert np.allclose(mean_map, NTL9_CP.get_distance_map(weights=weights, frames=[0, 2, 4, 6, 8])[0])
+
+    # topology-only methods do not take a frame selection
+    with pytest.raises(TypeError):
+        NTL9_CP.get_amino_acid_sequence(frames=[0])
@@ -186,3 +186,82 @@ def test_unit_setseq():
     for i in range(10):
         seq = nmr.__set_sequence(raw[i], key_aa1, key_aa3)
         assert seq[0] == control[i]
+
+
+# ----------
+def test_batch_matches_single():
+    """Tests that the batch predictor reproduces the per-sequence predictions for every sequence, with undefined shifts returned as NaN.
+
+    """
+    sequences = ["ACDEFGHIKLMNPQRSTVWY", "KLD(pT)GQK", "GGPGG", "ACDE"]
+
+    output = nmr.compute_random_coil_chemical_shifts_batch(sequences, 25, 6.5, True, False)
+    assert len(output) == 20 + 7 + 5 + 4
+
+    for (i, seq) in enumerate(sequences):
+        control = nmr.compute_random_coil_chemical_shifts(seq, 25, 6.5, True, False)
+        records = output[output['sequence'] == i]
+
+        assert len(records) == len(control)
+        for (record, entry) in zip(records, control):
+            assert record['index'] == entry['Index']
+            assert record['residue'] == entry['Res']
+            for nucleus in nmr.NUCLEI:
+                if isinstance(entry[nucleus], str):
+                    assert np.isnan(record[nucleus])
+                else:
+                    assert nmr.__round3(float(record[nucleus])) == entry[nucleus]
+
+    # perdeuteration leaves HA undefined, and is not available for phosphoresidues
+    output = nmr.compute_random_coil_chemical_shifts_batch("ACDE", 25, 6.5, True, True)
+    assert np.isnan(output['HA']).all()
+    assert nmr.__round3(float(output['CA'][0])) == 51.993
+
+    with pytest.raises(camparitraj.ctexceptions.CTException):
+        nmr.compute_random_coil_chemical_shifts_batch(["ACDE", "A(pS)E"], 25, 6.5, True, True)
+
+
+# ----------
+def test_secondary_shifts_from_dihedrals():
+    """Tests the phi/psi secondary shift surface lookup, and that ensemble averages (weighted or not) match the average of the per-frame shifts.
+
+    """
+    surface = nmr.build_secondary_shift_surface()
+
+    # ideal helix gives positive CA and negative CB secondary shifts, strand the opposite
+    shifts = nmr.compute_secondary_shifts_from_dihedrals([[-63.0, -120.0]], [[-43.0, 130.0]], surface=surface)
+    assert shifts[0][0] > 3 and shifts[0][1] < 0
+    assert shifts[1][0] < -1 and shifts[1][1] > 2
+
+    np.random.seed(1)
+    phi = np.random.uniform(-180, 180, (50, 4))
+    psi = np.random.uniform(-180, 180, (50, 4))
+    weights = np.random.random(50)
+
+    per_frame = nmr.compute_secondary_shifts_from_dihedrals(phi, psi, per_frame=True)
+    assert per_frame.shape == (50, 4, 6)
+    assert np.allclose(nmr.compute_secondary_shifts_from_dihedrals(phi, psi, chunk_size=7), np.mean(per_frame, 0))
+    assert np.allclose(nmr.compute_secondary_shifts_from_dihedrals(phi, psi, weights=weights), np.average(per_frame, 0, weights=weights))
+
+
+def test_get_secondary_chemical_shifts(NTL9_CP):
+    """Tests the CTProtein-integrated ensemble averaged chemical shift back-calculation.
+
+    """
+    out = NTL9_CP.get_secondary_chemical_shifts(return_per_frame=True)
+    n_residues = len(NTL9_CP.get_amino_acid_sequence(oneletter=True))
+
+    assert out['secondary'].shape == (n_residues, 6)
+    assert np.allclose(out['ensemble'], np.mean(out['per_frame'], 0), equal_nan=True)
+    assert np.allclose(out['secondary'], out['ensemble'] - out['random_coil'], equal_nan=True)
+
+    # first residue has no phi angle, so no shifts
+    assert np.isnan(out['secondary'][0]).all()
+
+    # random coil reference matches the sequence-based predictor
+    control = nmr.compute_random_coil_chemical_shifts(NTL9_CP.get_amino_acid_sequence(oneletter=True), 25, 7.4)
+    assert nmr.__round3(float(out['random_coil'][3][0])) == control[3]['CA']
+
+    weights = np.arange(NTL9_CP.n_frames) + 1.0
+    out = NTL9_CP.get_secondary_chemical_shifts(weights=weights, return_per_frame=True)
+    assert np.allclose(out['ensemble'], np.average(out['per_frame'], 0, weights=weights), equal_nan=True)
@@ -0,0 +1,52 @@
+"""
+Unit and regression tests for the ctpre module.
+"""
+
+import numpy as np
+import pytest
+
+from camparitraj import ctpre
+from camparitraj.ctexceptions import CTException
+
+
+def test_generate_PRE_profile(NTL9_CP):
+
+    PRE = ctpre.CTPRE(NTL9_CP, 5, 10, 10, 600000000)
+    (profile, gamma) = PRE.generate_PRE_profile(9)
+
+    assert len(profile) == len(NTL9_CP.resid_with_CA)
+
+    # gamma is the prefactor times <r^-6> over frames, using the CB - N distance (in nm)
+    control = [np.mean(PRE.PREFACTOR/np.power(0.1*NTL9_CP.get_inter_residue_atomic_distance(9, r, A1='CB', A2='N'), 6)) for r in [0, 9, 30]]
+    assert np.allclose(np.array(gamma)[[0, 9, 30]], control)
+    assert np.allclose(profile, (10 * np.exp(-np.array(gamma)*0.01)) / (10 + np.array(gamma)))
+
+    # glycine has no CB to place a label on
+    with pytest.raises(CTException):
+        PRE.generate_PRE_profile(10)
+
+
+def test_generate_PRE_profiles(NTL9_CP):
+
+    PRE = ctpre.CTPRE(NTL9_CP, 5, 10, 10, 600000000)
+    labels = [1, 9, 20, 40]
+
+    (profiles, gammas) = PRE.generate_PRE_profiles(labels)
+    assert profiles.shape == (4, len(NTL9_CP.resid_with_CA))
+
+    for (i, label) in enumerate(labels):
+        (profile, gamma) = PRE.generate_PRE_profile(label)
+        assert np.allclose(gammas[i], gamma)
+        assert np.allclose(profiles[i], profile)
+
+    # a weight on a single frame reproduces that frame
+    weights = np.zeros(NTL9_CP.n_frames)
+    weights[3] = 1
+    (_, gammas) = PRE.generate_PRE_profiles([9], weights=weights)
+    r = 0.1*NTL9_CP.get_inter_residue_atomic_distance(9, 30, A1='CB', A2='N')[3]
+    assert np.isclose(gammas[0][30], PRE.PREFACTOR/np.power(r, 6))
+
+    # per-frame gammas average to the ensemble gammas
+    (_, gammas, per_frame) = PRE.generate_PRE_profiles(labels, return_per_frame=True)
+    assert per_frame.shape == (NTL9_CP.n_frames, 4, len(NTL9_CP.resid_with_CA))
+    assert np.allclose(np.mean(per_frame, 0), gammas)
@@ -0,0 +1,91 @@
+"""
+Unit and regression tests for the ctprofiling module.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from camparitraj import ctprofiling
+from camparitraj.cttrajectory import CTTrajectory
+from camparitraj.ctexceptions import CTException
+
+
+@pytest.fixture
+def profiler():
+    ctprofiling.reset()
+    ctprofiling.enable(memory=True)
+    yield
+    ctprofiling.disable()
+    ctprofiling.reset()
+
+
+def test_disabled_by_default(GS6_CP):
+
+    assert not ctprofiling.is_enabled()
+
+    GS6_CP.get_radius_of_gyration()
+    assert ctprofiling.get_report()['methods'] == {}
+
+
+def test_method_records(GS6_CP, profiler):
+
+    GS6_CP.get_radius_of_gyration()
+    GS6_CP.get_distance_map(stride=2, verbose=False)
+    GS6_CP.get_distance_map(stride=2, verbose=False)
+
+    methods = ctprofiling.get_report()['methods']
+
+    record = methods['CTProtein.get_radius_of_gyration']
+    assert record['calls'] == 1 and record['frames'] == GS6_CP.n_frames
+    assert record['wall_time'] > 0 and record['cpu_time'] >= 0
+
+    # stride is taken into account, and the CA-index memoization is hit on the second call
+    record = methods['CTProtein.get_distance_map']
+    assert record['calls'] == 2 and record['frames'] == 2*len(range(0, GS6_CP.n_frames, 2))
+    assert record['cache_hits'] > 0 and record['peak_bytes'] > 0
+
+    # per-protein report only contains calls on that protein and is not itself recorded
+    report = GS6_CP.profile_report()
+    assert report['methods']['CTProtein.get_distance_map']['calls'] >= 2
+    assert 'CTProtein.profile_report' not in ctprofiling.get_report()['methods']
+
+
+def test_sections_and_save(GS6_CP, tmp_path, profiler):
+
+    with ctprofiling.section('rg'):
+        GS6_CP.get_radius_of_gyration()
+        GS6_CP.get_radius_of_gyration()
+
+    with ctprofiling.section('load'):
+        CTTrajectory(TRJ=GS6_CP.traj)
+
+    report = ctprofiling.get_report()
+    assert report['sections']['rg']['methods']['CTProtein.get_radius_of_gyration']['calls'] == 2
+    assert 'CTProtein.get_radius_of_gyration' not in report['sections']['load']['methods']
+    assert report['sections']['load']['methods']['CTTrajectory.__init__']['frames'] == GS6_CP.n_frames
+    assert report['sections']['rg']['wall_time'] >= report['sections']['rg']['methods']['CTProtein.get_radius_of_gyration']['wall_time']
+
+    filename = str(tmp_path / 'profile.json')
+    ctprofiling.save_report(filename)
+    with open(filename) as fh:
+        assert json.load(fh)['sections'].keys() == report['sections'].keys()
+
+    assert 'CTProtein.get_radius_of_gyration' in ctprofiling.format_report()
+
+    with pytest.raises(CTException):
+        ctprofiling.save_report(str(tmp_path / 'missing' / 'profile.json'))
+
+
+def test_profiling_context(GS6_CP):
+
+    ctprofiling.reset()
+    with ctprofiling.profiling():
+        assert ctprofiling.is_enabled()
+        rg = GS6_CP.get_radius_of_gyration()
+
+    assert not ctprofiling.is_enabled()
+    assert np.allclose(rg, GS6_CP.get_radius_of_gyration())
+    assert ctprofiling.get_report()['methods']['CTProtein.get_radius_of_gyration']['calls'] == 1
+    ctprofiling.reset()
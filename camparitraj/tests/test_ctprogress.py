@@ -0,0 +1,100 @@
+"""
+Unit and regression tests for the ctprogress module.
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+from camparitraj import ctprogress
+from camparitraj.ctexceptions import CTException, CTCancelledException
+
+
+def test_progress_tracker():
+
+    calls = []
+    with ctprogress.Progress('test', 10, frames_per_step=5, callback=calls.append, interval=0) as tracker:
+        for i in range(10):
+            tracker.update()
+
+    assert len(calls) == 11 and calls[-1]['done'] and not calls[0]['done']
+    assert calls[4]['completed'] == 5 and calls[4]['fraction'] == 0.5 and calls[4]['frames'] == 25
+    assert calls[-1]['eta'] == 0 and calls[-1]['rate'] > 0
+
+    # throttled - only the final call is issued
+    calls = []
+    with ctprogress.Progress('test', 1000, callback=calls.append, interval=60) as tracker:
+        for i in range(1000):
+            tracker.update()
+    assert len(calls) == 1 and calls[0]['completed'] == 1000
+
+    with pytest.raises(CTException):
+        ctprogress.Progress('test', 10, callback='loud')
+
+
+def test_console_renderer():
+
+    stream = io.StringIO()
+    with ctprogress.Progress('get_distance_map', 4, 10, ctprogress.ConsoleProgressBar(stream=stream), interval=0) as tracker:
+        for i in range(4):
+            tracker.update()
+
+    output = stream.getvalue()
+    assert output.endswith('\n') and output.count('\r') == 5
+    assert 'get_distance_map: 100%|####################| 4/4' in output and 'frames/s' in output
+
+    assert ctprogress.format_time(3725) == '1:02:05'
+    assert ctprogress.format_time(float('nan')) == '?'
+
+
+def test_cancellation(NTL9_CP):
+
+    # token that is cancelled (e.g. by another thread) while the third step is running
+    class CountingToken(ctprogress.CancellationToken):
+        n_checks = 0
+        def check(self, description=None):
+            self.n_checks += 1
+            if self.n_checks == 3:
+                self.cancel()
+            super().check(description)
+
+    token = CountingToken()
+    with pytest.raises(CTCancelledException):
+        NTL9_CP.get_distance_map(cancel_token=token)
+    assert token.cancelled and token.n_checks == 3
+
+    # a cancelled token stops methods before any work is done
+    for method in [NTL9_CP.get_internal_scaling, NTL9_CP.get_D_vector, NTL9_CP.get_local_heterogeneity]:
+        with pytest.raises(CTCancelledException):
+            method(stride=2, cancel_token=token)
+
+    with pytest.raises(CTCancelledException):
+        NTL9_CP.get_gyration_tensor(cancel_token=token)
+
+    token.reset()
+    assert np.allclose(NTL9_CP.get_distance_map(cancel_token=token)[0], NTL9_CP.get_distance_map()[0])
+
+
+def test_method_progress(GS6_CP):
+
+    calls = []
+    GS6_CP.get_internal_scaling(progress=calls.append)
+    GS6_CP.get_D_vector(stride=1, progress=calls.append)
+
+    assert [c['description'] for c in calls] == ['get_internal_scaling', 'get_D_vector']
+    assert all(c['done'] and c['completed'] == c['total'] for c in calls)
+    assert calls[0]['frames'] == calls[0]['total']*GS6_CP.n_frames
+
+
+def test_silent_defaults(NTL9_CP, GS6_CP, capsys):
+
+    # long-running methods are silent by default and report through the progress protocol
+    calls = []
+    NTL9_CP.get_scaling_exponent(inter_residue_min=5, end_effect=2, num_fitting_points=10, progress=calls.append)
+    GS6_CP.get_local_collapse(window_size=3, progress=calls.append)
+    GS6_CP.get_local_to_global_correlation(n_cycles=2, max_num_pairs=3, stride=1, progress=calls.append)
+
+    assert [c['description'] for c in calls] == ['get_scaling_exponent', 'get_local_collapse', 'get_local_to_global_correlation']
+    assert all(c['done'] and c['completed'] == c['total'] for c in calls)
+    assert capsys.readouterr().out == ''
@@ -188,3 +188,126 @@ def test_get_hydrodynamic_radius(GS6_CO):
     assert (11.840569781179006 - rh[0]) < 0.001
 
     
+
+
+def test_get_angle_decay(NTL9_CP):
+
+    a = NTL9_CP.get_angle_decay()
+    assert len(a) == 56
+    assert a[0] == [0, 1.0, 0.0]
+    assert abs(a[1][1] - 0.7294234) < 0.0001
+    assert abs(a[2][1] - 0.39989966) < 0.0001
+    assert abs(a[3][2] - 0.23839068) < 0.0001
+
+    # chunked evaluation must give the same answer as a single pass
+    (b, full_matrix) = NTL9_CP.get_angle_decay(return_full_matrix=True, chunk_size=3)
+    assert full_matrix.shape == (56, 56)
+    assert np.allclose(np.diagonal(full_matrix), 1.0, atol=1e-5)
+    assert np.allclose(np.array(a), np.array(b))
+
+
+def test_weights(NTL9_CP):
+
+    n_frames = NTL9_CP.n_frames
+
+    # uniform weights must reproduce the unweighted results exactly
+    uniform = np.ones(n_frames)
+    dm = NTL9_CP.get_distance_map(verbose=False)
+    dm_w = NTL9_CP.get_distance_map(weights=uniform, verbose=False)
+    assert np.allclose(dm[0], dm_w[0])
+    assert np.allclose(dm[1], dm_w[1])
+
+    cm = NTL9_CP.get_contact_map()[0]
+    assert np.allclose(cm, NTL9_CP.get_contact_map(weights=uniform)[0])
+
+    # all weight on a single frame reproduces that frame
+    single = np.zeros(n_frames)
+    single[4] = 1.0
+    weighted_IS = NTL9_CP.get_internal_scaling(mode='CA', mean_vals=True, weights=single, verbose=False)[1]
+    raw_IS = NTL9_CP.get_internal_scaling(mode='CA', verbose=False)[1]
+    assert abs(weighted_IS[9] - np.mean(raw_IS[9].reshape(-1, n_frames)[:, 4])) < 0.0001
+
+    # weights set once are used by every reducer, and stride renormalizes the strided subset
+    try:
+        NTL9_CP.set_weights(single)
+        assert abs(np.sum(NTL9_CP.weights) - 1.0) < 1e-10
+        cm_single = NTL9_CP.get_contact_map()[0]
+        assert np.all((cm_single == 0) | (cm_single == 1))
+
+        stride_weights = np.arange(1, n_frames+1, dtype=float)
+        NTL9_CP.set_weights(stride_weights)
+        strided = NTL9_CP.get_distance_map(stride=2, verbose=False)[0]
+        per_frame = NTL9_CP.calculate_all_CA_distances(NTL9_CP.resid_with_CA[0], stride=2)
+        w = stride_weights[0::2]/np.sum(stride_weights[0::2])
+        assert np.allclose(strided[0][1:], np.average(per_frame, 0, weights=w))
+
+        with pytest.raises(camparitraj.ctexceptions.CTException):
+            NTL9_CP.set_weights(np.ones(n_frames - 1))
+    finally:
+        NTL9_CP.clear_weights()
+
+    assert NTL9_CP.weights is None
+
+
+def test_get_Q_weights(NTL9_CP):
+
+    weights = np.ones(NTL9_CP.n_frames)
+    weights[1::2] = 0
+
+    # zero-weight frames are ignored, so weighting every other frame out matches a stride of 2
+    weighted = NTL9_CP.get_Q(protein_average=False, weights=weights)[0]
+    assert np.allclose(weighted, NTL9_CP.get_Q(protein_average=False, stride=2)[0])
+
+    # weights combine with a stride, and stored weights are used by default
+    NTL9_CP.set_weights(weights)
+    try:
+        assert np.allclose(NTL9_CP.get_Q(protein_average=False, stride=2)[0], weighted)
+        assert len(NTL9_CP.get_Q()) == NTL9_CP.n_frames
+    finally:
+        NTL9_CP.clear_weights()
+
+    with pytest.raises(camparitraj.ctexceptions.CTException):
+        NTL9_CP.get_Q(weights=weights)
+
+
+def test_COM_distance_map_stride_weights(NTL9_CP):
+
+    weights = np.ones(NTL9_CP.n_frames)
+    weights[2::4] = 0
+
+    # center-of-mass distances honour the stride, so strided weights line up with them
+    (mean_map, std_map) = NTL9_CP.get_distance_map(mode='COM', stride=2, weights=weights)
+    unweighted = NTL9_CP.get_distance_map(mode='COM', stride=4)[0]
+    assert np.allclose(mean_map, unweighted)
+
+    all_frames = NTL9_CP.calculate_all_CA_distances(NTL9_CP.resid_with_CA[0], mode='COM')
+    assert np.allclose(NTL9_CP.calculate_all_CA_distances(NTL9_CP.resid_with_CA[0], mode='COM', stride=2), all_frames[::2])
+
+    scaled = NTL9_CP.get_polymer_scaled_distance_map(stride=2, weights=weights)
+    assert scaled[0].shape == mean_map.shape
+
+
+def test_scaling_exponent_zero_weights(NTL9_CP):
+
+    # with a single frame carrying all the weight every error subset is drawn from that frame,
+    # so the error bounds collapse onto the best fit rather than mixing in unweighted frames
+    weights = np.zeros(NTL9_CP.n_frames)
+    weights[3] = 1
+
+    fit = NTL9_CP.get_scaling_exponent(weights=weights)
+    assert np.allclose(fit[2:4], fit[0])
+    assert np.allclose(fit[4:6], fit[1])
+
+
+def test_get_frame_weights(NTL9_CP):
+
+    from camparitraj import ctutils
+
+    weights = np.arange(NTL9_CP.n_frames, dtype=float) + 1
+    assert np.allclose(NTL9_CP.get_frame_weights(weights, stride=3), weights[::3]/np.sum(weights[::3]))
+    assert np.allclose(ctutils.get_frame_weights(weights, NTL9_CP.n_frames, 3), NTL9_CP.get_frame_weights(weights, 3))
+    assert NTL9_CP.get_frame_weights() is False
+
+    for bad_weights in [weights[:-1], -weights, np.zeros(NTL9_CP.n_frames)]:
+        with pytest.raises(camparitraj.ctexceptions.CTException):
+            NTL9_CP.get_frame_weights(bad_weights)
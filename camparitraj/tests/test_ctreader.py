@@ -0,0 +1,177 @@
+"""
+Unit and regression tests for the ctreader module.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import mdtraj as md
+import pytest
+
+import camparitraj
+from camparitraj import ctreader, ctsynthetic
+from camparitraj.cttrajectory import CTTrajectory
+from camparitraj.ctensemble import CTEnsemble
+from camparitraj.ctexceptions import CTException
+
+test_data_dir = camparitraj.get_data('test_data')
+NTL9_PDB = "%s/ntl9.pdb" % (test_data_dir)
+NTL9_XTC = "%s/ntl9.xtc" % (test_data_dir)
+NTL9_DCD = "%s/ntl9.dcd" % (test_data_dir)
+
+
+def test_plan_frame_reads():
+
+    # every selected frame is planned exactly once, in order, whatever the block split
+    n_frames_per_file = [7, 5, 9]
+    offsets = np.cumsum([0] + n_frames_per_file)
+
+    for (start, stop, stride, n_blocks) in [(0, None, 1, 1), (3, None, 2, 1), (2, 18, 3, 4), (8, None, 4, 6), (0, 5, 1, 3)]:
+        plan = ctreader.plan_frame_reads(n_frames_per_file, start=start, stop=stop, stride=stride, n_blocks=n_blocks)
+
+        selected = []
+        for (file_index, first, n, local_stride, output_offset) in plan:
+            assert output_offset == len(selected)
+            selected.extend(list(offsets[file_index] + first + np.arange(n)*local_stride))
+
+        assert selected == list(range(start, offsets[-1] if stop is None else stop, stride))
+
+    with pytest.raises(CTException):
+        ctreader.plan_frame_reads(n_frames_per_file, start=30)
+
+    with pytest.raises(CTException):
+        ctreader.plan_frame_reads(n_frames_per_file, stride=0)
+
+
+def test_read_trajectory():
+
+    full = md.load(NTL9_XTC, top=NTL9_PDB)
+    assert ctreader.get_n_frames(NTL9_XTC) == full.n_frames
+
+    traj = ctreader.read_trajectory(NTL9_XTC, NTL9_PDB, start=3, stride=2)
+    assert traj.n_frames == 4
+    assert np.allclose(traj.xyz, full.xyz[3::2])
+    assert np.allclose(traj.unitcell_lengths, full.unitcell_lengths[3::2])
+
+    # multiple files are treated as one trajectory, and frames can be split across workers
+    both = md.join([full, md.load(NTL9_DCD, top=NTL9_PDB)])
+    traj = ctreader.read_trajectory([NTL9_XTC, NTL9_DCD], NTL9_PDB, start=1, stop=19, stride=3, n_workers=2)
+    assert traj.n_frames == len(range(1, 19, 3))
+    assert np.allclose(traj.xyz, both.xyz[1:19:3], atol=1e-4)
+
+
+def test_cttrajectory_frame_selection(NTL9_CP):
+
+    CO = CTTrajectory(NTL9_XTC, NTL9_PDB, start=2, stride=3)
+    assert CO.n_frames == 3
+    assert np.allclose(CO.proteinTrajectoryList[0].get_radius_of_gyration(), NTL9_CP.get_radius_of_gyration()[2::3])
+
+    # the PDB frame is always added as the first frame
+    CO = CTTrajectory(NTL9_XTC, NTL9_PDB, start=5, pdblead=True)
+    assert CO.n_frames == 6
+
+
+def test_frame_offset_index(tmp_path):
+
+    fn = str(tmp_path / 'ntl9.xtc')
+    shutil.copyfile(NTL9_XTC, fn)
+    full = md.load(fn, top=NTL9_PDB)
+
+    index_fn = ctreader.get_index_filename(fn)
+    assert not os.path.exists(index_fn)
+
+    offsets = ctreader.get_frame_offsets(fn)
+    assert os.path.exists(index_fn)
+    assert len(offsets) == full.n_frames
+    assert np.array_equal(ctreader.get_frame_offsets(fn), offsets)
+
+    # a stale index (file changed since it was written) is rebuilt
+    shutil.copyfile(NTL9_XTC, fn)
+    with open(fn, 'ab') as fh:
+        fh.write(open(NTL9_XTC, 'rb').read())
+
+    assert ctreader.get_n_frames(fn) == 2*full.n_frames
+
+
+def test_boxless_xtc(tmp_path):
+
+    # trajectories written without box vectors have no unit cell
+    synthetic = ctsynthetic.generate_trajectory(n_residues=10, n_frames=12, seed=1)
+    assert synthetic.unitcell_vectors is None
+
+    fn = str(tmp_path / 'boxless.xtc')
+    pdb = str(tmp_path / 'boxless.pdb')
+    synthetic.save_xtc(fn)
+    synthetic[0].save_pdb(pdb)
+    full = md.load(fn, top=pdb)
+
+    for stride in [1, 3]:
+        traj = ctreader.read_trajectory(fn, pdb, stride=stride)
+        assert traj.unitcell_lengths is None
+        assert np.allclose(traj.xyz, full.xyz[::stride], atol=1e-3)
+
+    assert CTTrajectory(fn, pdb).n_frames == 12
+
+
+def test_read_frames():
+
+    full = md.load(NTL9_XTC, top=NTL9_PDB)
+
+    traj = ctreader.read_frames(NTL9_XTC, NTL9_PDB, [7, 2, 2, 5])
+    assert traj.n_frames == 4
+    assert np.allclose(traj.xyz, full.xyz[[7, 2, 2, 5]])
+    assert np.allclose(traj.time, full.time[[7, 2, 2, 5]])
+
+    with pytest.raises(CTException):
+        ctreader.read_frames(NTL9_XTC, NTL9_PDB, [full.n_frames])
+
+
+def test_atom_selection(tmp_path):
+
+    # build a 'solvated' system by adding a chain of water oxygens to NTL9
+    full = md.load(NTL9_XTC, top=NTL9_PDB)
+    topology = full.topology.copy()
+    chain = topology.add_chain()
+    for i in range(50):
+        topology.add_atom('O', md.element.oxygen, topology.add_residue('HOH', chain))
+
+    water = np.random.default_rng(0).uniform(0, 3, size=(full.n_frames, 50, 3)).astype(np.float32)
+    solvated = md.Trajectory(np.concatenate((full.xyz, water), axis=1), topology, unitcell_lengths=full.unitcell_lengths, unitcell_angles=full.unitcell_angles)
+
+    pdb_fn = str(tmp_path / 'solvated.pdb')
+    xtc_fn = str(tmp_path / 'solvated.xtc')
+    solvated[0].save_pdb(pdb_fn)
+    solvated.save_xtc(xtc_fn)
+
+    assert ctreader.get_n_atoms(xtc_fn) == full.n_atoms + 50
+    assert ctreader.select_atoms(full.topology, 'protein') is None
+    assert len(ctreader.select_atoms(topology, 'backbone+CB')) == len(full.topology.select('name N CA C O CB'))
+
+    # only the protein atoms are decoded, and the proteins are unchanged
+    CO = CTTrajectory(xtc_fn, pdb_fn, stride=2, atom_selection='protein')
+    assert CO.traj.n_atoms == full.n_atoms and np.array_equal(CO.atom_indices, np.arange(full.n_atoms))
+    assert np.allclose(CO.proteinTrajectoryList[0].traj.xyz, full.xyz[::2], atol=1e-3)
+
+    traj = ctreader.read_trajectory(xtc_fn, pdb_fn, n_workers=2, atom_indices=ctreader.select_atoms(topology, 'heavy'))
+    assert traj.n_atoms == len(full.topology.select('not element H'))
+
+    CO = CTTrajectory(xtc_fn, pdb_fn, pdblead=True, atom_selection='name CA')
+    assert CO.traj.n_atoms == len(full.topology.select('name CA')) and CO.n_frames == full.n_frames + 1
+
+    traj = ctreader.read_frames(xtc_fn, pdb_fn, [3, 1], atom_indices=[0, 5])
+    assert np.allclose(traj.xyz, full.xyz[[3, 1]][:, [0, 5]], atol=1e-3)
+
+    # ensembles only decode the protein atoms
+    for n_workers in [1, 2]:
+        E = CTEnsemble([xtc_fn, xtc_fn], pdb_fn, stride=3, lazy=False, n_workers=n_workers)
+        assert np.array_equal(E.atom_indices, np.arange(full.n_atoms))
+        assert np.allclose(E.get_protein(1).traj.xyz, full.xyz[::3], atol=1e-3)
+
+    # a topology that does not match the trajectory is still detected
+    with pytest.raises(CTException):
+        ctreader.read_trajectory(NTL9_XTC, pdb_fn, atom_indices=[0, 1])
+
+    for selection in ['nonsense ==', 'resname XYZ', [full.n_atoms + 50]]:
+        with pytest.raises(CTException):
+            ctreader.select_atoms(topology, selection)
@@ -0,0 +1,82 @@
+"""
+Unit and regression tests for the ctresources module.
+"""
+
+import numpy as np
+import mdtraj as md
+import pytest
+
+import camparitraj
+from camparitraj import ctresources, ctreader, ctfeatures
+from camparitraj.ctexceptions import CTException
+
+test_data_dir = camparitraj.get_data('test_data')
+NTL9_PDB = "%s/ntl9.pdb" % (test_data_dir)
+NTL9_XTC = "%s/ntl9.xtc" % (test_data_dir)
+
+
+@pytest.fixture
+def policy(monkeypatch):
+
+    # thread limits are exported to the environment, so make sure these are restored
+    for variable in ctresources.THREAD_ENVIRONMENT_VARIABLES:
+        monkeypatch.setenv(variable, '')
+
+    original_threads = ctresources.get_blas_threads()
+    yield
+    ctresources.reset_resources()
+    for (name, threads) in original_threads.items():
+        ctresources.set_blas_threads(threads)
+
+
+def test_parse_memory():
+
+    assert ctresources.parse_memory('512M') == 512*1024**2
+    assert ctresources.parse_memory('1.5GB') == int(1.5*1024**3)
+    assert ctresources.parse_memory('4GiB') == 4*1024**3
+    assert ctresources.parse_memory(1000) == 1000
+
+    for value in ['lots', '-2G', 0]:
+        with pytest.raises(CTException):
+            ctresources.parse_memory(value)
+
+
+def test_set_resources(policy):
+
+    assert camparitraj.get_resources()['workers'] == 1
+
+    resources = camparitraj.set_resources(threads=1, workers=2, memory_limit='1M')
+    assert resources['threads'] == 1 and resources['workers'] == 2 and resources['memory_limit'] == 1024**2
+
+    # every loaded BLAS runtime now uses a single thread
+    assert all(threads == 1 for threads in ctresources.get_blas_threads().values())
+
+    assert ctresources.get_workers() == min(2, ctresources.get_resources()['cores'])
+    assert ctresources.get_workers(1) == 1
+    assert ctresources.get_chunk_elements(10**9) == 1024**2 // ctresources.CHUNK_BYTES_PER_ELEMENT
+    assert ctfeatures.get_chunk_size(1024) == 1024**2 // ctresources.CHUNK_BYTES_PER_ELEMENT // 1024
+
+    # parallel reads use the policy's worker count
+    traj = ctreader.read_trajectory(NTL9_XTC, NTL9_PDB, stride=2)
+    assert np.allclose(traj.xyz, md.load(NTL9_XTC, top=NTL9_PDB).xyz[::2])
+
+    # invalid settings leave the policy unchanged
+    with pytest.raises(CTException):
+        camparitraj.set_resources(workers=4, threads=0)
+    assert camparitraj.get_resources()['workers'] == 2
+
+    with pytest.raises(CTException):
+        ctresources.get_workers(0)
+
+    ctresources.reset_resources()
+    assert ctresources.get_chunk_elements(1000) == 1000
+
+
+def test_resources_from_environment(policy):
+
+    resources = ctresources.set_resources_from_environment({'CAMPARITRAJ_WORKERS': '3', 'CAMPARITRAJ_MEMORY_LIMIT': '2G'})
+    assert resources['workers'] == 3 and resources['memory_limit'] == 2*1024**3 and resources['threads'] is None
+
+    # invalid values are ignored rather than raised
+    resources = ctresources.set_resources_from_environment({'CAMPARITRAJ_WORKERS': 'many'})
+    assert resources['workers'] == 3
@@ -0,0 +1,60 @@
+"""
+Unit and regression tests for the ctreweight module.
+"""
+
+import numpy as np
+import pytest
+
+from camparitraj import ctreweight, ctpre
+from camparitraj.ctexceptions import CTException
+
+
+def test_maxent_reweight():
+
+    np.random.seed(0)
+    calculated = np.random.normal(size=(5000, 3))
+    experimental = np.array([0.3, -0.2, 0.1])
+    sigma = np.array([0.05, 0.05, 0.1])
+
+    # theta -> 0 reproduces the data, and the weights have the maximum entropy (exponential) form
+    result = ctreweight.maxent_reweight(calculated, experimental, sigma=sigma, theta=1e-4)
+    assert result['converged']
+    assert np.allclose(result['average'], experimental, atol=1e-3)
+    assert np.isclose(np.sum(result['weights']), 1)
+
+    log_w = np.log(result['weights'])
+    assert np.allclose(log_w - log_w[0], -(calculated - calculated[0]).dot(result['lambdas']))
+
+    # larger theta keeps more of the prior, at the cost of a worse fit
+    relaxed = ctreweight.maxent_reweight(calculated, experimental, sigma=sigma, theta=10.0)
+    assert relaxed['phi'] > result['phi']
+    assert result['chi2'] < relaxed['chi2'] < relaxed['chi2_prior']
+    assert np.isclose(relaxed['chi2'], ctreweight.chi_squared(calculated, experimental, sigma, relaxed['weights']))
+
+    # float32 matrices are reweighted in float32
+    result_32 = ctreweight.maxent_reweight(calculated.astype(np.float32), experimental, sigma=sigma, theta=10.0)
+    assert np.allclose(result_32['weights'], relaxed['weights'], rtol=1e-3)
+
+    with pytest.raises(CTException):
+        ctreweight.maxent_reweight(calculated, experimental[:2])
+
+    with pytest.raises(CTException):
+        ctreweight.maxent_reweight(np.where(calculated > 2, np.nan, calculated), experimental)
+
+
+def test_reweight_protein(NTL9_CP):
+
+    # reweight against a target Rg and hand the weights back to CTProtein
+    rg = NTL9_CP.get_radius_of_gyration()
+    target = np.min(rg) + 0.25*(np.max(rg) - np.min(rg))
+
+    result = ctreweight.maxent_reweight(rg, [target], sigma=[0.01], theta=1e-3)
+    assert np.isclose(np.average(rg, weights=result['weights']), target, atol=0.02)
+
+    NTL9_CP.set_weights(result['weights'])
+    try:
+        PRE = ctpre.CTPRE(NTL9_CP, 5, 10, 10, 600000000)
+        (_, gammas, per_frame) = PRE.generate_PRE_profiles([9], return_per_frame=True)
+        assert np.allclose(gammas, np.average(per_frame, 0, weights=result['weights']))
+    finally:
+        NTL9_CP.clear_weights()
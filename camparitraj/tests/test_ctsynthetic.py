@@ -0,0 +1,73 @@
+"""
+Unit and regression tests for the ctsynthetic module.
+"""
+
+import numpy as np
+import mdtraj as md
+import pytest
+
+from camparitraj import ctsynthetic
+from camparitraj.cttrajectory import CTTrajectory
+from camparitraj.ctexceptions import CTException
+
+
+@pytest.mark.parametrize('model', ctsynthetic.MODELS)
+def test_generate_chain_coordinates(model):
+
+    xyz = ctsynthetic.generate_chain_coordinates(500, 200, model=model, seed=0)
+
+    assert xyz.shape == (500, 200, 3)
+    assert np.allclose(np.linalg.norm(np.diff(xyz, axis=1), axis=2), ctsynthetic.BOND_LENGTH, atol=1e-3)
+    assert np.allclose(np.mean(xyz, axis=1), 0, atol=1e-3)
+
+    # internal distances scale as |i-j|^nu
+    separations = np.array([8, 16, 32, 64])
+    rms = [np.sqrt(np.mean(np.sum(np.square(xyz[:, s:] - xyz[:, :-s]), axis=2))) for s in separations]
+    nu = np.polyfit(np.log(separations), np.log(rms), 1)[0]
+
+    expected = 0.5 if model == 'gaussian' else ctsynthetic.EXCLUDED_VOLUME_NU
+    assert abs(nu - expected) < 0.03
+
+    assert np.array_equal(xyz, ctsynthetic.generate_chain_coordinates(500, 200, model=model, seed=0))
+
+
+def test_generate_trajectory():
+
+    traj = ctsynthetic.generate_trajectory('GSPAW', n_frames=20, n_chains=3, caps=True, box=200.0, seed=1)
+
+    assert traj.n_frames == 20 and traj.n_chains == 3 and traj.n_residues == 21
+    assert np.allclose(traj.unitcell_lengths, 20.0)
+
+    # bonded atoms are at chemically sensible distances (nm)
+    bonds = np.array([(b.atom1.index, b.atom2.index) for b in traj.topology.bonds])
+    distances = md.compute_distances(traj, bonds)
+    assert distances.min() > 0.08 and distances.max() < 0.25
+
+    CO = CTTrajectory(TRJ=traj)
+    assert CO.num_proteins == 3
+    assert CO.proteinTrajectoryList[0].get_amino_acid_sequence(oneletter=True, numbered=False) == list('<GSPAW>')
+
+    traj = ctsynthetic.generate_trajectory(n_residues=40, n_frames=5, resolution='CA')
+    assert traj.n_atoms == 40
+
+    with pytest.raises(CTException):
+        ctsynthetic.generate_trajectory('GSX', n_frames=2)
+
+    with pytest.raises(CTException):
+        ctsynthetic.generate_trajectory(n_residues=10, resolution='CA', caps=True)
+
+
+def test_write_trajectory(tmp_path):
+
+    pdb = str(tmp_path / 'synthetic.pdb')
+    xtc = str(tmp_path / 'synthetic.xtc')
+
+    ctsynthetic.write_trajectory(pdb, xtc, n_residues=25, n_frames=23, box=150.0, model='excluded-volume', seed=2, chunk_size=5)
+    traj = md.load(xtc, top=pdb)
+
+    assert traj.n_frames == 23 and traj.n_residues == 25
+    assert np.allclose(traj.unitcell_lengths, 15.0)
+    assert np.allclose(traj.time, np.arange(23))
+
+    CA = traj.topology.select('name CA')
+    assert np.allclose(np.linalg.norm(np.diff(traj.xyz[:, CA], axis=1), axis=2), 0.38, atol=2e-3)
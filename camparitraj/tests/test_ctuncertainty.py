@@ -0,0 +1,184 @@
+"""
+Unit and regression tests for the ctuncertainty module.
+"""
+
+import numpy as np
+import pytest
+
+from camparitraj import ctuncertainty
+from camparitraj.ctexceptions import CTException
+
+
+def __ar1(n_frames, phi, seed=1, n_obs=None):
+    """
+    Generate an AR(1) series with lag-1 correlation phi (tau = (1+phi)/(1-phi))
+    """
+    rng = np.random.default_rng(seed)
+    shape = (n_frames,) if n_obs is None else (n_frames, n_obs)
+    noise = rng.normal(size=shape)
+    x = np.zeros(shape)
+    x[0] = noise[0]
+    for i in range(1, n_frames):
+        x[i] = phi*x[i-1] + np.sqrt(1 - phi**2)*noise[i]
+    return x
+
+
+def test_autocorrelation_uncorrelated():
+    x = np.random.default_rng(2).normal(size=5000)
+
+    acf = ctuncertainty.autocorrelation(x)
+    assert acf.shape == (5000,)
+    assert abs(acf[0] - 1.0) < 1e-10
+    assert abs(acf[1]) < 0.05
+
+    tau = ctuncertainty.integrated_autocorrelation_time(x)
+    assert 0.7 < tau < 1.3
+
+
+def test_integrated_autocorrelation_time_ar1():
+
+    # expected tau = (1 + 0.8)/(1 - 0.8) = 9
+    x = __ar1(20000, 0.8)
+    tau = ctuncertainty.integrated_autocorrelation_time(x)
+    assert 7 < tau < 11
+
+    block_size = ctuncertainty.select_block_size(x)
+    assert block_size >= 14
+
+
+def test_block_average_matches_theory():
+
+    x = __ar1(20000, 0.8)
+    (mean, stderr, block_size) = ctuncertainty.block_average(x)
+
+    # true standard error is sqrt(tau/N)
+    assert abs(mean - np.mean(x)) < 1e-12
+    assert 0.6*np.sqrt(9.0/20000) < stderr < 1.4*np.sqrt(9.0/20000)
+
+    # naive (block_size=1) estimate underestimates the error for correlated data
+    (_, naive, _) = ctuncertainty.block_average(x, block_size=1)
+    assert naive < stderr
+
+
+def test_block_bootstrap_maps():
+
+    # five-frame-correlated per-frame 'maps'
+    data = __ar1(2000, 0.5, n_obs=12).reshape(2000, 3, 4) + 10
+
+    (mean, stderr, lower, upper, block_size) = ctuncertainty.block_bootstrap(data, n_bootstrap=500, seed=10)
+
+    assert mean.shape == (3, 4)
+    assert stderr.shape == (3, 4)
+    assert np.all(lower <= mean)
+    assert np.all(upper >= mean)
+    assert np.allclose(mean, np.mean(data, axis=0))
+
+    # bootstrap and block standard errors should agree with a fixed block size
+    (_, block_err, _) = ctuncertainty.block_average(data, block_size=block_size)
+    assert np.all(np.abs(stderr - block_err) / block_err < 0.3)
+
+    # reproducible with a seed
+    again = ctuncertainty.block_bootstrap(data, n_bootstrap=500, seed=10)
+    assert np.allclose(again[2], lower)
+
+
+def test_block_average_weights():
+    x = np.arange(100, dtype=float)
+    weights = np.zeros(100)
+    weights[50:] = 1.0
+
+    (mean, stderr, _) = ctuncertainty.block_average(x, block_size=5, weights=weights)
+    assert abs(mean - np.mean(x[50:])) < 1e-10
+
+    with pytest.raises(CTException):
+        ctuncertainty.block_average(x, block_size=5, weights=weights[1:])
+
+    with pytest.raises(CTException):
+        ctuncertainty.block_average(x, block_size=20)
+
+
+def test_get_distance_map_uncertainty(NTL9_CP):
+
+    (distance_map, stderr_map, lower, upper, block_size) = NTL9_CP.get_distance_map_uncertainty(block_size=1, n_bootstrap=200, seed=1, verbose=False)
+    (ref_map, _) = NTL9_CP.get_distance_map(verbose=False)
+
+    assert np.allclose(distance_map, ref_map, atol=1e-4)
+    assert np.allclose(stderr_map, np.triu(stderr_map))
+    assert np.all(lower <= distance_map + 1e-6)
+    assert np.all(upper >= distance_map - 1e-6)
+
+    (_, block_stderr, lower, upper, _) = NTL9_CP.get_distance_map_uncertainty(method='block', block_size=1, verbose=False)
+    assert lower is None and upper is None
+    assert block_stderr[0, 10] > 0
+
+    # progress is reported through the standard progress protocol
+    calls = []
+    NTL9_CP.get_distance_map_uncertainty(method='block', block_size=1, progress=calls.append)
+    assert calls[-1]['done'] and calls[-1]['description'] == 'get_distance_map_uncertainty'
+
+
+def test_bootstrap_replicates():
+
+    data = __ar1(2000, 0.5, n_obs=6).reshape(2000, 2, 3) + 10
+
+    (replicates, block_size) = ctuncertainty.bootstrap_replicates(data, block_size=10, n_bootstrap=300, seed=4)
+    assert replicates.shape == (300, 2, 3) and block_size == 10
+
+    # the replicates are those summarized by block_bootstrap
+    (_, stderr, lower, upper, _) = ctuncertainty.block_bootstrap(data, block_size=10, n_bootstrap=300, seed=4)
+    assert np.allclose(np.std(replicates, axis=0, ddof=1), stderr)
+    assert np.allclose(np.percentile(replicates, 2.5, axis=0), lower)
+
+    # replicates that only draw zero-weight blocks are discarded
+    weights = np.zeros(2000)
+    weights[:200] = 1
+    (replicates, _) = ctuncertainty.bootstrap_replicates(data, block_size=200, n_bootstrap=300, weights=weights, seed=4)
+    assert 2 <= replicates.shape[0] < 300
+    assert np.allclose(replicates, np.mean(data[:200], axis=0))
+
+
+def test_get_scaling_exponent_bootstrap(NTL9_CP):
+
+    fit = NTL9_CP.get_scaling_exponent(seed=3, n_bootstrap=200)
+    assert fit[2] <= fit[0] <= fit[3] and fit[4] <= fit[1] <= fit[5]
+
+    # error bounds are reproducible with a seed, and narrow with the confidence level
+    assert np.allclose(fit[0:8], NTL9_CP.get_scaling_exponent(seed=3, n_bootstrap=200)[0:8])
+    narrow = NTL9_CP.get_scaling_exponent(seed=3, n_bootstrap=200, confidence=50)
+    assert narrow[3] - narrow[2] < fit[3] - fit[2]
+
+    # the best fit does not depend on the error estimate, and very few frames still work
+    assert np.isclose(NTL9_CP.get_scaling_exponent(block_size=1, n_bootstrap=50)[0], fit[0])
+    assert np.isfinite(NTL9_CP.get_scaling_exponent(stride=4)[2])
+
+
+def test_get_contact_map_uncertainty(NTL9_CP):
+
+    (contact_map, stderr_map, lower, upper, block_size) = NTL9_CP.get_contact_map_uncertainty(block_size=1, n_bootstrap=200, seed=1)
+
+    assert np.allclose(contact_map, NTL9_CP.get_contact_map()[0])
+    assert np.allclose(stderr_map, stderr_map.transpose())
+    assert np.all(lower <= contact_map + 1e-6) and np.all(upper >= contact_map - 1e-6)
+
+    # pairs in contact in only some frames have a non-zero error
+    partial = (contact_map > 0) & (contact_map < 1)
+    assert np.any(partial) and np.all(stderr_map[partial] > 0)
+
+    weights = np.ones(NTL9_CP.n_frames)
+    weights[::2] = 0
+    (weighted_map, _, lower, upper, _) = NTL9_CP.get_contact_map_uncertainty(method='block', block_size=1, weights=weights)
+    assert np.allclose(weighted_map, NTL9_CP.get_contact_map(weights=weights)[0])
+    assert lower is None and upper is None
+
+
+def test_get_secondary_structure_DSSP_uncertainty(NTL9_CP):
+
+    (dssp, stderr, lower, upper, block_size) = NTL9_CP.get_secondary_structure_DSSP_uncertainty(block_size=1, n_bootstrap=200, seed=1)
+
+    assert np.allclose(dssp, NTL9_CP.get_secondary_structure_DSSP())
+    assert stderr.shape == dssp.shape and np.array_equal(stderr[0], dssp[0])
+    assert np.all(stderr[1:] >= 0)
+    assert np.all(lower[1:] <= dssp[1:] + 1e-6) and np.all(upper[1:] >= dssp[1:] - 1e-6)
+
+    (local, _, _, _, _) = NTL9_CP.get_secondary_structure_DSSP_uncertainty(R1=5, R2=20, method='block', block_size=1)
+    assert np.allclose(local, NTL9_CP.get_secondary_structure_DSSP(R1=5, R2=20))